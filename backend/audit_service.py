@@ -20,12 +20,26 @@ Uso:
 from datetime import datetime, timezone
 from typing import Optional, List, Literal
 from fastapi import Request
+import asyncio
 import logging
+import os
+import time
+
+from pymongo.errors import BulkWriteError
 
 from utils.client_time import current_time_context, local_day_bounds_utc, local_now
 
 logger = logging.getLogger(__name__)
 
+# [Out/2026] Gravação bufferizada (AuditWriter). Desligar com AUDIT_BUFFERED=0
+# volta ao insert_one inline por registro.
+AUDIT_BUFFERED = os.environ.get('AUDIT_BUFFERED', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+AUDIT_BUFFER_MAX = int(os.environ.get('AUDIT_BUFFER_MAX', '10000'))
+AUDIT_FLUSH_BATCH = int(os.environ.get('AUDIT_FLUSH_BATCH', '500'))
+AUDIT_FLUSH_INTERVAL_SECONDS = float(os.environ.get('AUDIT_FLUSH_INTERVAL_SECONDS', '0.5'))
+AUDIT_ENQUEUE_TIMEOUT_SECONDS = float(os.environ.get('AUDIT_ENQUEUE_TIMEOUT_SECONDS', '2'))
+AUDIT_FLUSH_RETRIES = int(os.environ.get('AUDIT_FLUSH_RETRIES', '3'))
+
 # Coleções que devem ser auditadas
 AUDITED_COLLECTIONS = {
     'grades': {'severity': 'critical', 'category': 'academic'},
@@ -78,12 +92,169 @@ COLLECTION_NAMES = {
 }
 
 
+class AuditWriter:
+    """Buffer em processo para `audit_logs` (Out/2026).
+
+    `log()` só enfileira; uma task de fundo grava com `insert_many` quando o
+    buffer atinge `batch_size` ou a cada `flush_interval` segundos.
+
+    - Backpressure: com o buffer cheio, o chamador espera até
+      `enqueue_timeout` por espaço; se ainda assim não houver, grava o
+      registro inline (mais lento, mas nada se perde).
+    - Retentativas: o `_id` é atribuído pelo driver na 1ª tentativa, então
+      reenviar o mesmo lote é idempotente (duplicatas = já gravado).
+      Esgotadas as tentativas, o lote é descartado e contado em `dropped`.
+    - Shutdown: `stop()` drena o buffer inteiro antes de retornar.
+    """
+
+    def __init__(self, get_collection, *, max_size: int = AUDIT_BUFFER_MAX,
+                 batch_size: int = AUDIT_FLUSH_BATCH,
+                 flush_interval: float = AUDIT_FLUSH_INTERVAL_SECONDS,
+                 enqueue_timeout: float = AUDIT_ENQUEUE_TIMEOUT_SECONDS,
+                 retries: int = AUDIT_FLUSH_RETRIES):
+        self._get_collection = get_collection
+        self._max_size = max(1, max_size)
+        self._batch_size = max(1, batch_size)
+        self._flush_interval = flush_interval
+        self._enqueue_timeout = enqueue_timeout
+        self._retries = max(0, retries)
+        self._queue: Optional[asyncio.Queue] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            'enqueued': 0, 'flushed': 0, 'flushes': 0, 'flush_errors': 0,
+            'retries': 0, 'dropped': 0, 'inline_fallback': 0,
+            'backpressure_waits': 0, 'max_queue_depth': 0,
+            'flush_ms_last': 0.0, 'flush_ms_max': 0.0, 'flush_ms_total': 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self._max_size)
+        self._wake = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10) -> None:
+        """Para a task e drena TODO o buffer (chamado no shutdown do app)."""
+        if self._task is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        try:
+            await asyncio.wait_for(self._task, timeout=timeout)
+        except Exception as e:
+            logger.warning(f"[audit] writer não encerrou em {timeout}s: {e}")
+            self._task.cancel()
+        await self.flush()
+        self._task = None
+
+    async def enqueue(self, record: dict) -> None:
+        queue = self._queue
+        self._stats['enqueued'] += 1
+        try:
+            queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self._stats['backpressure_waits'] += 1
+            self._wake.set()
+            try:
+                await asyncio.wait_for(queue.put(record), timeout=self._enqueue_timeout)
+            except asyncio.TimeoutError:
+                self._stats['inline_fallback'] += 1
+                await self._write([record])
+                return
+        depth = queue.qsize()
+        if depth > self._stats['max_queue_depth']:
+            self._stats['max_queue_depth'] = depth
+        if depth >= self._batch_size:
+            self._wake.set()
+
+    async def flush(self) -> int:
+        """Grava tudo o que está no buffer agora. Retorna nº de registros gravados."""
+        if self._queue is None:
+            return 0
+        written = 0
+        async with self._lock:
+            while not self._queue.empty():
+                batch = []
+                while len(batch) < self._batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                written += await self._write(batch)
+        return written
+
+    async def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:  # noqa: BLE001 — o loop nunca pode morrer
+                logger.error(f"[audit] flush falhou: {e}")
+
+    async def _write(self, batch: list) -> int:
+        if not batch:
+            return 0
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                await self._get_collection().insert_many(batch, ordered=False)
+                break
+            except BulkWriteError as e:
+                # Duplicata (11000) = registro gravado numa tentativa anterior.
+                errors = [w for w in e.details.get('writeErrors', []) if w.get('code') != 11000]
+                if errors:
+                    self._stats['flush_errors'] += 1
+                    self._stats['dropped'] += len(errors)
+                    logger.error(f"[audit] {len(errors)} registros descartados: {errors[0].get('errmsg')}")
+                    self._stats['flushed'] += len(batch) - len(errors)
+                    return len(batch) - len(errors)
+                break
+            except Exception as e:
+                self._stats['flush_errors'] += 1
+                if attempt >= self._retries:
+                    self._stats['dropped'] += len(batch)
+                    logger.error(f"[audit] {len(batch)} registros descartados após {attempt + 1} tentativas: {e}")
+                    return 0
+                attempt += 1
+                self._stats['retries'] += 1
+                await asyncio.sleep(min(0.1 * (2 ** attempt), 2.0))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._stats['flushes'] += 1
+        self._stats['flushed'] += len(batch)
+        self._stats['flush_ms_last'] = round(elapsed_ms, 2)
+        self._stats['flush_ms_max'] = round(max(self._stats['flush_ms_max'], elapsed_ms), 2)
+        self._stats['flush_ms_total'] += elapsed_ms
+        return len(batch)
+
+    def stats(self) -> dict:
+        snap = dict(self._stats)
+        total_ms = snap.pop('flush_ms_total')
+        snap['flush_ms_avg'] = round(total_ms / snap['flushes'], 2) if snap['flushes'] else 0.0
+        snap['queue_depth'] = self._queue.qsize() if self._queue is not None else 0
+        snap['queue_max'] = self._max_size
+        snap['running'] = self.running
+        return snap
+
+
 class AuditService:
     """Serviço de auditoria para rastrear alterações no sistema"""
     
     def __init__(self):
         self.db = None
         self._enabled = True
+        self._writer: Optional[AuditWriter] = None
     
     def set_db(self, db):
         """Define a conexão com o banco de dados"""
@@ -96,6 +267,30 @@ class AuditService:
     def enable(self):
         """Reabilita a auditoria"""
         self._enabled = True
+
+    def start_writer(self):
+        """Liga a gravação bufferizada (startup do app). Sem isso — scripts,
+        testes — `log()` continua gravando inline."""
+        if not AUDIT_BUFFERED or self.db is None:
+            return
+        if self._writer is None:
+            self._writer = AuditWriter(lambda: self.db.audit_logs)
+        self._writer.start()
+
+    async def stop_writer(self, timeout: float = 10):
+        """Drena o buffer e para o writer (shutdown do app)."""
+        if self._writer is not None:
+            await self._writer.stop(timeout=timeout)
+
+    async def flush(self):
+        """Grava imediatamente o que estiver no buffer (leituras read-your-writes)."""
+        if self._writer is not None and self._writer.running:
+            await self._writer.flush()
+
+    def writer_stats(self) -> dict:
+        if self._writer is None:
+            return {'buffered': False}
+        return {'buffered': True, **self._writer.stats()}
     
     async def log(
         self,
@@ -190,8 +385,11 @@ class AuditService:
             if extra_data:
                 audit_record['extra_data'] = extra_data
             
-            # Insere no banco
-            await self.db.audit_logs.insert_one(audit_record)
+            # Insere no banco (via buffer quando o writer está ativo)
+            if self._writer is not None and self._writer.running:
+                await self._writer.enqueue(audit_record)
+            else:
+                await self.db.audit_logs.insert_one(audit_record)
             
             # Log também no console para monitoramento
             logger.info(f"AUDIT: [{action.upper()}] {collection} - {description} - User: {user.get('email')}")
@@ -269,6 +467,7 @@ class AuditService:
         """
         if self.db is None:
             return [], 0
+        await self.flush()
         
         query = {}
         
@@ -429,6 +628,7 @@ class AuditService:
     
     async def get_user_activity(self, user_id: str, limit: int = 20) -> List[dict]:
         """Retorna atividades recentes de um usuário específico"""
+        await self.flush()
         cursor = self.db.audit_logs.find(
             {'user_id': user_id},
             {'_id': 0}
@@ -438,6 +638,7 @@ class AuditService:
     
     async def get_document_history(self, collection: str, document_id: str) -> List[dict]:
         """Retorna histórico de alterações de um documento específico"""
+        await self.flush()
         cursor = self.db.audit_logs.find(
             {'collection': collection, 'document_id': document_id},
             {'_id': 0}
@@ -448,6 +649,7 @@ class AuditService:
     async def get_critical_events(self, hours: int = 24) -> List[dict]:
         """Retorna eventos críticos das últimas X horas"""
         from datetime import timedelta
+        await self.flush()
         
         cutoff = (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat()
         
@@ -26,7 +26,16 @@ class AuthMiddleware:
           1. Cookie HttpOnly `sigesc_access` (novo padrão seguro).
           2. Header `Authorization: Bearer ...` (retrocompat durante migração).
           3. Query param `?token=...` (necessário p/ window.open em PDFs).
+
+        [Out/2026] O resultado é memoizado em `request.state` — `require_roles`,
+        `require_permission` e o próprio handler chamam isto várias vezes por
+        request; só a 1ª decodifica o JWT e consulta a blacklist.
         """
+        state = getattr(request, 'state', None)
+        cached = getattr(state, '_auth_user', None)
+        if isinstance(cached, dict):
+            return {**cached, 'school_ids': list(cached['school_ids'] or [])}
+
         token = request.cookies.get(ACCESS_COOKIE_NAME)
 
         if not token:
@@ -87,7 +96,7 @@ class AuthMiddleware:
                     headers={'WWW-Authenticate': 'Bearer'},
                 )
         
-        return {
+        user = {
             'id': user_id,
             'role': payload.get('role'),
             'school_ids': payload.get('school_ids', []),
@@ -95,6 +104,10 @@ class AuthMiddleware:
             'is_sandbox': payload.get('is_sandbox', False),
             'mantenedora_id': payload.get('mantenedora_id'),
         }
+        # Cópia: handlers às vezes alteram o dict recebido (ex.: school_ids).
+        if state is not None:
+            state._auth_user = {**user, 'school_ids': list(user['school_ids'] or [])}
+        return user
     
     @staticmethod
     def require_roles(allowed_roles: List[str]):
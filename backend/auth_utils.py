@@ -1,11 +1,14 @@
 import bcrypt as _bcrypt
 from jose import JWTError, jwt
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
 from pathlib import Path
 from dotenv import load_dotenv
+import asyncio
 import os
 import secrets
+import time
 import uuid
 import logging
 
@@ -25,6 +28,14 @@ ALGORITHM = 'HS256'
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get('ACCESS_TOKEN_EXPIRE_MINUTES', 15))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.environ.get('REFRESH_TOKEN_EXPIRE_DAYS', 7))
 
+# [Out/2026] Cache em processo da blacklist (TokenBlacklistService). Revogações
+# feitas em OUTRA réplica valem aqui em até TOKEN_REVOCATION_REFRESH_SECONDS.
+# 0 desliga o cache (consulta o Mongo a cada request, como antes).
+TOKEN_REVOCATION_REFRESH_SECONDS = float(os.environ.get('TOKEN_REVOCATION_REFRESH_SECONDS', 2))
+TOKEN_REVOCATION_CACHE_MAX = int(os.environ.get('TOKEN_REVOCATION_CACHE_MAX', 100000))
+# Releitura sobreposta: cobre relógios de réplicas levemente dessincronizados.
+_REVOCATION_SYNC_OVERLAP = timedelta(seconds=60)
+
 # G2 (Fev/2026): HttpOnly cookies config
 # COOKIE_SECURE=true em produção (HTTPS). No preview emergentagent.com é HTTPS, OK.
 # SAMESITE=lax é o padrão recomendado para sessões web tradicionais.
@@ -179,10 +190,94 @@ class TokenBlacklistService:
     def __init__(self):
         self.db = None
         self._collection_name = 'token_blacklist'
+        # [Out/2026] Espelho em memória da coleção (pequena: TTL em expires_at).
+        # jti → expires_at (LRU limitado) e user_id → maior revoke_all_before.
+        self._revoked_jtis: "OrderedDict[str, Optional[datetime]]" = OrderedDict()
+        self._revoke_all_before: Dict[str, datetime] = {}
+        self._synced_until: Optional[datetime] = None
+        self._last_refresh = 0.0
+        self._overflow = False
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self.cache_stats = {'cached_checks': 0, 'refreshes': 0, 'refresh_errors': 0, 'db_fallbacks': 0}
     
     def set_db(self, db):
         """Configura a conexão com o banco de dados"""
         self.db = db
+        self._reset_cache()
+
+    # ---------- cache de revogação (Out/2026) ----------
+
+    def _reset_cache(self):
+        self._revoked_jtis.clear()
+        self._revoke_all_before.clear()
+        self._synced_until = None
+        self._last_refresh = 0.0
+        self._overflow = False
+
+    @staticmethod
+    def _aware(dt):
+        if isinstance(dt, datetime) and dt.tzinfo is None:
+            return dt.replace(tzinfo=timezone.utc)
+        return dt
+
+    def _remember(self, doc: dict):
+        """Aplica um documento da blacklist ao espelho em memória."""
+        if doc.get('jti'):
+            self._revoked_jtis[doc['jti']] = self._aware(doc.get('expires_at'))
+            self._revoked_jtis.move_to_end(doc['jti'])
+            if len(self._revoked_jtis) > TOKEN_REVOCATION_CACHE_MAX:
+                # Sem espaço: os jtis mais antigos saem e, a partir daqui,
+                # um miss precisa confirmar no banco.
+                self._revoked_jtis.popitem(last=False)
+                self._overflow = True
+        if doc.get('user_id') and doc.get('revoke_all_before') is not None:
+            before = self._aware(doc['revoke_all_before'])
+            current = self._revoke_all_before.get(doc['user_id'])
+            if current is None or before > current:
+                self._revoke_all_before[doc['user_id']] = before
+        revoked_at = self._aware(doc.get('revoked_at'))
+        if isinstance(revoked_at, datetime) and (self._synced_until is None or revoked_at > self._synced_until):
+            self._synced_until = revoked_at
+
+    async def refresh_cache(self, force: bool = False) -> bool:
+        """Sincroniza o espelho com a coleção — incremental por `revoked_at`.
+
+        Retorna False se o cache não pôde ser usado (desligado ou erro); nesse
+        caso o chamador consulta o banco diretamente.
+        """
+        if self.db is None or TOKEN_REVOCATION_REFRESH_SECONDS <= 0:
+            return False
+        if not force and self._last_refresh and time.monotonic() - self._last_refresh < TOKEN_REVOCATION_REFRESH_SECONDS:
+            return True
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            # Outra coroutine pode ter atualizado enquanto esperávamos o lock.
+            if not force and self._last_refresh and time.monotonic() - self._last_refresh < TOKEN_REVOCATION_REFRESH_SECONDS:
+                return True
+            query: Dict[str, Any] = {}
+            if self._synced_until is not None:
+                query['revoked_at'] = {'$gte': self._synced_until - _REVOCATION_SYNC_OVERLAP}
+            try:
+                async for doc in self.db[self._collection_name].find(
+                    query, {'_id': 0, 'jti': 1, 'user_id': 1, 'revoke_all_before': 1,
+                            'revoked_at': 1, 'expires_at': 1}
+                ).sort('revoked_at', 1):
+                    self._remember(doc)
+            except Exception as e:
+                self.cache_stats['refresh_errors'] += 1
+                logger.warning(f"[TokenBlacklist] refresh do cache falhou: {e}")
+                return False
+            self._prune_expired()
+            self._last_refresh = time.monotonic()
+            self.cache_stats['refreshes'] += 1
+            return True
+
+    def _prune_expired(self):
+        now = datetime.now(timezone.utc)
+        expired = [j for j, exp in self._revoked_jtis.items() if isinstance(exp, datetime) and exp < now]
+        for j in expired:
+            del self._revoked_jtis[j]
     
     async def ensure_index(self):
         """Cria índices necessários para performance"""
@@ -194,6 +289,8 @@ class TokenBlacklistService:
             await self.db[self._collection_name].create_index('jti', unique=True, sparse=True)
             # Índice para busca por user_id
             await self.db[self._collection_name].create_index('user_id')
+            # Refresh incremental do cache em memória (Out/2026)
+            await self.db[self._collection_name].create_index('revoked_at')
             # TTL index para limpeza automática de tokens expirados
             await self.db[self._collection_name].create_index(
                 'expires_at', 
@@ -220,11 +317,13 @@ class TokenBlacklistService:
                 'expires_at': expires_at,
                 'reason': reason or 'manual_revocation'
             })
+            self._remember({'jti': jti, 'expires_at': expires_at})
             logger.info(f"[TokenBlacklist] Token revogado: jti={jti[:8]}... user={user_id}")
             return True
         except Exception as e:
             # Ignora erro de duplicata (token já revogado)
             if 'duplicate key' in str(e).lower():
+                self._remember({'jti': jti, 'expires_at': expires_at})
                 return True
             logger.error(f"[TokenBlacklist] Erro ao revogar token: {e}")
             return False
@@ -255,6 +354,7 @@ class TokenBlacklistService:
                 'expires_at': now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS + 1),
                 'reason': reason or 'revoke_all_sessions'
             })
+            self._remember({'user_id': user_id, 'revoke_all_before': revoke_before})
             logger.info(f"[TokenBlacklist] Todos os tokens revogados para user={user_id}")
             return True
         except Exception as e:
@@ -269,7 +369,44 @@ class TokenBlacklistService:
         """
         if self.db is None:
             return False  # Se não há DB, assume que não está revogado
-        
+
+        # [Out/2026] Caminho rápido: espelho em memória (sem round trip).
+        if await self.refresh_cache():
+            self.cache_stats['cached_checks'] += 1
+            return await self._is_revoked_cached(jti, user_id, issued_at)
+        return await self._is_revoked_db(jti, user_id, issued_at)
+
+    @staticmethod
+    def _issued_datetime(issued_at):
+        """Converte issued_at (string ISO, timestamp numérico ou datetime) em datetime aware."""
+        if isinstance(issued_at, str):
+            token_issued = datetime.fromisoformat(issued_at.replace('Z', '+00:00'))
+        elif isinstance(issued_at, (int, float)):
+            token_issued = datetime.fromtimestamp(issued_at, tz=timezone.utc)
+        else:
+            token_issued = issued_at
+        return TokenBlacklistService._aware(token_issued)
+
+    async def _is_revoked_cached(self, jti, user_id, issued_at) -> bool:
+        if jti:
+            if jti in self._revoked_jtis:
+                return True
+            if self._overflow:
+                # Espelho incompleto: um miss não prova nada → confirma no banco.
+                self.cache_stats['db_fallbacks'] += 1
+                return await self._is_revoked_db(jti, user_id, issued_at)
+        if user_id and issued_at:
+            before = self._revoke_all_before.get(user_id)
+            if before is not None:
+                try:
+                    if self._issued_datetime(issued_at) < before:
+                        return True
+                except Exception as e:
+                    logger.debug(f"[TokenBlacklist] Erro ao verificar revoke_all: {e}")
+        return False
+
+    async def _is_revoked_db(self, jti, user_id, issued_at) -> bool:
+        """Consulta direta à coleção (cache desligado, overflow ou falha do refresh)."""
         try:
             # Verifica revogação específica por jti
             if jti:
@@ -280,14 +417,7 @@ class TokenBlacklistService:
             # Verifica se há revoke_all para este usuário
             if user_id and issued_at:
                 try:
-                    # Converte issued_at para datetime
-                    if isinstance(issued_at, str):
-                        token_issued = datetime.fromisoformat(issued_at.replace('Z', '+00:00'))
-                    elif isinstance(issued_at, (int, float)):
-                        # Timestamp numérico
-                        token_issued = datetime.fromtimestamp(issued_at, tz=timezone.utc)
-                    else:
-                        token_issued = issued_at
+                    token_issued = self._issued_datetime(issued_at)
                     
                     revoke_all = await self.db[self._collection_name].find_one({
                         'user_id': user_id,
@@ -298,9 +428,7 @@ class TokenBlacklistService:
                         # Motor sem tz_aware retorna datetime naive do Mongo;
                         # nosso token_issued é aware. Normalizamos para evitar
                         # TypeError na comparação que era engolido pelo except.
-                        revoke_before = revoke_all['revoke_all_before']
-                        if revoke_before.tzinfo is None:
-                            revoke_before = revoke_before.replace(tzinfo=timezone.utc)
+                        revoke_before = self._aware(revoke_all['revoke_all_before'])
                         if token_issued < revoke_before:
                             return True
                 except Exception as e:
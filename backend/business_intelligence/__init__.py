@@ -6,6 +6,7 @@ IMPORTANTE (Sprint BI-1A): este pacote é APENAS infraestrutura/arquitetura.
 - Não implementa indicadores.
 - Não é registrado no `server.py` (zero impacto no comportamento em runtime).
 - Não acessa MongoDB diretamente (depende apenas de Data Providers via interfaces).
+  Exceção (Sprint BI-3): `materialization.MongoMaterializer` persiste os marts.
 
 Camadas (baixo acoplamento, alta coesão):
     models          -> enums e vocabulário do domínio
@@ -1,4 +1,5 @@
-"""Cache providers. No-op default (não altera comportamento)."""
+"""Cache providers. No-op default (não altera comportamento); região do `utils.cache` na BI-3."""
 from .null_cache import NullCacheProvider
+from .region_cache import RegionCacheProvider
 
-__all__ = ["NullCacheProvider"]
+__all__ = ["NullCacheProvider", "RegionCacheProvider"]
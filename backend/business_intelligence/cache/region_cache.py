@@ -0,0 +1,49 @@
+"""RegionCacheProvider — ICacheProvider sobre a camada de cache do SIGESC.
+
+Usa uma região de `utils/cache.py` (`bi_indicators`): LRU limitada, TTL por
+entrada, tags e — quando o tier compartilhado está ligado — valores visíveis
+para todas as réplicas. Resultados são guardados como documento (codec), o que
+mantém o valor BSON-serializável e devolve `ResultSource.CACHE` no trace.
+
+Tags por entrada: `bi:<code>`, `bi:<code>@<version>` e `bi-scope:<scope_id>`.
+"""
+from __future__ import annotations
+from typing import Optional
+
+from utils.cache import CacheRegion, get_region
+
+from ..interfaces.ports import ICacheProvider
+from ..contracts.execution import CacheContext
+from ..contracts.results import IndicatorResult
+from ..models.enums import ResultSource
+from ..materialization.codec import result_from_doc, result_to_doc
+
+
+class RegionCacheProvider(ICacheProvider):
+    def __init__(self, region: Optional[CacheRegion] = None, *, max_entries: int = 5000) -> None:
+        self._region = region or get_region("bi_indicators", max_entries=max_entries, shared=True)
+
+    async def get(self, ctx: CacheContext) -> Optional[IndicatorResult]:
+        doc = self._region.get(ctx.cache_key)
+        if doc is None:
+            return None
+        return result_from_doc(doc, source=ResultSource.CACHE)
+
+    async def set(self, ctx: CacheContext, result: IndicatorResult, ttl_seconds: int) -> None:
+        if ttl_seconds <= 0:
+            return None
+        tags = [f"bi:{ctx.code}", f"bi:{ctx.code}@{ctx.version}"]
+        if ctx.scope_id:
+            tags.append(f"bi-scope:{ctx.scope_id}")
+        self._region.set(ctx.cache_key, result_to_doc(result), ttl_seconds, tags)
+
+    async def invalidate(self, ctx: CacheContext) -> None:
+        self._region.delete(ctx.cache_key)
+
+    def invalidate_indicator(self, code: str, version: Optional[int] = None) -> int:
+        """Remove todas as entradas de um indicador (ou de uma versão)."""
+        tag = f"bi:{code}" if version is None else f"bi:{code}@{version}"
+        return self._region.invalidate_tags(tag)
+
+    def invalidate_scope(self, scope_id: str) -> int:
+        return self._region.invalidate_tags(f"bi-scope:{scope_id}")
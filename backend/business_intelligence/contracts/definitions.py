@@ -56,11 +56,25 @@ class KpiSpec:
     direction: KpiDirection = KpiDirection.HIGHER_IS_BETTER
 
 
+# Idade máxima de um mart por periodicidade (None => fresco até ser invalidado).
+PERIODICITY_MAX_AGE_SECONDS = {
+    "hourly": 3600,
+    "daily": 86400,
+    "weekly": 7 * 86400,
+    "monthly": 31 * 86400,
+    "on_demand": None,
+}
+
+
 @dataclass(frozen=True)
 class RefreshSpec:
     periodicity: str = "on_demand"       # daily | monthly | on_demand ...
     strategy: RefreshStrategy = RefreshStrategy.REALTIME
 
+    @property
+    def max_age_seconds(self) -> Optional[int]:
+        return PERIODICITY_MAX_AGE_SECONDS.get(self.periodicity)
+
 
 @dataclass(frozen=True)
 class CacheSpec:
@@ -76,3 +76,12 @@ class MaterializationContext:
     scope_id: Optional[str] = None
     academic_year: Optional[int] = None
     period: Optional[str] = None
+    max_age_seconds: Optional[int] = None  # frescor (RefreshSpec.periodicity); None => até invalidar
+
+    @property
+    def mart_key(self) -> str:
+        """Chave do documento no mart: code|version|grain|scope|ano|período."""
+        return "|".join([
+            self.code, str(self.version), self.grain.value,
+            self.scope_id or "*", str(self.academic_year or "*"), self.period or "*",
+        ])
@@ -8,10 +8,13 @@ dashboards, nem indicadores concretos. Define o FLUXO oficial de resolução:
             -> [cache.get]
             -> data_provider.fetch -> calculator.calculate
             -> aggregator.aggregate (se grão-alvo != grão base)
-            -> cache.set / (materialização é responsabilidade do ETL)
+            -> cache.set / materializer.write (semeia o mart num miss de indicador MATERIALIZED)
             -> traceability.record + observability.emit
             -> IndicatorResult (oficial, rastreável)
 
+Sprint BI-3: `materialize(request)` é a entrada do ETL (recalcula ignorando
+mart/cache e grava o mart) — usada pelo `MartRefreshJob` agendado.
+
 Na Sprint BI-1A o Engine é montado com providers no-op e SEM calculators/data
 providers concretos — portanto `compute` lança `NoCalculatorError` de forma
 controlada (nenhum indicador existe ainda). Isso é o comportamento esperado da
@@ -68,14 +71,9 @@ class BIEngine:
         definition = self._registry.get(request.code, request.version)
 
         # 1) Materialização (marts) — leitura se fresca
+        mctx = None
         if definition.materialization.enabled:
-            mctx = MaterializationContext(
-                code=definition.code, version=definition.version,
-                mart=definition.materialization.mart,
-                incremental_key=definition.materialization.incremental_key,
-                grain=request.grain, scope_id=request.scope_id,
-                academic_year=request.academic_year, period=request.period,
-            )
+            mctx = self.materialization_context(request, definition)
             if await self._materializer.is_fresh(mctx):
                 mat = await self._materializer.read(mctx)
                 if mat is not None:
@@ -89,6 +87,32 @@ class BIEngine:
             if cached is not None:
                 return cached
 
+        # 3-4) Cálculo + agregação
+        base = await self._calculate(request, definition)
+
+        # 5) Cache set / semeadura do mart (o refresh agendado o mantém fresco)
+        if definition.cache.enabled and definition.refresh.strategy == RefreshStrategy.CACHED:
+            await self._cache.set(cache_ctx, base, definition.cache.ttl_seconds)
+        if mctx is not None and definition.refresh.strategy == RefreshStrategy.MATERIALIZED:
+            await self._materializer.write(mctx, base)
+
+        # 6) Rastreabilidade
+        await self._trace.record(base)
+        return base
+
+    async def materialize(self, request: IndicatorRequest, *, watermark=None) -> IndicatorResult:
+        """ETL: recalcula (ignora mart e cache) e grava o mart com o `watermark` da origem."""
+        definition = self._registry.get(request.code, request.version)
+        base = await self._calculate(request, definition)
+        mctx = self.materialization_context(request, definition)
+        if watermark is None:
+            await self._materializer.write(mctx, base)
+        else:
+            await self._materializer.write(mctx, base, watermark=watermark)
+        await self._trace.record(base)
+        return base
+
+    async def _calculate(self, request: IndicatorRequest, definition) -> IndicatorResult:
         # 3) Cálculo (Strategy) — exige data provider concreto (BI-2)
         if self._data is None:
             from ..calculators.base import NoCalculatorError
@@ -105,16 +129,20 @@ class BIEngine:
                 target_grain=request.grain, source_grain=base.grain,
             )
             base = await self._aggregator.aggregate(base, agg_ctx)
-
-        # 5) Cache set (materialização fica a cargo do ETL, não do caminho de leitura)
-        if definition.cache.enabled and definition.refresh.strategy == RefreshStrategy.CACHED:
-            await self._cache.set(cache_ctx, base, definition.cache.ttl_seconds)
-
-        # 6) Rastreabilidade
-        await self._trace.record(base)
         return base
 
     # -- Helpers ---------------------------------------------------------------
+    @staticmethod
+    def materialization_context(request: IndicatorRequest, definition) -> MaterializationContext:
+        return MaterializationContext(
+            code=definition.code, version=definition.version,
+            mart=definition.materialization.mart,
+            incremental_key=definition.materialization.incremental_key,
+            grain=request.grain, scope_id=request.scope_id,
+            academic_year=request.academic_year, period=request.period,
+            max_age_seconds=definition.refresh.max_age_seconds,
+        )
+
     @staticmethod
     def _build_cache_ctx(request: IndicatorRequest, version: int) -> CacheContext:
         fingerprint = "&".join(f"{k}={request.params[k]}" for k in sorted(request.params))
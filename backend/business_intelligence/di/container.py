@@ -10,6 +10,9 @@ Substituição futura (BI-2/BI-3):
     container.calculators.register(RatioCalculator())   # etc.
     container.cache = RedisCacheProvider(...)
     container.materializer = MongoMaterializer(db)
+
+Sprint BI-3: `container.use_mongo(db)` liga `MongoMaterializer` + `RegionCacheProvider`
+e `container.build_refresh_job(engine)` monta o refresh agendado dos marts.
 """
 from __future__ import annotations
 from typing import Optional
@@ -23,6 +26,9 @@ from ..calculators.base import CalculatorRegistry
 from ..aggregation.base import IdentityAggregator
 from ..cache.null_cache import NullCacheProvider
 from ..materialization.null_materializer import NullMaterializer
+from ..materialization.mongo_materializer import MongoMaterializer
+from ..materialization.refresh_job import MartRefreshJob
+from ..cache.region_cache import RegionCacheProvider
 from ..traceability.null_traceability import NullTraceabilityProvider
 from ..observability.null_observability import NullObservabilityProvider
 from ..core.engine import BIEngine
@@ -53,6 +59,23 @@ class BIContainer:
             data_provider=self.data_provider,
         )
 
+    def use_mongo(self, db) -> "BIContainer":
+        """Liga marts em MongoDB e o cache de resultados (Sprint BI-3)."""
+        self.materializer = MongoMaterializer(db)
+        self.cache = RegionCacheProvider()
+        return self
+
+    def build_refresh_job(self, engine: Optional[BIEngine] = None, *, concurrency: int = 4) -> MartRefreshJob:
+        if not isinstance(self.materializer, MongoMaterializer):
+            raise RuntimeError("Refresh de marts exige MongoMaterializer (chame use_mongo(db))")
+        return MartRefreshJob(
+            engine=engine or self.build_engine(),
+            registry=self.registry,
+            materializer=self.materializer,
+            data_provider=self.data_provider,
+            concurrency=concurrency,
+        )
+
 
 def build_default_engine() -> BIEngine:
     """Fábrica de conveniência: Engine com providers no-op (fundação)."""
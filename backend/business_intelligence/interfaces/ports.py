@@ -101,6 +101,13 @@ class IDataProvider(ABC):
     async def fetch(self, request: IndicatorRequest, definition: IndicatorDefinition) -> Any:
         """Retorna dados brutos/base necessários ao cálculo (formato acordado por calculator)."""
 
+    async def watermark(self, request: IndicatorRequest, definition: IndicatorDefinition) -> Any:
+        """Maior valor atual do `materialization.incremental_key` na origem do escopo.
+
+        Opcional (refresh incremental). None => sem suporte: o refresh sempre recalcula.
+        """
+        return None
+
 
 class IObservabilityProvider(ABC):
     """Coleta de métricas/eventos do Motor (no-op nesta fase)."""
@@ -1,4 +1,6 @@
-"""Materialization providers. No-op default (marts desligados)."""
+"""Materialization providers. No-op default (marts desligados); MongoDB na Sprint BI-3."""
 from .null_materializer import NullMaterializer
+from .mongo_materializer import MongoMaterializer
+from .refresh_job import MartRefreshJob
 
-__all__ = ["NullMaterializer"]
+__all__ = ["NullMaterializer", "MongoMaterializer", "MartRefreshJob"]
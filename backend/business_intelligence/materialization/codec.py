@@ -0,0 +1,82 @@
+"""Codec IndicatorResult <-> documento (dict BSON-serializável).
+
+Responsabilidade: ÚNICO ponto de (de)serialização de resultados persistidos
+(marts e cache). Enums viram `.value`; tuplas viram listas.
+Uso: `MongoMaterializer` e `RegionCacheProvider`.
+"""
+from __future__ import annotations
+from dataclasses import replace
+from typing import Optional
+
+from ..contracts.results import BreakdownItem, IndicatorResult, TraceRecord
+from ..models.enums import Grain, KpiStatus, ResultSource, Unit
+
+
+def result_to_doc(result: IndicatorResult) -> dict:
+    trace = result.trace
+    return {
+        "code": result.code,
+        "name": result.name,
+        "unit": result.unit.value,
+        "grain": result.grain.value,
+        "scope_id": result.scope_id,
+        "value": result.value,
+        "kpi_status": result.kpi_status.value,
+        "target": result.target,
+        "breakdown": [
+            {"dimension": b.dimension, "key": b.key, "label": b.label, "value": b.value}
+            for b in result.breakdown
+        ],
+        "trace": None if trace is None else {
+            "indicator_code": trace.indicator_code,
+            "definition_version": trace.definition_version,
+            "engine_version": trace.engine_version,
+            "computed_at": trace.computed_at,
+            "result_source": trace.result_source.value,
+            "period": trace.period,
+            "grain": trace.grain.value if trace.grain else None,
+            "scope_id": trace.scope_id,
+            "params": dict(trace.params),
+            "inputs_fingerprint": trace.inputs_fingerprint,
+            "data_sources": list(trace.data_sources),
+        },
+        "extra": dict(result.extra),
+    }
+
+
+def result_from_doc(doc: dict, *, source: Optional[ResultSource] = None) -> IndicatorResult:
+    """Reconstrói o resultado; `source` sobrescreve `trace.result_source` (MART/CACHE)."""
+    t = doc.get("trace")
+    trace = None
+    if t:
+        trace = TraceRecord(
+            indicator_code=t["indicator_code"],
+            definition_version=t["definition_version"],
+            engine_version=t["engine_version"],
+            computed_at=t["computed_at"],
+            result_source=ResultSource(t["result_source"]),
+            period=t.get("period"),
+            grain=Grain(t["grain"]) if t.get("grain") else None,
+            scope_id=t.get("scope_id"),
+            params=dict(t.get("params") or {}),
+            inputs_fingerprint=t.get("inputs_fingerprint") or "",
+            data_sources=tuple(t.get("data_sources") or ()),
+        )
+        if source is not None:
+            trace = replace(trace, result_source=source)
+    return IndicatorResult(
+        code=doc["code"],
+        name=doc["name"],
+        unit=Unit(doc["unit"]),
+        grain=Grain(doc["grain"]),
+        scope_id=doc.get("scope_id"),
+        value=doc.get("value"),
+        kpi_status=KpiStatus(doc.get("kpi_status") or KpiStatus.UNKNOWN.value),
+        target=doc.get("target"),
+        breakdown=tuple(
+            BreakdownItem(dimension=b["dimension"], key=b["key"], label=b["label"], value=b.get("value"))
+            for b in doc.get("breakdown") or ()
+        ),
+        trace=trace,
+        extra=dict(doc.get("extra") or {}),
+    )
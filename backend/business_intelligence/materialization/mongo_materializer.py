@@ -0,0 +1,153 @@
+"""MongoMaterializer — marts materializados em MongoDB (Sprint BI-3).
+
+Um documento por `code|version|grain|scope|ano|período` (`MaterializationContext.mart_key`)
+na coleção do mart (`MaterializationSpec.mart`, default `bi_marts`):
+
+    {key, code, version, grain, scope_id, academic_year, period,
+     result: <codec.result_to_doc>, watermark, materialized_at, fresh_until, stale}
+
+Frescor:
+  - `fresh_until` = materialized_at + `max_age_seconds` (periodicidade da definição);
+    None => fresco até ser invalidado (`mark_stale`);
+  - `stale=True` força recomputação na próxima leitura/refresh.
+
+Refresh incremental: `watermark` guarda o maior valor do `incremental_key`
+visto na última materialização. O `MartRefreshJob` compara com o valor atual
+da origem; se igual, só renova `fresh_until` (`touch`) sem recalcular.
+"""
+from __future__ import annotations
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from ..interfaces.ports import IMaterializer
+from ..contracts.execution import MaterializationContext
+from ..contracts.results import IndicatorResult
+from ..models.enums import ResultSource
+from .codec import result_from_doc, result_to_doc
+
+DEFAULT_MART = "bi_marts"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(dt: Optional[datetime]) -> Optional[datetime]:
+    if dt is not None and dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+class MongoMaterializer(IMaterializer):
+    def __init__(self, db, *, default_mart: str = DEFAULT_MART) -> None:
+        self._db = db
+        self._default_mart = default_mart
+        self._indexed: set[str] = set()
+        # Documento lido por `is_fresh` e reaproveitado pelo `read` seguinte
+        # (o Engine sempre chama os dois em sequência) — 1 round-trip em vez de 2.
+        self._prefetched: dict[str, dict] = {}
+
+    def _coll(self, mart: str):
+        return self._db[mart or self._default_mart]
+
+    async def ensure_indexes(self, mart: str = "") -> None:
+        name = mart or self._default_mart
+        if name in self._indexed:
+            return
+        coll = self._coll(name)
+        await coll.create_index("key", unique=True)
+        await coll.create_index([("code", 1), ("version", 1), ("academic_year", 1)])
+        await coll.create_index([("stale", 1), ("fresh_until", 1)])
+        self._indexed.add(name)
+
+    # -- IMaterializer ----------------------------------------------------
+    async def is_fresh(self, ctx: MaterializationContext) -> bool:
+        doc = await self._coll(ctx.mart).find_one({"key": ctx.mart_key}, {"_id": 0})
+        if not doc or doc.get("stale"):
+            return False
+        fresh_until = _aware(doc.get("fresh_until"))
+        if fresh_until is not None and fresh_until <= _utcnow():
+            return False
+        self._prefetched[ctx.mart_key] = doc
+        return True
+
+    async def read(self, ctx: MaterializationContext) -> Optional[IndicatorResult]:
+        doc = self._prefetched.pop(ctx.mart_key, None)
+        if doc is None:
+            doc = await self._coll(ctx.mart).find_one(
+                {"key": ctx.mart_key}, {"_id": 0, "result": 1},
+            )
+        if not doc or not doc.get("result"):
+            return None
+        return result_from_doc(doc["result"], source=ResultSource.MART)
+
+    async def write(
+        self, ctx: MaterializationContext, result: IndicatorResult, *, watermark: Any = None,
+    ) -> None:
+        await self.ensure_indexes(ctx.mart)
+        now = _utcnow()
+        fresh_until = now + timedelta(seconds=ctx.max_age_seconds) if ctx.max_age_seconds else None
+        await self._coll(ctx.mart).update_one(
+            {"key": ctx.mart_key},
+            {"$set": {
+                "key": ctx.mart_key,
+                "code": ctx.code,
+                "version": ctx.version,
+                "grain": ctx.grain.value,
+                "scope_id": ctx.scope_id,
+                "academic_year": ctx.academic_year,
+                "period": ctx.period,
+                "incremental_key": ctx.incremental_key,
+                "result": result_to_doc(result),
+                "watermark": watermark,
+                "materialized_at": now,
+                "fresh_until": fresh_until,
+                "stale": False,
+            }},
+            upsert=True,
+        )
+        self._prefetched.pop(ctx.mart_key, None)
+
+    # -- Refresh incremental ----------------------------------------------
+    async def get_watermark(self, ctx: MaterializationContext) -> tuple[bool, Any]:
+        """(existe, watermark) do mart — `existe=False` se nunca materializado."""
+        doc = await self._coll(ctx.mart).find_one({"key": ctx.mart_key}, {"_id": 0, "watermark": 1})
+        return (doc is not None), (doc or {}).get("watermark")
+
+    async def touch(self, ctx: MaterializationContext) -> None:
+        """Renova o frescor sem recalcular (origem não mudou desde o watermark)."""
+        now = _utcnow()
+        fresh_until = now + timedelta(seconds=ctx.max_age_seconds) if ctx.max_age_seconds else None
+        await self._coll(ctx.mart).update_one(
+            {"key": ctx.mart_key},
+            {"$set": {"fresh_until": fresh_until, "stale": False, "checked_at": now}},
+        )
+
+    async def mark_stale(
+        self,
+        mart: str = "",
+        *,
+        code: Optional[str] = None,
+        scope_id: Optional[str] = None,
+        academic_year: Optional[int] = None,
+    ) -> int:
+        """Invalida marts (ex.: após importação em massa de notas de uma escola)."""
+        query: dict = {}
+        if code is not None:
+            query["code"] = code
+        if scope_id is not None:
+            query["scope_id"] = scope_id
+        if academic_year is not None:
+            query["academic_year"] = academic_year
+        res = await self._coll(mart).update_many(query, {"$set": {"stale": True}})
+        self._prefetched.clear()
+        return res.modified_count
+
+    async def list_due(self, mart: str = "", *, limit: int = 500) -> list[dict]:
+        """Marts vencidos ou invalidados (alvos do refresh agendado)."""
+        now = _utcnow()
+        cursor = self._coll(mart).find(
+            {"$or": [{"stale": True}, {"fresh_until": {"$ne": None, "$lte": now}}]},
+            {"_id": 0, "result": 0},
+        ).sort("fresh_until", 1).limit(limit)
+        return await cursor.to_list(limit)
@@ -0,0 +1,116 @@
+"""MartRefreshJob — refresh agendado dos marts (Sprint BI-3).
+
+Fluxo por alvo (IndicatorRequest):
+    watermark atual da origem (IDataProvider.watermark)
+        == watermark gravado no mart  -> `touch` (renova frescor, sem recalcular)
+        != / ausente / sem suporte    -> `engine.materialize` (recalcula e grava)
+
+Alvos:
+  - `refresh_due()`: marts vencidos (`fresh_until`) ou invalidados (`stale`)
+    de todas as definições ACTIVE com materialização — é o que o loop agendado roda;
+  - `refresh_many(requests)`: lista explícita (ex.: pré-aquecer a rede após virada de ano).
+
+Concorrência limitada (`concurrency`) para não competir com o tráfego OLTP.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from typing import Iterable, Optional
+
+from ..contracts.execution import IndicatorRequest
+from ..interfaces.ports import IDataProvider, IRegistry
+from ..models.enums import Grain
+from .mongo_materializer import DEFAULT_MART, MongoMaterializer
+
+logger = logging.getLogger(__name__)
+
+RECOMPUTED = "recomputed"
+TOUCHED = "touched"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+class MartRefreshJob:
+    def __init__(
+        self,
+        *,
+        engine,
+        registry: IRegistry,
+        materializer: MongoMaterializer,
+        data_provider: Optional[IDataProvider] = None,
+        concurrency: int = 4,
+        batch_size: int = 500,
+    ) -> None:
+        self._engine = engine
+        self._registry = registry
+        self._mat = materializer
+        self._data = data_provider
+        self._sem = asyncio.Semaphore(max(1, concurrency))
+        self._batch_size = batch_size
+        self.last_run: dict = {}
+
+    async def refresh(self, request: IndicatorRequest) -> str:
+        async with self._sem:
+            try:
+                definition = self._registry.get(request.code, request.version)
+                if not definition.materialization.enabled:
+                    return SKIPPED
+                mctx = self._engine.materialization_context(request, definition)
+                current = None
+                if self._data is not None and definition.materialization.incremental_key:
+                    current = await self._data.watermark(request, definition)
+                if current is not None:
+                    exists, stored = await self._mat.get_watermark(mctx)
+                    if exists and stored == current:
+                        await self._mat.touch(mctx)
+                        return TOUCHED
+                await self._engine.materialize(request, watermark=current)
+                return RECOMPUTED
+            except Exception as e:
+                logger.warning("[bi:refresh] %s/%s falhou: %s", request.code, request.scope_id, e)
+                return FAILED
+
+    async def refresh_many(self, requests: Iterable[IndicatorRequest]) -> dict:
+        outcomes = await asyncio.gather(*(self.refresh(r) for r in requests))
+        summary = {RECOMPUTED: 0, TOUCHED: 0, SKIPPED: 0, FAILED: 0}
+        for outcome in outcomes:
+            summary[outcome] += 1
+        return summary
+
+    async def refresh_due(self) -> dict:
+        started = time.perf_counter()
+        materialized = [d for d in self._registry.list(active_only=True) if d.materialization.enabled]
+        active_keys = {(d.code, d.version) for d in materialized}
+        marts = {d.materialization.mart or DEFAULT_MART for d in materialized}
+        requests: list[IndicatorRequest] = []
+        for mart in sorted(marts):
+            for doc in await self._mat.list_due(mart, limit=self._batch_size):
+                if (doc.get("code"), doc.get("version")) not in active_keys:
+                    continue  # versão DEPRECATED/removida: o mart expira sozinho
+                requests.append(IndicatorRequest(
+                    code=doc["code"], version=doc.get("version"),
+                    grain=Grain(doc["grain"]), scope_id=doc.get("scope_id"),
+                    academic_year=doc.get("academic_year"), period=doc.get("period"),
+                ))
+        summary = await self.refresh_many(requests)
+        summary["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        self.last_run = summary
+        return summary
+
+    async def run_forever(
+        self, *, interval_seconds: float = 900, stop_event: Optional[asyncio.Event] = None,
+    ) -> None:
+        """Loop agendado (task de background do app). Para quando `stop_event` é setado."""
+        stop_event = stop_event or asyncio.Event()
+        while not stop_event.is_set():
+            try:
+                summary = await self.refresh_due()
+                if summary[RECOMPUTED] or summary[FAILED]:
+                    logger.info("[bi:refresh] %s", summary)
+            except Exception as e:
+                logger.error("[bi:refresh] ciclo falhou: %s", e)
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=interval_seconds)
+            except asyncio.TimeoutError:
+                pass
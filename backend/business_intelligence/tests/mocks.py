@@ -6,29 +6,36 @@ from __future__ import annotations
 from typing import Optional
 
 from ..interfaces.ports import (
-    ICalculator, IDataProvider, IObservabilityProvider,
+    ICalculator, IDataProvider, IMaterializer, IObservabilityProvider,
 )
 from ..calculators.base import BaseCalculator
 from ..contracts.definitions import IndicatorDefinition
-from ..contracts.execution import CalculationContext
+from ..contracts.execution import CalculationContext, MaterializationContext
 from ..contracts.results import IndicatorResult, TraceRecord
 from ..contracts.observability import ObservabilityEvent
 from ..models.enums import Grain, Unit, KpiStatus, ResultSource
+from ..materialization.codec import result_from_doc, result_to_doc
 
 
 class FakeDataProvider(IDataProvider):
     """DataProvider de teste (retorna payload fixo, sem tocar em banco)."""
 
-    def __init__(self, payload=None) -> None:
+    def __init__(self, payload=None, watermark=None) -> None:
         self._payload = payload if payload is not None else {"numerator": 87, "denominator": 100}
+        self.current_watermark = watermark
+        self.fetches = 0
 
     @property
     def source_id(self) -> str:
         return "fake"
 
     async def fetch(self, request, definition):
+        self.fetches += 1
         return self._payload
 
+    async def watermark(self, request, definition):
+        return self.current_watermark
+
 
 class FakeCalculator(BaseCalculator):
     """Calculator de teste que devolve um IndicatorResult determinístico."""
@@ -61,3 +68,42 @@ class RecordingObservability(IObservabilityProvider):
 
     def emit(self, event: ObservabilityEvent) -> None:
         self.events.append(event)
+
+
+class InMemoryMaterializer(IMaterializer):
+    """Marts em memória com a mesma superfície do `MongoMaterializer` (refresh incluso)."""
+
+    def __init__(self) -> None:
+        self.docs: dict[str, dict] = {}
+        self.writes = 0
+        self.touches = 0
+
+    async def is_fresh(self, ctx: MaterializationContext) -> bool:
+        doc = self.docs.get(ctx.mart_key)
+        return bool(doc) and not doc["stale"]
+
+    async def read(self, ctx: MaterializationContext) -> Optional[IndicatorResult]:
+        doc = self.docs.get(ctx.mart_key)
+        return None if doc is None else result_from_doc(doc["result"], source=ResultSource.MART)
+
+    async def write(self, ctx: MaterializationContext, result: IndicatorResult, *, watermark=None) -> None:
+        self.writes += 1
+        self.docs[ctx.mart_key] = {
+            "code": ctx.code, "version": ctx.version, "grain": ctx.grain.value,
+            "scope_id": ctx.scope_id, "academic_year": ctx.academic_year, "period": ctx.period,
+            "result": result_to_doc(result), "watermark": watermark, "stale": False,
+        }
+
+    async def get_watermark(self, ctx: MaterializationContext):
+        doc = self.docs.get(ctx.mart_key)
+        return (doc is not None), (doc or {}).get("watermark")
+
+    async def touch(self, ctx: MaterializationContext) -> None:
+        self.touches += 1
+        self.docs[ctx.mart_key]["stale"] = False
+
+    async def list_due(self, mart: str = "", *, limit: int = 500) -> list:
+        return [
+            {k: v for k, v in d.items() if k != "result"}
+            for d in self.docs.values() if d["stale"]
+        ][:limit]
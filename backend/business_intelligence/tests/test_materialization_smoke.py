@@ -0,0 +1,99 @@
+"""Smoke test de materialização + cache do Motor (Sprint BI-3).
+
+Valida, sem MongoDB:
+- codec IndicatorResult <-> documento (ida e volta);
+- Engine semeia o mart num miss e serve do mart (ResultSource.MART) depois;
+- RegionCacheProvider devolve ResultSource.CACHE e invalida por indicador;
+- MartRefreshJob: watermark igual => `touch`; watermark novo => recalcula.
+
+Executar: pytest backend/business_intelligence/tests/test_materialization_smoke.py
+"""
+import asyncio
+from dataclasses import replace
+
+from ..cache.region_cache import RegionCacheProvider
+from ..contracts.definitions import CacheSpec, RefreshSpec
+from ..di.container import BIContainer
+from ..materialization.codec import result_from_doc, result_to_doc
+from ..materialization.refresh_job import MartRefreshJob, RECOMPUTED, TOUCHED
+from ..models.enums import IndicatorStatus, RefreshStrategy, ResultSource
+from .builders import build_definition, build_request
+from .mocks import FakeCalculator, FakeDataProvider, InMemoryMaterializer
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def _container(definition, *, watermark=None):
+    container = BIContainer()
+    container.data_provider = FakeDataProvider(watermark=watermark)
+    container.calculators.register(FakeCalculator())
+    container.materializer = InMemoryMaterializer()
+    container.registry.register(definition)
+    return container
+
+
+def test_codec_roundtrip():
+    container = _container(build_definition(status=IndicatorStatus.ACTIVE))
+    result = _run(container.build_engine().compute(build_request()))
+    back = result_from_doc(result_to_doc(result))
+    assert back == result
+    assert result_from_doc(result_to_doc(result), source=ResultSource.MART).trace.result_source == ResultSource.MART
+
+
+def test_engine_seeds_and_reads_mart():
+    definition = replace(
+        build_definition(status=IndicatorStatus.ACTIVE, materialized=True),
+        refresh=RefreshSpec(periodicity="daily", strategy=RefreshStrategy.MATERIALIZED),
+    )
+    container = _container(definition)
+    engine = container.build_engine()
+    first = _run(engine.compute(build_request()))
+    assert first.trace.result_source == ResultSource.REALTIME
+    assert container.materializer.writes == 1
+    second = _run(engine.compute(build_request()))
+    assert second.trace.result_source == ResultSource.MART
+    assert abs(second.value - 0.87) < 1e-9
+    assert container.data_provider.fetches == 1  # 2ª leitura não tocou a origem
+
+
+def test_region_cache_provider():
+    definition = replace(
+        build_definition(code="IND-CACHE", status=IndicatorStatus.ACTIVE),
+        cache=CacheSpec(enabled=True, ttl_seconds=60),
+        refresh=RefreshSpec(strategy=RefreshStrategy.CACHED),
+    )
+    container = _container(definition)
+    container.cache = cache = RegionCacheProvider()
+    engine = container.build_engine()
+    request = build_request(code="IND-CACHE")
+    _run(engine.compute(request))
+    cached = _run(engine.compute(request))
+    assert cached.trace.result_source == ResultSource.CACHE
+    assert container.data_provider.fetches == 1
+    assert cache.invalidate_indicator("IND-CACHE") == 1
+    _run(engine.compute(request))
+    assert container.data_provider.fetches == 2
+
+
+def test_refresh_job_incremental_by_watermark():
+    definition = replace(
+        build_definition(status=IndicatorStatus.ACTIVE, materialized=True),
+        refresh=RefreshSpec(periodicity="daily", strategy=RefreshStrategy.MATERIALIZED),
+    )
+    container = _container(definition, watermark="2026-03-01")
+    engine = container.build_engine()
+    job = MartRefreshJob(
+        engine=engine, registry=container.registry,
+        materializer=container.materializer, data_provider=container.data_provider,
+    )
+    assert _run(job.refresh(build_request())) == RECOMPUTED
+    assert _run(job.refresh(build_request())) == TOUCHED      # origem não mudou
+    container.data_provider.current_watermark = "2026-03-02"
+    assert _run(job.refresh(build_request())) == RECOMPUTED   # novo dado => recalcula
+
+    for doc in container.materializer.docs.values():
+        doc["stale"] = True
+    summary = _run(job.refresh_due())
+    assert summary[TOUCHED] == 1 and summary[RECOMPUTED] == 0
@@ -13,8 +13,9 @@ backpressure por tenant, limite máximo de tentativas → DEAD_LETTER, métricas
 NÃO envia ao MEC. NÃO contém Worker nem Scheduler (o consumo é escopo da 002.d).
 Integra a idempotência existente via índice unique em `idempotency_key`.
 """
+import uuid
 from datetime import datetime, timezone, timedelta
-from typing import Optional
+from typing import List, Optional
 
 from pymongo import ReturnDocument
 
@@ -57,6 +58,7 @@ class MongoFrequencyQueue:
                                     name="reserve_idx")
         await self.col.create_index([("status", 1), ("lease_until", 1)], name="lease_idx")
         await self.col.create_index([("tenant", 1), ("status", 1)], name="metrics_idx")
+        await self.col.create_index([("reservation_id", 1)], name="reservation_idx", sparse=True)
 
     # ---- Escrita/idempotência ----
     async def enqueue(self, item: dict) -> dict:
@@ -95,6 +97,45 @@ class MongoFrequencyQueue:
             doc["first_reserved_at"] = now_iso
         return doc
 
+    async def reserve_batch(self, tenant: str, limit: int, lease_seconds: int = 60) -> List[dict]:
+        """Reserva até `limit` itens de UM mesmo grupo de envio (tenant + escola + competência)
+        — Out/2026. O item mais antigo disponível define o grupo; os demais são reservados num
+        único `update_many` que re-checa o status (dois workers nunca levam o mesmo item) e
+        marcados com um token de reserva para a releitura. Respeita o backpressure por tenant."""
+        if limit <= 0:
+            return []
+        if self.backpressure_per_tenant is not None:
+            limit = min(limit, self.backpressure_per_tenant - await self._inflight_count(tenant))
+            if limit <= 0:
+                return []
+        now_iso = _iso()
+        available = {"$or": [
+            {"status": PENDING},
+            {"status": RETRYING, "next_attempt_at": {"$lte": now_iso}},
+        ]}
+        head = await self.col.find_one({"tenant": tenant, **available},
+                                       {"_id": 0, "school_inep": 1, "competencia": 1},
+                                       sort=[("created_at", 1)])
+        if not head:
+            return []
+        group = {"tenant": tenant, "school_inep": head.get("school_inep"),
+                 "competencia": head.get("competencia"), **available}
+        ids = [d["id"] for d in await self.col.find(group, {"_id": 0, "id": 1})
+               .sort("created_at", 1).limit(limit).to_list(limit)]
+        if not ids:
+            return []
+        token = str(uuid.uuid4())
+        lease = _iso(_now() + timedelta(seconds=lease_seconds))
+        await self.col.update_many(
+            {"id": {"$in": ids}, **available},
+            {"$set": {"status": RESERVED, "lease_until": lease, "reserved_at": now_iso,
+                      "reservation_id": token, "updated_at": now_iso},
+             "$inc": {"attempts": 1}})
+        await self.col.update_many({"reservation_id": token, "first_reserved_at": None},
+                                   {"$set": {"first_reserved_at": now_iso}})
+        return await self.col.find({"reservation_id": token, "status": RESERVED}, {"_id": 0}) \
+            .sort("created_at", 1).to_list(limit)
+
     async def renew_lease(self, item_id: str, lease_seconds: int = 60) -> bool:
         lease = _iso(_now() + timedelta(seconds=lease_seconds))
         res = await self.col.update_one(
@@ -108,6 +149,12 @@ class MongoFrequencyQueue:
             {"$set": {"status": PROCESSING, "updated_at": _iso()}})
         return res.modified_count == 1
 
+    async def start_processing_many(self, item_ids: List[str]) -> int:
+        res = await self.col.update_many(
+            {"id": {"$in": list(item_ids)}, "status": RESERVED},
+            {"$set": {"status": PROCESSING, "updated_at": _iso()}})
+        return res.modified_count
+
     # ---- Transições terminais / retry ----
     async def succeed(self, item_id: str) -> None:
         await self.col.update_one({"id": item_id}, {"$set": {
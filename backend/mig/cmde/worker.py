@@ -7,9 +7,16 @@ Simulador CMDE (nenhuma chamada real ao MEC). NÃO contém Scheduler.
 
 Todos os caminhos de processamento são auditados (operation = FREQUENCY_ITEM_<estado>) e
 reconciliados via SendReceipt + totais/estado do lote.
+
+Out/2026: `run` envia em LOTES (CMDE_FREQUENCY_BATCH_SIZE itens do mesmo tenant/escola/
+competência por payload), com até CMDE_FREQUENCY_MAX_INFLIGHT lotes simultâneos por tenant.
+Cada item continua com recibo, auditoria e transição de fila próprios, conciliados pelo `ref`
+da resposta do lote.
 """
+import asyncio
 import hashlib
 import json
+import os
 import time
 from datetime import datetime, timezone
 
@@ -26,6 +33,10 @@ from mig.core.exceptions import MigError
 
 PROVIDER = "cmde"
 
+# Envio em lote (Out/2026): itens por payload e lotes simultâneos por tenant.
+CMDE_FREQUENCY_BATCH_SIZE = int(os.environ.get("CMDE_FREQUENCY_BATCH_SIZE", "50"))
+CMDE_FREQUENCY_MAX_INFLIGHT = int(os.environ.get("CMDE_FREQUENCY_MAX_INFLIGHT", "4"))
+
 
 def _now_iso():
     return datetime.now(timezone.utc).isoformat()
@@ -33,7 +44,8 @@ def _now_iso():
 
 class FrequencyWorker:
     def __init__(self, db, port=None, queue=None, audit=None, monitoring=None,
-                 lease_seconds: int = 60, retry_policy=None):
+                 lease_seconds: int = 60, retry_policy=None, batch_size: int = None,
+                 max_inflight_batches: int = None):
         self.db = db
         self.audit = audit or MigAuditService(db)
         self.monitoring = monitoring or MigMonitoring()
@@ -44,6 +56,9 @@ class FrequencyWorker:
         self.repo = FrequencyRepository(db)
         self.lease_seconds = lease_seconds
         self.retry_policy = retry_policy or CMDE_DEFAULT
+        self.batch_size = max(1, batch_size or CMDE_FREQUENCY_BATCH_SIZE)
+        self.max_inflight_batches = max(1, max_inflight_batches or CMDE_FREQUENCY_MAX_INFLIGHT)
+        self._slots: dict = {}                      # tenant -> Semaphore (lotes em voo)
 
     # ---- Bootstrap: índices + validação de infraestrutura ----
     async def bootstrap(self) -> bool:
@@ -67,12 +82,40 @@ class FrequencyWorker:
             return None
         self.monitoring.incr("worker.reserved")
         await self.queue.start_processing(item["id"])
-        cid = item.get("correlation_id") or generate_correlation_id("CMDE")
+        return (await self._send([item]))[0]
+
+    # ---- Processamento em lote (Out/2026) ----
+    async def process_batch(self, tenant: str, limit: int = None) -> list:
+        """Reserva até `limit` (padrão `batch_size`) itens do mesmo grupo tenant/escola/
+        competência e os envia num ÚNICO payload. No máximo `max_inflight_batches` lotes do
+        mesmo tenant ficam em voo por worker. Retorna o estado final de cada item."""
+        async with self._slot(tenant):
+            items = await self.queue.reserve_batch(tenant, limit or self.batch_size,
+                                                   self.lease_seconds)
+            if not items:
+                return []
+            self.monitoring.incr("worker.reserved", len(items))
+            await self.queue.start_processing_many([i["id"] for i in items])
+            return await self._send(items)
+
+    def _slot(self, tenant: str) -> asyncio.Semaphore:
+        sem = self._slots.get(tenant)
+        if sem is None:
+            sem = self._slots[tenant] = asyncio.Semaphore(self.max_inflight_batches)
+        return sem
+
+    async def _send(self, items: list) -> list:
+        """Envia `items` (já em PROCESSING, mesmo grupo) e reconcilia cada um pela resposta."""
+        head = items[0]
+        cids = {i.get("correlation_id") for i in items}
+        cid = head.get("correlation_id") if len(cids) == 1 and head.get("correlation_id") \
+            else generate_correlation_id("CMDE")
         payload = CmdeFrequencyPayloadDTO(
-            correlation_id=cid, tenant=item.get("tenant"), competencia=item.get("competencia"),
-            school_inep=item.get("school_inep", ""),
-            items=[FrequencyItemDTO(**(item.get("payload_snapshot") or {}))])
+            correlation_id=cid, tenant=head.get("tenant"), competencia=head.get("competencia"),
+            school_inep=head.get("school_inep", ""),
+            items=[FrequencyItemDTO(**(i.get("payload_snapshot") or {})) for i in items])
         started = _now_iso(); t0 = time.perf_counter()
+        states = []
 
         # ---- Transporte (Simulador por padrão) com RetryManager ----
         try:
@@ -80,69 +123,90 @@ class FrequencyWorker:
                                           self.retry_policy)
             resp, attempts = result.value, result.attempts
         except MigError as e:
-            state = await self.queue.fail(item["id"], error=e.message, recoverable=True)
-            await self._receipt(item, cid, http_status=e.status_code, accepted=False,
-                                code=type(e).__name__, reason=e.message, raw=None)
-            await self._audit(item, cid, state, "error", started, t0,
-                              attempts=self.retry_policy.max_attempts, http_status=e.status_code,
-                              error_code=type(e).__name__, error_message=e.message,
-                              sent=1, accepted=0, rejected=0)
-            self.monitoring.incr("worker.transport_error")
-            await self._reconcile_batch(item.get("batch_id"))
-            return state
+            for item in items:
+                state = await self.queue.fail(item["id"], error=e.message, recoverable=True)
+                await self._receipt(item, cid, http_status=e.status_code, accepted=False,
+                                    code=type(e).__name__, reason=e.message, raw=None)
+                await self._audit(item, cid, state, "error", started, t0,
+                                  attempts=self.retry_policy.max_attempts, http_status=e.status_code,
+                                  error_code=type(e).__name__, error_message=e.message,
+                                  sent=1, accepted=0, rejected=0)
+                states.append(state)
+            self.monitoring.incr("worker.transport_error", len(items))
+            await self._reconcile_batches(items)
+            return states
 
         # ---- Resposta fora do contrato ----
         if not resp.valid:
-            state = await self.queue.fail(item["id"], error="INVALID_RESPONSE", recoverable=True)
-            await self._receipt(item, cid, http_status=resp.http_status, accepted=False,
-                                code="INVALID_RESPONSE", reason="Resposta fora do contrato esperado.",
-                                raw=resp)
-            await self._audit(item, cid, state, "error", started, t0, attempts=attempts,
-                              http_status=resp.http_status, error_code="INVALID_RESPONSE",
-                              error_message="Resposta fora do contrato esperado.",
-                              sent=1, accepted=0, rejected=0)
-            self.monitoring.incr("worker.invalid")
-            await self._reconcile_batch(item.get("batch_id"))
-            return state
+            for item in items:
+                state = await self.queue.fail(item["id"], error="INVALID_RESPONSE", recoverable=True)
+                await self._receipt(item, cid, http_status=resp.http_status, accepted=False,
+                                    code="INVALID_RESPONSE", reason="Resposta fora do contrato esperado.",
+                                    raw=resp)
+                await self._audit(item, cid, state, "error", started, t0, attempts=attempts,
+                                  http_status=resp.http_status, error_code="INVALID_RESPONSE",
+                                  error_message="Resposta fora do contrato esperado.",
+                                  sent=1, accepted=0, rejected=0)
+                states.append(state)
+            self.monitoring.incr("worker.invalid", len(items))
+            await self._reconcile_batches(items)
+            return states
 
         # ---- Reconciliação por item ----
-        matched = next((r for r in resp.items if r.ref == item["student_id"]), None)
-        if matched and matched.accepted:
-            await self.queue.succeed(item["id"])
-            await self._receipt(item, cid, http_status=resp.http_status, accepted=True,
-                                code=None, reason=None, raw=resp, protocol=resp.protocol)
-            await self._audit(item, cid, SUCCESS, "success", started, t0, attempts=attempts,
-                              http_status=resp.http_status, sent=1, accepted=1, rejected=0)
-            self.monitoring.incr("worker.success")
-            state = SUCCESS
-        else:
-            code = matched.code if matched else "NO_RESULT"
-            reason = matched.reason if matched else "Item não retornado pelo CMDE."
-            state = await self.queue.fail(item["id"], error=reason, recoverable=False)  # rejeição definitiva
-            await self._receipt(item, cid, http_status=resp.http_status, accepted=False,
-                                code=code, reason=reason, raw=resp, protocol=resp.protocol)
-            await self._audit(item, cid, state, "error", started, t0, attempts=attempts,
-                              http_status=resp.http_status, error_code=code, error_message=reason,
-                              sent=1, accepted=0, rejected=1)
-            self.monitoring.incr("worker.rejected")
-        await self._reconcile_batch(item.get("batch_id"))
-        return state
+        results = {r.ref: r for r in resp.items}
+        for item in items:
+            matched = results.get(item["student_id"])
+            if matched and matched.accepted:
+                await self.queue.succeed(item["id"])
+                await self._receipt(item, cid, http_status=resp.http_status, accepted=True,
+                                    code=None, reason=None, raw=resp, protocol=resp.protocol)
+                await self._audit(item, cid, SUCCESS, "success", started, t0, attempts=attempts,
+                                  http_status=resp.http_status, sent=1, accepted=1, rejected=0)
+                self.monitoring.incr("worker.success")
+                state = SUCCESS
+            else:
+                code = matched.code if matched else "NO_RESULT"
+                reason = matched.reason if matched else "Item não retornado pelo CMDE."
+                state = await self.queue.fail(item["id"], error=reason, recoverable=False)  # rejeição definitiva
+                await self._receipt(item, cid, http_status=resp.http_status, accepted=False,
+                                    code=code, reason=reason, raw=resp, protocol=resp.protocol)
+                await self._audit(item, cid, state, "error", started, t0, attempts=attempts,
+                                  http_status=resp.http_status, error_code=code, error_message=reason,
+                                  sent=1, accepted=0, rejected=1)
+                self.monitoring.incr("worker.rejected")
+            states.append(state)
+        await self._reconcile_batches(items)
+        return states
 
     # ---- Loop de drenagem (sem Scheduler) ----
     async def run(self, tenant: str, max_items: int = None, requeue_first: bool = True) -> dict:
+        """Drena a fila do tenant em lotes, com até `max_inflight_batches` lotes em voo."""
         if requeue_first:
             await self.queue.requeue_expired()
         summary = {"processed": 0, "success": 0, "failed": 0, "retrying": 0, "dead_letter": 0}
         key = {SUCCESS: "success", FAILED: "failed", RETRYING: "retrying", DEAD_LETTER: "dead_letter"}
-        while True:
-            if max_items and summary["processed"] >= max_items:
-                break
-            state = await self.process_one(tenant)
-            if state is None:
-                break
-            summary["processed"] += 1
-            if key.get(state):
-                summary[key[state]] += 1
+        remaining = max_items or None   # itens ainda não reservados (None = sem limite)
+
+        async def consume():
+            nonlocal remaining
+            while True:
+                limit = self.batch_size
+                if remaining is not None:
+                    if remaining <= 0:
+                        return
+                    limit = min(limit, remaining)
+                    remaining -= limit
+                states = await self.process_batch(tenant, limit)
+                if remaining is not None:
+                    remaining += limit - len(states)
+                if not states:
+                    return
+                for state in states:
+                    summary["processed"] += 1
+                    if key.get(state):
+                        summary[key[state]] += 1
+
+        await asyncio.gather(*[consume() for _ in range(self.max_inflight_batches)])
         return summary
 
     # ---- Recibo + reconciliação de lote ----
@@ -157,6 +221,10 @@ class FrequencyWorker:
                           rejection_reason=reason, raw_response_hash=raw_hash)
         await self.repo.save_receipt(rec)
 
+    async def _reconcile_batches(self, items):
+        for batch_id in dict.fromkeys(i.get("batch_id") for i in items):
+            await self._reconcile_batch(batch_id)
+
     async def _reconcile_batch(self, batch_id):
         if not batch_id:
             return
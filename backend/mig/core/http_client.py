@@ -3,8 +3,17 @@ BaseGovClient — cliente HTTP base, ÚNICA porta de saída HTTP para provedores
 
 Responsabilidade: transporte (timeout, headers, logging estruturado, tradução de erros para
 exceções tipadas, retentativa via RetryPolicy). NÃO contém regra de negócio.
+
+Pool de conexões (Out/2026): cada requisição abria um `httpx.AsyncClient` novo — um handshake
+TLS por chamada (no envio mensal de frequência, um por aluno). Os clientes agora compartilham
+um `httpx.AsyncClient` de longa duração por (base_url, timeout, http2) e event loop, com
+keep-alive e limites de conexão configuráveis. HTTP/2 é opcional (MIG_HTTP2=true) e só é
+ativado se o pacote `h2` estiver instalado. `close_pooled_clients()` fecha tudo no shutdown.
 """
+import asyncio
 import logging
+import os
+
 import httpx
 
 from mig.core.exceptions import (
@@ -17,12 +26,62 @@ from mig.core.retry import RetryPolicy, NO_RETRY, run_with_retry
 
 logger = logging.getLogger("mig.http")
 
+MIG_HTTP2 = os.environ.get("MIG_HTTP2", "false").lower() in ("1", "true", "yes")
+MIG_HTTP_MAX_CONNECTIONS = int(os.environ.get("MIG_HTTP_MAX_CONNECTIONS", "20"))
+MIG_HTTP_MAX_KEEPALIVE = int(os.environ.get("MIG_HTTP_MAX_KEEPALIVE", "10"))
+MIG_HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("MIG_HTTP_KEEPALIVE_EXPIRY", "30"))
+
+# (base_url, timeout, http2) -> (loop, AsyncClient). O client fica preso ao loop em que
+# abriu as conexões; num loop novo (testes, reinício) um client novo é criado.
+_pool: dict = {}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def pooled_client(base_url: str, timeout: float, http2: bool = None) -> httpx.AsyncClient:
+    """`httpx.AsyncClient` compartilhado (keep-alive) para o loop corrente."""
+    http2 = MIG_HTTP2 if http2 is None else http2
+    if http2 and not _http2_available():
+        logger.warning("MIG_HTTP2 ativo mas o pacote h2 não está instalado — usando HTTP/1.1")
+        http2 = False
+    loop = asyncio.get_running_loop()
+    key = (base_url, timeout, http2)
+    entry = _pool.get(key)
+    if entry and entry[0] is loop and not entry[1].is_closed:
+        return entry[1]
+    client = httpx.AsyncClient(
+        timeout=timeout, http2=http2,
+        limits=httpx.Limits(max_connections=MIG_HTTP_MAX_CONNECTIONS,
+                            max_keepalive_connections=MIG_HTTP_MAX_KEEPALIVE,
+                            keepalive_expiry=MIG_HTTP_KEEPALIVE_EXPIRY))
+    _pool[key] = (loop, client)
+    return client
+
+
+async def close_pooled_clients() -> None:
+    """Fecha os clients do pool criados no loop corrente (shutdown do servidor)."""
+    loop = asyncio.get_running_loop()
+    for key, (owner, client) in list(_pool.items()):
+        _pool.pop(key, None)
+        if owner is loop and not client.is_closed:
+            try:
+                await client.aclose()
+            except Exception as e:  # noqa: BLE001 — shutdown é best-effort
+                logger.warning("Falha ao fechar client HTTP do MIG: %s", e)
+
 
 class BaseGovClient:
     def __init__(self, base_url: str, default_headers: dict = None, timeout: float = 30.0,
                  monitoring: MigMonitoring = None, audit: MigAuditService = None,
                  provider: str = "generic", retry_policy: RetryPolicy = None,
-                 correlation_id: str = None):
+                 correlation_id: str = None, http2: bool = None,
+                 client: httpx.AsyncClient = None):
         self.base_url = (base_url or "").rstrip("/")
         self.default_headers = default_headers or {}
         if correlation_id:
@@ -34,12 +93,16 @@ class BaseGovClient:
         self.retry_policy = retry_policy or NO_RETRY
         self.correlation_id = correlation_id
         self.last_attempts = 0
+        self.http2 = http2
+        self._client = client                 # injetável (testes); padrão = pool compartilhado
+
+    def _http(self) -> httpx.AsyncClient:
+        return self._client or pooled_client(self.base_url, self.timeout, self.http2)
 
     async def _single_request(self, method: str, url: str, params, json, merged) -> dict:
         self.monitoring.incr(f"{self.provider}.request")
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                resp = await client.request(method, url, params=params, json=json, headers=merged)
+            resp = await self._http().request(method, url, params=params, json=json, headers=merged)
         except httpx.TimeoutException as e:
             self.monitoring.incr(f"{self.provider}.timeout")
             raise MigTimeoutError("Tempo limite ao consultar a API do MEC. Tente novamente.") from e
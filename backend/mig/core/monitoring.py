@@ -1,9 +1,15 @@
 """MigMonitoring — contadores de execução em memória (fundação).
 
 Métricas exportáveis para o Dashboard Técnico na sprint de infra.
+
+[Out/2026] Cada `incr` também alimenta `sigesc_events_total{family="mig"}`
+(utils/metrics → GET /metrics), somado entre instâncias/réplicas. As chaves
+são fixas (`worker.success`, `<provider>.http_<status>` …), sem IDs.
 """
 from collections import defaultdict
 
+from utils.metrics import count_event
+
 
 class MigMonitoring:
     def __init__(self):
@@ -11,6 +17,7 @@ class MigMonitoring:
 
     def incr(self, key: str, by: int = 1):
         self._counters[key] += by
+        count_event("mig", key, by)
 
     def snapshot(self) -> dict:
         return dict(self._counters)
@@ -2992,12 +2992,15 @@ class CurriculumImportBatch(BaseModel):
     fonte: str = 'DCM_FA'
     items: List[CurriculumImportItem] = Field(default_factory=list)
     total_items: int = 0
-    status: Literal['extracting', 'pending_review', 'partially_committed', 'committed', 'cancelled'] = 'pending_review'
+    status: Literal['extracting', 'extract_failed', 'pending_review', 'committing',
+                    'partially_committed', 'committed', 'cancelled'] = 'pending_review'
     created_by: Optional[str] = None
     created_by_name: Optional[str] = None
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
     committed_at: Optional[str] = None
     summary: Optional[Dict] = None  # estatísticas pós-commit
+    extract_progress: Optional[Dict] = None  # {pages_done, pages_total} durante 'extracting'
+    extract_error: Optional[str] = None
 
 
 class CurriculumImportItemUpdate(BaseModel):
@@ -25,51 +25,42 @@ Se precisar expandir o pipeline de PDFs:
   - Nunca baixe imagens externas sem cache em disco/memória.
 """
 from __future__ import annotations
-import asyncio
-import time
 from typing import Any, Callable, Optional
 
+from utils.cache import CacheRegion, get_region, tenant_tag
+
 
 class _TTLCache:
-    """Dict simples com TTL por chave (thread/async seguro o suficiente para FastAPI)."""
+    """Fachada do cache de PDFs sobre `utils.cache.CacheRegion` (região `pdf`).
+
+    [Out/2026] Antes: dict sem limite + UM `asyncio.Lock` global — um miss
+    lento de calendário segurava todos os misses de mantenedora/escola.
+    Agora: LRU limitada e single-flight por chave (ver utils/cache.py).
+    """
 
-    def __init__(self, default_ttl: float = 300.0):
-        self._data: dict[Any, tuple[float, Any]] = {}
+    def __init__(self, default_ttl: float = 300.0, region: Optional[CacheRegion] = None):
+        self._region = region or get_region("pdf", default_ttl=default_ttl, max_entries=1000)
         self._default_ttl = default_ttl
-        self._lock = asyncio.Lock()
 
     async def get(self, key: Any) -> Optional[Any]:
-        entry = self._data.get(key)
-        if entry is None:
-            return None
-        expires_at, value = entry
-        if time.monotonic() > expires_at:
-            self._data.pop(key, None)
-            return None
-        return value
-
-    async def set(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
-        ttl = ttl if ttl is not None else self._default_ttl
-        self._data[key] = (time.monotonic() + ttl, value)
-
-    async def get_or_fetch(self, key: Any, fetcher: Callable, ttl: Optional[float] = None):
-        cached = await self.get(key)
-        if cached is not None:
-            return cached
-        async with self._lock:
-            # Double-check após o lock
-            cached = await self.get(key)
-            if cached is not None:
-                return cached
-            value = await fetcher() if asyncio.iscoroutinefunction(fetcher) else fetcher()
-            await self.set(key, value, ttl)
-            return value
+        return self._region.get(key)
+
+    async def set(self, key: Any, value: Any, ttl: Optional[float] = None, tags=()) -> None:
+        self._region.set(key, value, ttl if ttl is not None else self._default_ttl, tags)
+
+    async def get_or_fetch(self, key: Any, fetcher: Callable, ttl: Optional[float] = None, tags=()):
+        return await self._region.get_or_load(
+            key, fetcher, ttl=ttl if ttl is not None else self._default_ttl, tags=tags,
+        )
 
     def invalidate(self, key: Any = None) -> None:
         if key is None:
-            self._data.clear()
+            self._region.clear()
         else:
-            self._data.pop(key, None)
+            self._region.delete(key)
+
+    def invalidate_tags(self, *tags: str) -> int:
+        return self._region.invalidate_tags(*tags)
 
 
 # Instância global
@@ -92,7 +83,7 @@ async def get_mantenedora_cached(db, tenant_id: Optional[str] = None) -> Optiona
                 return doc
         # 2) Single-tenant típico: 1 mantenedora só
         return await db.mantenedoras.find_one({}, {"_id": 0})
-    return await pdf_cache.get_or_fetch(key, fetch, ttl=300.0)
+    return await pdf_cache.get_or_fetch(key, fetch, ttl=300.0, tags=(tenant_tag(tenant_id),))
 
 
 async def read_mantenedora_for_request(db, request=None, user=None) -> Optional[dict]:
@@ -127,7 +118,9 @@ async def get_calendario_cached(db, academic_year: int, school_id: Optional[str]
                 {"ano_letivo": academic_year}, {"_id": 0}
             )
         return cal
-    return await pdf_cache.get_or_fetch(key, fetch, ttl=300.0)
+    return await pdf_cache.get_or_fetch(
+        key, fetch, ttl=300.0, tags=(f"school:{school_id}",) if school_id else (),
+    )
 
 
 async def get_school_cached(db, school_id: str) -> Optional[dict]:
@@ -135,4 +128,4 @@ async def get_school_cached(db, school_id: str) -> Optional[dict]:
     key = f"school:{school_id}"
     async def fetch():
         return await db.schools.find_one({"id": school_id}, {"_id": 0})
-    return await pdf_cache.get_or_fetch(key, fetch, ttl=300.0)
+    return await pdf_cache.get_or_fetch(key, fetch, ttl=300.0, tags=(f"school:{school_id}",))
@@ -4,109 +4,400 @@ Sistema de Jobs assíncronos para geração de PDFs pesados.
 ⚠️  PERFORMANCE — LEIA /app/docs/pdf-performance.md ANTES DE ALTERAR ⚠️
 
 Fluxo:
-  1. Cliente chama POST .../async → retorna {job_id, status:'queued'}
-  2. Cliente faz polling em GET .../job/{id}/status
-  3. Quando status == 'done', cliente chama GET .../job/{id}/download
-  4. Jobs expiram 10 min após conclusão (limpeza automática)
+  1. Cliente chama POST .../jobs/... → retorna {job_id, status:'queued'}
+  2. Cliente faz polling em GET .../jobs/{id}/status
+  3. Quando status == 'done', cliente chama GET .../jobs/{id}/download
+  4. Jobs expiram PDF_JOB_TTL_SECONDS após conclusão (job + PDF removidos)
 
-Mantém tudo em memória (single-worker, suficiente para SIGESC).
-Se escalar horizontalmente, migrar para Redis.
+[Out/2026] Registro durável (antes: dict em memória, "single-worker"):
+  - estado e progresso ficam em `pdf_jobs` (Mongo): sobrevivem a restart e o
+    polling funciona em QUALQUER réplica atrás do balanceador;
+  - o PDF pronto vai para o blob store (services/blob_store, namespace
+    `pdf_job_results`), não para a RAM — dez Livros de Promoção simultâneos
+    não ficam mais 10 min em memória;
+  - a execução é do `PdfJobExecutor`: fila limitada (PDF_JOB_QUEUE_SIZE) e
+    PDF_JOB_CONCURRENCY workers supervisionados no lugar do
+    `asyncio.create_task` solto; fila cheia → `PdfJobQueueFull` (HTTP 503);
+  - a réplica dona renova `heartbeat_at` dos seus jobs. Job queued/running
+    sem heartbeat há PDF_JOB_STALE_SECONDS (réplica caiu/reiniciou) vira
+    'error' na próxima consulta — o cliente para de esperar e gera de novo.
+
+A execução continua na réplica que aceitou o job (o gerador é um closure do
+router); só o estado e o resultado são compartilhados.
 """
 from __future__ import annotations
 import asyncio
+import hashlib
+import logging
+import os
 import time
 import uuid
-from dataclasses import dataclass, field
-from typing import Any, Callable, Optional
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from services.blob_store import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+PDF_JOB_TTL_SECONDS = int(os.environ.get("PDF_JOB_TTL_SECONDS", "600"))  # 10 min
+PDF_JOB_CONCURRENCY = int(os.environ.get("PDF_JOB_CONCURRENCY", "2"))
+PDF_JOB_QUEUE_SIZE = int(os.environ.get("PDF_JOB_QUEUE_SIZE", "20"))
+PDF_JOB_HEARTBEAT_SECONDS = float(os.environ.get("PDF_JOB_HEARTBEAT_SECONDS", "15"))
+PDF_JOB_STALE_SECONDS = float(os.environ.get("PDF_JOB_STALE_SECONDS", "90"))
+
+JOB_TTL_SECONDS = PDF_JOB_TTL_SECONDS
+COLLECTION = "pdf_jobs"
+RESULT_NAMESPACE = "pdf_job_results"
+ACTIVE_STATUSES = ("queued", "running")
+# Rede de segurança: o índice TTL remove o documento 1 dia depois de expirar
+# caso nenhuma réplica tenha rodado `purge_expired` (o blob aí fica órfão).
+_PURGE_GRACE = timedelta(days=1)
+
+ProgressCallback = Callable[..., None]
+PdfRunner = Callable[[ProgressCallback], Awaitable[Tuple[bytes, str]]]
+
 
-JOB_TTL_SECONDS = 600  # 10 min
+class PdfJobQueueFull(Exception):
+    """Fila de PDFs da réplica cheia — o cliente deve tentar de novo depois."""
 
 
 @dataclass
 class PdfJob:
     id: str
+    kind: str = ''
     status: str = 'queued'  # queued | running | done | error
     progress: int = 0
     message: str = 'Na fila'
     filename: str = 'documento.pdf'
-    pdf_bytes: Optional[bytes] = None
     error: Optional[str] = None
+    params: Dict[str, Any] = field(default_factory=dict)
+    created_by: Optional[str] = None
     created_at: float = field(default_factory=time.time)
     done_at: Optional[float] = None
+    result: Optional[dict] = None  # {backend, key, size_bytes}
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "PdfJob":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in doc.items() if k in known})
+
+
+def _purge_at(expires_at: float) -> datetime:
+    return datetime.fromtimestamp(expires_at, timezone.utc) + _PURGE_GRACE
+
+
+class PdfJobStore:
+    """Estado dos jobs em `pdf_jobs` + resultado no blob store."""
+
+    def __init__(self, db):
+        self.db = db
+        self.coll = db[COLLECTION]
 
+    def _results(self, backend: Optional[str] = None):
+        return get_blob_store(self.db, backend, namespace=RESULT_NAMESPACE)
 
-class _JobRegistry:
-    def __init__(self):
-        self._jobs: dict[str, PdfJob] = {}
-        self._lock = asyncio.Lock()
+    async def ensure_indexes(self) -> None:
+        await self.coll.create_index("id", unique=True, background=True)
+        await self.coll.create_index("expires_at", background=True)
+        await self.coll.create_index("result.key", sparse=True, background=True)
+        await self.coll.create_index("purge_at", expireAfterSeconds=0, background=True)
 
-    def create(self) -> PdfJob:
-        job = PdfJob(id=str(uuid.uuid4()))
-        self._jobs[job.id] = job
+    async def create(self, kind: str, params: Optional[dict] = None,
+                     created_by: Optional[str] = None) -> PdfJob:
+        job = PdfJob(id=str(uuid.uuid4()), kind=kind, params=dict(params or {}), created_by=created_by)
+        # Job que nunca termina (réplica morta) expira como se tivesse acabado agora.
+        expires_at = job.created_at + PDF_JOB_STALE_SECONDS + PDF_JOB_TTL_SECONDS
+        await self.coll.insert_one({
+            **asdict(job),
+            "heartbeat_at": job.created_at,
+            "expires_at": expires_at,
+            "purge_at": _purge_at(expires_at),
+        })
         return job
 
-    def get(self, job_id: str) -> Optional[PdfJob]:
-        self._gc()
-        return self._jobs.get(job_id)
+    async def get(self, job_id: str) -> Optional[PdfJob]:
+        doc = await self.coll.find_one({"id": job_id}, {"_id": 0, "result_bytes": 0})
+        if not doc:
+            return None
+        now = time.time()
+        if doc.get("expires_at") and doc["expires_at"] < now:
+            return None  # expirado, aguardando `purge_expired`
+        if doc.get("status") in ACTIVE_STATUSES and now - (doc.get("heartbeat_at") or 0) > PDF_JOB_STALE_SECONDS:
+            # A réplica dona parou de renovar: caiu ou reiniciou no meio do job.
+            stale = self._terminal_fields('error', now)
+            stale.update(error='Geração interrompida (servidor reiniciado). Gere o documento novamente.',
+                         message='Erro')
+            res = await self.coll.update_one(
+                {"id": job_id, "status": {"$in": list(ACTIVE_STATUSES)},
+                 "heartbeat_at": doc.get("heartbeat_at")},
+                {"$set": stale},
+            )
+            if res.modified_count:
+                logger.warning(f"PDF job {job_id} sem heartbeat há >{PDF_JOB_STALE_SECONDS:.0f}s — marcado como erro")
+                doc.update(stale)
+            else:
+                doc = await self.coll.find_one({"id": job_id}, {"_id": 0, "result_bytes": 0}) or doc
+        return PdfJob.from_doc(doc)
 
-    def update(self, job_id: str, **fields) -> None:
-        job = self._jobs.get(job_id)
-        if not job:
-            return
-        for k, v in fields.items():
-            setattr(job, k, v)
+    async def update(self, job_id: str, **values) -> None:
+        values["heartbeat_at"] = time.time()
+        await self.coll.update_one({"id": job_id}, {"$set": values})
+
+    async def heartbeat(self, job_ids) -> None:
+        job_ids = list(job_ids)
+        if job_ids:
+            await self.coll.update_many(
+                {"id": {"$in": job_ids}, "status": {"$in": list(ACTIVE_STATUSES)}},
+                {"$set": {"heartbeat_at": time.time()}},
+            )
+
+    @staticmethod
+    def _terminal_fields(status: str, now: float) -> dict:
+        expires_at = now + PDF_JOB_TTL_SECONDS
+        return {"status": status, "done_at": now, "heartbeat_at": now,
+                "expires_at": expires_at, "purge_at": _purge_at(expires_at)}
+
+    async def complete(self, job_id: str, pdf_bytes: bytes, filename: str) -> None:
+        store = self._results()
+        values = self._terminal_fields('done', time.time())
+        values.update(progress=100, message='Concluído', filename=filename)
+        if store is None:  # DOCUMENT_BLOB_BACKEND=inline: bytes no próprio job (limite do BSON)
+            values.update(result={"backend": "inline", "size_bytes": len(pdf_bytes)}, result_bytes=pdf_bytes)
+        else:
+            sha = hashlib.sha256(pdf_bytes).hexdigest()
+            await store.put(sha, pdf_bytes, content_type="application/pdf")
+            values["result"] = {"backend": store.name, "key": sha, "size_bytes": len(pdf_bytes)}
+        await self.coll.update_one({"id": job_id}, {"$set": values})
+
+    async def fail(self, job_id: str, error: str) -> None:
+        values = self._terminal_fields('error', time.time())
+        values.update(error=error, message='Erro')
+        await self.coll.update_one({"id": job_id}, {"$set": values})
+
+    async def open_result(self, job: PdfJob) -> Optional[AsyncIterator[bytes]]:
+        """Leitor do PDF pronto (streaming), ou None se o resultado sumiu."""
+        result = job.result or {}
+        if result.get("backend") == "inline":
+            doc = await self.coll.find_one({"id": job.id}, {"_id": 0, "result_bytes": 1})
+            data = (doc or {}).get("result_bytes")
+            if data is None:
+                return None
 
-    def _gc(self) -> None:
-        """Remove jobs finalizados há mais que JOB_TTL_SECONDS."""
+            async def _inline() -> AsyncIterator[bytes]:
+                yield bytes(data)
+            return _inline()
+        if not result.get("key"):
+            return None
+        store = self._results(result.get("backend"))
+        if not await store.exists(result["key"]):
+            return None
+        return store.read_range(result["key"])
+
+    async def purge_expired(self, limit: int = 100) -> int:
+        """Remove jobs expirados e os blobs que só eles referenciavam."""
         now = time.time()
-        expired = [
-            jid for jid, j in self._jobs.items()
-            if j.done_at and (now - j.done_at) > JOB_TTL_SECONDS
-        ]
-        for jid in expired:
-            self._jobs.pop(jid, None)
-
-
-job_registry = _JobRegistry()
-
-
-async def run_pdf_job(
-    job_id: str,
-    generator: Callable,
-    *args,
-    stages: Optional[list[tuple[int, str]]] = None,
-    **kwargs,
-) -> None:
-    """Executa o gerador de PDF em background, reportando progresso.
-    `generator` deve ser uma async callable que recebe um parâmetro `progress_cb`
-    (ou ignora) e retorna (pdf_bytes, filename).
+        expired = await self.coll.find(
+            {"expires_at": {"$lt": now}}, {"_id": 0, "id": 1, "result": 1}
+        ).to_list(limit)
+        purged = 0
+        for doc in expired:
+            res = await self.coll.delete_one({"id": doc["id"], "expires_at": {"$lt": now}})
+            if not res.deleted_count:
+                continue  # outra réplica chegou antes
+            purged += 1
+            result = doc.get("result") or {}
+            key = result.get("key")
+            if key and not await self.coll.find_one({"result.key": key}, {"_id": 1}):
+                try:
+                    await self._results(result.get("backend")).delete(key)
+                except Exception as e:
+                    logger.warning(f"PDF job {doc['id']}: falha ao remover resultado {key[:12]}: {e}")
+        return purged
+
+
+class _ProgressSink:
+    """`progress_cb` síncrono dos geradores → escrita no Mongo sem bloquear.
+
+    Só uma escrita em voo por job; chamadas no meio disso só trocam o valor
+    pendente (os geradores chamam em rajadas, o polling só quer o último).
     """
-    job = job_registry.get(job_id)
-    if not job:
-        return
-    job_registry.update(job_id, status='running', progress=5, message='Iniciando...')
-
-    def progress_cb(pct: int, msg: str = ''):
-        job_registry.update(job_id, progress=max(5, min(95, pct)), message=msg or job.message)
-
-    try:
-        # Injetar callback se o generator suportar
-        pdf_bytes, filename = await generator(*args, progress_cb=progress_cb, **kwargs)
-        job_registry.update(
-            job_id,
-            status='done', progress=100, message='Concluído',
-            pdf_bytes=pdf_bytes, filename=filename, done_at=time.time(),
-        )
-    except Exception as e:  # noqa: BLE001
-        import traceback
-        tb = traceback.format_exc()
-        job_registry.update(
-            job_id,
-            status='error',
-            error=str(e) or 'Erro ao gerar PDF',
-            message='Erro',
-            done_at=time.time(),
-        )
-        # Log verboso
-        import logging
-        logging.getLogger(__name__).error(f"PDF job {job_id} falhou: {e}\n{tb}")
+
+    def __init__(self, store: PdfJobStore, job_id: str):
+        self._store = store
+        self._job_id = job_id
+        self._pending: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __call__(self, pct: int, msg: str = '') -> None:
+        values = {"status": 'running', "progress": max(5, min(95, int(pct)))}
+        if msg:
+            values["message"] = msg
+        self._pending = values
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._flush())
+
+    async def _flush(self) -> None:
+        while self._pending is not None:
+            values, self._pending = self._pending, None
+            try:
+                await self._store.update(self._job_id, **values)
+            except Exception as e:
+                logger.warning(f"PDF job {self._job_id}: falha ao gravar progresso: {e}")
+
+    async def drain(self) -> None:
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+class PdfJobExecutor:
+    """Fila limitada + workers supervisionados para os jobs de PDF desta réplica."""
+
+    def __init__(self, store: PdfJobStore, concurrency: Optional[int] = None,
+                 queue_size: Optional[int] = None):
+        self.store = store
+        self.concurrency = max(1, concurrency or PDF_JOB_CONCURRENCY)
+        self.queue_size = max(1, queue_size or PDF_JOB_QUEUE_SIZE)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list = []
+        self._supervisor: Optional[asyncio.Task] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._owned: set = set()  # jobs desta réplica (fila + em execução) → heartbeat
+        self.stats = {"submitted": 0, "done": 0, "error": 0, "rejected": 0, "restarted_workers": 0}
+
+    # --- ciclo de vida -------------------------------------------------
+
+    async def start(self) -> None:
+        """Índices + workers + supervisor (idempotente; chamado no startup)."""
+        await self.store.ensure_indexes()
+        self._ensure_started()
+
+    def _ensure_started(self) -> None:
+        if self._supervisor is not None and not self._supervisor.done():
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._stop = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._supervisor = asyncio.create_task(self._supervise())
+
+    async def stop(self, timeout: float = 10) -> None:
+        """Espera os jobs em execução (até `timeout`); o que sobrar vira 'error'."""
+        if self._supervisor is None:
+            return
+        self._stop.set()
+        while self._queue is not None and not self._queue.empty():
+            _job_id, _runner = self._queue.get_nowait()
+            self._queue.task_done()
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        tasks = [*self._workers, self._supervisor]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for job_id in list(self._owned):
+            try:
+                await self.store.fail(job_id, 'Geração interrompida (servidor reiniciado). Gere o documento novamente.')
+            except Exception as e:
+                logger.warning(f"PDF job {job_id}: falha ao marcar interrupção: {e}")
+        self._owned.clear()
+        self._supervisor = None
+        self._workers = []
+
+    # --- API -----------------------------------------------------------
+
+    async def enqueue(self, kind: str, runner: PdfRunner, *, params: Optional[dict] = None,
+                      created_by: Optional[str] = None) -> PdfJob:
+        """Cria o job e o põe na fila. `runner(progress_cb)` → (pdf_bytes, filename)."""
+        self._ensure_started()
+        if self._queue.full():
+            self.stats["rejected"] += 1
+            raise PdfJobQueueFull(f"{self._queue.qsize()} PDFs na fila")
+        job = await self.store.create(kind, params=params, created_by=created_by)
+        try:
+            self._queue.put_nowait((job.id, runner))
+        except asyncio.QueueFull:  # encheu durante o insert
+            self.stats["rejected"] += 1
+            await self.store.fail(job.id, 'Fila de geração de PDFs cheia.')
+            raise PdfJobQueueFull(f"{self._queue.qsize()} PDFs na fila")
+        self._owned.add(job.id)
+        self.stats["submitted"] += 1
+        return job
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "owned": len(self._owned),
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+        }
+
+    # --- internos ------------------------------------------------------
+
+    async def _worker(self) -> None:
+        while True:
+            job_id, runner = await self._queue.get()
+            try:
+                await self._run(job_id, runner)
+            finally:
+                self._owned.discard(job_id)
+                self._queue.task_done()
+
+    async def _run(self, job_id: str, runner: PdfRunner) -> None:
+        sink = _ProgressSink(self.store, job_id)
+        try:
+            await self.store.update(job_id, status='running', progress=5, message='Iniciando...')
+            pdf_bytes, filename = await runner(sink)
+            await sink.drain()
+            await self.store.complete(job_id, pdf_bytes, filename)
+            self.stats["done"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:  # noqa: BLE001
+            await sink.drain()
+            self.stats["error"] += 1
+            # HTTPException dos geradores traz a mensagem para o usuário em `detail`.
+            error = getattr(e, 'detail', None) or str(e) or 'Erro ao gerar PDF'
+            logger.error(f"PDF job {job_id} falhou: {e}", exc_info=not hasattr(e, 'detail'))
+            try:
+                await self.store.fail(job_id, str(error))
+            except Exception as e2:
+                logger.error(f"PDF job {job_id}: falha ao gravar erro: {e2}")
+
+    async def _supervise(self) -> None:
+        """Heartbeat dos jobs desta réplica, limpeza de expirados e workers que morreram."""
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=PDF_JOB_HEARTBEAT_SECONDS)
+                return
+            except asyncio.TimeoutError:
+                pass
+            for i, task in enumerate(self._workers):
+                if task.done():
+                    exc = None if task.cancelled() else task.exception()
+                    logger.error(f"[pdf_jobs] worker {i} parou ({exc!r}) — reiniciando")
+                    self.stats["restarted_workers"] += 1
+                    self._workers[i] = asyncio.create_task(self._worker())
+            try:
+                await self.store.heartbeat(self._owned)
+                await self.store.purge_expired()
+            except Exception as e:
+                logger.warning(f"[pdf_jobs] supervisor: {e}")
+
+
+_executors: Dict[int, PdfJobExecutor] = {}
+
+
+def get_pdf_job_executor(db) -> PdfJobExecutor:
+    """Executor (único por banco) desta réplica."""
+    executor = _executors.get(id(db))
+    if executor is None:
+        executor = _executors[id(db)] = PdfJobExecutor(PdfJobStore(db))
+    return executor
+
+
+async def stop_pdf_job_executors(timeout: float = 10) -> None:
+    for executor in list(_executors.values()):
+        await executor.stop(timeout=timeout)
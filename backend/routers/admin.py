@@ -10,6 +10,7 @@ from pydantic import BaseModel, Field
 import unicodedata
 
 from auth_middleware import AuthMiddleware
+from services.class_roster import clear_class_rosters
 from utils.curriculum_resolver import resolve_curriculum
 
 logger = logging.getLogger(__name__)
@@ -441,6 +442,8 @@ def setup_router(db, active_sessions=None, connection_manager=None, get_db_for_u
             {"status": "active", "enrollment_date": {"$ne": target_date}},
             {"$set": {"enrollment_date": target_date}}
         )
+        if r2.modified_count or r3.modified_count:
+            clear_class_rosters()  # datas de matrícula em rosters de todas as turmas
 
         return {
             "message": f"Migração concluída: histórico={r1.modified_count}, alunos={r2.modified_count}, matrículas={r3.modified_count} atualizados para 15/01/2026",
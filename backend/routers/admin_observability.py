@@ -18,6 +18,8 @@ from fastapi import APIRouter, HTTPException, Request, Response
 from auth_middleware import AuthMiddleware
 from utils.students_search import get_observability_snapshot
 from utils.observability import diary_metrics
+from utils.cache import cache_stats
+from utils.db_profiler import top_endpoints
 from routers.calendar_diary_state import diary_state_metrics
 from utils.academic_event_sla import compute_sla_days, compute_sla_status
 
@@ -213,6 +215,90 @@ def setup_admin_observability_router(audit_service: object | None = None, db=Non
                 logger.warning("[observability:diary-state] audit log falhou: %s", e)
         return snap
 
+    @router.get("/cache")
+    async def cache_observability(request: Request, response: Response):
+        """Snapshot da camada de cache (utils/cache.py — Out/2026).
+
+        Por região: entradas/limite, hits/misses/hit_pct, loads, coalesced
+        (misses resolvidos pelo single-flight), evictions. Instance-local.
+        """
+        current_user = await AuthMiddleware.get_current_user(request)
+        if current_user.get("role") != "super_admin":
+            raise HTTPException(status_code=403, detail="Apenas super_admin pode acessar dados de observabilidade.")
+        user_key = current_user.get("id") or current_user.get("email") or "unknown"
+        _check_admin_rate(user_key)
+        _no_cache_headers(response)
+        snap = cache_stats()
+        if audit_service is not None:
+            try:
+                await audit_service.log(  # type: ignore[attr-defined]
+                    action="export", collection="observability_metrics",
+                    user=current_user, request=request,
+                    description=f"Acesso a /admin/observability/cache (regions={len(snap['regions'])})",
+                    extra_data={"endpoint": "cache", "regions": len(snap["regions"])},
+                )
+            except Exception as e:
+                logger.warning("[observability:cache] audit log falhou: %s", e)
+        return snap
+
+    @router.get("/audit-writer")
+    async def audit_writer_observability(request: Request, response: Response):
+        """Snapshot do buffer de auditoria (audit_service.AuditWriter — Out/2026).
+
+        enqueued/flushed/flushes, latência de flush (last/avg/max em ms),
+        profundidade do buffer, esperas por backpressure, gravações inline
+        de fallback e registros descartados. Instance-local.
+        """
+        current_user = await AuthMiddleware.get_current_user(request)
+        if current_user.get("role") != "super_admin":
+            raise HTTPException(status_code=403, detail="Apenas super_admin pode acessar dados de observabilidade.")
+        user_key = current_user.get("id") or current_user.get("email") or "unknown"
+        _check_admin_rate(user_key)
+        _no_cache_headers(response)
+        if audit_service is None:
+            return {"buffered": False}
+        snap = audit_service.writer_stats()
+        try:
+            await audit_service.log(  # type: ignore[attr-defined]
+                action="export", collection="observability_metrics",
+                user=current_user, request=request,
+                description="Acesso a /admin/observability/audit-writer",
+                extra_data={"endpoint": "audit-writer"},
+            )
+        except Exception as e:
+            logger.warning("[observability:audit-writer] audit log falhou: %s", e)
+        return snap
+
+    @router.get("/db-profile")
+    async def db_profile_observability(request: Request, response: Response,
+                                       limit: int = 10, order_by: str = "db_ms_total"):
+        """Top-N endpoints mais caros em banco (utils/db_profiler — Out/2026).
+
+        Por template de rota: requisições, tempo de banco (total/médio/máx),
+        queries (total/média/máx), contagem por coleção e formatos de query
+        repetidos (suspeitas de N+1). `order_by` aceita qualquer campo numérico
+        (`db_ms_avg`, `queries_max`, `n_plus_one_requests`…). Só coleta com
+        DB_PROFILER_ENABLED=true; instance-local.
+        """
+        current_user = await AuthMiddleware.get_current_user(request)
+        if current_user.get("role") != "super_admin":
+            raise HTTPException(status_code=403, detail="Apenas super_admin pode acessar dados de observabilidade.")
+        user_key = current_user.get("id") or current_user.get("email") or "unknown"
+        _check_admin_rate(user_key)
+        _no_cache_headers(response)
+        snap = top_endpoints(limit=max(1, min(limit, 100)), order_by=order_by)
+        if audit_service is not None:
+            try:
+                await audit_service.log(  # type: ignore[attr-defined]
+                    action="export", collection="observability_metrics",
+                    user=current_user, request=request,
+                    description=f"Acesso a /admin/observability/db-profile (endpoints={len(snap['endpoints'])})",
+                    extra_data={"endpoint": "db-profile", "order_by": snap["order_by"]},
+                )
+            except Exception as e:
+                logger.warning("[observability:db-profile] audit log falhou: %s", e)
+        return snap
+
     @router.get("/academic_events")
     async def academic_events_observability(request: Request, response: Response):
         """Snapshot do canal `academic_events` (Passo 2 — Fev/2026).
@@ -1,12 +1,16 @@
 """
 Analytics Router - Dashboard Analítico para acompanhamento do município
 """
-from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query
 from typing import Optional, List
 from datetime import datetime, timedelta
 from bson import ObjectId
 import unicodedata
 from auth_middleware import AuthMiddleware
+from services import analytics_rollups
+from services.analytics_rollups import (
+    ATTENDANCE_ROLLUP, ATTENDANCE_STUDENT_ROLLUP, ENROLLMENTS_ROLLUP, GRADES_ROLLUP,
+)
 from tenant_scope import apply_tenant_filter
 from utils.grade_dependency_filters import regular_only_aggregate_match
 from utils.school_resolution import (
@@ -54,6 +58,14 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
         """Retorna filtro que aceita ano como int ou string"""
         return {'$in': [str(year), year]}
 
+    async def _rollup_status(current_db):
+        """[Out/2026] (status, usar_rollup) — rollups só existem no banco
+        principal; sandbox e rollups atrasados leem ao vivo."""
+        if current_db is not db:
+            return None, False
+        status = await analytics_rollups.rollup_status(db)
+        return status, status['usable']
+
     async def _require_admin_tier(request: Request):
         """Apr 2026: Dashboard Analítico - respeita Matriz de Permissões."""
         return await AuthMiddleware.require_permission(
@@ -69,9 +81,14 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
     ):
         """
         Retorna visão geral das estatísticas do município/escola
+
+        [Out/2026] Matrículas, frequência e notas vêm dos rollups
+        (services/analytics_rollups) quando frescos; `data_freshness` informa
+        a origem e o instante de referência dos números.
         """
         current_db = get_current_db(request)
         user = await AuthMiddleware.get_current_user(request)
+        rollup, use_rollup = await _rollup_status(current_db)
         
         # Determina se usuário tem visão global ou restrita
         is_global = user.get('role') in ['admin', 'admin_teste', 'super_admin', 'gerente', 'semed', 'semed3']
@@ -155,11 +172,12 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
             {'$match': enrollment_filter},
             {'$group': {
                 '_id': '$status',
-                'count': {'$sum': 1}
+                'count': {'$sum': '$count' if use_rollup else 1}
             }}
         ]
+        enrollment_coll = current_db[ENROLLMENTS_ROLLUP] if use_rollup else current_db.enrollments
         enrollment_stats = {}
-        async for doc in current_db.enrollments.aggregate(enrollments_pipeline):
+        async for doc in enrollment_coll.aggregate(enrollments_pipeline):
             enrollment_stats[doc['_id'] or 'active'] = doc['count']
         
         total_enrollments = sum(enrollment_stats.values())
@@ -225,20 +243,34 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
                 attendance_match, school_scope_to_date_match(scope, "date"),
             ]}
 
-        attendance_pipeline = [
-            {'$match': attendance_match},
-            *_attendance_split_stages(),
-            {'$group': {
-                '_id': None,
-                'total_records': {'$sum': 1},
-                'present_count': {'$sum': {'$cond': [{'$eq': ['$_st', 'P']}, 1, 0]}},
-                'falta_count': {'$sum': {'$cond': [{'$eq': ['$_st', 'F']}, 1, 0]}},
-                'justified_count': {'$sum': {'$cond': [{'$eq': ['$_st', 'J']}, 1, 0]}},
-            }}
-        ]
+        if use_rollup:
+            attendance_coll = current_db[ATTENDANCE_ROLLUP]
+            attendance_pipeline = [
+                {'$match': attendance_match},
+                {'$group': {
+                    '_id': None,
+                    'total_records': {'$sum': '$total'},
+                    'present_count': {'$sum': '$present'},
+                    'falta_count': {'$sum': '$absent'},
+                    'justified_count': {'$sum': '$justified'},
+                }}
+            ]
+        else:
+            attendance_coll = current_db.attendance
+            attendance_pipeline = [
+                {'$match': attendance_match},
+                *_attendance_split_stages(),
+                {'$group': {
+                    '_id': None,
+                    'total_records': {'$sum': 1},
+                    'present_count': {'$sum': {'$cond': [{'$eq': ['$_st', 'P']}, 1, 0]}},
+                    'falta_count': {'$sum': {'$cond': [{'$eq': ['$_st', 'F']}, 1, 0]}},
+                    'justified_count': {'$sum': {'$cond': [{'$eq': ['$_st', 'J']}, 1, 0]}},
+                }}
+            ]
 
         attendance_stats = {'total_records': 0, 'present_count': 0, 'falta_count': 0, 'justified_count': 0}
-        async for doc in current_db.attendance.aggregate(attendance_pipeline):
+        async for doc in attendance_coll.aggregate(attendance_pipeline):
             attendance_stats = doc
 
         attendance_rate = 0
@@ -269,26 +301,46 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
         # Média Geral = média dos `final_average` (já é a média dos bimestres
         # lançados). Aprovação = por ALUNO: aprovado se todos os componentes
         # avaliados têm média >= 5,0 (base = alunos com nota lançada).
-        grades_pipeline = [
-            {'$match': {**grades_filter, 'final_average': {'$ne': None}, **regular_only_aggregate_match()}},
-            {'$facet': {
-                'avg': [
-                    {'$group': {'_id': None, 'avg_grade': {'$avg': '$final_average'}, 'total': {'$sum': 1}}}
-                ],
-                'approval': [
-                    {'$group': {'_id': '$student_id', 'min_avg': {'$min': '$final_average'}}},
-                    {'$group': {'_id': None,
-                        'students': {'$sum': 1},
-                        'approved': {'$sum': {'$cond': [{'$gte': ['$min_avg', 5]}, 1, 0]}}}}
-                ]
-            }}
-        ]
+        if use_rollup:
+            # Linhas por aluno/turma: reg_* = notas regulares com final_average.
+            grades_coll = current_db[GRADES_ROLLUP]
+            grades_pipeline = [
+                {'$match': {**grades_filter, 'reg_n': {'$gt': 0}}},
+                {'$facet': {
+                    'avg': [
+                        {'$group': {'_id': None, 'sum': {'$sum': '$reg_sum'}, 'total': {'$sum': '$reg_n'}}},
+                        {'$project': {'total': 1, 'avg_grade': {'$divide': ['$sum', '$total']}}}
+                    ],
+                    'approval': [
+                        {'$group': {'_id': '$student_id', 'min_avg': {'$min': '$reg_min'}}},
+                        {'$group': {'_id': None,
+                            'students': {'$sum': 1},
+                            'approved': {'$sum': {'$cond': [{'$gte': ['$min_avg', 5]}, 1, 0]}}}}
+                    ]
+                }}
+            ]
+        else:
+            grades_coll = current_db.grades
+            grades_pipeline = [
+                {'$match': {**grades_filter, 'final_average': {'$ne': None}, **regular_only_aggregate_match()}},
+                {'$facet': {
+                    'avg': [
+                        {'$group': {'_id': None, 'avg_grade': {'$avg': '$final_average'}, 'total': {'$sum': 1}}}
+                    ],
+                    'approval': [
+                        {'$group': {'_id': '$student_id', 'min_avg': {'$min': '$final_average'}}},
+                        {'$group': {'_id': None,
+                            'students': {'$sum': 1},
+                            'approved': {'$sum': {'$cond': [{'$gte': ['$min_avg', 5]}, 1, 0]}}}}
+                    ]
+                }}
+            ]
 
         avg_grade_val = 0
         total_grades_val = 0
         approved_students = 0
         total_students_graded = 0
-        async for doc in current_db.grades.aggregate(grades_pipeline):
+        async for doc in grades_coll.aggregate(grades_pipeline):
             avg_block = (doc.get('avg') or [{}])[0] if doc.get('avg') else {}
             appr_block = (doc.get('approval') or [{}])[0] if doc.get('approval') else {}
             avg_grade_val = round(avg_block.get('avg_grade') or 0, 1)
@@ -344,7 +396,8 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
                 'approved': grades_stats.get('approved', 0),
                 'failed': grades_stats.get('failed', 0),
                 'approval_rate': approval_rate
-            }
+            },
+            'data_freshness': analytics_rollups.data_freshness(rollup, use_rollup),
         }
     
     @router.get("/enrollments/trend")
@@ -420,6 +473,7 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
     @router.get("/attendance/monthly")
     async def get_attendance_monthly(
         request: Request,
+        response: Response,
         academic_year: int = Query(..., description="Ano letivo"),
         school_id: Optional[str] = Query(None),
         class_id: Optional[str] = Query(None),
@@ -427,10 +481,18 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
     ):
         """
         Retorna frequência mensal
+
+        [Out/2026] Sem `student_id`, lê de `analytics_rollup_attendance`
+        (linhas por turma/data). A origem vai nos headers X-Analytics-*.
         """
         await _require_admin_tier(request)
         current_db = get_current_db(request)
         user = await AuthMiddleware.get_current_user(request)
+        rollup, use_rollup = await _rollup_status(current_db)
+        # Drill-down por aluno não tem granularidade diária nos rollups.
+        use_rollup = use_rollup and not student_id
+        response.headers.update(analytics_rollups.freshness_headers(
+            analytics_rollups.data_freshness(rollup, use_rollup)))
         
         is_global = user.get('role') in ['admin', 'admin_teste', 'super_admin', 'gerente', 'semed', 'semed3']
         user_school_ids = user.get('school_ids', []) or []
@@ -462,6 +524,7 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
         
         # Usa o mesmo helper de split (records[] com combos 'P|F') e a regra
         # de negócio: Frequência = P / total de aulas (J e F = ausência).
+        attendance_coll = current_db.attendance
         pipeline = [
             {'$match': {**(match_filter), **regular_only_aggregate_match()}},
             {'$unwind': '$records'},
@@ -490,6 +553,19 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
             }},
             {'$sort': {'_id': 1}}
         ])
+        if use_rollup:
+            attendance_coll = current_db[ATTENDANCE_ROLLUP]
+            pipeline = [
+                {'$match': {**match_filter, 'regular': True, 'total': {'$gt': 0}}},
+                {'$group': {
+                    '_id': '$month',
+                    'total': {'$sum': '$total'},
+                    'present': {'$sum': '$present'},
+                    'absent': {'$sum': '$absent'},
+                    'justified': {'$sum': '$justified'}
+                }},
+                {'$sort': {'_id': 1}}
+            ]
         
         months_map = {
             '01': 'Jan', '02': 'Fev', '03': 'Mar', '04': 'Abr',
@@ -498,7 +574,7 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
         }
         
         result = []
-        async for doc in current_db.attendance.aggregate(pipeline):
+        async for doc in attendance_coll.aggregate(pipeline):
             month_num = doc['_id']
             rate = 0
             if doc['total'] > 0:
@@ -718,6 +794,7 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
     @router.get("/schools/ranking")
     async def get_schools_ranking(
         request: Request,
+        response: Response,
         academic_year: int = Query(..., description="Ano letivo"),
         limit: int = Query(100, description="Limite de resultados (default: todas)"),
         bimestre: Optional[int] = Query(None, description="Bimestre para cálculo de evolução (1-4)")
@@ -752,6 +829,10 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
         INDICADOR INFORMATIVO (não entra no score):
         - Distorção Idade-Série: % de alunos fora da idade adequada
         ============================================
+
+        [Out/2026] Matrículas, frequência, SLA de frequência, notas e aprovação
+        vêm dos rollups (services/analytics_rollups) quando frescos — origem
+        nos headers X-Analytics-Source / X-Analytics-As-Of.
         """
         from datetime import timedelta
         
@@ -759,6 +840,9 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
         current_db = get_current_db(request)
         user = await AuthMiddleware.get_current_user(request)
         user_role = user.get('role', '').lower()
+        rollup, use_rollup = await _rollup_status(current_db)
+        response.headers.update(analytics_rollups.freshness_headers(
+            analytics_rollups.data_freshness(rollup, use_rollup)))
         
         # ============================================
         # RESTRIÇÃO DE ACESSO AO RANKING
@@ -838,6 +922,8 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
         # 1. MATRÍCULAS E EVASÃO
         # ============================================
         # Matrículas ativas (atuais) — agrupadas por turma e mapeadas à escola temporal
+        enrollment_coll = current_db[ENROLLMENTS_ROLLUP] if use_rollup else current_db.enrollments
+        enrollment_count = '$count' if use_rollup else 1
         enrollment_pipeline = [
             {'$match': {
                 'class_id': {'$in': _scoped_class_ids},
@@ -846,10 +932,10 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
             }},
             {'$group': {
                 '_id': '$class_id',
-                'count': {'$sum': 1}
+                'count': {'$sum': enrollment_count}
             }}
         ]
-        async for doc in current_db.enrollments.aggregate(enrollment_pipeline):
+        async for doc in enrollment_coll.aggregate(enrollment_pipeline):
             _sid = classes_by_school.get(doc['_id'])
             if _sid in schools:
                 schools[_sid]['enrollments_active'] += doc['count']
@@ -862,10 +948,10 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
             }},
             {'$group': {
                 '_id': {'class_id': '$class_id', 'status': '$status'},
-                'count': {'$sum': 1}
+                'count': {'$sum': enrollment_count}
             }}
         ]
-        async for doc in current_db.enrollments.aggregate(enrollment_start_pipeline):
+        async for doc in enrollment_coll.aggregate(enrollment_start_pipeline):
             _sid = classes_by_school.get(doc['_id']['class_id'])
             status = doc['_id']['status'] or 'active'
             if _sid in schools:
@@ -880,30 +966,50 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
         
         # Frequência agregada por escola (records[] com P/F/J).
         # Regra: J e F contam como AUSÊNCIA; presença = somente 'P'.
-        attendance_pipeline = [
-            {'$match': {
-                'class_id': {'$in': list(classes_by_school.keys())},
-                'date': {'$regex': f'^{academic_year}'}
-            }},
-            *_attendance_split_stages(),
-            {'$group': {
-                '_id': '$class_id',
-                'total': {'$sum': 1},
-                'present': {
-                    '$sum': {'$cond': [{'$eq': ['$_st', 'P']}, 1, 0]}
-                }
-            }}
-        ]
-        async for doc in current_db.attendance.aggregate(attendance_pipeline):
+        attendance_match = {
+            'class_id': {'$in': list(classes_by_school.keys())},
+            'date': {'$regex': f'^{academic_year}'}
+        }
+        if use_rollup:
+            # Uma única passada nos rollups serve também o SLA (seção 5).
+            attendance_coll = current_db[ATTENDANCE_ROLLUP]
+            attendance_pipeline = [
+                {'$match': attendance_match},
+                {'$group': {
+                    '_id': '$class_id',
+                    'total': {'$sum': '$total'},
+                    'present': {'$sum': '$present'},
+                    'docs': {'$sum': '$docs'},
+                    'docs_on_time': {'$sum': '$docs_on_time'},
+                }}
+            ]
+        else:
+            attendance_coll = current_db.attendance
+            attendance_pipeline = [
+                {'$match': attendance_match},
+                *_attendance_split_stages(),
+                {'$group': {
+                    '_id': '$class_id',
+                    'total': {'$sum': 1},
+                    'present': {
+                        '$sum': {'$cond': [{'$eq': ['$_st', 'P']}, 1, 0]}
+                    }
+                }}
+            ]
+        async for doc in attendance_coll.aggregate(attendance_pipeline):
             school_id = classes_by_school.get(doc['_id'])
             if school_id and school_id in schools:
                 schools[school_id]['attendance_total'] += doc['total']
                 schools[school_id]['attendance_present'] += doc['present']
+                if use_rollup:
+                    schools[school_id]['attendance_records_total'] += doc['docs']
+                    schools[school_id]['attendance_on_time'] += doc['docs_on_time']
         
         # ============================================
         # 3. NOTAS E APROVAÇÃO
         # ============================================
         # Busca notas por turma e calcula médias bimestrais e aprovação
+        grades_coll = current_db.grades
         grades_pipeline = [
             {'$match': {
                 'class_id': {'$in': list(classes_by_school.keys())},
@@ -925,9 +1031,33 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
                 'total_grades': {'$sum': 1}
             }}
         ]
+        if use_rollup:
+            # Médias por turma = soma/contagem dos valores lançados ($avg ignora nulos).
+            def _rollup_avg(field):
+                return {'$cond': [{'$gt': [f'$_{field}_n', 0]},
+                                  {'$divide': [f'$_{field}_sum', f'$_{field}_n']}, None]}
+            grades_coll = current_db[GRADES_ROLLUP]
+            grades_pipeline = [
+                {'$match': {
+                    'class_id': {'$in': list(classes_by_school.keys())},
+                    'academic_year': year_filter(academic_year)
+                }},
+                {'$group': {
+                    '_id': '$class_id',
+                    **{f'_{f}_{s}': {'$sum': f'${f}_{s}'}
+                       for f in ('fa', 'b1', 'b2', 'b3', 'b4') for s in ('n', 'sum')},
+                }},
+                {'$project': {
+                    'avg_final': _rollup_avg('fa'),
+                    'avg_b1': _rollup_avg('b1'),
+                    'avg_b2': _rollup_avg('b2'),
+                    'avg_b3': _rollup_avg('b3'),
+                    'avg_b4': _rollup_avg('b4'),
+                }}
+            ]
         
         school_grade_data = {sid: {'sum_avg': 0, 'count': 0, 'b1': [], 'b2': [], 'b3': [], 'b4': []} for sid in school_ids}
-        async for doc in current_db.grades.aggregate(grades_pipeline):
+        async for doc in grades_coll.aggregate(grades_pipeline):
             school_id = classes_by_school.get(doc['_id'])
             if school_id and school_id in schools:
                 if doc['avg_final']:
@@ -958,20 +1088,34 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
         # componentes avaliados têm média (final_average) >= 5,0. Base = alunos
         # com pelo menos uma nota lançada. (Substitui a contagem por status,
         # que ficava vazia no início do ano e inflava a % de aprovação.)
-        approval_pipeline = [
-            {'$match': {
-                'class_id': {'$in': list(classes_by_school.keys())},
-                'academic_year': year_filter(academic_year),
-                'final_average': {'$ne': None},
-                **regular_only_aggregate_match()
-            }},
-            {'$group': {
-                '_id': '$student_id',
-                'min_avg': {'$min': '$final_average'},
-                'class_id': {'$first': '$class_id'}
-            }}
-        ]
-        async for doc in current_db.grades.aggregate(approval_pipeline):
+        if use_rollup:
+            approval_pipeline = [
+                {'$match': {
+                    'class_id': {'$in': list(classes_by_school.keys())},
+                    'academic_year': year_filter(academic_year),
+                    'reg_n': {'$gt': 0}
+                }},
+                {'$group': {
+                    '_id': '$student_id',
+                    'min_avg': {'$min': '$reg_min'},
+                    'class_id': {'$first': '$class_id'}
+                }}
+            ]
+        else:
+            approval_pipeline = [
+                {'$match': {
+                    'class_id': {'$in': list(classes_by_school.keys())},
+                    'academic_year': year_filter(academic_year),
+                    'final_average': {'$ne': None},
+                    **regular_only_aggregate_match()
+                }},
+                {'$group': {
+                    '_id': '$student_id',
+                    'min_avg': {'$min': '$final_average'},
+                    'class_id': {'$first': '$class_id'}
+                }}
+            ]
+        async for doc in grades_coll.aggregate(approval_pipeline):
             school_id = classes_by_school.get(doc.get('class_id'))
             if school_id and school_id in schools:
                 schools[school_id]['evaluated_count'] += 1
@@ -1033,11 +1177,13 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
             }}
         ]
         try:
-            async for doc in current_db.attendance.aggregate(sla_freq_pipeline):
-                school_id = classes_by_school.get(doc['_id'])
-                if school_id and school_id in schools:
-                    schools[school_id]['attendance_records_total'] += doc['total']
-                    schools[school_id]['attendance_on_time'] += doc['on_time']
+            # Com rollups o SLA já foi somado na seção 2 (docs / docs_on_time).
+            if not use_rollup:
+                async for doc in current_db.attendance.aggregate(sla_freq_pipeline):
+                    school_id = classes_by_school.get(doc['_id'])
+                    if school_id and school_id in schools:
+                        schools[school_id]['attendance_records_total'] += doc['total']
+                        schools[school_id]['attendance_on_time'] += doc['on_time']
         except Exception:
             # Se o cálculo falhar (dados inconsistentes), usa 100% como fallback
             for school_id in school_ids:
@@ -1253,11 +1399,15 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
         - Professor: apenas alunos da sua turma e componentes vinculados
         - Coordenador/Diretor/Secretário: apenas alunos da escola vinculada
         - Admin/SEMED: acesso global
+
+        [Out/2026] Frequência por aluno vem de `analytics_rollup_attendance_student`
+        quando fresca (`data_freshness` na resposta).
         """
         await _require_admin_tier(request)
         current_db = get_current_db(request)
         user = await AuthMiddleware.get_current_user(request)
         user_role = user.get('role', '').lower()
+        rollup, use_rollup = await _rollup_status(current_db)
         
         # ============================================
         # RESTRIÇÕES DE ACESSO POR PERFIL
@@ -1433,21 +1583,33 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
             if school_class_ids:
                 att_match['class_id'] = {'$in': list(set(school_class_ids))}
         
-        attendance_pipeline = [
-            {'$match': att_match},
-            {'$unwind': '$records'},
-            {'$match': {'records.dependency_id': {'$in': [None]}, 'records.student_id': {'$in': student_ids}}},
-            {'$addFields': {'_sts': {'$split': [{'$toUpper': {'$ifNull': ['$records.status', '']}}, '|']}}},
-            {'$unwind': '$_sts'},
-            {'$addFields': {'_st': {'$trim': {'input': '$_sts'}}}},
-            {'$match': {'_st': {'$in': ['P', 'F', 'J']}}},
-            {'$group': {
-                '_id': '$records.student_id',
-                'total': {'$sum': 1},
-                'present': {'$sum': {'$cond': [{'$eq': ['$_st', 'P']}, 1, 0]}}
-            }}
-        ]
-        async for doc in current_db.attendance.aggregate(attendance_pipeline):
+        if use_rollup:
+            attendance_coll = current_db[ATTENDANCE_STUDENT_ROLLUP]
+            attendance_pipeline = [
+                {'$match': {**att_match, 'student_id': {'$in': student_ids}}},
+                {'$group': {
+                    '_id': '$student_id',
+                    'total': {'$sum': '$total'},
+                    'present': {'$sum': '$present'}
+                }}
+            ]
+        else:
+            attendance_coll = current_db.attendance
+            attendance_pipeline = [
+                {'$match': att_match},
+                {'$unwind': '$records'},
+                {'$match': {'records.dependency_id': {'$in': [None]}, 'records.student_id': {'$in': student_ids}}},
+                {'$addFields': {'_sts': {'$split': [{'$toUpper': {'$ifNull': ['$records.status', '']}}, '|']}}},
+                {'$unwind': '$_sts'},
+                {'$addFields': {'_st': {'$trim': {'input': '$_sts'}}}},
+                {'$match': {'_st': {'$in': ['P', 'F', 'J']}}},
+                {'$group': {
+                    '_id': '$records.student_id',
+                    'total': {'$sum': 1},
+                    'present': {'$sum': {'$cond': [{'$eq': ['$_st', 'P']}, 1, 0]}}
+                }}
+            ]
+        async for doc in attendance_coll.aggregate(attendance_pipeline):
             if doc['_id'] in students and doc['total'] > 0:
                 students[doc['_id']]['attendance_rate'] = round(doc['present'] / doc['total'] * 100, 1)
                 students[doc['_id']]['total_attendance'] = doc['total']
@@ -1501,7 +1663,8 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
                 "school_id": school_id,
                 "class_id": class_id,
                 "subject_id": subject_id if is_professor else None
-            }
+            },
+            "data_freshness": analytics_rollups.data_freshness(rollup, use_rollup),
         }
     
     @router.get("/teachers/performance")
@@ -1818,6 +1981,33 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
                 }
 
 
+        # [Out/2026] Média das notas por turma em UMA agregação (antes: uma por
+        # professor). Soma+contagem por turma → média ponderada por professor.
+        rollup, use_rollup = await _rollup_status(current_db)
+        grades_by_class = {}  # class_id -> (soma, contagem)
+        if all_class_ids:
+            if use_rollup:
+                grades_coll = current_db[GRADES_ROLLUP]
+                grades_pipeline = [
+                    {'$match': {'class_id': {'$in': all_class_ids},
+                                'academic_year': year_filter(academic_year),
+                                'reg_n': {'$gt': 0}}},
+                    {'$group': {'_id': '$class_id', 'sum': {'$sum': '$reg_sum'}, 'total': {'$sum': '$reg_n'}}}
+                ]
+            else:
+                grades_coll = current_db.grades
+                grades_pipeline = [
+                    {'$match': {
+                        'class_id': {'$in': all_class_ids},
+                        'academic_year': year_filter(academic_year),
+                        'final_average': {'$ne': None},
+                        **regular_only_aggregate_match()
+                    }},
+                    {'$group': {'_id': '$class_id', 'sum': {'$sum': '$final_average'}, 'total': {'$sum': 1}}}
+                ]
+            async for doc in grades_coll.aggregate(grades_pipeline):
+                grades_by_class[doc['_id']] = (doc.get('sum') or 0, doc.get('total') or 0)
+
         # Para cada professor: calcular métricas
         result = []
         for tid, tdata in teachers.items():
@@ -1940,22 +2130,10 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
             
             # 2. Média de notas dos alunos (40%) — usa final_average (modelo real)
             media_notas = 0
-            grades_pipeline = [
-                {'$match': {
-                    'class_id': {'$in': class_ids},
-                    'academic_year': year_filter(academic_year),
-                    'final_average': {'$ne': None},
-                    **regular_only_aggregate_match()
-                }},
-                {'$group': {
-                    '_id': None,
-                    'media': {'$avg': '$final_average'},
-                    'total': {'$sum': 1}
-                }}
-            ]
-            async for doc in current_db.grades.aggregate(grades_pipeline):
-                if doc.get('total', 0) > 0:
-                    media_notas = round(doc['media'] or 0, 1)
+            _g_sum = sum(grades_by_class.get(c, (0, 0))[0] for c in class_ids)
+            _g_total = sum(grades_by_class.get(c, (0, 0))[1] for c in class_ids)
+            if _g_total > 0:
+                media_notas = round(_g_sum / _g_total, 1)
             
             # Score: 60% diários + 40% índice da média (média/10 * 100)
             indice_media = round(media_notas * 10, 1)  # Nota 10 = 100%
@@ -1976,7 +2154,8 @@ def setup_analytics_router(db, audit_service=None, sandbox_db=None):
             })
         
         result.sort(key=lambda x: x['score'], reverse=True)
-        return {"data": result[:limit]}
+        return {"data": result[:limit],
+                "data_freshness": analytics_rollups.data_freshness(rollup, use_rollup)}
 
     @router.get("/teachers/performance/pdf")
     async def get_teachers_performance_pdf(
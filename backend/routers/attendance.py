@@ -17,9 +17,12 @@ import uuid
 import logging
 
 from auth_middleware import AuthMiddleware
+from services.analytics_rollups import mark_dirty as mark_analytics_dirty
+from services.sync_tombstones import record_tombstones
 from tenant_scope import apply_tenant_filter, resolve_tenant_id_for_create, get_mantenedora_scope
-from utils.dependency_validator import validate_dependency_link
-from utils.academic_event_lens import resolve_student_ownership, record_lock_audit
+from utils.dependency_validator import check_dependency_link, fetch_dependencies
+from utils.academic_event_lens import resolve_students_ownership, record_lock_audit
+from services.class_roster import get_class_roster
 
 logger = logging.getLogger(__name__)
 
@@ -89,28 +92,32 @@ async def save_attendance_canonical(current_db, current_user, request, attendanc
     existing = await current_db.attendance.find_one(query)
 
     # Fase 2 — anti-spoof: valida coerência de dependency_id em CADA record
+    # (Out/2026: dependências da chamada lidas numa única query).
+    tenant_for_lens = get_mantenedora_scope(current_user, request)
+    dependencies = await fetch_dependencies(current_db, [r.dependency_id for r in attendance.records])
     for r in attendance.records:
         if r.dependency_id:
-            await validate_dependency_link(
-                db=current_db,
+            check_dependency_link(
+                dependencies.get(r.dependency_id),
                 dependency_id=r.dependency_id,
                 student_id=r.student_id,
                 class_id=attendance.class_id,
                 course_id=attendance.course_id,
-                tenant_id=get_mantenedora_scope(current_user, request),
+                tenant_id=tenant_for_lens,
             )
 
-    # Fase 3 — Academic Event Lock por aluno (a frequência tem `date` própria)
-    tenant_for_lens = get_mantenedora_scope(current_user, request)
+    # Fase 3 — Academic Event Lock por aluno (a frequência tem `date` própria).
+    # Out/2026: lens em lote — 1 query de eventos para a turma inteira.
+    ownerships = await resolve_students_ownership(
+        current_db,
+        student_ids=[r.student_id for r in attendance.records],
+        class_id=attendance.class_id,
+        course_id=attendance.course_id,
+        target_date=attendance.date,  # frequência usa data da aula
+        mantenedora_id=tenant_for_lens,
+    )
     for r in attendance.records:
-        ownership = await resolve_student_ownership(
-            current_db,
-            student_id=r.student_id,
-            class_id=attendance.class_id,
-            course_id=attendance.course_id,
-            target_date=attendance.date,  # frequência usa data da aula
-            mantenedora_id=tenant_for_lens,
-        )
+        ownership = ownerships[r.student_id]
         if not ownership["editable"]:
             await record_lock_audit(
                 current_db,
@@ -215,6 +222,7 @@ async def save_attendance_canonical(current_db, current_user, request, attendanc
             {"id": existing['id']},
             {"$set": update_data}
         )
+        await mark_analytics_dirty(current_db, attendance.class_id)
 
         from services.attendance_audit_diary import diff_records, build_diary_audit_extra
         class_info = await current_db.classes.find_one({"id": attendance.class_id}, {"_id": 0, "name": 1, "school_id": 1})
@@ -286,6 +294,7 @@ async def save_attendance_canonical(current_db, current_user, request, attendanc
         )
 
         await current_db.attendance.insert_one(new_attendance)
+        await mark_analytics_dirty(current_db, attendance.class_id)
 
         class_info = await current_db.classes.find_one({"id": attendance.class_id}, {"_id": 0, "name": 1, "school_id": 1})
         from services.attendance_audit_diary import build_diary_audit_extra
@@ -508,93 +517,13 @@ def setup_attendance_router(db, audit_service, sandbox_db=None):
         
         academic_year = turma.get('academic_year', datetime.now().year)
         
-        # Busca alunos matriculados - usando múltiplas fontes para maior robustez
-        # Estratégia 1: Busca na coleção enrollments (matrícula formal - ativos)
-        enrollments = await current_db.enrollments.find(
-            {"class_id": class_id, "status": "active"},
-            {"_id": 0, "student_id": 1, "enrollment_number": 1, "academic_year": 1, "enrollment_date": 1}
-        ).to_list(1000)
-        
-        enrollment_student_ids = set()
-        enrollment_numbers = {}
-        enrollment_dates = {}
-        for e in enrollments:
-            student_id = e.get('student_id')
-            enrollment_student_ids.add(student_id)
-            if student_id not in enrollment_numbers or e.get('academic_year') == academic_year:
-                enrollment_numbers[student_id] = e.get('enrollment_number')
-            if e.get('enrollment_date'):
-                enrollment_dates[student_id] = e.get('enrollment_date')
-        
-        # Busca alunos inativos que JÁ ESTIVERAM nesta turma (transferidos, desistentes, etc.)
-        # IMPORTANTE: "cancelled" (matrícula cancelada) é EXCLUÍDO de propósito —
-        # aluno com matrícula cancelada NÃO deve aparecer em nenhuma lista da turma
-        # onde foi cancelada (notas/frequência).
-        inactive_enrollments = await current_db.enrollments.find(
-            {"class_id": class_id, "status": {"$in": ["transferred", "dropout", "relocated", "progressed", "reclassified"]}},
-            {"_id": 0, "student_id": 1, "enrollment_number": 1, "academic_year": 1, "status": 1}
-        ).to_list(1000)
-        
-        inactive_student_ids = set()
-        inactive_enrollment_status = {}
-        for e in inactive_enrollments:
-            sid = e.get('student_id')
-            if sid not in enrollment_student_ids:
-                inactive_student_ids.add(sid)
-                if sid not in enrollment_numbers or e.get('academic_year') == academic_year:
-                    enrollment_numbers[sid] = e.get('enrollment_number')
-                inactive_enrollment_status[sid] = e.get('status')
-        
-        # Estratégia 2: Busca alunos diretamente com class_id (fallback)
-        direct_students = await current_db.students.find(
-            {"class_id": class_id, "status": {"$in": ["active", "Ativo"]}},
-            {"_id": 0, "id": 1, "enrollment_number": 1}
-        ).to_list(1000)
-        
-        for s in direct_students:
-            student_id = s.get('id')
-            if student_id not in enrollment_numbers:
-                enrollment_numbers[student_id] = s.get('enrollment_number')
-        
-        direct_student_ids = {s.get('id') for s in direct_students}
-        
-        # Combina todas as fontes
-        all_student_ids = list(enrollment_student_ids.union(direct_student_ids).union(inactive_student_ids))
-        
-        students = []
-        if all_student_ids:
-            students = await current_db.students.find(
-                {"id": {"$in": all_student_ids}},
-                {"_id": 0, "id": 1, "full_name": 1, "enrollment_number": 1, "status": 1, "class_id": 1}
-            ).sort("full_name", 1).collation({"locale": "pt", "strength": 1}).to_list(1000)
-        
-        # Busca ação mais recente (data e tipo) para alunos inativos
-        action_info_map = {}
-        if inactive_student_ids:
-            action_type_map = {
-                'transferencia_saida': 'Transferido',
-                'remanejamento': 'Remanejado',
-                'progressao': 'Progredido',
-                'reclassificacao': 'Reclassificado',
-                'desistencia': 'Desistente',
-                'cancelamento': 'Cancelado'
-            }
-            history_entries = await current_db.student_history.find(
-                {
-                    "student_id": {"$in": list(inactive_student_ids)},
-                    "class_id": class_id,
-                    "action_type": {"$in": list(action_type_map.keys())}
-                },
-                {"_id": 0, "student_id": 1, "action_type": 1, "action_date": 1}
-            ).sort("action_date", -1).to_list(1000)
-            
-            for h in history_entries:
-                sid = h.get('student_id')
-                if sid not in action_info_map:
-                    action_info_map[sid] = {
-                        "action_label": action_type_map.get(h.get('action_type'), ''),
-                        "action_date": h.get('action_date', '')
-                    }
+        # Alunos da turma (matrículas ativas/inativas, vínculo direto, histórico e
+        # dependências) — Out/2026: roster memoizado (services/class_roster).
+        roster = await get_class_roster(current_db, class_id)
+        enrollment_numbers = roster.enrollment_numbers(academic_year)
+        enrollment_dates = roster.enrollment_dates()
+        students = roster.students
+        action_info_map = roster.action_info()
         
         # Busca frequência existente
         query = {"class_id": class_id, "date": date}
@@ -665,46 +594,26 @@ def setup_attendance_router(db, audit_service, sandbox_db=None):
             from utils.diary_constants import DEPENDENCY_DISPLAY_LABEL
             from tenant_scope import get_mantenedora_scope as _get_scope_att
             active_tenant_att = _get_scope_att(current_user, request)
-            dep_filter_att = {
-                "class_id": class_id, "course_id": course_id, "status": "active",
-            }
-            if active_tenant_att:
-                dep_filter_att["mantenedora_id"] = active_tenant_att
-            deps_active = await current_db.student_dependencies.find(dep_filter_att, {"_id": 0}).to_list(200)
-            existing_sids = {s['id'] for s in result_payload['students']}
-            dep_sids = [d['student_id'] for d in deps_active
-                        if d.get('student_id') and d['student_id'] not in existing_sids]
-            if dep_sids:
-                dep_students = await current_db.students.find(
-                    {"id": {"$in": dep_sids}},
-                    {"_id": 0, "id": 1, "full_name": 1, "enrollment_number": 1,
-                     "status": 1, "dependency_mode": 1}
-                ).sort("full_name", 1).collation({"locale": "pt", "strength": 1}).to_list(200)
-                dep_by_sid = {d['student_id']: d for d in deps_active}
-                stu_by_id = {s['id']: s for s in dep_students}
-                for sid in dep_sids:
-                    dep = dep_by_sid.get(sid)
-                    stu = stu_by_id.get(sid)
-                    if not (dep and stu):
-                        continue
-                    result_payload['students'].append({
-                        "id": sid,
-                        "full_name": stu.get('full_name', ''),
-                        "enrollment_number": stu.get('enrollment_number'),
-                        "status": records_map.get(sid, None),
-                        "student_status": stu.get('status', 'active'),
-                        "current_class_id": None,
-                        "is_transferred_from_class": False,
-                        "action_label": "",
-                        "action_date": "",
-                        "enrollment_date": "",
-                        # Fase 2
-                        "is_dependency": True,
-                        "dependency_id": dep.get('id'),
-                        "dependency_type": stu.get('dependency_mode'),
-                        "origin_academic_year": dep.get('origin_academic_year'),
-                        "display_label": DEPENDENCY_DISPLAY_LABEL,
-                    })
+            for dep, stu in roster.dependencies_for(course_id, active_tenant_att):
+                sid = stu['id']
+                result_payload['students'].append({
+                    "id": sid,
+                    "full_name": stu.get('full_name', ''),
+                    "enrollment_number": stu.get('enrollment_number'),
+                    "status": records_map.get(sid, None),
+                    "student_status": stu.get('status', 'active'),
+                    "current_class_id": None,
+                    "is_transferred_from_class": False,
+                    "action_label": "",
+                    "action_date": "",
+                    "enrollment_date": "",
+                    # Fase 2
+                    "is_dependency": True,
+                    "dependency_id": dep.get('id'),
+                    "dependency_type": stu.get('dependency_mode'),
+                    "origin_academic_year": dep.get('origin_academic_year'),
+                    "display_label": DEPENDENCY_DISPLAY_LABEL,
+                })
 
         return result_payload
 
@@ -937,6 +846,8 @@ def setup_attendance_router(db, audit_service, sandbox_db=None):
             raise HTTPException(status_code=404, detail="Registro de frequência não encontrado")
         
         await current_db.attendance.delete_one({"id": attendance_id})
+        await record_tombstones(current_db, 'attendance', [existing], current_user)
+        await mark_analytics_dirty(current_db, existing.get('class_id'))
         
         try:
             class_info = await current_db.classes.find_one({"id": existing.get('class_id')}, {"_id": 0, "name": 1, "school_id": 1})
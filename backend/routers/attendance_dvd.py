@@ -35,8 +35,8 @@ from services.attendance_assignment_scope import (
 )
 from services.diary_assignment_contract import AttendanceMode, AttendancePurpose
 from tenant_scope import get_mantenedora_scope
-from utils.academic_event_lens import record_lock_audit, resolve_student_ownership
-from utils.dependency_validator import validate_dependency_link
+from utils.academic_event_lens import record_lock_audit, resolve_students_ownership
+from utils.dependency_validator import check_dependency_link, fetch_dependencies
 
 logger = logging.getLogger(__name__)
 
@@ -95,11 +95,22 @@ async def _validate_records_for_context(
     tenant_id = context.snapshot.get("mantenedora_id")
     class_id = context.assignment.get("class_id")
     course_id = context.effective_course_id
+    # Dependências e lens da chamada inteira em lote; as regras continuam
+    # sendo aplicadas por aluno, na ordem recebida.
+    dependencies = await fetch_dependencies(db, [r.dependency_id for r in payload.records])
+    ownerships = await resolve_students_ownership(
+        db,
+        student_ids=[r.student_id for r in payload.records],
+        class_id=class_id,
+        course_id=course_id,
+        target_date=payload.date,
+        mantenedora_id=tenant_id,
+    )
     out = []
     for record in payload.records:
         if record.dependency_id:
-            await validate_dependency_link(
-                db=db,
+            check_dependency_link(
+                dependencies.get(record.dependency_id),
                 dependency_id=record.dependency_id,
                 student_id=record.student_id,
                 class_id=class_id,
@@ -107,14 +118,7 @@ async def _validate_records_for_context(
                 tenant_id=tenant_id,
             )
 
-        ownership = await resolve_student_ownership(
-            db,
-            student_id=record.student_id,
-            class_id=class_id,
-            course_id=course_id,
-            target_date=payload.date,
-            mantenedora_id=tenant_id,
-        )
+        ownership = ownerships[record.student_id]
         if not ownership["editable"]:
             await record_lock_audit(
                 db,
@@ -829,6 +833,11 @@ def _install_sync_adapter(db, audit_service, sandbox_db=None):
 
     sync_mod._sync_attendance_canonical = dvd_sync
     sync_mod.fetch_collection_data_paginated = dvd_fetch
+    sync_mod.register_pull_interceptor(
+        lambda user, collection, class_id: (
+            collection == "attendance" and user.get("role") == "professor" and bool(class_id)
+        )
+    )
     sync_mod._dvd_phase4_installed = True
 
 
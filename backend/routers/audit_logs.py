@@ -309,6 +309,7 @@ def setup_router(db, audit_service=None, sandbox_db=None, **kwargs):
 
         from datetime import timedelta
         cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+        await audit_service.flush()
 
         # Estatísticas por ação
         pipeline_action = [
@@ -12,6 +12,7 @@ import calendar
 
 from auth_middleware import AuthMiddleware
 from pdf_cache import get_mantenedora_cached
+from utils.cache import get_region
 from pdf.utils import format_date_pt, get_logo_image
 from services.attendance_utils import (
     compute_monthly_valid_absences,
@@ -392,20 +393,19 @@ def setup_router(db, **kwargs):
     # Owner spec: backend PRIMEIRO, dashboard depois. Pipeline `$facet`
     # única — sem múltiplas queries dispersas.
     # ------------------------------------------------------------------
+    # [Out/2026] Região `bolsa_familia_stats` da camada única (utils/cache.py):
+    # LRU limitada e invalidação propagada às outras réplicas.
     _STATS_CACHE_TTL_SECONDS = 300
-    _stats_cache: dict = {}
+    _stats_cache = get_region(
+        "bolsa_familia_stats", max_entries=200,
+        default_ttl=_STATS_CACHE_TTL_SECONDS, shared=True,
+    )
 
     def _cache_get(key: str):
-        entry = _stats_cache.get(key)
-        if not entry:
-            return None
-        if (datetime.now(timezone.utc) - entry["at"]).total_seconds() > _STATS_CACHE_TTL_SECONDS:
-            _stats_cache.pop(key, None)
-            return None
-        return entry["data"]
+        return _stats_cache.get(key)
 
     def _cache_set(key: str, data):
-        _stats_cache[key] = {"at": datetime.now(timezone.utc), "data": data}
+        _stats_cache.set(key, data, _STATS_CACHE_TTL_SECONDS)
 
     def _cache_invalidate_all():
         """Invalida todo o cache de stats — chamado quando trackings mudam."""
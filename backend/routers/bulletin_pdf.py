@@ -7,18 +7,18 @@ from __future__ import annotations
 
 import hashlib
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import StreamingResponse
-from io import BytesIO
+from fastapi.responses import Response, StreamingResponse
 
 from auth_middleware import AuthMiddleware
-from services.document_files import fetch_pdf
+from services.document_files import open_pdf
 from services.teacher_grade_access import (
     TeacherGradeAccessError,
     ensure_teacher_student_grade_access,
 )
 from tenant_scope import get_mantenedora_scope
-from utils.render_jobs import compute_idempotency_key, find_existing_job, now_iso
+from utils.render_jobs import compute_idempotency_key, find_existing_job, insert_render_job, now_iso
 from utils.client_time import current_time_context
+from utils.http_range import RangeNotSatisfiable, parse_range
 
 BULLETIN_TEMPLATE_VERSION = "boletim_v1.0.0"
 BULLETIN_RENDER_ENGINE_VERSION = "reportlab+qrcode-v1"
@@ -162,7 +162,7 @@ def setup_bulletin_pdf_router(db, audit_service=None):
                 {"action": "queued", "at": now_s, "by_user_id": user.get("id")},
             ],
         }
-        await db.document_render_jobs.insert_one(job)
+        await insert_render_job(db, job)
         return {"id": job["id"], "status": "pending", "idempotent_hit": False}
 
     @router.get("/render-jobs/{job_id}/file")
@@ -205,17 +205,34 @@ def setup_bulletin_pdf_router(db, audit_service=None):
         file_id = job.get("generated_file_id")
         if not file_id:
             raise HTTPException(status_code=500, detail="Job sem arquivo associado")
-        f = await fetch_pdf(db, file_id)
+        f = await open_pdf(db, file_id)
         if not f:
             raise HTTPException(status_code=404, detail="Arquivo expirado ou removido")
 
+        # [Out/2026] Streaming do blob store + suporte a Range (visualizadores
+        # de PDF pedem faixas; downloads interrompidos retomam).
+        size = f["size_bytes"]
+        headers = {
+            "Content-Disposition": f'attachment; filename="{f["filename"]}"',
+            "X-PDF-SHA256": f["sha256"] or "",
+            "Accept-Ranges": "bytes",
+        }
+        if f["sha256"]:
+            headers["ETag"] = f'"{f["sha256"]}"'
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        if byte_range is not None and request.headers.get("if-range") not in (None, headers.get("ETag")):
+            byte_range = None  # arquivo mudou desde o 1º pedaço → envia inteiro
+        if byte_range is None:
+            headers["Content-Length"] = str(size)
+            return StreamingResponse(f["iter_range"](), media_type=f["mime_type"], headers=headers)
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
         return StreamingResponse(
-            BytesIO(f["pdf_bytes"]),
-            media_type=f["mime_type"],
-            headers={
-                "Content-Disposition": f'attachment; filename="{f["filename"]}"',
-                "X-PDF-SHA256": f["sha256"] or "",
-            },
+            f["iter_range"](start, end), status_code=206, media_type=f["mime_type"], headers=headers,
         )
 
     @router.get("/verify/boletim/{token}")
@@ -8,7 +8,7 @@ from typing import List, Optional
 
 from models import Class, ClassCreate, ClassUpdate
 from auth_middleware import AuthMiddleware
-from utils.cache import cache, CACHE_TTL_CLASSES
+from utils.cache import cache, CACHE_TTL_CLASSES, tenant_tag, tenant_invalidation_tags
 from tenant_scope import apply_tenant_filter, assert_same_tenant, resolve_tenant_id_for_create, get_mantenedora_scope
 
 router = APIRouter(prefix="/classes", tags=["Turmas"])
@@ -45,7 +45,7 @@ def setup_router(db, audit_service, sandbox_db=None):
         
         await current_db.classes.insert_one(doc)
         
-        cache.invalidate('classes')
+        cache.invalidate('classes', tags=tenant_invalidation_tags(doc['mantenedora_id']))
         return class_obj
 
     @router.get("")
@@ -62,7 +62,7 @@ def setup_router(db, audit_service, sandbox_db=None):
             'tenant': tenant_id or 'ALL',
             'school_id': school_id, 'skip': skip, 'limit': limit
         }
-        cached = cache.get('classes', cache_params)
+        cached = await cache.aget('classes', cache_params)
         if cached is not None:
             return cached
         
@@ -113,7 +113,7 @@ def setup_router(db, audit_service, sandbox_db=None):
             for c in classes:
                 c['student_count'] = count_map.get(c['id'], 0)
         
-        cache.set('classes', cache_params, classes, CACHE_TTL_CLASSES)
+        cache.set('classes', cache_params, classes, CACHE_TTL_CLASSES, tags=(tenant_tag(tenant_id),))
         return classes
 
     @router.get("/{class_id}", response_model=Class)
@@ -167,7 +167,7 @@ def setup_router(db, audit_service, sandbox_db=None):
             )
         
         updated_class = await current_db.classes.find_one({"id": class_id}, {"_id": 0})
-        cache.invalidate('classes')
+        cache.invalidate('classes', tags=tenant_invalidation_tags(class_doc.get('mantenedora_id')))
         return Class(**updated_class)
 
     @router.delete("/{class_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -219,7 +219,7 @@ def setup_router(db, audit_service, sandbox_db=None):
                 detail="Turma não encontrada"
             )
         
-        cache.invalidate('classes')
+        cache.invalidate('classes', tags=tenant_invalidation_tags(class_doc.get('mantenedora_id')))
         return None
 
     @router.get("/{class_id}/curriculum")
@@ -8,7 +8,7 @@ from typing import List, Optional
 
 from models import Course, CourseCreate, CourseUpdate
 from auth_middleware import AuthMiddleware
-from utils.cache import cache, CACHE_TTL_COURSES
+from utils.cache import cache, CACHE_TTL_COURSES, tenant_tag, tenant_invalidation_tags
 from tenant_scope import apply_tenant_filter, assert_same_tenant, resolve_tenant_id_for_create, get_mantenedora_scope
 
 router = APIRouter(prefix="/courses", tags=["Componentes Curriculares"])
@@ -33,7 +33,7 @@ def setup_router(db, audit_service):
         
         await db.courses.insert_one(doc)
         
-        cache.invalidate('courses')
+        cache.invalidate('courses', tags=tenant_invalidation_tags(doc['mantenedora_id']))
         return course_obj
 
     @router.get("", response_model=List[Course])
@@ -43,7 +43,7 @@ def setup_router(db, audit_service):
         
         tenant_id = get_mantenedora_scope(current_user, request)
         cache_params = {'nivel_ensino': nivel_ensino, 'skip': skip, 'limit': limit, 'tenant': tenant_id or 'ALL'}
-        cached = cache.get('courses', cache_params)
+        cached = await cache.aget('courses', cache_params)
         if cached is not None:
             return cached
         
@@ -58,7 +58,7 @@ def setup_router(db, audit_service):
         
         courses = await db.courses.find(filter_query, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
         
-        cache.set('courses', cache_params, courses, CACHE_TTL_COURSES)
+        cache.set('courses', cache_params, courses, CACHE_TTL_COURSES, tags=(tenant_tag(tenant_id),))
         return courses
 
     @router.get("/{course_id}", response_model=Course)
@@ -104,7 +104,7 @@ def setup_router(db, audit_service):
             )
         
         updated_course = await db.courses.find_one({"id": course_id}, {"_id": 0})
-        cache.invalidate('courses')
+        cache.invalidate('courses', tags=tenant_invalidation_tags(course_doc.get('mantenedora_id')))
         return Course(**updated_course)
 
     @router.delete("/{course_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -139,7 +139,7 @@ def setup_router(db, audit_service):
                 detail="Componente curricular não encontrado"
             )
         
-        cache.invalidate('courses')
+        cache.invalidate('courses', tags=tenant_invalidation_tags(existing.get('mantenedora_id')))
         return None
 
     return router
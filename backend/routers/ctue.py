@@ -5,7 +5,7 @@ Expõe o resultado do CTUEConformityService. Nenhuma regra recalculada aqui.
 from fastapi import APIRouter, Request
 from typing import Optional
 
-from utils.cache import cache, CACHE_TTL_SCHOOLS
+from utils.cache import cache, CACHE_TTL_SCHOOLS, tenant_tag
 from auth_middleware import AuthMiddleware
 from tenant_scope import apply_tenant_filter, get_mantenedora_scope, assert_same_tenant
 from services import ctue_conformity_service as ctue
@@ -80,13 +80,13 @@ def setup_router(db, audit_service, sandbox_db=None):
             'school_ids': sorted(current_user.get('school_ids', [])),
             'tenant': tenant_id or 'ALL', 'profile': profile,
         }
-        cached = cache.get('ctue', cache_params)
+        cached = await cache.aget('ctue', cache_params)
         if cached is not None:
             return cached
 
         schools = await current_db.schools.find(query, {"_id": 0}).to_list(2000)
         panel = ctue.build_network_panel(schools, profile=profile)
-        cache.set('ctue', cache_params, panel, CACHE_TTL_SCHOOLS)
+        cache.set('ctue', cache_params, panel, CACHE_TTL_SCHOOLS, tags=(tenant_tag(tenant_id),))
         return panel
 
     @router.get("/schools/{school_id}/dossie")
@@ -4,7 +4,7 @@ Importador de PDF curricular (BNCC / DCM) — May 2026.
 Pipeline: super_admin envia PDF → extract → fila de revisão → commit seletivo.
 
 Endpoints (todos super_admin via Matriz `nav-curriculum-button`):
-  POST   /api/curriculum/import/upload                        (multipart, ?only=LP,MA)
+  POST   /api/curriculum/import/upload                        (multipart, ?only=LP,MA&wait=)
   GET    /api/curriculum/import/batches?status=
   GET    /api/curriculum/import/batches/{batch_id}
   PUT    /api/curriculum/import/batches/{batch_id}/items/{idx}
@@ -20,16 +20,19 @@ from typing import List, Optional
 from datetime import datetime, timezone
 from fastapi import APIRouter, Request, UploadFile, File, HTTPException, Query
 from pydantic import BaseModel
+from pymongo.errors import OperationFailure
 
 from auth_middleware import AuthMiddleware
 from models import (
     CurriculumImportBatch, CurriculumImportItem, CurriculumImportItemUpdate,
 )
-from services.curriculum_extractor import extract_skills_from_pdf, COMPONENT_MAP
-from services.curriculum_v2_migration import (
-    BNCC_CODE_RE, AREA_BY_COMPONENT, hash_id as _hash_id,
-    etapa_bncc_from_codigo as _etapa_bncc_from_codigo,
-    escopo_from_fonte as _escopo_from_fonte,
+from services.curriculum_commit import (
+    COMMIT_LOCK_FIELDS, CURRICULUM_COMMIT_TRANSACTION, acquire_commit_lock, commit_items,
+    commit_lock_stale, release_commit_lock,
+)
+from services.curriculum_extraction import (
+    build_batch_items, cache_key, get_cached_items, run_extraction_job,
+    start_extraction_job, summarize_items,
 )
 
 router = APIRouter(prefix="/curriculum/import", tags=["Currículo - Importação"])
@@ -51,6 +54,11 @@ def setup_router(db):
             db, 'nav-curriculum-button', ['super_admin']
         )(request)
 
+    async def _not_found_or_extracting(batch_id: str):
+        if await db.curriculum_import_batches.count_documents({"id": batch_id}):
+            raise HTTPException(409, "Extração do PDF ainda em andamento.")
+        raise HTTPException(404, "Batch não encontrado.")
+
     # =================== UPLOAD + EXTRACT ===================
 
     @router.post("/upload", status_code=201)
@@ -59,82 +67,62 @@ def setup_router(db):
         file: UploadFile = File(...),
         only: Optional[str] = Query(None, description="Componentes (CSV) — ex.: 'LP' ou 'LP,MA'"),
         fonte: str = Query('DCM_FA', description="DCM_FA | BNCC | MUNICIPAL"),
+        wait: bool = Query(False, description="Aguarda a extração terminar (resposta com os totais finais)"),
     ):
+        """[Out/2026] A extração roda em background (services/curriculum_extraction):
+        a resposta traz o batch em 'extracting' e o progresso fica em
+        `extract_progress`. PDF já extraído (mesmo sha256) volta pronto do cache.
+        """
         user = await _require_super(request)
 
         if not file.filename or not file.filename.lower().endswith('.pdf'):
             raise HTTPException(400, "Apenas arquivos .pdf são aceitos.")
 
-        # Salva temporariamente
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-        try:
-            content = await file.read()
-            if len(content) > 30 * 1024 * 1024:
-                raise HTTPException(413, "PDF maior que 30 MB. Divida em partes menores.")
-            tmp.write(content)
-            tmp.flush()
-            tmp.close()
+        content = await file.read()
+        if len(content) > 30 * 1024 * 1024:
+            raise HTTPException(413, "PDF maior que 30 MB. Divida em partes menores.")
 
-            only_list = [c.strip().upper() for c in only.split(',')] if only else None
-            try:
-                items_raw = extract_skills_from_pdf(tmp.name, only_components=only_list, fonte=fonte)
-            except Exception as e:
-                raise HTTPException(500, f"Falha ao extrair PDF: {e}")
-        finally:
-            try:
-                os.unlink(tmp.name)
-            except OSError:
-                pass
-
-        # Marca itens duplicados (já existem em curriculum_skills)
-        codigos = [i['codigo'] for i in items_raw]
-        existing = set()
-        if codigos:
-            cursor = db.curriculum_skills.find(
-                {"codigo": {"$in": codigos}}, {"_id": 0, "codigo": 1}
-            )
-            async for doc in cursor:
-                existing.add(doc['codigo'])
-
-        items: List[CurriculumImportItem] = []
-        for idx, raw in enumerate(items_raw):
-            status = 'duplicate' if raw['codigo'] in existing else 'pending'
-            items.append(CurriculumImportItem(
-                idx=idx,
-                codigo=raw['codigo'],
-                descricao=raw['descricao'],
-                ano=raw.get('ano'),
-                ano_range=raw.get('ano_range'),
-                bimestre=raw.get('bimestre'),
-                componente_codigo=raw.get('componente_codigo'),
-                componente_nome=raw.get('componente_nome'),
-                etapa=raw.get('etapa'),
-                page=raw.get('page'),
-                fonte=raw.get('fonte', fonte),
-                status=status,
-            ))
+        only_list = [c.strip().upper() for c in only.split(',')] if only else None
+        key = cache_key(content, only_list, fonte)
+        cached = await get_cached_items(db, key)
 
         batch = CurriculumImportBatch(
             filename=file.filename,
             only_components=only_list or [],
             fonte=fonte,
-            items=items,
-            total_items=len(items),
-            status='pending_review',
+            status='pending_review' if cached is not None else 'extracting',
             created_by=user.get('id'),
             created_by_name=user.get('full_name') or user.get('email'),
         )
+        if cached is not None:
+            batch.items = await build_batch_items(db, cached, fonte)
+            batch.total_items = len(batch.items)
+            await db.curriculum_import_batches.insert_one(batch.model_dump())
+            return {"batch_id": batch.id, "status": batch.status, "cached": True,
+                    **summarize_items(batch.items)}
+
+        # Salva temporariamente (o job remove o arquivo ao terminar)
+        tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
+        try:
+            tmp.write(content)
+            tmp.close()
+        except OSError as e:
+            os.unlink(tmp.name)
+            raise HTTPException(500, f"Falha ao salvar PDF: {e}")
         await db.curriculum_import_batches.insert_one(batch.model_dump())
 
-        return {
-            "batch_id": batch.id,
-            "total_items": len(items),
-            "duplicates": sum(1 for i in items if i.status == 'duplicate'),
-            "by_componente": {
-                c: sum(1 for i in items if i.componente_codigo == c)
-                for c in {i.componente_codigo for i in items if i.componente_codigo}
-            },
-        }
+        if not wait:
+            start_extraction_job(db, batch.id, tmp.name, key, only_list, fonte)
+            return {"batch_id": batch.id, "status": batch.status, "cached": False,
+                    **summarize_items([])}
+
+        await run_extraction_job(db, batch.id, tmp.name, key, only_list, fonte)
+        done = await db.curriculum_import_batches.find_one({"id": batch.id}, {"_id": 0})
+        if done['status'] == 'extract_failed':
+            raise HTTPException(500, done.get('extract_error') or "Falha ao extrair PDF.")
+        items = [CurriculumImportItem(**i) for i in done['items']]
+        return {"batch_id": batch.id, "status": done['status'], "cached": False,
+                **summarize_items(items)}
 
     # =================== LIST + GET ===================
 
@@ -171,12 +159,12 @@ def setup_router(db):
         # Constrói operadores positionais $.fieldname para items[idx]
         set_ops = {f"items.$[elem].{k}": v for k, v in update.items()}
         r = await db.curriculum_import_batches.update_one(
-            {"id": batch_id},
+            {"id": batch_id, "status": {"$ne": "extracting"}},
             {"$set": set_ops},
             array_filters=[{"elem.idx": idx}],
         )
         if r.matched_count == 0:
-            raise HTTPException(404, "Batch não encontrado.")
+            await _not_found_or_extracting(batch_id)
         return {"ok": True, "updated": list(update.keys())}
 
     @router.post("/batches/{batch_id}/bulk-status")
@@ -185,26 +173,37 @@ def setup_router(db):
         if payload.status not in ('pending', 'approved', 'rejected', 'edited'):
             raise HTTPException(400, "Status inválido para bulk.")
         r = await db.curriculum_import_batches.update_one(
-            {"id": batch_id},
+            {"id": batch_id, "status": {"$ne": "extracting"}},
             {"$set": {"items.$[elem].status": payload.status}},
             array_filters=[{"elem.idx": {"$in": payload.indices}}],
         )
         if r.matched_count == 0:
-            raise HTTPException(404, "Batch não encontrado.")
+            await _not_found_or_extracting(batch_id)
         return {"ok": True, "affected": len(payload.indices)}
 
     # =================== COMMIT ===================
 
     @router.post("/batches/{batch_id}/commit")
-    async def commit_batch(batch_id: str, request: Request):
+    async def commit_batch(
+        batch_id: str,
+        request: Request,
+        transactional: Optional[bool] = Query(
+            None, description="Tudo-ou-nada (exige replica set). Padrão: CURRICULUM_COMMIT_TRANSACTION"),
+    ):
         """Persiste os items aprovados no modelo v2 (bncc_skills + curriculum_adaptations).
 
         Também mantém escrita em `curriculum_skills` (legado, retrocompat 30 dias).
+        [Out/2026] Gravação em lote via services/curriculum_commit; progresso em
+        `commit_progress` enquanto o batch está 'committing'.
         """
         user = await _require_super(request)
         batch = await db.curriculum_import_batches.find_one({"id": batch_id}, {"_id": 0})
         if not batch:
             raise HTTPException(404, "Batch não encontrado.")
+        if batch['status'] == 'committing' and not commit_lock_stale(batch):
+            raise HTTPException(409, "Batch já está sendo importado.")
+        if batch['status'] == 'extracting':
+            raise HTTPException(409, "Extração do PDF ainda em andamento.")
         if batch['status'] in ('committed', 'cancelled'):
             raise HTTPException(400, f"Batch já está '{batch['status']}'.")
 
@@ -218,203 +217,51 @@ def setup_router(db):
             'floresta_araguaia' if batch_fonte == 'DCM_FA' else None
         )
 
-        # Cache de components por (codigo, etapa, fonte) → component_id
-        comp_cache: dict = {}
-        skills_inserted = 0  # legado
-        skills_skipped_dup = 0
-        components_created = 0
-        bncc_inserted = 0
-        bncc_existed = 0
-        adaptations_inserted = 0
-        adaptations_existed = 0
-
-        for item in approved:
-            comp_codigo = (item.get('componente_codigo') or 'XX').upper()
-            etapa = item.get('etapa') or 'anos_iniciais'
-            fonte = item.get('fonte') or batch_fonte
-            codigo = item['codigo']
-            cache_key = (comp_codigo, etapa, fonte)
-
-            # --- 1. Componente v2 (escopo + area) ---
-            if cache_key not in comp_cache:
-                comp = await db.curriculum_components.find_one(
-                    {"codigo": comp_codigo, "etapa": etapa, "fonte": fonte},
-                    {"_id": 0}
-                )
-                if not comp:
-                    nome = item.get('componente_nome') or COMPONENT_MAP.get(
-                        comp_codigo, (comp_codigo, etapa)
-                    )[0]
-                    new_comp = {
-                        "id": f"comp_{comp_codigo.lower()}_{etapa}_{fonte.lower()}",
-                        "codigo": comp_codigo,
-                        "nome": nome,
-                        "eixo_estruturante": None,
-                        "etapa": etapa,
-                        "fonte": fonte,
-                        "escopo": _escopo_from_fonte(fonte),
-                        "area_conhecimento": AREA_BY_COMPONENT.get(comp_codigo),
-                        "mantenedora_id": mantenedora_id if _escopo_from_fonte(fonte) == 'MUNICIPAL' else None,
-                        "descricao": f"Importado via batch {batch['id']}.",
-                        "ordem": 50,
-                        "ativo": True,
-                        "created_at": _now(),
-                        "updated_at": None,
-                    }
-                    await db.curriculum_components.insert_one(new_comp)
-                    components_created += 1
-                    comp_cache[cache_key] = new_comp['id']
-                else:
-                    comp_cache[cache_key] = comp['id']
-
-            component_id = comp_cache[cache_key]
-            is_bncc_code = bool(BNCC_CODE_RE.match(codigo))
-
-            # --- 2. BNCC skill canônica (se código BNCC e ainda não existe) ---
-            bncc_id = None
-            if is_bncc_code:
-                existing_bncc = await db.bncc_skills.find_one(
-                    {"codigo_bncc": codigo}, {"_id": 0, "id": 1}
-                )
-                if existing_bncc:
-                    bncc_id = existing_bncc['id']
-                    bncc_existed += 1
-                else:
-                    m = BNCC_CODE_RE.match(codigo)
-                    comp_from_code = m.group(3) if m else comp_codigo
-                    bncc_etapa = _etapa_bncc_from_codigo(codigo, item.get('ano'))
-                    bncc_id = _hash_id("bncc", codigo)
-                    bncc_doc = {
-                        "id": bncc_id,
-                        "codigo_bncc": codigo,
-                        "descricao_bncc": item['descricao'],
-                        "eixo": None,
-                        "etapa": bncc_etapa,
-                        "ano": item.get('ano'),
-                        "ano_range": None,
-                        "area_conhecimento": AREA_BY_COMPONENT.get(comp_from_code),
-                        "componente_codigo": comp_from_code,
-                        "ativo": True,
-                        "created_at": _now(),
-                        "updated_at": None,
-                    }
-                    try:
-                        await db.bncc_skills.insert_one(bncc_doc)
-                        bncc_inserted += 1
-                    except Exception:
-                        existing_bncc = await db.bncc_skills.find_one(
-                            {"codigo_bncc": codigo}, {"_id": 0, "id": 1}
-                        )
-                        if existing_bncc:
-                            bncc_id = existing_bncc['id']
-                            bncc_existed += 1
-
-            # --- 3. Adaptation (upsert pela tupla única) ---
-            adapt_filt = {
-                "mantenedora_id": mantenedora_id,
-                "component_id": component_id,
-                "bncc_skill_id": bncc_id,
-                "codigo_local": None if is_bncc_code else codigo,
-                "ano": item.get('ano') or 0,
-                "bimestre": item.get('bimestre'),
-            }
-            existing_adapt = await db.curriculum_adaptations.find_one(
-                adapt_filt, {"_id": 0, "id": 1}
-            )
-            if existing_adapt:
-                adaptations_existed += 1
-                # Marca como duplicate no batch
-                await db.curriculum_import_batches.update_one(
-                    {"id": batch_id},
-                    {"$set": {"items.$[elem].status": "duplicate"}},
-                    array_filters=[{"elem.idx": item['idx']}],
-                )
-                continue
-
-            adapt_id = _hash_id(
-                "adapt", codigo, mantenedora_id or "_",
-                item.get('ano') or 0, item.get('bimestre') or 0
-            )
-            adapt_doc = {
-                "id": adapt_id,
-                "mantenedora_id": mantenedora_id,
-                "component_id": component_id,
-                "bncc_skill_id": bncc_id,
-                "codigo_local": None if is_bncc_code else codigo,
-                "descricao_local": None if is_bncc_code else item['descricao'],
-                "eixo_local": None,
-                "objeto_conhecimento": None,
-                "ano": item.get('ano') or 0,
-                "bimestre": item.get('bimestre'),
-                "ordem_sequencia": 0,
-                "fonte": fonte if fonte in ('DCM_FA', 'MUNICIPAL', 'BNCC_COMPUTACAO') else 'MUNICIPAL',
-                "ativo": True,
-                "created_at": _now(),
-                "updated_at": None,
-            }
-            try:
-                await db.curriculum_adaptations.insert_one(adapt_doc)
-                adaptations_inserted += 1
-            except Exception:
-                adaptations_existed += 1
-
-            # --- 4. Legado (curriculum_skills) para retro-compat ---
-            exists_legacy = await db.curriculum_skills.find_one(
-                {"codigo": codigo}, {"_id": 0, "id": 1}
-            )
-            if not exists_legacy:
-                skill_doc = {
-                    "id": f"skill_imp_{batch_id[:8]}_{item['idx']}",
-                    "codigo": codigo,
-                    "descricao": item['descricao'],
-                    "componente_id": component_id,
-                    "componente_codigo": comp_codigo,
-                    "ano": item.get('ano'),
-                    "bimestre": item.get('bimestre'),
-                    "objeto_conhecimento": None,
-                    "unidade_tematica": None,
-                    "fonte": fonte,
-                    "metodos_recomendados": [],
-                    "ativo": True,
-                    "created_at": _now(),
-                    "updated_at": None,
-                }
-                await db.curriculum_skills.insert_one(skill_doc)
-                skills_inserted += 1
-            else:
-                skills_skipped_dup += 1
+        # Trava contra commit concorrente do mesmo batch (duplo clique / duas abas);
+        # uma trava sem progresso há CURRICULUM_COMMIT_STALE_SECONDS é assumida.
+        lock = await acquire_commit_lock(db, batch)
+        if lock is None:
+            raise HTTPException(409, "Batch já está sendo importado.")
+        lease, prev_status = lock
 
+        async def _progress(p: dict):
             await db.curriculum_import_batches.update_one(
-                {"id": batch_id},
-                {"$set": {"items.$[elem].status": "imported"}},
-                array_filters=[{"elem.idx": item['idx']}],
+                {"id": batch_id, "commit_lease": lease},
+                {"$set": {"commit_progress": {**p, "updated_at": _now()}}},
             )
 
-        # Atualiza status do batch
-        remaining_pending = await db.curriculum_import_batches.count_documents({
-            "id": batch_id,
-            "items.status": {"$in": ["pending", "approved", "edited"]},
-        })
+        try:
+            plan = await commit_items(
+                db, batch, approved, mantenedora_id,
+                transactional=CURRICULUM_COMMIT_TRANSACTION if transactional is None else transactional,
+                progress_cb=_progress,
+            )
+        except BaseException as e:  # inclui CancelledError (cliente caiu / shutdown)
+            await release_commit_lock(db, batch_id, lease, prev_status, str(e) or type(e).__name__)
+            if isinstance(e, OperationFailure) and e.code in (20, 263):
+                raise HTTPException(409, "Commit transacional exige MongoDB em replica set.")
+            raise
+
+        # Status final a partir do próprio plano (sem reler o batch)
+        done = set(plan.imported) | set(plan.duplicates)
+        remaining_pending = sum(
+            1 for i in batch['items']
+            if i.get('idx') not in done and i.get('status') in ("pending", "approved", "edited")
+        )
         new_status = 'committed' if remaining_pending == 0 else 'partially_committed'
 
         summary = {
             "approved_at_commit": len(approved),
-            "skills_inserted": skills_inserted,
-            "skills_skipped_duplicate": skills_skipped_dup,
-            "components_created": components_created,
-            "bncc_inserted": bncc_inserted,
-            "bncc_existed": bncc_existed,
-            "adaptations_inserted": adaptations_inserted,
-            "adaptations_existed": adaptations_existed,
+            **plan.counts,
             "committed_by": user.get('email'),
         }
         await db.curriculum_import_batches.update_one(
-            {"id": batch_id},
+            {"id": batch_id, "commit_lease": lease},
             {"$set": {
                 "status": new_status,
                 "committed_at": _now(),
                 "summary": summary,
-            }}
+            }, "$unset": {**COMMIT_LOCK_FIELDS, "commit_error": ""}}
         )
 
         return {
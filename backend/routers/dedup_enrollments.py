@@ -39,6 +39,7 @@ from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from auth_middleware import AuthMiddleware
+from services.class_roster import invalidate_class_rosters
 from lib.critical_mutation import (
     acquire_lock,
     execution_fingerprint,
@@ -273,6 +274,12 @@ async def _execute_dedup_work(db, payload: DedupRequest) -> Dict[str, Any]:
             )
             inactivated += result.modified_count
 
+    if inactivated:
+        invalidate_class_rosters(
+            class_ids=[d["class_id"] for d in duplicates_removed + kept_records],
+            student_ids=[d["student_id"] for d in duplicates_removed],
+        )
+
     return {
         "mode": "dry_run" if payload.dry_run else "apply",
         "summary": {
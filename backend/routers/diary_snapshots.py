@@ -247,7 +247,7 @@ async def _enqueue_render_job(
     Mesmo snapshot publicado 2x não duplica PDF — o render_job existente
     é retornado (status pode estar pending|processing|completed).
     """
-    from utils.render_jobs import compute_idempotency_key, find_existing_job
+    from utils.render_jobs import compute_idempotency_key, find_existing_job, insert_render_job
     from datetime import datetime, timezone
     import uuid as _uuid
 
@@ -292,6 +292,5 @@ async def _enqueue_render_job(
         "time_context": current_time_context(),
             "audit_trail": [{"action": "created", "at": now, "requested_by": user_id}],
     }
-    await db.document_render_jobs.insert_one(job.copy())
-    job.pop("_id", None)
+    await insert_render_job(db, job)
     return job
@@ -13,6 +13,7 @@ from fastapi import APIRouter, HTTPException, status, Request, Response
 from fastapi.responses import StreamingResponse
 from datetime import datetime, timedelta, timezone
 from io import BytesIO
+import asyncio
 import logging
 import unicodedata
 
@@ -28,6 +29,15 @@ from pdf_generator import (
     generate_livro_promocao_pdf,
 )
 from pdf.historico_escolar import generate_historico_escolar_pdf
+from services.class_batch_documents import (
+    build_attendance_data,
+    group_grades_by_student,
+    index_absences_by_student,
+    merge_pdf_pages,
+    render_batch_page,
+)
+from services.class_roster import invalidate_class_rosters
+from services.render_pool import run_render
 from utils.curriculum_resolver import resolve_curriculum
 
 logger = logging.getLogger(__name__)
@@ -149,6 +159,8 @@ async def _ensure_enrollment_number(
         ]},
         {"$set": {"enrollment_number": new_number}},
     )
+    # O roster da turma carrega os números de matrícula.
+    invalidate_class_rosters(class_ids=[enrollment.get('class_id')], student_ids=[student_id])
     logger.info(
         "Enrollment number backfilled (declaração on-demand): student=%s year=%s -> %s",
         student_id, academic_year, new_number,
@@ -2361,7 +2373,10 @@ def setup_router(db, audit_service=None, sandbox_db=None, **kwargs):
     # ===== PDF JOBS ASSÍNCRONOS =====
     # Reduz percepção de lentidão com progress bar + polling.
     # ⚠️  PERFORMANCE — LEIA /app/docs/pdf-performance.md ANTES DE ALTERAR ⚠️
-    from pdf_jobs import job_registry
+    # [Out/2026] Estado em `pdf_jobs` e PDF no blob store (qualquer réplica
+    # responde status/download); execução na fila limitada do executor.
+    from pdf_jobs import PdfJobQueueFull, get_pdf_job_executor
+    pdf_job_executor = get_pdf_job_executor(db)
 
     @router.post("/documents/jobs/promotion/{class_id}")
     async def start_livro_promocao_job(
@@ -2370,44 +2385,30 @@ def setup_router(db, audit_service=None, sandbox_db=None, **kwargs):
         request: Request = None,
     ):
         """Inicia job assíncrono do Livro de Promoção e devolve job_id para polling."""
-        await AuthMiddleware.get_current_user(request)
-        job = job_registry.create()
+        current_user = await AuthMiddleware.get_current_user(request)
 
-        async def _runner():
-            try:
-                def _progress(pct, msg=''):
-                    job_registry.update(job.id, progress=max(5, min(95, pct)), message=msg, status='running')
-                job_registry.update(job.id, status='running', progress=5, message='Iniciando...')
-                pdf_bytes, filename = await _build_livro_promocao_pdf(class_id, academic_year, progress_cb=_progress)
-                import time as _t
-                job_registry.update(
-                    job.id, status='done', progress=100, message='Concluído',
-                    pdf_bytes=pdf_bytes, filename=filename, done_at=_t.time(),
-                )
-            except HTTPException as he:
-                import time as _t
-                job_registry.update(
-                    job.id, status='error', error=he.detail or 'Erro',
-                    message='Erro', done_at=_t.time(),
-                )
-            except Exception as e:  # noqa: BLE001
-                import time as _t
-                import traceback as _tb
-                logger.error(f"Job PDF {job.id} falhou: {e}\n{_tb.format_exc()}")
-                job_registry.update(
-                    job.id, status='error', error=str(e) or 'Erro interno',
-                    message='Erro', done_at=_t.time(),
-                )
+        async def _runner(progress_cb):
+            return await _build_livro_promocao_pdf(class_id, academic_year, progress_cb=progress_cb)
 
-        import asyncio as _asy
-        _asy.create_task(_runner())
-        return {"job_id": job.id, "status": "queued"}
+        try:
+            job = await pdf_job_executor.enqueue(
+                'promotion', _runner,
+                params={"class_id": class_id, "academic_year": academic_year},
+                created_by=current_user.get('id'),
+            )
+        except PdfJobQueueFull:
+            raise HTTPException(
+                status_code=503,
+                detail="Muitos PDFs em geração no momento. Tente novamente em instantes.",
+                headers={"Retry-After": "30"},
+            )
+        return {"job_id": job.id, "status": job.status}
 
     @router.get("/documents/jobs/{job_id}/status")
     async def get_pdf_job_status(job_id: str, request: Request = None):
         """Polling do progresso do job de PDF."""
         await AuthMiddleware.get_current_user(request)
-        job = job_registry.get(job_id)
+        job = await pdf_job_executor.store.get(job_id)
         if not job:
             raise HTTPException(status_code=404, detail="Job não encontrado ou expirado")
         return {
@@ -2421,18 +2422,20 @@ def setup_router(db, audit_service=None, sandbox_db=None, **kwargs):
 
     @router.get("/documents/jobs/{job_id}/download")
     async def download_pdf_job(job_id: str, request: Request = None):
-        """Baixa o PDF de um job concluído."""
+        """Baixa o PDF de um job concluído (streaming do blob store)."""
         await AuthMiddleware.get_current_user(request)
-        job = job_registry.get(job_id)
+        job = await pdf_job_executor.store.get(job_id)
         if not job:
             raise HTTPException(status_code=404, detail="Job não encontrado ou expirado")
-        if job.status != 'done' or not job.pdf_bytes:
+        if job.status != 'done':
             raise HTTPException(status_code=409, detail=f"Job ainda não concluído (status={job.status})")
-        return Response(
-            content=job.pdf_bytes,
-            media_type="application/pdf",
-            headers={"Content-Disposition": f'inline; filename="{job.filename}"'}
-        )
+        content = await pdf_job_executor.store.open_result(job)
+        if content is None:
+            raise HTTPException(status_code=404, detail="Job não encontrado ou expirado")
+        headers = {"Content-Disposition": f'inline; filename="{job.filename}"'}
+        if (job.result or {}).get("size_bytes") is not None:
+            headers["Content-Length"] = str(job.result["size_bytes"])
+        return StreamingResponse(content, media_type="application/pdf", headers=headers)
 
 
     @router.get("/documents/batch/{class_id}/{document_type}")
@@ -2447,9 +2450,10 @@ def setup_router(db, audit_service=None, sandbox_db=None, **kwargs):
         Usa a mesma lógica de filtragem de componentes curriculares dos endpoints individuais.
 
         document_type: 'boletim', 'ficha_individual', 'certificado'
-        """
-        from PyPDF2 import PdfMerger
 
+        Notas e frequência da turma vêm em UMA query cada (indexadas por aluno);
+        as páginas são renderizadas em paralelo no render pool, fora do event loop.
+        """
         current_user = await AuthMiddleware.get_current_user(request)
 
         valid_types = ['boletim', 'ficha_individual', 'certificado', 'historico_escolar']
@@ -2631,116 +2635,65 @@ def setup_router(db, audit_service=None, sandbox_db=None, **kwargs):
                 {"_id": 0}
             ).to_list(2000)
 
-        merger = PdfMerger()
+        # ===== NOTAS DA TURMA (uma query para todos os alunos) =====
+        grades_by_student = {}
+        absences_by_student = {}
+        if document_type in ['boletim', 'ficha_individual']:
+            all_grades = await db.grades.find(
+                {"student_id": {"$in": [s['id'] for s in students]}, "academic_year": academic_year_int},
+                {"_id": 0}
+            ).to_list(None)
+            grades_by_student = group_grades_by_student(all_grades)
+            absences_by_student = index_absences_by_student(all_attendance_records)
+
+        await resolve_anexa_name(db, school)
 
         try:
+            # Monta os argumentos no loop (barato) e renderiza no render pool (CPU).
+            page_jobs = []
             for student in students:
                 enrollment = enrollment_map.get(student['id'], {})
                 if not enrollment.get('student_series') and student.get('student_series'):
                     enrollment['student_series'] = student['student_series']
 
-                grades = []
+                grades = grades_by_student.get(student['id'], [])
+
                 if document_type in ['boletim', 'ficha_individual']:
-                    grades = await db.grades.find(
-                        {"student_id": student['id'], "academic_year": academic_year_int},
-                        {"_id": 0}
-                    ).to_list(100)
+                    attendance_data = build_attendance_data(
+                        absences_by_student.get(student['id']), courses,
+                        is_escola_integral=turma_integral,
+                    )
+                    _batch_courses = _dedupe_components(courses, class_info.get('grade_level'), grades)
 
                 if document_type == 'boletim':
-                    # ===== CALCULAR FREQUÊNCIA POR ALUNO (mesma lógica do individual) =====
-                    faltas_regular = 0
-                    faltas_por_componente = {}
-                    for att_record in all_attendance_records:
-                        period = att_record.get('period', 'regular')
-                        course_id = att_record.get('course_id')
-                        attendance_type = att_record.get('attendance_type', 'daily')
-                        for sr in att_record.get('records', []):
-                            if sr.get('student_id') == student['id'] and sr.get('status') == 'F':
-                                if attendance_type == 'daily' and period == 'regular':
-                                    faltas_regular += 1
-                                elif course_id:
-                                    faltas_por_componente[course_id] = faltas_por_componente.get(course_id, 0) + 1
-
-                    attendance_data = {
-                        '_meta': {
-                            'faltas_regular': faltas_regular,
-                            'faltas_por_componente': faltas_por_componente,
-                            'is_escola_integral': turma_integral
-                        }
-                    }
-                    for course in courses:
-                        c_id = course.get('id')
-                        atendimento = course.get('atendimento_programa')
-                        if atendimento == 'atendimento_integral':
-                            faltas = faltas_por_componente.get(c_id, 0)
-                        else:
-                            faltas = 0
-                        attendance_data[c_id] = {'absences': faltas, 'atendimento_programa': atendimento}
-
-                    await resolve_anexa_name(db, school)
-                    _batch_courses_bol = _dedupe_components(courses, class_info.get('grade_level'), grades)
-                    pdf_buffer = generate_boletim_pdf(
+                    kwargs = dict(
                         student=student,
                         school=school,
                         enrollment=enrollment,
                         class_info=class_info,
                         grades=grades,
-                        courses=_batch_courses_bol,
+                        courses=_batch_courses,
                         academic_year=str(academic_year_int),
                         mantenedora=mantenedora,
                         dias_letivos_ano=dias_letivos_ano,
                         calendario_letivo=calendario_letivo,
                         attendance_data=attendance_data
                     )
-
                 elif document_type == 'ficha_individual':
-                    # ===== CALCULAR FREQUÊNCIA POR ALUNO (mesma lógica do individual) =====
-                    faltas_regular = 0
-                    faltas_por_componente = {}
-                    for att_record in all_attendance_records:
-                        period = att_record.get('period', 'regular')
-                        course_id = att_record.get('course_id')
-                        attendance_type = att_record.get('attendance_type', 'daily')
-                        for sr in att_record.get('records', []):
-                            if sr.get('student_id') == student['id'] and sr.get('status') == 'F':
-                                if attendance_type == 'daily' and period == 'regular':
-                                    faltas_regular += 1
-                                elif course_id:
-                                    faltas_por_componente[course_id] = faltas_por_componente.get(course_id, 0) + 1
-
-                    attendance_data = {
-                        '_meta': {
-                            'faltas_regular': faltas_regular,
-                            'faltas_por_componente': faltas_por_componente,
-                            'is_escola_integral': turma_integral
-                        }
-                    }
-                    for course in courses:
-                        c_id = course.get('id')
-                        atendimento = course.get('atendimento_programa')
-                        if atendimento == 'atendimento_integral':
-                            faltas = faltas_por_componente.get(c_id, 0)
-                        else:
-                            faltas = 0
-                        attendance_data[c_id] = {'absences': faltas, 'atendimento_programa': atendimento}
-
-                    await resolve_anexa_name(db, school)
-                    _batch_courses_fic = _dedupe_components(courses, class_info.get('grade_level'), grades)
-                    pdf_buffer = generate_ficha_individual_pdf(
+                    kwargs = dict(
                         student=student,
                         school=school,
                         enrollment=enrollment,
                         class_info=class_info,
                         grades=grades,
-                        courses=_batch_courses_fic,
+                        courses=_batch_courses,
                         attendance_data=attendance_data,
                         academic_year=academic_year_int,
                         mantenedora=mantenedora,
                         calendario_letivo=calendario_letivo
                     )
-
                 elif document_type == 'certificado':
-                    pdf_buffer = generate_certificado_pdf(
+                    kwargs = dict(
                         student=student,
                         school=school,
                         class_info=class_info,
@@ -2748,13 +2701,16 @@ def setup_router(db, audit_service=None, sandbox_db=None, **kwargs):
                         academic_year=academic_year_int,
                         mantenedora=mantenedora
                     )
+                else:
+                    raise HTTPException(status_code=400, detail=f"Lote ainda não disponível para {document_type}")
 
-                merger.append(pdf_buffer)
+                page_jobs.append(run_render(render_batch_page, document_type, kwargs))
 
-            output_buffer = BytesIO()
-            merger.write(output_buffer)
-            merger.close()
-            output_buffer.seek(0)
+            # gather preserva a ordem alfabética dos alunos.
+            pages = await asyncio.gather(*page_jobs)
+            merged = await run_render(merge_pdf_pages, list(pages))
+
+            output_buffer = BytesIO(merged)
 
             class_name = class_info.get('name', 'turma').replace(' ', '_')
             type_names = {
@@ -2773,6 +2729,8 @@ def setup_router(db, audit_service=None, sandbox_db=None, **kwargs):
                 }
             )
 
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Erro ao gerar documentos em lote: {e}", exc_info=True)
             raise HTTPException(status_code=500, detail=f"Erro ao gerar PDF: {str(e)}")
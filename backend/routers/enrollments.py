@@ -9,6 +9,8 @@ from pymongo.errors import DuplicateKeyError
 
 from models import Enrollment, EnrollmentCreate, EnrollmentUpdate
 from auth_middleware import AuthMiddleware
+from services.analytics_rollups import mark_dirty as mark_analytics_dirty
+from services.class_roster import invalidate_class_rosters
 from tenant_scope import apply_tenant_filter, assert_same_tenant, resolve_tenant_id_for_create
 
 router = APIRouter(prefix="/enrollments", tags=["Matrículas"])
@@ -90,6 +92,8 @@ def setup_router(db, audit_service):
             from utils.text_normalize import normalize_input_fields
             doc = normalize_input_fields(doc, "enrollments")
             await db.enrollments.insert_one(doc)
+            await mark_analytics_dirty(db, doc.get('class_id'))
+            invalidate_class_rosters([doc.get('class_id')], [doc.get('student_id')])
         except DuplicateKeyError:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
@@ -186,6 +190,10 @@ def setup_router(db, audit_service):
                 {"id": enrollment_id},
                 {"$set": update_data}
             )
+            # Troca de turma: origem e destino precisam recompor os rollups.
+            await mark_analytics_dirty(db, existing_enrollment.get('class_id'), update_data.get('class_id'))
+            invalidate_class_rosters([existing_enrollment.get('class_id'), update_data.get('class_id')],
+                                     [existing_enrollment.get('student_id')])
             
             # Sincroniza dados do aluno se school_id, class_id ou status mudaram
             student_update = {}
@@ -245,6 +253,8 @@ def setup_router(db, audit_service):
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Matrícula não encontrada"
             )
+        await mark_analytics_dirty(db, existing.get('class_id'))
+        invalidate_class_rosters([existing.get('class_id')], [existing.get('student_id')])
         
         # Auditoria de exclusão de matrícula
         student = await db.students.find_one({"id": existing.get('student_id')}, {"_id": 0, "full_name": 1})
@@ -298,6 +308,8 @@ def setup_router(db, audit_service):
                 "cancelled_by": current_user.get('id', '')
             }}
         )
+        await mark_analytics_dirty(db, enrollment.get('class_id'))
+        invalidate_class_rosters([enrollment.get('class_id')], [enrollment.get('student_id')])
 
         # Se o class_id do aluno é o mesmo da turma cancelada, limpar
         student = await db.students.find_one({"id": student_id}, {"_id": 0, "full_name": 1, "class_id": 1})
@@ -15,12 +15,17 @@ from datetime import datetime, timezone
 import uuid
 import logging
 
+from pymongo import InsertOne, UpdateOne
+
 from models import Grade, GradeCreate, GradeUpdate
 from auth_middleware import AuthMiddleware
+from services.analytics_rollups import mark_dirty as mark_analytics_dirty
 from pdf_cache import get_mantenedora_cached
 from tenant_scope import resolve_tenant_id_for_create, apply_tenant_filter, get_mantenedora_scope
-from utils.dependency_validator import validate_dependency_link
+from utils.dependency_validator import check_dependency_link, fetch_dependencies, validate_dependency_link
 from utils.academic_event_lens import resolve_student_ownership, record_lock_audit
+from services.class_roster import get_class_roster
+from services.sync_tombstones import record_tombstones
 
 logger = logging.getLogger(__name__)
 
@@ -67,94 +72,118 @@ def _strip_frozen_grade_fields(update_fields: dict, existing: dict, user_role: s
     return {k: v for k, v in update_fields.items() if k not in frozen}
 
 
-async def calculate_and_update_grade(db, grade_id: str):
-    """Calcula média final e atualiza status da nota"""
-    grade = await db.grades.find_one({"id": grade_id}, {"_id": 0})
-    if not grade:
-        return None
-    
+def compute_final_average(grade: dict) -> tuple:
+    """(final_average, status) a partir de b1..b4, rec_s1/rec_s2 e recovery.
+
+    Out/2026: regra extraída de `calculate_and_update_grade` (sem I/O) para o
+    lote calcular em memória.
+    """
     # Coleta notas bimestrais
     notas = []
     for bim in ['b1', 'b2', 'b3', 'b4']:
         nota = grade.get(bim)
         if nota is not None:
             notas.append(float(nota))
-    
-    # Calcula média se houver notas
-    if notas:
-        media = sum(notas) / len(notas)
-        
-        # Considera recuperação semestral
-        rec_s1 = grade.get('rec_s1')
-        rec_s2 = grade.get('rec_s2')
-        
-        # Lógica de recuperação semestral
-        if rec_s1 is not None and grade.get('b1') is not None and grade.get('b2') is not None:
-            media_s1 = (float(grade.get('b1', 0)) + float(grade.get('b2', 0))) / 2
-            if float(rec_s1) > media_s1:
-                # Recalcula com nota de recuperação
-                notas_recalc = [float(rec_s1), float(rec_s1)]
-                if grade.get('b3') is not None:
-                    notas_recalc.append(float(grade.get('b3')))
-                if grade.get('b4') is not None:
-                    notas_recalc.append(float(grade.get('b4')))
-                media = sum(notas_recalc) / len(notas_recalc)
-        
-        if rec_s2 is not None and grade.get('b3') is not None and grade.get('b4') is not None:
-            media_s2 = (float(grade.get('b3', 0)) + float(grade.get('b4', 0))) / 2
-            if float(rec_s2) > media_s2:
-                # Recalcula com nota de recuperação
-                notas_recalc = []
-                if grade.get('b1') is not None:
-                    notas_recalc.append(float(grade.get('b1')))
-                if grade.get('b2') is not None:
-                    notas_recalc.append(float(grade.get('b2')))
-                notas_recalc.extend([float(rec_s2), float(rec_s2)])
-                media = sum(notas_recalc) / len(notas_recalc)
-        
-        # Considera recuperação final
-        recovery = grade.get('recovery')
-        if recovery is not None and media < 6.0:
-            media = (media + float(recovery)) / 2
-        
-        # Determina status
-        if len(notas) == 4:  # Todas as notas lançadas
-            if media >= 6.0:
-                status_nota = 'aprovado'
-            elif recovery is not None:
-                status_nota = 'aprovado' if media >= 5.0 else 'reprovado'
-            else:
-                status_nota = 'recuperacao' if media >= 4.0 else 'reprovado'
+
+    # Todas as notas foram limpas — resetar média e status
+    if not notas:
+        return None, 'cursando'
+
+    media = sum(notas) / len(notas)
+
+    # Considera recuperação semestral
+    rec_s1 = grade.get('rec_s1')
+    rec_s2 = grade.get('rec_s2')
+
+    # Lógica de recuperação semestral
+    if rec_s1 is not None and grade.get('b1') is not None and grade.get('b2') is not None:
+        media_s1 = (float(grade.get('b1', 0)) + float(grade.get('b2', 0))) / 2
+        if float(rec_s1) > media_s1:
+            # Recalcula com nota de recuperação
+            notas_recalc = [float(rec_s1), float(rec_s1)]
+            if grade.get('b3') is not None:
+                notas_recalc.append(float(grade.get('b3')))
+            if grade.get('b4') is not None:
+                notas_recalc.append(float(grade.get('b4')))
+            media = sum(notas_recalc) / len(notas_recalc)
+
+    if rec_s2 is not None and grade.get('b3') is not None and grade.get('b4') is not None:
+        media_s2 = (float(grade.get('b3', 0)) + float(grade.get('b4', 0))) / 2
+        if float(rec_s2) > media_s2:
+            # Recalcula com nota de recuperação
+            notas_recalc = []
+            if grade.get('b1') is not None:
+                notas_recalc.append(float(grade.get('b1')))
+            if grade.get('b2') is not None:
+                notas_recalc.append(float(grade.get('b2')))
+            notas_recalc.extend([float(rec_s2), float(rec_s2)])
+            media = sum(notas_recalc) / len(notas_recalc)
+
+    # Considera recuperação final
+    recovery = grade.get('recovery')
+    if recovery is not None and media < 6.0:
+        media = (media + float(recovery)) / 2
+
+    # Determina status
+    if len(notas) == 4:  # Todas as notas lançadas
+        if media >= 6.0:
+            status_nota = 'aprovado'
+        elif recovery is not None:
+            status_nota = 'aprovado' if media >= 5.0 else 'reprovado'
         else:
-            status_nota = 'cursando'
-        
-        # Atualiza no banco
-        await db.grades.update_one(
-            {"id": grade_id},
-            {"$set": {
-                "final_average": round(media, 2),
-                "status": status_nota,
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }}
-        )
-        
-        grade['final_average'] = round(media, 2)
-        grade['status'] = status_nota
+            status_nota = 'recuperacao' if media >= 4.0 else 'reprovado'
     else:
-        # Todas as notas foram limpas — resetar média e status
-        await db.grades.update_one(
-            {"id": grade_id},
-            {"$set": {
-                "final_average": None,
-                "status": "cursando",
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }}
-        )
-        grade['final_average'] = None
-        grade['status'] = 'cursando'
+        status_nota = 'cursando'
 
+    return round(media, 2), status_nota
+
+
+async def calculate_and_update_grade(db, grade_id: str):
+    """Calcula média final e atualiza status da nota"""
+    grade = await db.grades.find_one({"id": grade_id}, {"_id": 0})
+    if not grade:
+        return None
+
+    final_average, status_nota = compute_final_average(grade)
+
+    # Atualiza no banco
+    await db.grades.update_one(
+        {"id": grade_id},
+        {"$set": {
+            "final_average": final_average,
+            "status": status_nota,
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }}
+    )
+
+    grade['final_average'] = final_average
+    grade['status'] = status_nota
     return grade
 
+
+_GRADE_KEY_FIELDS = ('student_id', 'class_id', 'course_id', 'academic_year')
+
+
+def _grade_key(grade: dict) -> tuple:
+    return tuple(grade[f] for f in _GRADE_KEY_FIELDS)
+
+
+async def prefetch_batch_grades(db, grades: List[dict]) -> dict:
+    """Notas já existentes do lote numa única query → {(aluno, turma, componente, ano): nota}.
+
+    O `$in` por campo pode trazer combinações fora do lote; só as chaves do
+    payload são usadas. Com duplicidade no banco vale a primeira (como o
+    `find_one` por linha fazia).
+    """
+    if not grades:
+        return {}
+    query = {f: {"$in": list({g[f] for g in grades})} for f in _GRADE_KEY_FIELDS}
+    found = {}
+    async for doc in db.grades.find(query, {"_id": 0}):
+        found.setdefault(_grade_key(doc), doc)
+    return found
+
+
 def setup_grades_router(db, audit_service, verify_academic_year_open_or_raise=None, verify_bimestre_edit_deadline_or_raise=None, sandbox_db=None):
     """Configura o router de notas com as dependências necessárias"""
     
@@ -207,96 +236,14 @@ def setup_grades_router(db, audit_service, verify_academic_year_open_or_raise=No
             {"id": class_id}, {"_id": 0, "grade_level": 1}
         ) or {}
         class_grade_level = class_doc_gl.get('grade_level') or ''
-        # Estratégia 1: Busca na coleção enrollments (matrícula formal)
-        enrollments = await current_db.enrollments.find(
-            {"class_id": class_id, "status": "active"},
-            {"_id": 0, "student_id": 1, "enrollment_number": 1, "academic_year": 1, "student_series": 1, "enrollment_date": 1}
-        ).to_list(1000)
-        
-        enrollment_student_ids = set()
-        enrollment_numbers = {}
-        enrollment_series = {}
-        enrollment_dates = {}
-        for e in enrollments:
-            student_id = e.get('student_id')
-            enrollment_student_ids.add(student_id)
-            if student_id not in enrollment_numbers or e.get('academic_year') == academic_year:
-                enrollment_numbers[student_id] = e.get('enrollment_number')
-            if e.get('student_series'):
-                enrollment_series[student_id] = e.get('student_series')
-            if e.get('enrollment_date'):
-                enrollment_dates[student_id] = e.get('enrollment_date')
-        
-        # Busca alunos inativos que JÁ ESTIVERAM nesta turma.
-        # IMPORTANTE: "cancelled" (matrícula cancelada) é EXCLUÍDO de propósito —
-        # aluno com matrícula cancelada NÃO deve aparecer em nenhuma lista da turma
-        # onde foi cancelada (notas/frequência).
-        inactive_enrollments = await current_db.enrollments.find(
-            {"class_id": class_id, "status": {"$in": ["transferred", "dropout", "relocated", "progressed", "reclassified"]}},
-            {"_id": 0, "student_id": 1, "enrollment_number": 1, "academic_year": 1, "status": 1, "enrollment_date": 1}
-        ).to_list(1000)
-        
-        inactive_student_ids = set()
-        for e in inactive_enrollments:
-            sid = e.get('student_id')
-            if sid not in enrollment_student_ids:
-                inactive_student_ids.add(sid)
-                if sid not in enrollment_numbers or e.get('academic_year') == academic_year:
-                    enrollment_numbers[sid] = e.get('enrollment_number')
-            if e.get('enrollment_date') and sid not in enrollment_dates:
-                enrollment_dates[sid] = e.get('enrollment_date')
-        
-        # Estratégia 2: Busca alunos diretamente com class_id (fallback para dados antigos/inconsistentes)
-        direct_students = await current_db.students.find(
-            {"class_id": class_id, "status": {"$in": ["active", "Ativo"]}},
-            {"_id": 0, "id": 1, "enrollment_number": 1}
-        ).to_list(1000)
-        
-        for s in direct_students:
-            student_id = s.get('id')
-            if student_id not in enrollment_numbers:
-                enrollment_numbers[student_id] = s.get('enrollment_number')
-        
-        direct_student_ids = {s.get('id') for s in direct_students}
-        
-        # Combina todas as fontes (união de IDs)
-        all_student_ids = list(enrollment_student_ids.union(direct_student_ids).union(inactive_student_ids))
-        
-        # Busca dados dos alunos (inclui status para verificação de bloqueio)
-        students = []
-        if all_student_ids:
-            students = await current_db.students.find(
-                {"id": {"$in": all_student_ids}},
-                {"_id": 0, "id": 1, "full_name": 1, "enrollment_number": 1, "status": 1, "class_id": 1, "student_series": 1}
-            ).sort("full_name", 1).collation({"locale": "pt", "strength": 1}).to_list(1000)
-        
-        # Busca ação mais recente para alunos inativos
-        action_info_map = {}
-        if inactive_student_ids:
-            action_type_map = {
-                'transferencia_saida': 'Transferido',
-                'remanejamento': 'Remanejado',
-                'progressao': 'Progredido',
-                'reclassificacao': 'Reclassificado',
-                'desistencia': 'Desistente',
-                'cancelamento': 'Cancelado'
-            }
-            history_entries = await current_db.student_history.find(
-                {
-                    "student_id": {"$in": list(inactive_student_ids)},
-                    "class_id": class_id,
-                    "action_type": {"$in": list(action_type_map.keys())}
-                },
-                {"_id": 0, "student_id": 1, "action_type": 1, "action_date": 1}
-            ).sort("action_date", -1).to_list(1000)
-            
-            for h in history_entries:
-                sid = h.get('student_id')
-                if sid not in action_info_map:
-                    action_info_map[sid] = {
-                        "action_label": action_type_map.get(h.get('action_type'), ''),
-                        "action_date": h.get('action_date', '')
-                    }
+        # Out/2026: matrículas ativas/inativas, vínculo direto, histórico e
+        # dependências vêm do roster memoizado da turma (services/class_roster).
+        roster = await get_class_roster(current_db, class_id)
+        enrollment_numbers = roster.enrollment_numbers(academic_year)
+        enrollment_series = roster.enrollment_series()
+        enrollment_dates = roster.enrollment_dates(include_inactive=True)
+        students = roster.students
+        action_info_map = roster.action_info()
         
         # Busca calendário para determinar períodos dos bimestres
         calendario = await get_mantenedora_cached(current_db)
@@ -407,32 +354,17 @@ def setup_grades_router(db, audit_service, verify_academic_year_open_or_raise=No
         from utils.diary_constants import DEPENDENCY_DISPLAY_LABEL
         from tenant_scope import get_mantenedora_scope as _get_scope_grades
         active_tenant_grades = _get_scope_grades(current_user, request)
-        dep_filter = {
-            "class_id": class_id, "course_id": course_id, "status": "active",
-        }
-        if active_tenant_grades:
-            dep_filter["mantenedora_id"] = active_tenant_grades
-        deps_for_diary = await current_db.student_dependencies.find(dep_filter, {"_id": 0}).to_list(200)
-        existing_ids = {r['student']['id'] for r in result}
-        dep_student_ids = [d['student_id'] for d in deps_for_diary if d.get('student_id') and d['student_id'] not in existing_ids]
+        dep_pairs = roster.dependencies_for(course_id, active_tenant_grades)
+        dep_student_ids = [stu['id'] for _, stu in dep_pairs]
         if dep_student_ids:
-            dep_students = await current_db.students.find(
-                {"id": {"$in": dep_student_ids}},
-                {"_id": 0, "id": 1, "full_name": 1, "enrollment_number": 1, "status": 1, "dependency_mode": 1}
-            ).sort("full_name", 1).collation({"locale": "pt", "strength": 1}).to_list(200)
-            dep_by_sid = {d['student_id']: d for d in deps_for_diary}
-            student_by_id = {s['id']: s for s in dep_students}
             dep_grades_existing = await current_db.grades.find(
                 {"class_id": class_id, "course_id": course_id, "academic_year": academic_year,
                  "student_id": {"$in": dep_student_ids}},
                 {"_id": 0}
             ).to_list(200)
             dep_grades_map = {g['student_id']: g for g in dep_grades_existing}
-            for sid in dep_student_ids:
-                dep = dep_by_sid.get(sid)
-                stu = student_by_id.get(sid)
-                if not (dep and stu):
-                    continue
+            for dep, stu in dep_pairs:
+                sid = stu['id']
                 dep_grade = dep_grades_map.get(sid, {
                     'student_id': sid, 'class_id': class_id, 'course_id': course_id,
                     'academic_year': academic_year, 'dependency_id': dep.get('id'),
@@ -657,13 +589,23 @@ def setup_grades_router(db, audit_service, verify_academic_year_open_or_raise=No
         results = []
         audit_changes = []
         skipped = []
+        # Out/2026: dependências do lote numa única query (validadas por linha).
+        batch_dependencies = await fetch_dependencies(current_db, [g.get('dependency_id') for g in grades])
         
+        # Out/2026: notas existentes numa query, média/status em memória e um único
+        # bulk_write ordenado no fim (antes: find_one + update_one + re-leitura +
+        # update_one por aluno). Linhas repetidas no payload enxergam a anterior.
+        existing_by_key = await prefetch_batch_grades(current_db, grades)
+        tenant_by_class = {}
+        ops = []
+        now = datetime.now(timezone.utc).isoformat()
+
         for grade_data in grades:
             # Fase 2 — anti-spoof: valida dependency_id antes de gravar
             dep_id_in_payload = grade_data.get('dependency_id')
             if dep_id_in_payload:
-                await validate_dependency_link(
-                    db=current_db,
+                check_dependency_link(
+                    batch_dependencies.get(dep_id_in_payload),
                     dependency_id=dep_id_in_payload,
                     student_id=grade_data['student_id'],
                     class_id=grade_data['class_id'],
@@ -671,12 +613,8 @@ def setup_grades_router(db, audit_service, verify_academic_year_open_or_raise=No
                     tenant_id=get_mantenedora_scope(current_user, request),
                 )
 
-            existing = await current_db.grades.find_one({
-                "student_id": grade_data['student_id'],
-                "class_id": grade_data['class_id'],
-                "course_id": grade_data['course_id'],
-                "academic_year": grade_data['academic_year']
-            }, {"_id": 0})
+            key = _grade_key(grade_data)
+            existing = existing_by_key.get(key)
             
             if existing:
                 grade_keys = ['b1', 'b2', 'b3', 'b4', 'rec_s1', 'rec_s2', 'recovery', 'observations']
@@ -698,17 +636,18 @@ def setup_grades_router(db, audit_service, verify_academic_year_open_or_raise=No
                         })
                         continue
 
-                update_fields['updated_at'] = datetime.now(timezone.utc).isoformat()
+                update_fields['updated_at'] = now
                 
                 old_values = {k: existing.get(k) for k in update_fields.keys() if k != 'updated_at'}
                 new_values = {k: v for k, v in update_fields.items() if k != 'updated_at'}
-                
-                await current_db.grades.update_one(
+
+                updated = {**existing, **update_fields}
+                updated['final_average'], updated['status'] = compute_final_average(updated)
+                ops.append(UpdateOne(
                     {"id": existing['id']},
-                    {"$set": update_fields}
-                )
-                
-                updated = await calculate_and_update_grade(current_db, existing['id'])
+                    {"$set": {**update_fields, "final_average": updated['final_average'], "status": updated['status']}}
+                ))
+                existing_by_key[key] = updated
                 results.append(updated)
                 
                 if old_values != new_values:
@@ -736,17 +675,22 @@ def setup_grades_router(db, audit_service, verify_academic_year_open_or_raise=No
                     'observations': grade_data.get('observations'),
                     'final_average': None,
                     'status': 'cursando',
-                    'created_at': datetime.now(timezone.utc).isoformat()
+                    'created_at': now
                 }
                 
-                # Multi-tenancy: injeta mantenedora_id derivada da turma
-                new_grade['mantenedora_id'] = await resolve_tenant_id_for_create(
-                    current_db, current_user, request, class_id=grade_data['class_id']
-                )
+                # Multi-tenancy: injeta mantenedora_id derivada da turma (uma vez por turma)
+                class_id = grade_data['class_id']
+                if class_id not in tenant_by_class:
+                    tenant_by_class[class_id] = await resolve_tenant_id_for_create(
+                        current_db, current_user, request, class_id=class_id
+                    )
+                new_grade['mantenedora_id'] = tenant_by_class[class_id]
+                new_grade['final_average'], new_grade['status'] = compute_final_average(new_grade)
+                new_grade['updated_at'] = now
                 
-                await current_db.grades.insert_one(new_grade)
-                updated = await calculate_and_update_grade(current_db, new_grade['id'])
-                results.append(updated)
+                ops.append(InsertOne(dict(new_grade)))  # cópia: o driver injeta `_id`
+                existing_by_key[key] = new_grade
+                results.append(new_grade)
                 
                 audit_changes.append({
                     'student_id': grade_data['student_id'],
@@ -754,6 +698,9 @@ def setup_grades_router(db, audit_service, verify_academic_year_open_or_raise=No
                     'action': 'create',
                     'new': {k: v for k, v in new_grade.items() if k in ['b1', 'b2', 'b3', 'b4', 'rec_s1', 'rec_s2']}
                 })
+
+        if ops:
+            await current_db.grades.bulk_write(ops, ordered=True)
         
         # Auditoria em lote
         if audit_changes:
@@ -816,11 +763,17 @@ def setup_grades_router(db, audit_service, verify_academic_year_open_or_raise=No
         current_user = await AuthMiddleware.require_roles(['admin', 'admin_teste', 'super_admin', 'gerente'])(request)
         current_db = get_db_for_user(current_user)
         
-        result = await current_db.grades.delete_one({"id": grade_id})
+        deleted = await current_db.grades.find_one_and_delete(
+            {"id": grade_id}, projection={"_id": 0, "id": 1, "mantenedora_id": 1, "class_id": 1}
+        )
         
-        if result.deleted_count == 0:
+        if deleted is None:
             raise HTTPException(status_code=404, detail="Nota não encontrada")
         
+        # Dispositivos offline descartam a nota no próximo pull.
+        await record_tombstones(current_db, 'grades', [deleted], current_user)
+        # Exclusão não deixa `updated_at` para o delta job — marca a turma.
+        await mark_analytics_dirty(current_db, deleted.get('class_id'))
         return None
 
     @router.get("/pdf/{class_id}/{course_id}")
@@ -15,6 +15,7 @@ Invariantes adicionais:
 
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Any, Mapping, Optional
 import logging
@@ -44,8 +45,8 @@ from services.grade_assignment_scope import (
     resolve_own_grade_assignment,
 )
 from tenant_scope import get_mantenedora_scope
-from utils.academic_event_lens import record_lock_audit, resolve_student_ownership
-from utils.dependency_validator import validate_dependency_link
+from utils.academic_event_lens import record_lock_audit, resolve_student_ownership, resolve_students_ownership
+from utils.dependency_validator import check_dependency_link, fetch_dependencies, validate_dependency_link
 
 logger = logging.getLogger(__name__)
 
@@ -209,10 +210,44 @@ async def _context_or_legacy(
     return None
 
 
-async def _validate_dependency(current_db, user, request, payload: Mapping[str, Any]):
+@dataclass(frozen=True)
+class _BatchPrefetch:
+    """Dependências e lens de um lote inteiro, lidas antes do loop (Out/2026)."""
+
+    dependencies: Mapping[str, dict]
+    ownerships: Mapping[str, dict]
+
+
+async def _prefetch_batch_checks(current_db, user, request, context, rows) -> _BatchPrefetch:
+    tenant_id = get_mantenedora_scope(user, request)
+    dependencies = await fetch_dependencies(current_db, [row.get("dependency_id") for row in rows])
+    ownerships = await resolve_students_ownership(
+        current_db,
+        student_ids=[row.get("student_id") for row in rows],
+        class_id=context.class_id,
+        course_id=context.course_id,
+        target_date=None,
+        mantenedora_id=tenant_id,
+    )
+    return _BatchPrefetch(dependencies=dependencies, ownerships=ownerships)
+
+
+async def _validate_dependency(
+    current_db, user, request, payload: Mapping[str, Any], prefetch: Optional[_BatchPrefetch] = None
+):
     dependency_id = payload.get("dependency_id")
     if not dependency_id:
         return
+    if prefetch is not None:
+        check_dependency_link(
+            prefetch.dependencies.get(dependency_id),
+            dependency_id=dependency_id,
+            student_id=payload["student_id"],
+            class_id=payload["class_id"],
+            course_id=payload["course_id"],
+            tenant_id=get_mantenedora_scope(user, request),
+        )
+        return
     await validate_dependency_link(
         db=current_db,
         dependency_id=dependency_id,
@@ -223,15 +258,19 @@ async def _validate_dependency(current_db, user, request, payload: Mapping[str,
     )
 
 
-async def _validate_academic_event(current_db, user, request, payload: Mapping[str, Any]):
-    ownership = await resolve_student_ownership(
-        current_db,
-        student_id=payload["student_id"],
-        class_id=payload["class_id"],
-        course_id=payload["course_id"],
-        target_date=None,
-        mantenedora_id=get_mantenedora_scope(user, request),
-    )
+async def _validate_academic_event(
+    current_db, user, request, payload: Mapping[str, Any], prefetch: Optional[_BatchPrefetch] = None
+):
+    ownership = prefetch.ownerships.get(payload["student_id"]) if prefetch is not None else None
+    if ownership is None:
+        ownership = await resolve_student_ownership(
+            current_db,
+            student_id=payload["student_id"],
+            class_id=payload["class_id"],
+            course_id=payload["course_id"],
+            target_date=None,
+            mantenedora_id=get_mantenedora_scope(user, request),
+        )
     if ownership["editable"]:
         return
     await record_lock_audit(
@@ -288,8 +327,12 @@ async def _save_one_dvd_grade(
     request: Request,
     context: GradeAssignmentContext,
     payload: Mapping[str, Any],
+    prefetch: Optional[_BatchPrefetch] = None,
 ) -> tuple[dict, Optional[dict]]:
-    """Salva um estudante e retorna ``(grade atualizada, mudança auditável)``."""
+    """Salva um estudante e retorna ``(grade atualizada, mudança auditável)``.
+
+    ``prefetch`` (lote): dependências/lens já lidas por `_prefetch_batch_checks`.
+    """
     if payload.get("class_id") != context.class_id or payload.get("course_id") != context.course_id:
         raise _http_scope_error(
             GradeAssignmentScopeError(
@@ -297,8 +340,8 @@ async def _save_one_dvd_grade(
                 "Todos os dados do lote devem pertencer à turma/componente do vínculo.",
             )
         )
-    await _validate_dependency(current_db, user, request, payload)
-    await _validate_academic_event(current_db, user, request, payload)
+    await _validate_dependency(current_db, user, request, payload, prefetch)
+    await _validate_academic_event(current_db, user, request, payload, prefetch)
 
     from routers.grades import _strip_frozen_grade_fields, calculate_and_update_grade
 
@@ -777,7 +820,13 @@ def _install_sync_adapter(db, audit_service, sandbox_db=None):
         return masked, len(masked)
 
     sync_mod.process_sync_operation = dvd_process
+    sync_mod.register_push_interceptor(
+        lambda user, op: op.collection == "grades" and user.get("role") == "professor"
+    )
     sync_mod.fetch_collection_data_paginated = dvd_fetch
+    sync_mod.register_pull_interceptor(
+        lambda user, collection, class_id: collection == "grades" and user.get("role") == "professor"
+    )
     sync_mod._dvd_phase5_grades_installed = True
 
 
@@ -1182,6 +1231,7 @@ def install_grades_dvd_adapter(
 
         results = []
         changes = []
+        prefetch = await _prefetch_batch_checks(current_db, user, request, context, grades)
         for row in grades:
             updated, change = await _save_one_dvd_grade(
                 current_db,
@@ -1189,6 +1239,7 @@ def install_grades_dvd_adapter(
                 request,
                 context,
                 row,
+                prefetch,
             )
             results.append(
                 _mask_grade_for_assignment(
@@ -472,7 +472,13 @@ def install_grades_dvd_hardening(base_router, db, *, sandbox_db=None):
         return visible, total
 
     sync_mod.process_sync_operation = hardened_process
+    sync_mod.register_push_interceptor(
+        lambda user, op: op.collection == "grades" and user.get("role") == "professor"
+    )
     sync_mod.fetch_collection_data_paginated = hardened_fetch
+    sync_mod.register_pull_interceptor(
+        lambda user, collection, class_id: collection == "grades" and user.get("role") == "professor"
+    )
 
     base_router._dvd_phase5_hardening_installed = True
     return base_router
@@ -13,7 +13,7 @@ from fastapi import APIRouter, HTTPException, Request
 
 from auth_middleware import AuthMiddleware
 from tenant_scope import get_mantenedora_scope
-from utils.render_jobs import compute_idempotency_key, find_existing_job, now_iso
+from utils.render_jobs import compute_idempotency_key, find_existing_job, insert_render_job, now_iso
 from utils.client_time import current_time_context
 
 HISTORY_TEMPLATE_VERSION = "historico_v1.0.0"
@@ -90,7 +90,7 @@ def setup_history_pdf_router(db, audit_service=None):
             "time_context": current_time_context(),
             "audit_trail": [{"action": "queued", "at": now_s, "by_user_id": user.get("id")}],
         }
-        await db.document_render_jobs.insert_one(job)
+        await insert_render_job(db, job)
         return {"id": job["id"], "status": "pending", "idempotent_hit": False}
 
     @router.get("/verify/historico/{token}")
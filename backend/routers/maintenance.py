@@ -9,6 +9,8 @@ import logging
 
 from models import *
 from auth_middleware import AuthMiddleware
+from services.class_roster import clear_class_rosters
+from services.sync_tombstones import record_tombstones
 
 logger = logging.getLogger(__name__)
 
@@ -147,6 +149,8 @@ def setup_router(db, audit_service=None, sandbox_db=None, **kwargs):
                 logger.error(f"Falha ao remover registro órfão {orphan.get('type')}/{orphan.get('id')}: {e}")
 
         deleted['total'] = deleted['enrollments'] + deleted['school_assignments'] + deleted['teacher_assignments']
+        if deleted['enrollments']:
+            clear_class_rosters()
 
         # Registra auditoria da limpeza
         await audit_service.log(
@@ -346,10 +350,13 @@ def setup_router(db, audit_service=None, sandbox_db=None, **kwargs):
                         {"$pull": {"records": {"student_id": sid}}}
                     )
                     t_att += r.modified_count
-                    r = await db.grades.delete_many(
-                        {"student_id": sid, "class_id": {"$in": class_ids}}
-                    )
+                    grades_query = {"student_id": sid, "class_id": {"$in": class_ids}}
+                    removed_grades = await db.grades.find(
+                        grades_query, {"_id": 0, "id": 1, "mantenedora_id": 1, "class_id": 1}
+                    ).to_list(None)
+                    r = await db.grades.delete_many(grades_query)
                     t_gr += r.deleted_count
+                    await record_tombstones(db, 'grades', removed_grades, current_user)
                 r = await db.enrollments.delete_many(
                     {"student_id": sid, "status": "cancelled"}
                 )
@@ -370,6 +377,8 @@ def setup_router(db, audit_service=None, sandbox_db=None, **kwargs):
             affected.append(entry)
 
         if not dry_run:
+            if t_en or t_st:
+                clear_class_rosters()
             await audit_service.log(
                 action='delete',
                 collection='system',
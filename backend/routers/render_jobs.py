@@ -6,24 +6,27 @@ Render Jobs Router — orquestração da fila de geração de documentos.
 - GET    /api/render-jobs/{id}         status do job
 - GET    /api/render-jobs              lista (filtros básicos)
 - POST   /api/render-jobs/{id}/retry   força retry manual (admin only)
+- GET    /api/render-jobs/metrics      profundidade da fila + throughput (admin only)
 
 NÃO implementado nesta V1 (backlog explícito):
 - /file (download do PDF) — depende dos handlers do Boletim/Histórico estarem prontos
 - /public/render-jobs/{token}/file — idem
-- Observabilidade dedicada — backlog
 """
 from __future__ import annotations
 
 import logging
 import uuid
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel, Field
 
 from auth_middleware import AuthMiddleware
+from services.render_worker import worker_state_snapshot
 from tenant_scope import apply_tenant_filter, get_mantenedora_scope
 from utils.client_time import current_time_context
+from utils.observability import render_job_metrics
 from utils.render_jobs import (
     DOCUMENT_TYPES,
     JOB_STATUSES,
@@ -31,7 +34,9 @@ from utils.render_jobs import (
     compute_payload_hash,
     find_existing_job,
     has_render_handler,
+    insert_render_job,
     is_terminal_status,
+    notify_render_worker,
     now_iso,
 )
 
@@ -161,8 +166,7 @@ def setup_render_jobs_router(db, audit_service=None) -> APIRouter:
                 {"action": "queued", "at": now_s, "by_user_id": user.get("id")},
             ],
         }
-        await db.document_render_jobs.insert_one(job)
-        job.pop("_id", None)
+        await insert_render_job(db, job)
         logger.info("[render-jobs] criado %s tipo=%s snapshot=%s", job["id"], payload.document_type, payload.source_snapshot_id)
         return {
             "id": job["id"],
@@ -172,6 +176,92 @@ def setup_render_jobs_router(db, audit_service=None) -> APIRouter:
             "job": job,
         }
 
+    # -------------------------------------------------------------------
+    # Declarado antes de /{job_id} para não ser capturado como id.
+    @router.get("/metrics", response_model=dict)
+    async def queue_metrics(request: Request):
+        """Profundidade da fila e throughput — base para dimensionar o pool.
+
+        `queue` e `throughput` vêm do banco (visão de TODAS as réplicas);
+        `worker` e `channel` são instance-local (réplica que atendeu).
+        """
+        user = await _require_role(request, ROLES_FORCE_RETRY)
+        base = apply_tenant_filter({}, user, request)
+        now = datetime.now(timezone.utc)
+
+        def _iso(dt: datetime) -> str:
+            return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        queue: dict[str, dict[str, int]] = {}
+        async for row in db.document_render_jobs.aggregate([
+            {"$match": {**base, "status": {"$in": ["pending", "processing"]}}},
+            {"$group": {
+                "_id": {"status": "$status", "document_type": "$document_type"},
+                "count": {"$sum": 1},
+            }},
+        ]):
+            key = row["_id"]
+            queue.setdefault(key["status"], {})[key["document_type"]] = row["count"]
+
+        oldest = await db.document_render_jobs.find_one(
+            {**base, "status": "pending"},
+            {"_id": 0, "requested_at": 1},
+            sort=[("requested_at", 1)],
+        )
+        oldest_age_s = None
+        if oldest and oldest.get("requested_at"):
+            try:
+                t0 = datetime.fromisoformat(oldest["requested_at"].replace("Z", "+00:00"))
+                oldest_age_s = int((now - t0).total_seconds())
+            except (ValueError, TypeError):
+                oldest_age_s = None
+
+        throughput: dict[str, list[dict]] = {}
+        for label, minutes in (("last_15m", 15), ("last_60m", 60)):
+            rows = await db.document_render_jobs.aggregate([
+                {"$match": {
+                    **base,
+                    "status": {"$in": ["completed", "failed"]},
+                    "$or": [
+                        {"completed_at": {"$gte": _iso(now - timedelta(minutes=minutes))}},
+                        {"failed_at": {"$gte": _iso(now - timedelta(minutes=minutes))}},
+                    ],
+                }},
+                {"$group": {
+                    "_id": {"status": "$status", "document_type": "$document_type"},
+                    "count": {"$sum": 1},
+                    "avg_duration_ms": {"$avg": "$duration_ms"},
+                    "max_duration_ms": {"$max": "$duration_ms"},
+                    "avg_queue_wait_ms": {"$avg": "$queue_wait_ms"},
+                }},
+            ]).to_list(None)
+            throughput[label] = [
+                {
+                    "status": r["_id"]["status"],
+                    "document_type": r["_id"]["document_type"],
+                    "count": r["count"],
+                    "per_minute": round(r["count"] / minutes, 2),
+                    "avg_duration_ms": round(r["avg_duration_ms"]) if r.get("avg_duration_ms") is not None else None,
+                    "max_duration_ms": r.get("max_duration_ms"),
+                    "avg_queue_wait_ms": round(r["avg_queue_wait_ms"]) if r.get("avg_queue_wait_ms") is not None else None,
+                }
+                for r in rows
+            ]
+
+        return {
+            "generated_at": _iso(now),
+            "queue": {
+                "pending": queue.get("pending", {}),
+                "processing": queue.get("processing", {}),
+                "pending_total": sum(queue.get("pending", {}).values()),
+                "processing_total": sum(queue.get("processing", {}).values()),
+                "oldest_pending_age_seconds": oldest_age_s,
+            },
+            "throughput": throughput,
+            "worker": worker_state_snapshot(),
+            "channel": render_job_metrics.snapshot(),
+        }
+
     # -------------------------------------------------------------------
     @router.get("/{job_id}", response_model=dict)
     async def get_job(job_id: str, request: Request):
@@ -268,6 +358,7 @@ def setup_render_jobs_router(db, audit_service=None) -> APIRouter:
                 },
             },
         )
+        notify_render_worker()
         return {"id": job_id, "status": "pending", "force_retry": True}
 
     return router
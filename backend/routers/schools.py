@@ -9,7 +9,8 @@ from datetime import datetime, timezone
 
 from models import School, SchoolCreate, SchoolUpdate
 from auth_middleware import AuthMiddleware
-from utils.cache import cache, CACHE_TTL_SCHOOLS
+from utils.cache import cache, CACHE_TTL_SCHOOLS, tenant_tag, tenant_invalidation_tags
+from pdf_cache import pdf_cache
 from tenant_scope import apply_tenant_filter, get_mantenedora_scope, assert_same_tenant, is_super_admin
 
 router = APIRouter(prefix="/schools", tags=["Escolas"])
@@ -53,8 +54,8 @@ def setup_router(db, audit_service, sandbox_db=None):
         
         await current_db.schools.insert_one(doc)
         
-        cache.invalidate('schools')
-        cache.invalidate('ctue')
+        cache.invalidate('schools', tags=tenant_invalidation_tags(tenant_id))
+        cache.invalidate('ctue', tags=tenant_invalidation_tags(tenant_id))
         return school_obj
 
     @router.get("")
@@ -73,7 +74,7 @@ def setup_router(db, audit_service, sandbox_db=None):
             'tenant': tenant_id or 'ALL',
             'skip': skip, 'limit': limit, 'include_student_count': include_student_count
         }
-        cached = cache.get('schools', cache_params)
+        cached = await cache.aget('schools', cache_params)
         if cached is not None:
             return cached
         
@@ -109,7 +110,7 @@ def setup_router(db, audit_service, sandbox_db=None):
             for school in schools:
                 school['student_count'] = count_map.get(school['id'], 0)
         
-        cache.set('schools', cache_params, schools, CACHE_TTL_SCHOOLS)
+        cache.set('schools', cache_params, schools, CACHE_TTL_SCHOOLS, tags=(tenant_tag(tenant_id),))
         return schools
 
     @router.get("/pre-matricula", response_model=List[School])
@@ -198,8 +199,10 @@ def setup_router(db, audit_service, sandbox_db=None):
                 )
         
         updated_school = await current_db.schools.find_one({"id": school_id}, {"_id": 0})
-        cache.invalidate('schools')
-        cache.invalidate('ctue')
+        tags = tenant_invalidation_tags((updated_school or {}).get('mantenedora_id'))
+        cache.invalidate('schools', tags=tags)
+        cache.invalidate('ctue', tags=tags)
+        pdf_cache.invalidate_tags(f"school:{school_id}")
         return School(**updated_school)
 
     @router.delete("/{school_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -225,8 +228,10 @@ def setup_router(db, audit_service, sandbox_db=None):
                 detail="Escola não encontrada"
             )
         
-        cache.invalidate('schools')
-        cache.invalidate('ctue')
+        tags = tenant_invalidation_tags(existing.get('mantenedora_id'))
+        cache.invalidate('schools', tags=tags)
+        cache.invalidate('ctue', tags=tags)
+        pdf_cache.invalidate_tags(f"school:{school_id}")
         return None
 
     @router.post("/migrate-bercario", status_code=status.HTTP_200_OK)
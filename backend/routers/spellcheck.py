@@ -7,6 +7,8 @@ gratuita com limite de 20 req/min por IP e 20.000 caracteres por chamada —
 suficiente para uso escolar. Caso a prefeitura extrapole, basta subir um
 container LanguageTool e apontar a env LANGUAGETOOL_URL para o novo endpoint.
 
+[Out/2026] Cliente, cache por parágrafo e orçamento em services/languagetool.py.
+
 Request body:
     {"text": str, "language": "pt-BR"}  # language é opcional (default pt-BR)
 
@@ -29,21 +31,22 @@ Response body (payload simplificado):
 """
 from __future__ import annotations
 
-import os
 import logging
-import httpx
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, Field
 
 from auth_middleware import AuthMiddleware
+from services.languagetool import (
+    LanguageToolError,
+    LanguageToolRateLimited,
+    LanguageToolTimeout,
+    check_text,
+)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Corretor Ortográfico"])
 
-LANGUAGETOOL_URL = os.environ.get(
-    "LANGUAGETOOL_URL", "https://api.languagetool.org/v2/check"
-)
 MAX_TEXT_LENGTH = 20_000  # limite da API pública
 
 
@@ -58,56 +61,27 @@ def setup_router(db=None, **kwargs):
     async def spellcheck(payload: SpellCheckRequest, request: Request):
         """Corrige ortografia e gramática PT-BR. Requer autenticação."""
         # Qualquer usuário autenticado pode usar o corretor.
-        await AuthMiddleware.get_current_user(request)
+        user = await AuthMiddleware.get_current_user(request)
 
         # Whitelist: apenas pt-BR e pt-PT (foco do sistema é PT-BR).
         lang = payload.language if payload.language in ("pt-BR", "pt-PT") else "pt-BR"
 
+        # [Out/2026] Cliente em pool, cache por parágrafo, coalescência e
+        # orçamento por mantenedora — ver services/languagetool.py.
         try:
-            async with httpx.AsyncClient(timeout=15.0) as client:
-                resp = await client.post(
-                    LANGUAGETOOL_URL,
-                    data={
-                        "text": payload.text,
-                        "language": lang,
-                        # Desabilita regras pedantes que geram ruído em textos escolares.
-                        "disabledRules": "WHITESPACE_RULE,UPPERCASE_SENTENCE_START",
-                    },
-                    headers={"User-Agent": "SIGESC-Spellchecker/1.0"},
-                )
-        except httpx.TimeoutException:
+            matches = await check_text(payload.text, lang, tenant_id=user.get("mantenedora_id"))
+        except LanguageToolTimeout:
             raise HTTPException(
                 status_code=504,
                 detail="Corretor demorou para responder. Tente novamente em instantes.",
             )
-        except Exception as e:
-            logger.error(f"Falha ao chamar LanguageTool: {e}")
-            raise HTTPException(status_code=502, detail="Serviço de correção indisponível.")
-
-        if resp.status_code == 429:
+        except LanguageToolRateLimited:
             raise HTTPException(
                 status_code=429,
                 detail="Limite de requisições atingido. Aguarde alguns segundos.",
             )
-        if resp.status_code >= 400:
-            logger.error(f"LanguageTool {resp.status_code}: {resp.text[:200]}")
-            raise HTTPException(status_code=502, detail="Serviço de correção retornou erro.")
-
-        raw = resp.json()
-        matches = []
-        for m in raw.get("matches", []):
-            rule = m.get("rule") or {}
-            matches.append({
-                "message": m.get("message", ""),
-                "short_message": m.get("shortMessage", ""),
-                "offset": m.get("offset", 0),
-                "length": m.get("length", 0),
-                "replacements": [r.get("value", "") for r in m.get("replacements", [])][:8],
-                "rule_id": rule.get("id", ""),
-                "category": (rule.get("category") or {}).get("name", ""),
-                "issue_type": (rule.get("issueType") or "other"),
-                "context": (m.get("context") or {}).get("text", ""),
-            })
+        except LanguageToolError:
+            raise HTTPException(status_code=502, detail="Serviço de correção indisponível.")
 
         return {
             "matches": matches,
@@ -20,6 +20,7 @@ from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Request, status
 
 from models import StudentDependency, StudentDependencyCreate, StudentDependencyUpdate
+from services.class_roster import invalidate_class_rosters
 
 logger = logging.getLogger(__name__)
 
@@ -166,6 +167,7 @@ def setup_student_dependencies_router(db, auth_middleware, audit_service=None, a
         doc = dep.model_dump()
         doc["created_at"] = doc["created_at"].isoformat()
         await db.student_dependencies.insert_one(doc)
+        invalidate_class_rosters([doc.get("class_id")], [doc.get("student_id")])
 
         await _audit("create", dep.id, user, request, after=doc)
         logger.info("[student_dependencies] criada %s para aluno %s", dep.id, payload.student_id)
@@ -238,6 +240,7 @@ def setup_student_dependencies_router(db, auth_middleware, audit_service=None, a
         update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
         update_data["updated_by"] = user.get("id")
         await db.student_dependencies.update_one({"id": dep_id}, {"$set": update_data})
+        invalidate_class_rosters([existing.get("class_id"), update_data.get("class_id")], [existing.get("student_id")])
 
         # Fase 2.5 — snapshot imutável em transições documentais
         new_status = update_data.get("status")
@@ -276,6 +279,7 @@ def setup_student_dependencies_router(db, auth_middleware, audit_service=None, a
             raise HTTPException(404, detail="Dependência não encontrada.")
 
         await db.student_dependencies.delete_one({"id": dep_id})
+        invalidate_class_rosters([existing.get("class_id")], [existing.get("student_id")])
         await _audit("delete", dep_id, user, request, before=existing)
         logger.info("[student_dependencies] deletada %s por %s", dep_id, user.get("email"))
         return {"message": "Dependência removida com sucesso."}
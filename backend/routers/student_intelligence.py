@@ -8,7 +8,6 @@ student_snapshots, student_alerts.
 """
 from __future__ import annotations
 
-import uuid
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
@@ -21,7 +20,7 @@ from tenant_scope import (
     assert_same_tenant,
     resolve_tenant_id_for_create,
 )
-from services import sie_service
+from services import sie_batch, sie_service
 
 router = APIRouter(prefix="/sie", tags=["SIE — Student Intelligence"])
 
@@ -55,106 +54,9 @@ def setup_router(db, audit_service=None, sandbox_db=None, **kwargs):
 
     async def _persist(current_db, student: Dict[str, Any], result: Dict[str, Any],
                        year: int, tenant_id: Optional[str]) -> None:
-        sid = student['id']
-        school_id = student.get('school_id')
-        class_id = student.get('class_id')
-        ac = result['academic']
-        at = result['attendance']
-        ov = result['overall']
-        diag = result['diagnostic']
-        now = _now_iso()
-
-        # 1. Risk score (1 doc corrente por aluno/ano)
-        risk_doc = {
-            'mantenedora_id': tenant_id,
-            'student_id': sid,
-            'school_id': school_id,
-            'class_id': class_id,
-            'academic_year': year,
-            'overall_risk': ov['overall_risk'],
-            'risk_level': ov['risk_level'],
-            'academic_risk': ac['score'],
-            'attendance_risk': at['score'],
-            'trend_status': ac['trend_status'],
-            'factors': ov['factors'],
-            'academic_breakdown': ac['breakdown'],
-            'attendance_breakdown': at['breakdown'],
-            'recovery_subjects': ac['recovery_subjects'],
-            'failed_subjects': ac['failed_subjects'],
-            'critical_components': ac['critical_components'],
-            'average_grade': ac['average_grade'],
-            'attendance_pct': at['attendance_pct'],
-            'updated_at': now,
-        }
-        await current_db.student_risk_scores.update_one(
-            {'student_id': sid, 'academic_year': year},
-            {'$set': risk_doc, '$setOnInsert': {'id': str(uuid.uuid4()), 'computed_at': now}},
-            upsert=True,
-        )
-
-        # 2. Diagnóstico estruturado (1 doc corrente por aluno/ano)
-        diag_doc = {
-            'mantenedora_id': tenant_id,
-            'student_id': sid,
-            'school_id': school_id,
-            'class_id': class_id,
-            'academic_year': year,
-            **diag,
-            'updated_at': now,
-        }
-        await current_db.student_diagnostics.update_one(
-            {'student_id': sid, 'academic_year': year},
-            {'$set': diag_doc, '$setOnInsert': {'id': str(uuid.uuid4()), 'computed_at': now}},
-            upsert=True,
-        )
-
-        # 3. Snapshot (1 por dia → série temporal para gráficos)
-        snap_date = datetime.now(timezone.utc).date().isoformat()
-        await current_db.student_snapshots.update_one(
-            {'student_id': sid, 'academic_year': year, 'snapshot_date': snap_date},
-            {'$set': {
-                'mantenedora_id': tenant_id,
-                'student_id': sid,
-                'school_id': school_id,
-                'class_id': class_id,
-                'academic_year': year,
-                'snapshot_date': snap_date,
-                'academic_risk': ac['score'],
-                'attendance_risk': at['score'],
-                'overall_risk': ov['overall_risk'],
-                'risk_level': ov['risk_level'],
-                'trend': ac['trend_status'],
-                'updated_at': now,
-            }, '$setOnInsert': {'id': str(uuid.uuid4()), 'created_at': now}},
-            upsert=True,
-        )
-
-        # 4. Alertas (materializa sinais; resolve os que não disparam mais)
-        current_types = set()
-        for al in result['alerts']:
-            current_types.add(al['alert_type'])
-            await current_db.student_alerts.update_one(
-                {'student_id': sid, 'academic_year': year, 'alert_type': al['alert_type']},
-                {'$set': {
-                    'mantenedora_id': tenant_id,
-                    'student_id': sid,
-                    'school_id': school_id,
-                    'class_id': class_id,
-                    'academic_year': year,
-                    'alert_type': al['alert_type'],
-                    'severity': al['severity'],
-                    'message': al['message'],
-                    'resolved_at': None,
-                    'updated_at': now,
-                }, '$setOnInsert': {'id': str(uuid.uuid4()), 'created_at': now}},
-                upsert=True,
-            )
-        # Resolve alertas que não dispararam neste cálculo
-        await current_db.student_alerts.update_many(
-            {'student_id': sid, 'academic_year': year,
-             'alert_type': {'$nin': list(current_types)}, 'resolved_at': None},
-            {'$set': {'resolved_at': now, 'updated_at': now}},
-        )
+        """Risk score + diagnóstico + snapshot diário + alertas (mesmas
+        operações do lote — services/sie_batch.build_persist_ops)."""
+        await sie_batch.persist_results(current_db, [(student, result, tenant_id)], year)
 
     # ===================== CONFIG =====================
 
@@ -231,7 +133,14 @@ def setup_router(db, audit_service=None, sandbox_db=None, **kwargs):
 
     @router.post("/compute")
     async def compute_batch(request: Request, academic_year: Optional[int] = None,
-                            school_id: Optional[str] = None, class_id: Optional[str] = None):
+                            school_id: Optional[str] = None, class_id: Optional[str] = None,
+                            background: bool = False):
+        """Recalcula o risco de todos os alunos ativos do escopo.
+
+        [Out/2026] Leitura/escrita em bulk e scores vetorizados (services/sie_batch).
+        `background=true` devolve `{job_id}` na hora; o progresso fica em
+        GET /sie/compute/jobs/{job_id}.
+        """
         user = await AuthMiddleware.require_roles(MANAGEMENT_ROLES)(request)
         current_db = _get_db(user)
         year = academic_year or datetime.now().year
@@ -246,29 +155,38 @@ def setup_router(db, audit_service=None, sandbox_db=None, **kwargs):
         if user.get('role') == 'secretario':
             q['school_id'] = {'$in': user.get('school_ids', []) or []}
 
-        stats = {'processed': 0, 'by_level': {'low': 0, 'moderate': 0, 'high': 0, 'critical': 0},
-                 'alerts_open': 0}
-        cfg_cache: Dict[str, Any] = {}
-        async for student in current_db.students.find(q, {'_id': 0}):
-            tenant_id = student.get('mantenedora_id')
-            cfg = cfg_cache.get(tenant_id or '__none__')
-            if cfg is None:
-                cfg = await sie_service.get_or_create_config(current_db, tenant_id)
-                cfg_cache[tenant_id or '__none__'] = cfg
-            result = await sie_service.compute_for_student(current_db, student, cfg, year)
-            await _persist(current_db, student, result, year, tenant_id)
-            stats['processed'] += 1
-            stats['by_level'][result['overall']['risk_level']] += 1
-            stats['alerts_open'] += len(result['alerts'])
-
-        if audit_service:
-            await audit_service.log(
-                action='compute', collection='student_risk_scores', user=user, request=request,
-                document_id='sie-batch',
-                description=f"SIE: recomputou risco de {stats['processed']} alunos (ano {year}).",
+        async def _audit(stats: Dict[str, Any]) -> None:
+            if audit_service:
+                await audit_service.log(
+                    action='compute', collection='student_risk_scores', user=user, request=request,
+                    document_id='sie-batch',
+                    description=f"SIE: recomputou risco de {stats['processed']} alunos (ano {year}).",
+                )
+
+        if background:
+            tenant_id = await resolve_tenant_id_for_create(current_db, user, request)
+            job = await sie_batch.create_job(
+                current_db, year=year, user=user, tenant_id=tenant_id,
+                filters={'school_id': school_id, 'class_id': class_id},
             )
+            sie_batch.start_job(current_db, job['id'], q, year, on_done=_audit)
+            return {'job_id': job['id'], 'status': job['status'], 'academic_year': year}
+
+        stats = await sie_batch.run_batch(current_db, q, year)
+        stats.pop('total', None)
+        await _audit(stats)
         return {'academic_year': year, **stats}
 
+    @router.get("/compute/jobs/{job_id}")
+    async def get_compute_job(job_id: str, request: Request):
+        user = await AuthMiddleware.require_roles(MANAGEMENT_ROLES)(request)
+        current_db = _get_db(user)
+        job = await sie_batch.get_job(current_db, job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job não encontrado")
+        assert_same_tenant(job, user, request)
+        return job
+
     # ===================== LISTAGENS =====================
 
     @router.get("/risk")
@@ -27,6 +27,11 @@ from tenant_scope import apply_tenant_filter, assert_same_tenant, resolve_tenant
 from utils.serie_canonical import canonicalize_serie, UNRECOGNIZED_KEY
 from utils.student_location import normalize_student_address_location
 from services.pedagogical_consolidation import consolidate_student_movement
+from services.sync_tombstones import record_tombstones
+from services.class_roster import clear_class_rosters, invalidate_class_rosters
+from utils.student_search_index import (
+    RANK_PREFIX, get_tenant_index, note_student_deleted, note_student_saved,
+)
 
 router = APIRouter(prefix="/students", tags=["Estudantes"])
 
@@ -218,6 +223,7 @@ def setup_students_router(db, audit_service, sandbox_db=None):
             student_obj.enrollment_number = new_enrollment_number
 
         await current_db.students.insert_one(doc)
+        note_student_saved(current_db, doc)
         
         # Se o aluno tem turma, cria a matrícula automaticamente
         if student_obj.class_id and student_obj.status == 'active':
@@ -241,6 +247,7 @@ def setup_students_router(db, audit_service, sandbox_db=None):
                 "created_at": datetime.now().isoformat()
             }
             await current_db.enrollments.insert_one(enrollment_doc)
+        invalidate_class_rosters([student_obj.class_id])
         
         # Registra auditoria
         school = await current_db.schools.find_one({"id": student_data.school_id}, {"_id": 0, "name": 1})
@@ -639,6 +646,7 @@ def setup_students_router(db, audit_service, sandbox_db=None):
                         f"{created_enrollments} matrículas criadas.")
         )
 
+        clear_class_rosters()
         return {
             "fixed_students": fixed_students,
             "fixed_enrollments": fixed_enrollments,
@@ -766,6 +774,7 @@ def setup_students_router(db, audit_service, sandbox_db=None):
                         f"{fixed} matrícula(s) preenchida(s) a partir de students.student_series.")
         )
 
+        clear_class_rosters()
         return {"fixed_enrollments": fixed, "candidates": len(candidates)}
 
 
@@ -782,8 +791,10 @@ def setup_students_router(db, audit_service, sandbox_db=None):
         """Autocomplete de alunos — server-side, indexado, observável.
 
         Diretriz: /app/docs/SEARCH_ARCHITECTURE.md
-        - Prefix-first sobre `nome_busca` (índice composto tenant_id+nome_busca).
-        - Fallback contains apenas se q tem >= 4 chars E prefix retornou < 3.
+        - [Out/2026] Índice em memória por tenant (utils/student_search_index):
+          início do nome > início de palavra > trecho (q >= 4); CPF por dígitos.
+        - Sem índice (super_admin cross-tenant, tenant grande demais): prefix-first
+          sobre `nome_busca` e fallback contains se q >= 4 chars E prefix < 3.
         - Cache server-side TTL 5s (tenant-aware).
         - CPF mascarado.
         - Rate limit 30 req/min/usuário.
@@ -852,29 +863,48 @@ def setup_students_router(db, audit_service, sandbox_db=None):
             "school_id": 1, "class_id": 1, "status": 1,
         }
 
-        # Estratégia 1: PREFIX (caminho rápido, índice ix_tenant_nome_busca)
-        prefix_filter = {**base_filter, 'nome_busca': {'$regex': f'^{q_escaped}'}}
-        prefix_hits = await current_db.students.find(
-            prefix_filter, projection
-        ).limit(limit).to_list(limit)
-
-        used_fallback = False
-        results = list(prefix_hits)
-
-        # Estratégia 2: CONTAINS — restrita: q >= 4 chars E prefix < 3 hits
-        if len(prefix_hits) < 3 and len(q_norm) >= 4:
-            seen_ids = {s.get('id') for s in prefix_hits}
-            contains_filter = {**base_filter, 'nome_busca': {'$regex': q_escaped}}
-            need = limit - len(prefix_hits)
-            contains_hits = await current_db.students.find(
-                contains_filter, projection
-            ).limit(need + len(seen_ids)).to_list(need + len(seen_ids))
-            for hit in contains_hits:
-                if hit.get('id') not in seen_ids:
-                    results.append(hit)
-                    if len(results) >= limit:
-                        break
-            used_fallback = True
+        # [Out/2026] Índice em memória do tenant (trigramas/prefixos, ranking por
+        # qualidade). Os ids escolhidos são confirmados no Mongo com o filtro real
+        # (uma query `$in`) — o índice pode estar até alguns minutos atrás de escritas
+        # feitas fora do router de alunos.
+        index = await get_tenant_index(current_db, base_filter.get('mantenedora_id'))
+        if index is not None:
+            ranked = index.search(q_norm, limit=limit, filters={
+                'school_id': school_id, 'class_id': class_id, 'status': status,
+            })
+            ids = [sid for _, sid in ranked]
+            fresh = {}
+            if ids:
+                docs = await current_db.students.find(
+                    {**base_filter, 'id': {'$in': ids}}, projection
+                ).to_list(len(ids))
+                fresh = {d['id']: d for d in docs}
+            results = [fresh[sid] for sid in ids if sid in fresh]
+            used_fallback = any(rank != RANK_PREFIX for rank, sid in ranked if sid in fresh)
+        else:
+            # Estratégia 1: PREFIX (caminho rápido, índice ix_tenant_nome_busca)
+            prefix_filter = {**base_filter, 'nome_busca': {'$regex': f'^{q_escaped}'}}
+            prefix_hits = await current_db.students.find(
+                prefix_filter, projection
+            ).limit(limit).to_list(limit)
+
+            used_fallback = False
+            results = list(prefix_hits)
+
+            # Estratégia 2: CONTAINS — restrita: q >= 4 chars E prefix < 3 hits
+            if len(prefix_hits) < 3 and len(q_norm) >= 4:
+                seen_ids = {s.get('id') for s in prefix_hits}
+                contains_filter = {**base_filter, 'nome_busca': {'$regex': q_escaped}}
+                need = limit - len(prefix_hits)
+                contains_hits = await current_db.students.find(
+                    contains_filter, projection
+                ).limit(need + len(seen_ids)).to_list(need + len(seen_ids))
+                for hit in contains_hits:
+                    if hit.get('id') not in seen_ids:
+                        results.append(hit)
+                        if len(results) >= limit:
+                            break
+                used_fallback = True
 
         # Enriquece com nomes (1 query batch cada)
         school_ids = list({s.get('school_id') for s in results if s.get('school_id')})
@@ -1838,11 +1868,14 @@ def setup_students_router(db, audit_service, sandbox_db=None):
                         {"$pull": {"records": {"student_id": student_id}}}
                     )
                 
-                # 2. Deletar notas do aluno nas turmas
+                # 2. Deletar notas do aluno nas turmas (com tombstone para o sync offline)
                 if cancelled_class_ids:
-                    await current_db.grades.delete_many(
-                        {"student_id": student_id, "class_id": {"$in": cancelled_class_ids}}
-                    )
+                    grades_query = {"student_id": student_id, "class_id": {"$in": cancelled_class_ids}}
+                    removed_grades = await current_db.grades.find(
+                        grades_query, {"_id": 0, "id": 1, "mantenedora_id": 1, "class_id": 1}
+                    ).to_list(None)
+                    await current_db.grades.delete_many(grades_query)
+                    await record_tombstones(current_db, 'grades', removed_grades, current_user)
                 
                 # 3. Deletar as matrículas ativas (não apenas marcar como cancelled)
                 await current_db.enrollments.delete_many(
@@ -2018,6 +2051,8 @@ def setup_students_router(db, audit_service, sandbox_db=None):
         )
         
         updated_student = await current_db.students.find_one({"id": student_id}, {"_id": 0})
+        note_student_saved(current_db, updated_student)
+        invalidate_class_rosters([old_class_id, new_class_id], [student_id])
         return Student(**updated_student)
 
     @router.get("/{student_id}/history")
@@ -2138,6 +2173,8 @@ def setup_students_router(db, audit_service, sandbox_db=None):
         await current_db.student_history.insert_one(history_entry)
         
         updated_student = await current_db.students.find_one({"id": student_id}, {"_id": 0})
+        note_student_saved(current_db, updated_student)
+        invalidate_class_rosters([new_class_id], [student_id])
         return {
             "message": "Estudante transferido com sucesso",
             "student": updated_student,
@@ -2259,6 +2296,8 @@ def setup_students_router(db, audit_service, sandbox_db=None):
         )
 
         updated_student = await current_db.students.find_one({"id": student_id}, {"_id": 0})
+        note_student_saved(current_db, updated_student)
+        invalidate_class_rosters([class_id], [student_id])
         return {
             "message": "Transferência cancelada com sucesso. Estudante restaurado na turma de origem.",
             "student": Student(**updated_student).model_dump(),
@@ -2288,6 +2327,9 @@ def setup_students_router(db, audit_service, sandbox_db=None):
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Estudante não encontrado"
             )
+        await record_tombstones(current_db, 'students', [student_doc], current_user)
+        note_student_deleted(current_db, student_doc)
+        invalidate_class_rosters([student_doc.get('class_id')], [student_id])
         
         # Registra auditoria
         school = await current_db.schools.find_one({"id": student_doc.get('school_id')}, {"_id": 0, "name": 1})
@@ -8,10 +8,19 @@ PATCHES DE SEGURANÇA FASE 2:
 - PATCH 2.3: Rate limiting específico
 """
 from fastapi import APIRouter, HTTPException, status, Request
-from typing import List, Optional, Dict, Any
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Callable, List, Optional, Dict, Any, Tuple
 from pydantic import BaseModel
 from datetime import datetime, timezone
+from collections import defaultdict
+import asyncio
+import base64
+import json
 import logging
+import zlib
+
+from pymongo import DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
 
 import uuid
 from tenant_scope import (
@@ -20,6 +29,12 @@ from tenant_scope import (
     get_mantenedora_scope,
     get_user_mantenedora_id,
 )
+from services.sync_tombstones import TOMBSTONE_COLLECTIONS, fetch_deleted_ids, record_tombstones, tombstones_expired
+
+try:  # formato binário opcional do snapshot; sem a lib, só NDJSON
+    import msgpack
+except ImportError:  # pragma: no cover - depende do ambiente
+    msgpack = None
 
 logger = logging.getLogger(__name__)
 
@@ -40,10 +55,20 @@ SENSITIVE_FIELDS = {
     'enrollments': []
 }
 
+# Push em lote (Out/2026): frequências de turma+data DIFERENTES são aplicadas
+# em paralelo pelo motor canônico, até este limite (mesma turma+data: em série).
+SYNC_ATTENDANCE_CONCURRENCY = 4
+
 # PATCH 2.2: Limites de paginação
 DEFAULT_PAGE_SIZE = 100
 MAX_PAGE_SIZE = 500
 
+# Pull por cursor (Out/2026): keyset em (updated_at, id) — ver SYNC_KEYSET_SORT.
+SYNC_TOKEN_VERSION = 1
+# Snapshot NDJSON da turma: registros lidos do Mongo por vez (memória limitada).
+SNAPSHOT_BATCH_SIZE = 500
+SNAPSHOT_COLLECTIONS = ('students', 'grades', 'attendance')
+
 # ============= MODELOS PYDANTIC =============
 
 class SyncOperation(BaseModel):
@@ -90,6 +115,9 @@ class SyncPullRequest(BaseModel):
     # PATCH 2.2: Parâmetros de paginação
     page: Optional[int] = 1  # Página atual (começa em 1)
     pageSize: Optional[int] = DEFAULT_PAGE_SIZE  # Itens por página
+    # Out/2026: pull por cursor. Presente (mesmo `{}`) → modo keyset; o valor
+    # de cada coleção é o `nextCursor` recebido (ausente/None = início).
+    cursors: Optional[Dict[str, Optional[str]]] = None
 
 class SyncPullResponse(BaseModel):
     """Response do endpoint de pull"""
@@ -98,6 +126,8 @@ class SyncPullResponse(BaseModel):
     counts: Dict[str, int]
     # PATCH 2.2: Informações de paginação
     pagination: Optional[Dict[str, Any]] = None
+    # Out/2026: ids apagados no servidor desde o último sync (tombstones)
+    deleted: Optional[Dict[str, List[str]]] = None
 
 
 def setup_sync_router(db, auth_middleware, limiter=None):
@@ -123,26 +153,11 @@ def setup_sync_router(db, auth_middleware, limiter=None):
                 detail=f"Máximo de {MAX_OPERATIONS_PER_REQUEST} operações por requisição. Envie em lotes menores."
             )
         
-        results = []
-        succeeded = 0
-        failed = 0
-        
-        for op in body.operations:
-            try:
-                result = await process_sync_operation(db, current_user, op, request)
-                results.append(result)
-                if result.success:
-                    succeeded += 1
-                else:
-                    failed += 1
-            except Exception as e:
-                logger.error(f"[Sync] Erro ao processar operação {op.recordId}: {e}")
-                results.append(SyncPushResult(
-                    recordId=op.recordId,
-                    success=False,
-                    error=str(e)
-                ))
-                failed += 1
+        # Out/2026: pipeline em lote (prefetch + bulk_write); mesma lista de
+        # resultados, na mesma ordem das operações recebidas.
+        results = await process_sync_batch(db, current_user, body.operations, request)
+        succeeded = sum(1 for r in results if r.success)
+        failed = len(results) - succeeded
         
         return SyncPushResponse(
             processed=len(body.operations),
@@ -159,8 +174,17 @@ def setup_sync_router(db, auth_middleware, limiter=None):
         
         PATCH 2.1: Campos sensíveis são filtrados automaticamente
         PATCH 2.2: Suporta paginação para evitar sobrecarga
+
+        Out/2026 — modo cursor (`cursors` no body): páginas por keyset em
+        (updated_at, id), sem skip nem count por página, e cada coleção devolve
+        um `nextCursor` opaco. Com `hasMore=false` o cursor vira o token de
+        mudanças do próximo sync incremental (substitui o `lastSync`). O modo
+        page/pageSize continua igual para clientes antigos.
         """
         current_user = await auth_middleware.get_current_user(request)
+        # Início da leitura: o próximo delta parte daqui, então nada gravado
+        # durante o pull fica para trás.
+        synced_at = datetime.now(timezone.utc).isoformat()
         
         # PATCH 2.2: Validar e limitar tamanho da página
         page = max(1, body.page or 1)
@@ -173,41 +197,81 @@ def setup_sync_router(db, auth_middleware, limiter=None):
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Máximo de {MAX_COLLECTIONS_PER_REQUEST} coleções por requisição."
             )
+
+        keyset_mode = body.cursors is not None
+        resume = {}
+        if keyset_mode:
+            for collection in body.collections:
+                try:
+                    resume[collection] = resume_sync_state(
+                        body.cursors.get(collection), collection, body.classId, body.academicYear,
+                        body.lastSync, synced_at,
+                    )
+                except ValueError as e:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Cursor inválido para {collection}: {e}"
+                    )
         
         data = {}
         counts = {}
         pagination_info = {}
+        deleted = {}
         
         for collection in body.collections:
             try:
-                # PATCH 2.2: Busca com paginação
-                collection_data, total_count = await fetch_collection_data_paginated(
-                    db, 
-                    current_user, 
-                    collection, 
-                    body.classId, 
-                    body.academicYear,
-                    body.lastSync,
-                    page,
-                    page_size,
-                    request
-                )
+                if keyset_mode:
+                    state = resume[collection]
+                    deleted_ids, reset = await _pull_tombstones(
+                        db, current_user, request, collection, state, body.classId
+                    )
+                    collection_data, position, has_more = await fetch_sync_page(
+                        db, current_user, collection, body.classId, body.academicYear,
+                        state, page_size, request
+                    )
+                    next_state = dict(state, **position) if has_more else dict(state, s=state['t'], k=None, p=None)
+                    pagination_info[collection] = {
+                        "pageSize": page_size,
+                        "hasMore": has_more,
+                        "nextCursor": encode_sync_token(next_state),
+                        "resetRequired": reset,
+                    }
+                else:
+                    # PATCH 2.2: Busca com paginação
+                    collection_data, total_count = await fetch_collection_data_paginated(
+                        db, 
+                        current_user, 
+                        collection, 
+                        body.classId, 
+                        body.academicYear,
+                        body.lastSync,
+                        page,
+                        page_size,
+                        request
+                    )
+                    deleted_ids = []
+                    if page == 1 and body.lastSync:
+                        deleted_ids, _ = await _pull_tombstones(
+                            db, current_user, request, collection, {'s': body.lastSync}, body.classId
+                        )
+                    
+                    # PATCH 2.2: Informações de paginação por coleção
+                    total_pages = (total_count + page_size - 1) // page_size if total_count > 0 else 1
+                    pagination_info[collection] = {
+                        "page": page,
+                        "pageSize": page_size,
+                        "totalItems": total_count,
+                        "totalPages": total_pages,
+                        "hasMore": page < total_pages
+                    }
                 
                 # PATCH 2.1: Filtrar campos sensíveis
                 filtered_data = filter_sensitive_fields(collection_data, collection)
                 
                 data[collection] = filtered_data
                 counts[collection] = len(filtered_data)
-                
-                # PATCH 2.2: Informações de paginação por coleção
-                total_pages = (total_count + page_size - 1) // page_size if total_count > 0 else 1
-                pagination_info[collection] = {
-                    "page": page,
-                    "pageSize": page_size,
-                    "totalItems": total_count,
-                    "totalPages": total_pages,
-                    "hasMore": page < total_pages
-                }
+                if deleted_ids:
+                    deleted[collection] = deleted_ids
                 
             except Exception as e:
                 logger.error(f"[Sync] Erro ao buscar {collection}: {e}")
@@ -217,10 +281,66 @@ def setup_sync_router(db, auth_middleware, limiter=None):
         
         return SyncPullResponse(
             data=data,
-            syncedAt=datetime.now(timezone.utc).isoformat(),
+            syncedAt=synced_at,
             counts=counts,
-            pagination=pagination_info
+            pagination=pagination_info,
+            deleted=deleted
         )
+
+    @router.get("/classes/{class_id}/snapshot")
+    async def sync_class_snapshot(
+        request: Request,
+        class_id: str,
+        collections: str = ','.join(SNAPSHOT_COLLECTIONS),
+        academicYear: Optional[str] = None,
+        format: str = 'ndjson',
+    ):
+        """Sincronização inicial completa de uma turma em streaming (Out/2026).
+
+        Uma linha por registro (`{"type": "record", "collection", "data"}`),
+        lida do Mongo em lotes por keyset — o servidor nunca monta a turma
+        inteira em memória e o cliente grava no IndexedDB conforme chega. A
+        última linha (`type=end`) traz o `cursors` de cada coleção para os
+        pulls incrementais seguintes. `format=msgpack` troca o JSON por
+        objetos MessagePack concatenados (se a lib estiver instalada); gzip
+        quando o cliente envia `Accept-Encoding: gzip`.
+        """
+        current_user = await auth_middleware.get_current_user(request)
+        synced_at = datetime.now(timezone.utc).isoformat()
+
+        wanted = [c.strip() for c in collections.split(',') if c.strip()]
+        invalid = [c for c in wanted if c not in SNAPSHOT_COLLECTIONS]
+        if not wanted or invalid:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Coleções suportadas no snapshot: {', '.join(SNAPSHOT_COLLECTIONS)}"
+            )
+        if format == 'msgpack':
+            if msgpack is None:
+                raise HTTPException(
+                    status_code=status.HTTP_406_NOT_ACCEPTABLE,
+                    detail="Formato msgpack indisponível neste servidor; use format=ndjson."
+                )
+            encode, media_type = _encode_msgpack, 'application/x-msgpack'
+        elif format == 'ndjson':
+            encode, media_type = _encode_ndjson, 'application/x-ndjson'
+        else:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="format deve ser ndjson ou msgpack")
+
+        class_doc = await db.classes.find_one(
+            apply_tenant_filter({'id': class_id}, current_user, request), {'_id': 0, 'id': 1}
+        )
+        if not class_doc:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Turma não encontrada")
+
+        stream = stream_class_snapshot(
+            db, current_user, request, class_id, academicYear, wanted, synced_at, encode
+        )
+        headers = {'Cache-Control': 'no-store', 'Vary': 'Accept-Encoding'}
+        if 'gzip' in (request.headers.get('accept-encoding') or '').lower():
+            stream = _gzip_stream(stream)
+            headers['Content-Encoding'] = 'gzip'
+        return StreamingResponse(stream, media_type=media_type, headers=headers)
     
     @router.get("/status")
     async def sync_status(request: Request):
@@ -395,12 +515,14 @@ async def process_sync_operation(db, user, op: SyncOperation, request: Request =
         elif operation == 'delete':
             # Escopo de tenant: só remove registro da mantenedora ativa
             tenant_filter = apply_tenant_filter({'id': record_id}, user, request)
-            result = await collection.delete_one(tenant_filter)
+            removed = await collection.find_one_and_delete(tenant_filter, _TOMBSTONE_PROJECTION)
+            if removed:
+                await record_tombstones(db, collection_name, [removed], user)
             
             return SyncPushResult(
                 recordId=record_id,
-                success=True if result.deleted_count > 0 else False,
-                error=None if result.deleted_count > 0 else "Registro não encontrado"
+                success=True if removed else False,
+                error=None if removed else "Registro não encontrado"
             )
             
         else:
@@ -419,6 +541,232 @@ async def process_sync_operation(db, user, op: SyncOperation, request: Request =
         )
 
 
+async def process_sync_batch(db, user, operations: List[SyncOperation], request: Request = None) -> List[SyncPushResult]:
+    """Processa um push inteiro em lote (Out/2026) — mesmo resultado de chamar
+    `process_sync_operation` para cada operação, em ordem.
+
+    - attendance: motor canônico, uma chamada por chave natural (turma+data+
+      componente+período+aula). Edições repetidas da mesma aula convergem para
+      a ÚLTIMA (o motor é idempotente/last-write-wins); as anteriores recebem
+      o resultado dela. Chaves diferentes rodam em paralelo (limitado).
+    - grades/students: 1 query de existência (update/delete), 1 por coleção
+      pai para o tenant dos creates e 1 `bulk_write` por coleção — ordenado
+      só quando o mesmo registro aparece mais de uma vez no lote.
+    - operações interceptadas por adaptadores (`register_push_interceptor`,
+      ex.: notas DVD do professor) seguem 1 a 1 por `process_sync_operation`.
+    """
+    results: List[Optional[SyncPushResult]] = [None] * len(operations)
+
+    attendance_ops = []
+    by_collection: Dict[str, List[Tuple[int, SyncOperation]]] = defaultdict(list)
+    serial_ops: List[Tuple[int, SyncOperation]] = []
+    for i, op in enumerate(operations):
+        if op.collection == 'attendance':
+            attendance_ops.append((i, op))
+        elif _push_intercepted(user, op):
+            serial_ops.append((i, op))
+        elif op.collection not in _SYNC_WRITE_COLLECTIONS:
+            results[i] = SyncPushResult(recordId=op.recordId, success=False,
+                                        error=f"Coleção desconhecida: {op.collection}")
+        elif op.operation not in ('create', 'update', 'delete'):
+            results[i] = SyncPushResult(recordId=op.recordId, success=False,
+                                        error=f"Operação desconhecida: {op.operation}")
+        else:
+            by_collection[op.collection].append((i, op))
+
+    if attendance_ops:
+        await _apply_attendance_batch(db, user, request, attendance_ops, results)
+    for i, op in serial_ops:
+        # Nome do módulo resolvido na chamada → passa pelos wrappers instalados.
+        results[i] = await process_sync_operation(db, user, op, request)
+    for collection_name, ops in by_collection.items():
+        try:
+            await _apply_collection_batch(db, user, request, collection_name, ops, results)
+        except Exception as e:
+            logger.error(f"[Sync] Erro no lote de {collection_name}: {e}")
+            for i, op in ops:
+                if results[i] is None:
+                    results[i] = SyncPushResult(recordId=op.recordId, success=False, error=str(e))
+    return results
+
+
+_SYNC_WRITE_COLLECTIONS = ('grades', 'students')
+# Campos copiados para o tombstone de uma exclusão (services/sync_tombstones.py).
+_TOMBSTONE_PROJECTION = {'_id': 0, 'id': 1, 'mantenedora_id': 1, 'class_id': 1}
+
+# Adaptadores (DVD) que envolvem `process_sync_operation` declaram aqui quais
+# operações interceptam; essas seguem 1 a 1 pelo wrapper, fora do bulk. Se o
+# wrapper existir sem nenhum predicado registrado, TUDO segue 1 a 1 (fail-closed).
+_process_sync_operation_base = process_sync_operation
+_push_interceptors: List[Callable[[dict, SyncOperation], bool]] = []
+
+
+def register_push_interceptor(predicate: Callable[[dict, SyncOperation], bool]) -> None:
+    """Registra `predicate(user, op)` → True se o wrapper do adaptador trata a operação."""
+    _push_interceptors.append(predicate)
+
+
+def _push_intercepted(user: dict, op: SyncOperation) -> bool:
+    if process_sync_operation is _process_sync_operation_base:
+        return False
+    if not _push_interceptors:
+        return True
+    return any(predicate(user, op) for predicate in _push_interceptors)
+
+
+def _attendance_key(data: dict) -> tuple:
+    """Chave natural normalizada como a query de `save_attendance_canonical`.
+
+    `course_id` vazio e `period == 'regular'` ficam fora da query; `aula_numero`
+    só conta em anos finais (a turma não é lida aqui), então entra sempre —
+    a chave fica mais fina que a do motor, nunca mais grossa.
+    """
+    period = data.get('period') or 'regular'
+    return (data.get('class_id'), data.get('date'), data.get('course_id') or None,
+            None if period == 'regular' else period, data.get('aula_numero'))
+
+
+async def _apply_attendance_batch(db, user, request, ops: List[Tuple[int, SyncOperation]],
+                                  results: List[Optional[SyncPushResult]]) -> None:
+    def _has_records(op: SyncOperation) -> bool:
+        return any(r.get('student_id') and r.get('status') for r in ((op.data or {}).get('records') or []))
+
+    # Última operação VÁLIDA de cada chave natural; as anteriores são superadas.
+    last_by_key: Dict[tuple, int] = {}
+    for pos, (_, op) in enumerate(ops):
+        if _has_records(op):
+            last_by_key[_attendance_key(op.data or {})] = pos
+    superseded: Dict[int, int] = {}
+    # A query do motor casa por prefixo (sem course_id pega qualquer componente;
+    # sem aula_numero fora dos anos finais): chaves diferentes da mesma turma+dia
+    # podem cair no mesmo documento. Essas seguem em série, na ordem recebida.
+    groups: Dict[tuple, List[int]] = defaultdict(list)
+    for pos, (_, op) in enumerate(ops):
+        data = op.data or {}
+        winner = last_by_key.get(_attendance_key(data)) if _has_records(op) else None
+        if winner is not None and winner != pos:
+            superseded[pos] = winner
+        groups[(data.get('class_id'), data.get('date'))].append(pos)
+
+    sem = asyncio.Semaphore(SYNC_ATTENDANCE_CONCURRENCY)
+
+    async def _apply(pos: int) -> None:
+        i, op = ops[pos]
+        results[i] = await _sync_attendance_canonical(db, user, request, op.recordId, op.data or {})
+
+    async def _apply_group(positions: List[int]) -> None:
+        async with sem:
+            for pos in positions:
+                if pos not in superseded:
+                    await _apply(pos)
+            for pos in positions:
+                if pos not in superseded:
+                    continue
+                i, op = ops[pos]
+                applied = results[ops[superseded[pos]][0]]
+                if applied.success:
+                    results[i] = SyncPushResult(recordId=op.recordId, success=True, serverId=applied.serverId)
+                else:
+                    # A vencedora falhou (trava, validação): esta vale por si só.
+                    await _apply(pos)
+
+    await asyncio.gather(*(_apply_group(positions) for positions in groups.values()))
+
+
+async def _apply_collection_batch(db, user, request, collection_name: str,
+                                  ops: List[Tuple[int, SyncOperation]],
+                                  results: List[Optional[SyncPushResult]]) -> None:
+    collection = db[collection_name]
+    now = datetime.now(timezone.utc).isoformat()
+
+    # 1. Existência dos alvos de update/delete — uma query, já com escopo de tenant.
+    target_ids = sorted({op.recordId for _, op in ops if op.operation in ('update', 'delete')})
+    existing = set()
+    targets: Dict[str, dict] = {}
+    if target_ids:
+        q = apply_tenant_filter({'id': {'$in': target_ids}}, user, request)
+        async for d in collection.find(q, _TOMBSTONE_PROJECTION):
+            existing.add(d['id'])
+            targets[d['id']] = d
+
+    # 2. Tenant dos creates — mesma ordem de `resolve_tenant_id_for_create`
+    #    (scope → turma → estudante), com as coleções pai lidas em bulk.
+    scope = get_mantenedora_scope(user, request)
+    cleaned = {i: clean_sync_data(op.data or {}) for i, op in ops if op.operation == 'create'}
+    tenant_by_class: Dict[str, str] = {}
+    tenant_by_student: Dict[str, str] = {}
+    if cleaned and not scope:
+        for parent, field, target in (('classes', 'class_id', tenant_by_class),
+                                      ('students', 'student_id', tenant_by_student)):
+            ids = sorted({c[field] for c in cleaned.values() if c.get(field)})
+            if ids:
+                async for d in db[parent].find({'id': {'$in': ids}}, {'_id': 0, 'id': 1, 'mantenedora_id': 1}):
+                    if d.get('mantenedora_id'):
+                        target[d['id']] = d['mantenedora_id']
+
+    # 3. Validação em memória, na ordem recebida (create → update → delete do
+    #    mesmo registro no mesmo lote funciona como no processamento 1 a 1).
+    writes: List[Tuple[int, Any, SyncPushResult, str]] = []
+    for i, op in ops:
+        if op.operation == 'create':
+            clean_data = cleaned[i]
+            server_id = str(uuid.uuid4()) if op.recordId.startswith('temp_') else op.recordId
+            clean_data['id'] = server_id
+            tenant_id = scope or tenant_by_class.get(clean_data.get('class_id')) \
+                or tenant_by_student.get(clean_data.get('student_id'))
+            if not tenant_id:
+                results[i] = SyncPushResult(recordId=op.recordId, success=False,
+                                            error="Não foi possível determinar a mantenedora do registro")
+                continue
+            clean_data['mantenedora_id'] = tenant_id
+            clean_data['created_at'] = now
+            clean_data['created_by'] = user['id']
+            writes.append((i, InsertOne(clean_data),
+                           SyncPushResult(recordId=op.recordId, success=True, serverId=server_id), server_id))
+            existing.add(server_id)
+            targets[server_id] = clean_data
+        elif op.recordId not in existing:
+            error = "Registro não encontrado no servidor" if op.operation == 'update' else "Registro não encontrado"
+            results[i] = SyncPushResult(recordId=op.recordId, success=False, error=error)
+        elif op.operation == 'update':
+            clean_data = clean_sync_data(op.data or {})
+            clean_data['updated_at'] = now
+            clean_data['updated_by'] = user['id']
+            writes.append((i, UpdateOne(apply_tenant_filter({'id': op.recordId}, user, request), {'$set': clean_data}),
+                           SyncPushResult(recordId=op.recordId, success=True, serverId=op.recordId), op.recordId))
+        else:
+            writes.append((i, DeleteOne(apply_tenant_filter({'id': op.recordId}, user, request)),
+                           SyncPushResult(recordId=op.recordId, success=True), op.recordId))
+            existing.discard(op.recordId)
+
+    if not writes:
+        return
+
+    # 4. Aplicação. Ordenado só se algum registro tem mais de uma operação.
+    touched = [w[3] for w in writes]
+    ordered = len(set(touched)) != len(touched)
+    failed_at: Dict[int, str] = {}
+    op_at = dict(ops)
+    try:
+        await collection.bulk_write([w[1] for w in writes], ordered=ordered)
+    except BulkWriteError as e:
+        for err in e.details.get('writeErrors', []):
+            failed_at[err['index']] = err.get('errmsg') or 'Erro de escrita'
+    removed = []
+    for pos, (i, write, ok, record_id) in enumerate(writes):
+        if pos in failed_at:
+            results[i] = SyncPushResult(recordId=ok.recordId, success=False, error=failed_at[pos])
+        elif ordered and failed_at and pos > min(failed_at):
+            # Lote ordenado parou no 1º erro: o restante segue 1 a 1.
+            results[i] = await process_sync_operation(db, user, op_at[i], request)
+        else:
+            results[i] = ok
+            if isinstance(write, DeleteOne):
+                removed.append(targets.get(record_id) or {'id': record_id})
+    if removed:
+        await record_tombstones(db, collection_name, removed, user)
+
+
 async def _sync_attendance_canonical(db, user, request, record_id: str, data: dict) -> SyncPushResult:
     """Aplica uma frequência offline via motor canônico de frequência.
 
@@ -533,28 +881,24 @@ def filter_sensitive_fields(data: List[Dict[str, Any]], collection: str) -> List
     return filtered
 
 
-# PATCH 2.2: Função de busca com paginação
-async def fetch_collection_data_paginated(
-    db, 
-    user, 
-    collection: str, 
+_ADMIN_ROLES = ['admin', 'admin_teste', 'super_admin', 'gerente']
+
+
+async def _pull_query(
+    db,
+    user,
+    collection: str,
     class_id: Optional[str],
     academic_year: Optional[str],
     last_sync: Optional[str],
-    page: int = 1,
-    page_size: int = DEFAULT_PAGE_SIZE,
     request: Request = None
 ) -> tuple:
-    """
-    Busca dados de uma coleção para sincronização com paginação.
-    Retorna tupla (dados, total_count) para suportar paginação.
-    
-    PATCH 2.2: Implementa paginação para evitar sobrecarga de memória.
+    """(collection do Mongo, query) do pull de `collection`, já com escopo de
+    tenant; (None, None) para coleção desconhecida.
+
     G3 (Jun/2026): TODAS as coleções filtradas por mantenedora ativa (tenant).
     """
-    
     query = {}
-    skip = (page - 1) * page_size
     
     # Filtros comuns
     if class_id:
@@ -564,26 +908,14 @@ async def fetch_collection_data_paginated(
     
     # Delta sync - apenas registros modificados após última sincronização
     if last_sync:
-        try:
-            query['$or'] = [
-                {'created_at': {'$gte': last_sync}},
-                {'updated_at': {'$gte': last_sync}}
-            ]
-        except Exception:
-            pass  # Ignora se formato de data inválido
+        query['$or'] = [
+            {'created_at': {'$gte': last_sync}},
+            {'updated_at': {'$gte': last_sync}}
+        ]
     
     # Busca baseada na coleção (sempre com escopo de tenant)
-    if collection == 'grades':
-        q = apply_tenant_filter(query, user, request)
-        total = await db.grades.count_documents(q)
-        cursor = db.grades.find(q, {'_id': 0}).skip(skip).limit(page_size)
-        return await cursor.to_list(page_size), total
-        
-    elif collection == 'attendance':
-        q = apply_tenant_filter(query, user, request)
-        total = await db.attendance.count_documents(q)
-        cursor = db.attendance.find(q, {'_id': 0}).skip(skip).limit(page_size)
-        return await cursor.to_list(page_size), total
+    if collection in ('grades', 'attendance'):
+        return db[collection], apply_tenant_filter(query, user, request)
         
     elif collection == 'students':
         student_query = {}
@@ -597,10 +929,7 @@ async def fetch_collection_data_paginated(
             student_ids = [e['student_id'] for e in enrollments]
             student_query['id'] = {'$in': student_ids}
         
-        student_query = apply_tenant_filter(student_query, user, request)
-        total = await db.students.count_documents(student_query)
-        cursor = db.students.find(student_query, {'_id': 0}).skip(skip).limit(page_size)
-        return await cursor.to_list(page_size), total
+        return db.students, apply_tenant_filter(student_query, user, request)
         
     elif collection == 'classes':
         class_query = {}
@@ -608,41 +937,300 @@ async def fetch_collection_data_paginated(
             class_query['academic_year'] = academic_year
             
         # Filtra por escolas do usuário se não for admin
-        if user['role'] not in ['admin', 'admin_teste', 'super_admin', 'gerente'] and user.get('school_ids'):
+        if user['role'] not in _ADMIN_ROLES and user.get('school_ids'):
             class_query['school_id'] = {'$in': user['school_ids']}
         
-        class_query = apply_tenant_filter(class_query, user, request)
-        total = await db.classes.count_documents(class_query)
-        cursor = db.classes.find(class_query, {'_id': 0}).skip(skip).limit(page_size)
-        return await cursor.to_list(page_size), total
+        return db.classes, apply_tenant_filter(class_query, user, request)
         
     elif collection == 'courses':
         course_query = {}
         
         # Filtra por escolas do usuário se não for admin
-        if user['role'] not in ['admin', 'admin_teste', 'super_admin', 'gerente'] and user.get('school_ids'):
+        if user['role'] not in _ADMIN_ROLES and user.get('school_ids'):
             course_query['school_id'] = {'$in': user['school_ids']}
         
-        course_query = apply_tenant_filter(course_query, user, request)
-        total = await db.courses.count_documents(course_query)
-        cursor = db.courses.find(course_query, {'_id': 0}).skip(skip).limit(page_size)
-        return await cursor.to_list(page_size), total
+        return db.courses, apply_tenant_filter(course_query, user, request)
         
     elif collection == 'schools':
         school_query = {}
         
         # Filtra por escolas do usuário se não for admin
-        if user['role'] not in ['admin', 'admin_teste', 'super_admin', 'gerente'] and user.get('school_ids'):
+        if user['role'] not in _ADMIN_ROLES and user.get('school_ids'):
             school_query['id'] = {'$in': user['school_ids']}
         
-        school_query = apply_tenant_filter(school_query, user, request)
-        total = await db.schools.count_documents(school_query)
-        cursor = db.schools.find(school_query, {'_id': 0}).skip(skip).limit(page_size)
-        return await cursor.to_list(page_size), total
+        return db.schools, apply_tenant_filter(school_query, user, request)
+    
+    return None, None
+
+
+# PATCH 2.2: Função de busca com paginação
+async def fetch_collection_data_paginated(
+    db, 
+    user, 
+    collection: str, 
+    class_id: Optional[str],
+    academic_year: Optional[str],
+    last_sync: Optional[str],
+    page: int = 1,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    request: Request = None
+) -> tuple:
+    """
+    Busca dados de uma coleção para sincronização com paginação.
+    Retorna tupla (dados, total_count) para suportar paginação.
     
-    else:
+    PATCH 2.2: Implementa paginação para evitar sobrecarga de memória.
+    Out/2026: mantida para clientes no modo page/pageSize; o modo cursor usa
+    `fetch_collection_page_keyset` (sem skip nem count).
+    """
+    coll, q = await _pull_query(db, user, collection, class_id, academic_year, last_sync, request)
+    if coll is None:
         logger.warning(f"[Sync] Coleção desconhecida para pull: {collection}")
         return [], 0
+    skip = (page - 1) * page_size
+    total = await coll.count_documents(q)
+    cursor = coll.find(q, {'_id': 0}).skip(skip).limit(page_size)
+    return await cursor.to_list(page_size), total
+
+
+# ============= PULL POR CURSOR (Out/2026) =============
+#
+# Ordem total e estável: (updated_at, id). Registros sem `updated_at` (nunca
+# editados) vêm primeiro — o Mongo ordena null/ausente antes de strings. Um
+# registro editado durante a paginação "pula" para o fim e é entregue de novo
+# (nunca perdido); um criado durante ela tem `created_at` >= início da sessão
+# e entra no delta seguinte.
+
+SYNC_KEYSET_SORT = [('updated_at', 1), ('id', 1)]
+
+
+def _keyset_after(key: List[Optional[str]]) -> dict:
+    """Filtro "depois de (updated_at, id)" na ordem de SYNC_KEYSET_SORT."""
+    updated_at, record_id = key
+    if updated_at is None:
+        return {'$or': [
+            {'updated_at': None, 'id': {'$gt': record_id}},
+            {'updated_at': {'$ne': None}},
+        ]}
+    return {'$or': [
+        {'updated_at': {'$gt': updated_at}},
+        {'updated_at': updated_at, 'id': {'$gt': record_id}},
+    ]}
+
+
+async def fetch_collection_page_keyset(
+    db,
+    user,
+    collection: str,
+    class_id: Optional[str],
+    academic_year: Optional[str],
+    since: Optional[str],
+    after: Optional[List[Optional[str]]],
+    limit: int = DEFAULT_PAGE_SIZE,
+    request: Request = None
+) -> tuple:
+    """Uma página do pull por keyset: (dados, chave do último, hasMore).
+
+    Lê `limit + 1` para saber se há próxima página — sem `count_documents`.
+    """
+    coll, q = await _pull_query(db, user, collection, class_id, academic_year, since, request)
+    if coll is None:
+        logger.warning(f"[Sync] Coleção desconhecida para pull: {collection}")
+        return [], None, False
+    if after:
+        q = {'$and': [q, _keyset_after(after)]}
+    docs = await coll.find(q, {'_id': 0}).sort(SYNC_KEYSET_SORT).limit(limit + 1).to_list(limit + 1)
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    next_key = [docs[-1].get('updated_at'), docs[-1].get('id')] if docs else after
+    return docs, next_key, has_more
+
+
+# Adaptadores (DVD) que envolvem `fetch_collection_data_paginated` com
+# regras próprias (ex.: notas/frequência do professor por vínculo) declaram
+# aqui o que interceptam. Essas coleções continuam paginando pelo wrapper
+# (offset guardado no cursor) — o keyset direto ignoraria o filtro deles.
+_fetch_collection_data_paginated_base = fetch_collection_data_paginated
+_pull_interceptors: List[Callable[[dict, str, Optional[str]], bool]] = []
+
+
+def register_pull_interceptor(predicate: Callable[[dict, str, Optional[str]], bool]) -> None:
+    """Registra `predicate(user, collection, class_id)` → True se o wrapper trata o pull."""
+    _pull_interceptors.append(predicate)
+
+
+def _pull_intercepted(user: dict, collection: str, class_id: Optional[str]) -> bool:
+    if fetch_collection_data_paginated is _fetch_collection_data_paginated_base:
+        return False
+    if not _pull_interceptors:
+        return True
+    return any(predicate(user, collection, class_id) for predicate in _pull_interceptors)
+
+
+async def fetch_sync_page(
+    db,
+    user,
+    collection: str,
+    class_id: Optional[str],
+    academic_year: Optional[str],
+    state: dict,
+    limit: int,
+    request: Request = None
+) -> tuple:
+    """Próxima página do pull por cursor: (dados, posição seguinte, hasMore).
+
+    A posição é `{'k': chave}` no keyset ou `{'p': página}` quando um
+    adaptador intercepta a coleção.
+    """
+    if _pull_intercepted(user, collection, class_id):
+        page = state.get('p') or 1
+        docs, total = await fetch_collection_data_paginated(
+            db, user, collection, class_id, academic_year, state.get('s'), page, limit, request
+        )
+        has_more = page * limit < total
+        return docs, {'k': None, 'p': page + 1}, has_more
+    docs, next_key, has_more = await fetch_collection_page_keyset(
+        db, user, collection, class_id, academic_year, state.get('s'), state.get('k'), limit, request
+    )
+    return docs, {'k': next_key, 'p': None}, has_more
+
+
+def encode_sync_token(state: dict) -> str:
+    """Cursor opaco (base64url de JSON). Não é segredo: o escopo de tenant é
+    sempre reaplicado no servidor, o cursor só diz ONDE continuar."""
+    raw = json.dumps(dict(state, v=SYNC_TOKEN_VERSION), separators=(',', ':'), sort_keys=True)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_sync_token(token: str) -> dict:
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError("formato não reconhecido")
+    if not isinstance(state, dict) or state.get('v') != SYNC_TOKEN_VERSION:
+        raise ValueError("versão não suportada")
+    key, page = state.get('k'), state.get('p')
+    if key is not None and not (isinstance(key, list) and len(key) == 2 and isinstance(key[1], str)):
+        raise ValueError("posição inválida")
+    if page is not None and not (isinstance(page, int) and page >= 1):
+        raise ValueError("posição inválida")
+    return state
+
+
+def resume_sync_state(
+    token: Optional[str],
+    collection: str,
+    class_id: Optional[str],
+    academic_year: Optional[str],
+    last_sync: Optional[str],
+    now: str,
+) -> dict:
+    """Estado de pull de uma coleção a partir do cursor recebido.
+
+    c/f: coleção e filtros a que o cursor pertence (usar com outros → erro);
+    s: delta desde (None = completo); t: início da sessão de paginação —
+    vira o `s` do próximo sync quando a sessão termina; k/p: última chave
+    entregue / próxima página (ambos None = começo de uma sessão).
+    """
+    filters = [class_id, academic_year]
+    if not token:
+        return {'c': collection, 'f': filters, 's': last_sync, 't': now, 'k': None, 'p': None}
+    state = decode_sync_token(token)
+    if state.get('c') != collection or state.get('f') != filters:
+        raise ValueError("cursor emitido para outra coleção ou outros filtros")
+    if state.get('k') is None and state.get('p') is None:
+        # Token de mudanças de uma sessão concluída → nova sessão incremental.
+        state['t'] = now
+    return {k: state.get(k) for k in ('c', 'f', 's', 't', 'k', 'p')}
+
+
+async def _pull_tombstones(db, user, request, collection: str, state: dict,
+                           class_id: Optional[str] = None) -> Tuple[List[str], bool]:
+    """Ids apagados desde `state['s']`, só no início de uma sessão (pull por
+    turma: só os tombstones daquela turma).
+
+    Se o período passou da retenção dos tombstones (ou tem exclusões demais
+    para uma resposta), o estado é rebaixado para sync completo (`s=None`) e
+    o retorno sinaliza `resetRequired`: o cliente limpa a coleção local e
+    recebe tudo de novo.
+    """
+    since = state.get('s')
+    if not since or state.get('k') is not None or state.get('p') is not None \
+            or collection not in TOMBSTONE_COLLECTIONS:
+        return [], False
+    if tombstones_expired(since):
+        state['s'] = None
+        return [], True
+    ids, truncated = await fetch_deleted_ids(db, collection, since, apply_tenant_filter({}, user, request),
+                                             class_id=class_id)
+    if truncated:
+        state['s'] = None
+        return [], True
+    return ids, False
+
+
+# ============= SNAPSHOT EM STREAMING (Out/2026) =============
+
+def _encode_ndjson(obj: dict) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+
+
+def _encode_msgpack(obj: dict) -> bytes:
+    return msgpack.packb(obj, default=str, use_bin_type=True)
+
+
+async def stream_class_snapshot(
+    db,
+    user,
+    request,
+    class_id: str,
+    academic_year: Optional[str],
+    collections: List[str],
+    synced_at: str,
+    encode: Callable[[dict], bytes],
+) -> AsyncIterator[bytes]:
+    """Snapshot completo da turma, um pedaço de bytes por lote do keyset.
+
+    Erro no meio do stream (status 200 já enviado) vira uma linha
+    `type=error` — o cliente descarta o snapshot incompleto.
+    """
+    yield encode({'type': 'header', 'classId': class_id, 'academicYear': academic_year,
+                  'syncedAt': synced_at, 'collections': collections})
+    cursors: Dict[str, str] = {}
+    counts: Dict[str, int] = {}
+    try:
+        for collection in collections:
+            state, total = {'s': None, 'k': None, 'p': None}, 0
+            while True:
+                docs, position, has_more = await fetch_sync_page(
+                    db, user, collection, class_id, academic_year, state, SNAPSHOT_BATCH_SIZE, request
+                )
+                state.update(position)
+                rows = filter_sensitive_fields(docs, collection)
+                if rows:
+                    yield b''.join(encode({'type': 'record', 'collection': collection, 'data': d}) for d in rows)
+                total += len(rows)
+                if not has_more:
+                    break
+            counts[collection] = total
+            cursors[collection] = encode_sync_token(
+                {'c': collection, 'f': [class_id, academic_year], 's': synced_at, 't': None, 'k': None, 'p': None}
+            )
+    except Exception as e:
+        logger.error(f"[Sync] Erro no snapshot da turma {class_id}: {e}")
+        yield encode({'type': 'error', 'error': str(e)})
+        return
+    yield encode({'type': 'end', 'syncedAt': synced_at, 'counts': counts, 'cursors': cursors})
+
+
+async def _gzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
 
 
 # Mantém função antiga para compatibilidade (deprecated)
@@ -11,16 +11,17 @@ from typing import List, Optional
 
 from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel, Field
-from pymongo import InsertOne
 
 from auth_middleware import AuthMiddleware
-from scripts.text_improvement import (
-    CONTENT_FIELDS_BY_COLLECTION,
-    _build_queue_item,
-    detect_format_issues,
-    detect_spelling_issues,
-    should_skip_format,
-    should_skip_spelling,
+from scripts.text_improvement import CONTENT_FIELDS_BY_COLLECTION
+from services.text_scan import (
+    SCANS_COLLECTION,
+    create_scan,
+    is_resumable,
+    public_scan,
+    resume_scan,
+    run_scan_job,
+    start_scan_job,
 )
 
 logger = logging.getLogger(__name__)
@@ -239,21 +240,24 @@ def setup_router(db, **_kwargs):
     # BUSCA SOB DEMANDA — analisa textos e propõe correções.
     # Professor: APENAS os próprios registros (learning_objects criados por ele).
     # Admin: todas as coleções da whitelist (ou uma específica).
+    # [Out/2026] Roda como job em background (services/text_scan): detecção no
+    # pool de processos, fila pendente pré-carregada por bloco, cursor para
+    # retomar. `?wait=true` mantém a resposta síncrona com os totais.
     # ------------------------------------------------------------------
-    MAX_SCAN_DOCS = 3000
-
-    async def _already_pending(col_name: str, doc_id, field: str, tipo: str) -> bool:
-        existing = await db[QUEUE].find_one({
-            "source_collection": col_name,
-            "source_id": str(doc_id),
-            "source_field": field,
-            "tipo": tipo,
-            "status": "pending",
-        }, {"_id": 1})
-        return existing is not None
+    async def _load_scan(scan_id: str, user: dict) -> dict:
+        scan = await db[SCANS_COLLECTION].find_one({"id": scan_id}, {"_id": 0})
+        if not scan:
+            raise HTTPException(404, "Análise não encontrada.")
+        if user.get("role") not in _ADMIN_ROLES and scan.get("created_by") != user.get("id"):
+            raise HTTPException(403, "Sem permissão para esta análise.")
+        return scan
 
     @router.post("/scan")
-    async def scan_texts(request: Request, body: ScanRequest = ScanRequest()):
+    async def scan_texts(
+        request: Request,
+        body: ScanRequest = ScanRequest(),
+        wait: bool = Query(False, description="Aguarda a análise terminar (resposta com os totais finais)"),
+    ):
         user = await _require_user(request)
         uid = user.get("id")
         is_teacher = user.get("role") in _TEACHER_ROLES
@@ -261,11 +265,6 @@ def setup_router(db, **_kwargs):
         # Define alvo e filtro de propriedade
         if is_teacher:
             targets = {"learning_objects": CONTENT_FIELDS_BY_COLLECTION["learning_objects"]}
-            owner_filter = {"$or": [
-                {"recorded_by": uid},
-                {"created_by_user_id": uid},
-                {"created_by": uid},
-            ]}
         else:
             if body and body.collection:
                 if body.collection not in CONTENT_FIELDS_BY_COLLECTION:
@@ -274,67 +273,28 @@ def setup_router(db, **_kwargs):
             else:
                 cols = list(CONTENT_FIELDS_BY_COLLECTION.keys())
             targets = {c: CONTENT_FIELDS_BY_COLLECTION[c] for c in cols}
-            owner_filter = {}
 
-        meta_fields = {
-            "_id": 1, "id": 1, "mantenedora_id": 1, "full_name": 1, "nome": 1,
-            "name": 1, "class_id": 1, "course_id": 1, "recorded_by": 1,
-            "created_by_user_id": 1, "created_by": 1,
-        }
+        scan = await create_scan(db, targets, created_by=uid, owner_id=uid if is_teacher else None)
+        if wait:
+            scan = await run_scan_job(db, scan["id"])
+        else:
+            start_scan_job(db, scan["id"])
+        return public_scan(scan)
 
-        enqueued = duplicates = candidates = scanned = 0
-        for col_name, fields in targets.items():
-            projection = {**meta_fields, **{f: 1 for f in fields}}
-            cursor = db[col_name].find(owner_filter, projection).limit(MAX_SCAN_DOCS)
-            ops: List[InsertOne] = []
-            async for doc in cursor:
-                scanned += 1
-                doc_id = doc.get("id") or doc.get("_id")
-                for f in fields:
-                    v = doc.get(f)
-                    if not isinstance(v, str) or not v.strip():
-                        continue
-
-                    # FASE 1 — Formatação
-                    if not should_skip_format(v):
-                        new_v, rules = detect_format_issues(v)
-                        if rules:
-                            candidates += 1
-                            if await _already_pending(col_name, doc_id, f, "formatacao"):
-                                duplicates += 1
-                            else:
-                                ops.append(InsertOne(_build_queue_item(
-                                    col_name, doc, f, v, new_v, rules, tipo="formatacao")))
-                                enqueued += 1
-
-                    # FASE 2 — Ortografia
-                    if not should_skip_spelling(v):
-                        new_sp, corrections = detect_spelling_issues(v)
-                        if corrections:
-                            candidates += 1
-                            if await _already_pending(col_name, doc_id, f, "ortografia"):
-                                duplicates += 1
-                            else:
-                                avg_conf = sum(c["confidence"] for c in corrections) / len(corrections)
-                                rules_list = [f"sp_{c['original']}_{c['sugestao']}" for c in corrections]
-                                ops.append(InsertOne(_build_queue_item(
-                                    col_name, doc, f, v, new_sp, rules_list,
-                                    tipo="ortografia", confidence=round(avg_conf, 2),
-                                    spelling_corrections=corrections)))
-                                enqueued += 1
-
-                if len(ops) >= 500:
-                    await db[QUEUE].bulk_write(ops, ordered=False); ops.clear()
-            if ops:
-                await db[QUEUE].bulk_write(ops, ordered=False)
-
-        return {
-            "enqueued": enqueued,
-            "duplicates": duplicates,
-            "candidates": candidates,
-            "scanned": scanned,
-            "scope": "self" if is_teacher else "all",
-        }
+    @router.get("/scan/{scan_id}")
+    async def get_scan(scan_id: str, request: Request):
+        """Progresso/totais de uma análise (polling)."""
+        user = await _require_user(request)
+        return public_scan(await _load_scan(scan_id, user))
+
+    @router.post("/scan/{scan_id}/resume")
+    async def resume_scan_texts(scan_id: str, request: Request):
+        """Retoma do cursor uma análise que falhou ou parou (servidor reiniciado)."""
+        user = await _require_user(request)
+        scan = await _load_scan(scan_id, user)
+        if not is_resumable(scan) or not await resume_scan(db, scan):
+            raise HTTPException(409, f"Análise não pode ser retomada (status={scan.get('status')}).")
+        return public_scan(await _load_scan(scan_id, user))
 
     @router.get("/{item_id}/context")
     async def get_context(item_id: str, request: Request):
@@ -0,0 +1,83 @@
+"""Migra `document_files` legados (base64 no documento) para o blob store.
+
+Cada documento com `data_base64` tem o conteúdo gravado no backend de
+DOCUMENT_BLOB_BACKEND (GridFS ou filesystem, chave = sha256, deduplicado) e
+passa a ter `storage`; o `data_base64` é removido. O `id` (file_id) não muda.
+Idempotente: documentos já migrados são ignorados, então pode ser
+interrompido e reexecutado.
+
+Uso:
+    python3 -m scripts.migrate_document_files_to_blobs          # dry-run
+    python3 -m scripts.migrate_document_files_to_blobs --apply  # aplica as escritas
+
+Opções úteis:
+    --backend gridfs|filesystem  sobrescreve DOCUMENT_BLOB_BACKEND
+    --limit 100                  limita a quantidade de documentos migrados
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+load_dotenv('/app/backend/.env')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.blob_store import DOCUMENT_BLOB_BACKEND  # noqa: E402
+from services.document_files import migrate_inline_document  # noqa: E402
+
+
+async def run(*, apply: bool, backend: str, limit: int | None) -> None:
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    query = {'data_base64': {'$exists': True}, 'storage': {'$exists': False}}
+    pending = await db.document_files.count_documents(query)
+    scanned = migrated = failed = 0
+    inline_bytes = 0
+
+    # Um documento por vez: cada um pode ter vários MB de base64.
+    cursor = db.document_files.find(query, {'_id': 0}, batch_size=20)
+    if limit:
+        cursor = cursor.limit(limit)
+    async for doc in cursor:
+        scanned += 1
+        inline_bytes += len(doc.get('data_base64') or '')
+        if not apply:
+            continue
+        try:
+            if await migrate_inline_document(db, doc, backend):
+                migrated += 1
+        except Exception as e:
+            failed += 1
+            print(f'  ! {doc.get("id")}: {e}')
+
+    mode = 'APLICADO' if apply else 'DRY-RUN'
+    print(f'\n{mode} — document_files → blob store ({backend})')
+    print(f'Pendentes (base64 no documento): {pending}')
+    print(f'Analisados: {scanned}')
+    print(f'Base64 analisado: {inline_bytes / 1024 / 1024:.1f} MB')
+    print(f'Migrados: {migrated if apply else 0}')
+    print(f'Falhas: {failed}')
+    if not apply and scanned:
+        print('\nNenhuma escrita foi feita. Execute novamente com --apply para persistir.')
+
+    client.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Migra document_files base64 para o blob store')
+    parser.add_argument('--apply', action='store_true', help='persiste as alterações; sem esta opção é dry-run')
+    parser.add_argument('--backend', default=DOCUMENT_BLOB_BACKEND, choices=['gridfs', 'filesystem'],
+                        help='backend de destino (default: DOCUMENT_BLOB_BACKEND)')
+    parser.add_argument('--limit', type=int, help='limita a quantidade de documentos migrados')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    asyncio.run(run(apply=args.apply, backend=args.backend, limit=args.limit))
@@ -32,6 +32,7 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import functools
 import logging
 import os
 import re
@@ -255,6 +256,24 @@ def _levenshtein(a: str, b: str) -> int:
 _WORD_RE = re.compile(r"\b[A-Za-zÀ-ÿ]+\b")
 
 
+@functools.lru_cache(maxsize=50_000)
+def _spelling_decision(wlow: str) -> Optional[Tuple[str, float]]:
+    """(sugestão, confiança) para a palavra minúscula, ou None se está correta.
+
+    [Out/2026] Memoizado por processo: num scan, a mesma palavra (errada ou
+    não) aparece em milhares de textos e `spell.correction` + Levenshtein em
+    Python puro dominavam o tempo.
+    """
+    spell = _get_spell()
+    if wlow in spell:
+        return None
+    suggestion = spell.correction(wlow)
+    if not suggestion or suggestion == wlow:
+        return None
+    d = _levenshtein(wlow, suggestion)
+    return suggestion, max(0.0, 1 - d / max(len(wlow), 1))
+
+
 def _is_proper_noun(text: str, match: re.Match) -> bool:
     """Heurística: palavra começa com maiúscula no MEIO da frase
     (precedida por algo que não é início de sentença) → provável nome próprio."""
@@ -294,7 +313,6 @@ def detect_spelling_issues(
     if not text or not isinstance(text, str):
         return text, []
 
-    spell = _get_spell()
     candidates: List[Dict[str, Any]] = []
 
     for m in _WORD_RE.finditer(text):
@@ -307,14 +325,10 @@ def detect_spelling_issues(
             continue  # provável sigla nova (deixa pro humano)
         if _is_proper_noun(text, m):
             continue
-        wlow = word.lower()
-        if wlow in spell:
-            continue
-        suggestion = spell.correction(wlow)
-        if not suggestion or suggestion == wlow:
+        decision = _spelling_decision(word.lower())
+        if decision is None:
             continue
-        d = _levenshtein(wlow, suggestion)
-        confidence = max(0.0, 1 - d / max(len(wlow), 1))
+        suggestion, confidence = decision
         if confidence < min_confidence:
             continue
         # Preserva caixa do original
@@ -1,5 +1,5 @@
 from fastapi import FastAPI, APIRouter, HTTPException, status, Request, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
@@ -8,12 +8,15 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 import os
+import hmac
 import logging
 import json
 from pathlib import Path
 from datetime import datetime, timezone
 
 from auth_utils import decode_token, token_blacklist
+from utils.metrics import REGISTRY, CONTENT_TYPE_LATEST, MetricsMiddleware, mongo_command_listener
+from utils.db_profiler import DbProfilerMiddleware, profiler_command_listener
 from auth_middleware import AuthMiddleware
 from audit_service import audit_service
 from sandbox_service import sandbox_service
@@ -126,7 +129,7 @@ from routers import content_review as content_review_mod
 from routers import text_improvement as text_improvement_mod
 
 # Utilitários compartilhados
-from utils.connection_manager import ConnectionManager, ActiveSessionsTracker
+from utils.connection_manager import ConnectionManager, ActiveSessionsTracker, topics_for_user
 from utils.client_time import ClientTimeContextMiddleware
 from utils.academic_year import create_academic_year_validators
 
@@ -135,7 +138,9 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# [Out/2026] listeners: tempo de Mongo por requisição (utils/metrics → /metrics) e
+# profiler opt-in de queries/N+1 (utils/db_profiler, DB_PROFILER_ENABLED).
+client = AsyncIOMotorClient(mongo_url, event_listeners=[mongo_command_listener, profiler_command_listener])
 db = client[os.environ.get('DB_NAME', 'sigesc_db')]
 
 # Sandbox database para admin_teste
@@ -181,10 +186,16 @@ limiter = Limiter(key_func=get_remote_address)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
-# Render worker (Passo 4) — single-process background task.
+# Render worker (Passo 4) — background task (slots concorrentes + reaper de leases).
 import asyncio
 _render_worker_task: asyncio.Task | None = None
 _render_worker_stop: asyncio.Event | None = None
+# Barramento de invalidação do cache entre réplicas (utils/cache.py).
+_cache_bus_task: asyncio.Task | None = None
+_cache_bus_stop: asyncio.Event | None = None
+# Delta job dos rollups do Dashboard Analítico (services/analytics_rollups.py).
+_analytics_rollup_task: asyncio.Task | None = None
+_analytics_rollup_stop: asyncio.Event | None = None
 
 @app.on_event("startup")
 async def create_indexes():
@@ -223,6 +234,34 @@ async def create_indexes():
         # Passo 4 — índices de document_render_jobs (idempotente)
         await _ensure_render_indexes(db)
 
+        # [Out/2026] Camada de cache — tier compartilhado (opcional) + barramento
+        # de invalidação entre réplicas.
+        from utils.cache import configure_cache, run_invalidation_listener
+        await configure_cache(db)
+        global _cache_bus_task, _cache_bus_stop
+        _cache_bus_stop = asyncio.Event()
+        _cache_bus_task = asyncio.create_task(run_invalidation_listener(_cache_bus_stop))
+
+        # [Out/2026] WebSocket: backbone de pub/sub entre réplicas (utils/ws_pubsub).
+        await connection_manager.start(db)
+
+        # [Out/2026] Auditoria bufferizada (insert_many em lote, drena no shutdown).
+        audit_service.start_writer()
+
+        # [Out/2026] Jobs de PDF (Livro de Promoção): registro em `pdf_jobs`,
+        # fila limitada + workers supervisionados (pdf_jobs.py).
+        from pdf_jobs import get_pdf_job_executor
+        await get_pdf_job_executor(db).start()
+
+        # [Out/2026] Rollups do Dashboard Analítico — backfill + delta job.
+        from services import analytics_rollups
+        if analytics_rollups.ROLLUPS_ENABLED:
+            global _analytics_rollup_task, _analytics_rollup_stop
+            _analytics_rollup_stop = asyncio.Event()
+            _analytics_rollup_task = asyncio.create_task(
+                analytics_rollups.run_rollup_loop(db, _analytics_rollup_stop)
+            )
+
         # Fase 5 (Mai/2026) — índices de diary_snapshots (idempotente)
         from services import diary_snapshot_service as _diary_snap_svc
         await _diary_snap_svc.ensure_indexes(db)
@@ -259,7 +298,7 @@ async def create_indexes():
                 _hmac_env[-4:],
             )
 
-        # Passo 4 — worker de render jobs (in-process, single-loop)
+        # Passo 4 — worker de render jobs (pool in-process com lease; ver render_worker)
         if os.environ.get("DISABLE_RENDER_WORKER", "").lower() not in {"1", "true", "yes"}:
             from services.render_worker import run_worker_loop
             from utils.render_jobs import register_render_handler
@@ -395,6 +434,28 @@ async def health_check():
             }
         )
 
+# ============= MÉTRICAS (Prometheus) =============
+# [Out/2026] Exposição em text format para o Prometheus raspar CADA réplica
+# (utils/metrics). Fora do /api e sem JWT: scrapers usam Bearer estático —
+# se METRICS_TOKEN estiver definido, ele é exigido.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+REGISTRY.gauge("ws_connections", "Sockets WebSocket abertos nesta réplica.").set_function(
+    lambda: sum(len(s) for s in connection_manager.active_connections.values())
+)
+REGISTRY.gauge("active_sessions", "Usuários com atividade HTTP nos últimos 5 minutos.").set_function(
+    lambda: len(active_sessions.get_online())
+)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(request: Request):
+    if METRICS_TOKEN:
+        auth = request.headers.get("authorization", "")
+        if not hmac.compare_digest(auth.encode(), f"Bearer {METRICS_TOKEN}".encode()):
+            raise HTTPException(status_code=401, detail="Token de métricas inválido")
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE_LATEST)
+
 # ============= SETUP E REGISTRO DE ROTEADORES =============
 
 # Helper para banco correto (produção ou sandbox)
@@ -628,8 +689,8 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
         
         logger.info(f"WebSocket: Tentando conectar user_id={user_id}")
         
-        # Conectar
-        await connection_manager.connect(websocket, user_id)
+        # Conectar (tópicos permitidos: user/role/tenant/escolas do token)
+        await connection_manager.connect(websocket, user_id, topics=topics_for_user(payload))
         
         try:
             while True:
@@ -647,10 +708,16 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
                         if message.get('type') == 'mark_read':
                             # Marcar mensagens como lidas
                             pass
+                        elif message.get('type') == 'subscribe':
+                            connection_manager.subscribe(websocket, message.get('topics') or [])
+                        elif message.get('type') == 'unsubscribe':
+                            connection_manager.unsubscribe(websocket, message.get('topics') or [])
                     except json.JSONDecodeError:
                         pass
                         
         except WebSocketDisconnect:
+            pass
+        finally:
             connection_manager.disconnect(websocket, user_id)
             
     except Exception as e:
@@ -850,6 +917,11 @@ app.add_middleware(
     allow_headers=["Authorization", "Content-Type", "X-CSRF-Token", "X-Requested-With", "X-Mantenedora-Id", "X-SIGESC-Timezone", "X-SIGESC-UTC-Offset-Minutes", "X-SIGESC-Local-Date"],
 )
 
+# [Out/2026] Mais externos de todos: profiler de queries (opt-in) e
+# latência/status/Mongo por template de rota.
+app.add_middleware(DbProfilerMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     """Fecha conexão com MongoDB ao desligar"""
@@ -861,6 +933,49 @@ async def shutdown_db_client():
             await asyncio.wait_for(_render_worker_task, timeout=10)
     except Exception as e:
         logger.warning(f"render worker shutdown: {e}")
+    try:
+        if _cache_bus_stop is not None:
+            _cache_bus_stop.set()
+        if _cache_bus_task is not None:
+            await asyncio.wait_for(_cache_bus_task, timeout=5)
+    except Exception as e:
+        logger.warning(f"cache bus shutdown: {e}")
+    try:
+        await connection_manager.stop()
+    except Exception as e:
+        logger.warning(f"websocket pub/sub shutdown: {e}")
+    try:
+        if _analytics_rollup_stop is not None:
+            _analytics_rollup_stop.set()
+        if _analytics_rollup_task is not None:
+            await asyncio.wait_for(_analytics_rollup_task, timeout=10)
+    except Exception as e:
+        logger.warning(f"analytics rollup shutdown: {e}")
+    try:
+        from pdf_jobs import stop_pdf_job_executors
+        await stop_pdf_job_executors(timeout=10)
+    except Exception as e:
+        logger.warning(f"pdf jobs shutdown: {e}")
+    # Drena o buffer de auditoria ANTES de fechar o client (nada se perde).
+    try:
+        await audit_service.stop_writer(timeout=10)
+    except Exception as e:
+        logger.warning(f"audit writer shutdown: {e}")
+    try:
+        from services.render_pool import shutdown_render_pool
+        shutdown_render_pool()
+    except Exception as e:
+        logger.warning(f"render pool shutdown: {e}")
+    try:
+        from mig.core.http_client import close_pooled_clients
+        await close_pooled_clients()
+    except Exception as e:
+        logger.warning(f"mig http pool shutdown: {e}")
+    try:
+        from services.languagetool import close_client as close_languagetool_client
+        await close_languagetool_client()
+    except Exception as e:
+        logger.warning(f"languagetool client shutdown: {e}")
     client.close()
     logger.info("MongoDB connection closed")
 
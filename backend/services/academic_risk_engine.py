@@ -40,18 +40,8 @@ def _course_average(g: Dict[str, Any]) -> Optional[float]:
     return sum(vals) / len(vals) if vals else None
 
 
-def compute_academic_risk(grades: List[Dict[str, Any]], config: Dict[str, Any]) -> Dict[str, Any]:
-    passing = float(config.get('passing_grade', 6.0))
-    aw = config.get('academic_weights', {}) or {}
-    w_notas = float(aw.get('notas', 50))
-    w_rec = float(aw.get('recuperacao', 20))
-    w_rep = float(aw.get('reprovacao', 20))
-    w_trend = float(aw.get('tendencia', 10))
-    caps = config.get('caps', {}) or {}
-    rec_max = float(caps.get('recovery_max', 3)) or 1
-    fail_max = float(caps.get('failed_max', 2)) or 1
-    trend_drop_max = float(caps.get('trend_drop_max', 3)) or 1
-
+def summarize_grades(grades: List[Dict[str, Any]], passing: float) -> Dict[str, Any]:
+    """Sinais brutos das notas de UM aluno (entrada do score; também usada pelo lote)."""
     course_avgs: List[float] = []
     recovery_subjects = 0
     failed_subjects = 0
@@ -76,7 +66,32 @@ def compute_academic_risk(grades: List[Dict[str, Any]], config: Dict[str, Any])
         if len(vals) >= 2:
             deltas.append(vals[-1] - vals[0])
 
-    average_grade = round(sum(course_avgs) / len(course_avgs), 2) if course_avgs else None
+    return {
+        'average_grade': round(sum(course_avgs) / len(course_avgs), 2) if course_avgs else None,
+        'recovery_subjects': recovery_subjects,
+        'failed_subjects': failed_subjects,
+        'critical_components': critical_components,
+        'avg_delta': sum(deltas) / len(deltas) if deltas else 0.0,
+    }
+
+
+def compute_academic_risk(grades: List[Dict[str, Any]], config: Dict[str, Any]) -> Dict[str, Any]:
+    passing = float(config.get('passing_grade', 6.0))
+    aw = config.get('academic_weights', {}) or {}
+    w_notas = float(aw.get('notas', 50))
+    w_rec = float(aw.get('recuperacao', 20))
+    w_rep = float(aw.get('reprovacao', 20))
+    w_trend = float(aw.get('tendencia', 10))
+    caps = config.get('caps', {}) or {}
+    rec_max = float(caps.get('recovery_max', 3)) or 1
+    fail_max = float(caps.get('failed_max', 2)) or 1
+    trend_drop_max = float(caps.get('trend_drop_max', 3)) or 1
+
+    summary = summarize_grades(grades, passing)
+    average_grade = summary['average_grade']
+    recovery_subjects = summary['recovery_subjects']
+    failed_subjects = summary['failed_subjects']
+    critical_components = summary['critical_components']
 
     # 1. Notas — quão abaixo da nota de corte (acima do corte = 0 risco)
     if average_grade is None:
@@ -91,7 +106,7 @@ def compute_academic_risk(grades: List[Dict[str, Any]], config: Dict[str, Any])
     rep_frac = _clamp(failed_subjects / fail_max)
 
     # 4. Tendência (apenas QUEDA adiciona risco)
-    avg_delta = sum(deltas) / len(deltas) if deltas else 0.0
+    avg_delta = summary['avg_delta']
     if avg_delta <= -0.5:
         trend_status = 'falling'
     elif avg_delta >= 0.5:
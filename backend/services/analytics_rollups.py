@@ -0,0 +1,462 @@
+"""
+Rollups pré-agregados do Dashboard Analítico.
+
+[Out/2026] Os endpoints de `routers/analytics.py` faziam `$unwind` de
+`attendance.records` e `$group` sobre `grades`/`enrollments` a cada request
+(o ranking sozinho disparava ~7 pipelines). Em redes com centenas de milhares
+de registros de frequência isso custava segundos por painel. Agora mantemos
+coleções de CONTADORES e os endpoints agregam essas linhas:
+
+  analytics_rollup_attendance          1 linha por (turma, data, ano, regular)
+      {class_id, date, month, academic_year, mantenedora_id, regular,
+       total, present, absent, justified, docs, docs_on_time}
+  analytics_rollup_attendance_student  1 linha por (turma, aluno, ano, regular)
+      {class_id, student_id, academic_year, regular, total, present, absent, justified}
+  analytics_rollup_grades              1 linha por (turma, aluno, ano)
+      {class_id, student_id, academic_year, mantenedora_id,
+       reg_n, reg_sum, reg_min, fa_n, fa_sum, b1_n, b1_sum, ..., b4_n, b4_sum}
+  analytics_rollup_enrollments         1 linha por (turma, escola, mantenedora, ano, status)
+      {class_id, school_id, mantenedora_id, academic_year, status, count}
+
+Regras idênticas às pipelines ao vivo: combos 'P|F' contam uma aula por parte,
+`records.dependency_id` nulo, `regular` = doc sem `dependency_id`
+(`regular_only_aggregate_match`). Cada linha guarda os MESMOS campos que os
+endpoints usam no `$match` (`class_id`, `date`, `academic_year`, `school_id`,
+`mantenedora_id`) — inclusive o escopo TEMPORAL por escola
+(`school_scope_to_date_match`) funciona sem mudança.
+
+Manutenção — a unidade é a TURMA (recomputar uma turma custa dezenas de ms):
+  - no write: routers de frequência/notas/matrículas chamam `mark_dirty`;
+  - delta job (`run_rollup_loop`): a cada ciclo processa as turmas sujas e as
+    turmas com `updated_at`/`created_at` acima do watermark das origens;
+  - reconciliação completa periódica cobre scripts/migrações que escrevem
+    direto no banco sem passar pelos routers.
+
+Frescor: `analytics_rollup_state` guarda `as_of` (início do último ciclo
+concluído). `rollup_status` diz se os rollups podem servir leituras
+(backfill concluído e atraso <= ANALYTICS_ROLLUP_MAX_LAG_SECONDS); caso
+contrário os endpoints voltam às pipelines ao vivo. A origem é sempre
+exposta (`data_freshness` e headers `X-Analytics-Source`/`X-Analytics-As-Of`).
+
+Configuração (env):
+  ANALYTICS_ROLLUPS                 "on" (default) | "off"
+  ANALYTICS_ROLLUP_INTERVAL_SECONDS ciclo do delta job (default 60)
+  ANALYTICS_ROLLUP_FULL_HOURS       reconciliação completa (default 24)
+  ANALYTICS_ROLLUP_MAX_LAG_SECONDS  atraso máximo para servir leitura (default 900)
+  ANALYTICS_ROLLUP_CONCURRENCY      turmas recomputadas em paralelo (default 4)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import DeleteMany, ReplaceOne
+
+logger = logging.getLogger(__name__)
+
+ATTENDANCE_ROLLUP = "analytics_rollup_attendance"
+ATTENDANCE_STUDENT_ROLLUP = "analytics_rollup_attendance_student"
+GRADES_ROLLUP = "analytics_rollup_grades"
+ENROLLMENTS_ROLLUP = "analytics_rollup_enrollments"
+ROLLUP_COLLECTIONS = (ATTENDANCE_ROLLUP, ATTENDANCE_STUDENT_ROLLUP, GRADES_ROLLUP, ENROLLMENTS_ROLLUP)
+STATE_COLLECTION = "analytics_rollup_state"
+DIRTY_COLLECTION = "analytics_rollup_dirty"
+SOURCE_COLLECTIONS = ("attendance", "grades", "enrollments")
+
+ROLLUPS_ENABLED = os.environ.get("ANALYTICS_ROLLUPS", "on").strip().lower() not in {"off", "0", "false", "no"}
+INTERVAL_SECONDS = float(os.environ.get("ANALYTICS_ROLLUP_INTERVAL_SECONDS", "60"))
+FULL_RECONCILE_HOURS = float(os.environ.get("ANALYTICS_ROLLUP_FULL_HOURS", "24"))
+MAX_LAG_SECONDS = float(os.environ.get("ANALYTICS_ROLLUP_MAX_LAG_SECONDS", "900"))
+CONCURRENCY = max(1, int(os.environ.get("ANALYTICS_ROLLUP_CONCURRENCY", "4")))
+# Sobreposição do watermark: tolera relógios de réplicas levemente defasados
+# (recomputar uma turma é idempotente, então reprocessar é barato e seguro).
+WATERMARK_SKEW_SECONDS = 30
+LEASE_SECONDS = 300
+# Janela de agrupamento dos `mark_dirty` antes de rodar um ciclo antecipado.
+DEBOUNCE_SECONDS = 2.0
+
+SLA_ATTENDANCE_DAYS = 3
+_STATE_ID = "global"
+_WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+_wake: Optional[asyncio.Event] = None
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse_dt(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if not value:
+        return None
+    s = str(value).strip()
+    try:
+        d = datetime.fromisoformat(s.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return d if d.tzinfo else d.replace(tzinfo=timezone.utc)
+
+
+def _norm_year(value: Any) -> Any:
+    """Ano letivo como int quando possível (origens misturam '2026' e 2026)."""
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value.strip())
+    return value
+
+
+def _num(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def _split_statuses(status: Any) -> List[str]:
+    """'P|F' → ['P', 'F'] — mesma regra de `_attendance_split_stages`."""
+    parts = (str(status or "")).upper().split("|")
+    return [p.strip() for p in parts if p.strip() in ("P", "F", "J")]
+
+
+def _key(*parts: Any) -> str:
+    return "|".join("" if p is None else str(p) for p in parts)
+
+
+# ---------------------------------------------------------------------------
+# Builders puros (uma turma → linhas de rollup)
+# ---------------------------------------------------------------------------
+
+def build_attendance_rows(class_id: Optional[str], docs: Iterable[dict]) -> Tuple[List[dict], List[dict]]:
+    """Linhas (por data) e (por aluno) a partir dos docs de `attendance` da turma."""
+    daily: Dict[str, dict] = {}
+    per_student: Dict[str, dict] = {}
+    for doc in docs:
+        date = str(doc.get("date") or "")[:10]
+        year = _norm_year(doc.get("academic_year"))
+        regular = doc.get("dependency_id") is None
+        k = _key(class_id, date, year, int(regular))
+        row = daily.get(k)
+        if row is None:
+            row = daily[k] = {
+                "_k": k, "class_id": class_id, "date": date, "month": date[5:7],
+                "academic_year": year, "mantenedora_id": doc.get("mantenedora_id"),
+                "regular": regular, "total": 0, "present": 0, "absent": 0,
+                "justified": 0, "docs": 0, "docs_on_time": 0,
+            }
+        row["docs"] += 1
+        # SLA: lançado em até 3 dias após a aula. Sem `created_at` conta como
+        # no prazo (a pipeline ao vivo tinha o mesmo efeito: null <= 3).
+        created, lesson = _parse_dt(doc.get("created_at")), _parse_dt(date)
+        if created is None or lesson is None or (created - lesson).total_seconds() / 86400 <= SLA_ATTENDANCE_DAYS:
+            row["docs_on_time"] += 1
+        for rec in doc.get("records") or []:
+            if rec.get("dependency_id") is not None:
+                continue
+            statuses = _split_statuses(rec.get("status"))
+            if not statuses:
+                continue
+            sk = _key(class_id, rec.get("student_id"), year, int(regular))
+            srow = per_student.get(sk)
+            if srow is None:
+                srow = per_student[sk] = {
+                    "_k": sk, "class_id": class_id, "student_id": rec.get("student_id"),
+                    "academic_year": year, "regular": regular,
+                    "total": 0, "present": 0, "absent": 0, "justified": 0,
+                }
+            for st in statuses:
+                field = {"P": "present", "F": "absent", "J": "justified"}[st]
+                for target in (row, srow):
+                    target["total"] += 1
+                    target[field] += 1
+    return list(daily.values()), list(per_student.values())
+
+
+def build_grade_rows(class_id: Optional[str], docs: Iterable[dict]) -> List[dict]:
+    """Somas/contagens por aluno da turma (base das médias e da aprovação)."""
+    rows: Dict[str, dict] = {}
+    for doc in docs:
+        year = _norm_year(doc.get("academic_year"))
+        k = _key(class_id, doc.get("student_id"), year)
+        row = rows.get(k)
+        if row is None:
+            row = rows[k] = {
+                "_k": k, "class_id": class_id, "student_id": doc.get("student_id"),
+                "academic_year": year, "mantenedora_id": doc.get("mantenedora_id"),
+                "reg_n": 0, "reg_sum": 0.0, "reg_min": None, "fa_n": 0, "fa_sum": 0.0,
+                **{f"b{i}_{s}": (0 if s == "n" else 0.0) for i in range(1, 5) for s in ("n", "sum")},
+            }
+        fa = _num(doc.get("final_average"))
+        if fa is not None:
+            row["fa_n"] += 1
+            row["fa_sum"] += fa
+            if doc.get("dependency_id") is None:
+                row["reg_n"] += 1
+                row["reg_sum"] += fa
+                row["reg_min"] = fa if row["reg_min"] is None else min(row["reg_min"], fa)
+        for i in range(1, 5):
+            b = _num(doc.get(f"b{i}"))
+            if b is not None:
+                row[f"b{i}_n"] += 1
+                row[f"b{i}_sum"] += b
+    return list(rows.values())
+
+
+def build_enrollment_rows(class_id: Optional[str], docs: Iterable[dict]) -> List[dict]:
+    rows: Dict[str, dict] = {}
+    for doc in docs:
+        year = _norm_year(doc.get("academic_year"))
+        k = _key(class_id, doc.get("school_id"), doc.get("mantenedora_id"), year, doc.get("status"))
+        row = rows.get(k)
+        if row is None:
+            row = rows[k] = {
+                "_k": k, "class_id": class_id, "school_id": doc.get("school_id"),
+                "mantenedora_id": doc.get("mantenedora_id"), "academic_year": year,
+                "status": doc.get("status"), "count": 0,
+            }
+        row["count"] += 1
+    return list(rows.values())
+
+
+# ---------------------------------------------------------------------------
+# Persistência
+# ---------------------------------------------------------------------------
+
+async def ensure_indexes(db) -> None:
+    for name in ROLLUP_COLLECTIONS:
+        await db[name].create_index("_k", unique=True, background=True)
+        await db[name].create_index("class_id", background=True)
+    await db[ATTENDANCE_ROLLUP].create_index([("academic_year", 1), ("date", 1)], background=True)
+    await db[ATTENDANCE_STUDENT_ROLLUP].create_index([("student_id", 1), ("academic_year", 1)], background=True)
+    await db[GRADES_ROLLUP].create_index([("academic_year", 1), ("student_id", 1)], background=True)
+    await db[ENROLLMENTS_ROLLUP].create_index([("school_id", 1), ("academic_year", 1)], background=True)
+    await db[DIRTY_COLLECTION].create_index("class_id", unique=True, background=True)
+    # Delta job: turmas alteradas desde o watermark.
+    for source in SOURCE_COLLECTIONS:
+        await db[source].create_index("updated_at", name=f"ix_{source}_updated_at", background=True, sparse=True)
+        await db[source].create_index("created_at", name=f"ix_{source}_created_at", background=True, sparse=True)
+
+
+async def _replace_class_rows(db, collection: str, class_id: Optional[str], rows: List[dict]) -> None:
+    """Upsert das linhas novas + remoção das que sumiram — sem janela vazia."""
+    ops: list = [ReplaceOne({"_k": r["_k"]}, r, upsert=True) for r in rows]
+    ops.append(DeleteMany({"class_id": class_id, "_k": {"$nin": [r["_k"] for r in rows]}}))
+    await db[collection].bulk_write(ops, ordered=True)
+
+
+async def rebuild_class(db, class_id: Optional[str]) -> dict:
+    """Recalcula TODAS as linhas de rollup de uma turma a partir das origens."""
+    att_docs = await db.attendance.find(
+        {"class_id": class_id},
+        {"_id": 0, "date": 1, "academic_year": 1, "mantenedora_id": 1,
+         "dependency_id": 1, "created_at": 1, "records.student_id": 1,
+         "records.status": 1, "records.dependency_id": 1},
+    ).to_list(None)
+    daily, per_student = build_attendance_rows(class_id, att_docs)
+    grades = build_grade_rows(class_id, await db.grades.find(
+        {"class_id": class_id},
+        {"_id": 0, "student_id": 1, "academic_year": 1, "mantenedora_id": 1,
+         "dependency_id": 1, "final_average": 1, "b1": 1, "b2": 1, "b3": 1, "b4": 1},
+    ).to_list(None))
+    enrollments = build_enrollment_rows(class_id, await db.enrollments.find(
+        {"class_id": class_id},
+        {"_id": 0, "school_id": 1, "mantenedora_id": 1, "academic_year": 1, "status": 1},
+    ).to_list(None))
+    await _replace_class_rows(db, ATTENDANCE_ROLLUP, class_id, daily)
+    await _replace_class_rows(db, ATTENDANCE_STUDENT_ROLLUP, class_id, per_student)
+    await _replace_class_rows(db, GRADES_ROLLUP, class_id, grades)
+    await _replace_class_rows(db, ENROLLMENTS_ROLLUP, class_id, enrollments)
+    return {"attendance": len(daily), "grades": len(grades), "enrollments": len(enrollments)}
+
+
+# ---------------------------------------------------------------------------
+# Hooks de escrita
+# ---------------------------------------------------------------------------
+
+def _wake_event() -> asyncio.Event:
+    global _wake
+    if _wake is None:
+        _wake = asyncio.Event()
+    return _wake
+
+
+async def mark_dirty(db, *class_ids: Optional[str]) -> None:
+    """Marca turmas para recomputação no próximo ciclo (best-effort, nunca levanta).
+
+    Chamado após writes de frequência/notas/matrículas — principalmente
+    exclusões e trocas de turma, que o watermark por `updated_at` não enxerga.
+    """
+    if not ROLLUPS_ENABLED:
+        return
+    ids = {c for c in class_ids if c}
+    if not ids:
+        return
+    now = _now()
+    try:
+        for cid in ids:
+            await db[DIRTY_COLLECTION].update_one(
+                {"class_id": cid}, {"$set": {"class_id": cid, "marked_at": now}}, upsert=True,
+            )
+        _wake_event().set()
+    except Exception as e:
+        logger.warning("[analytics_rollups] mark_dirty falhou (%s): %s", sorted(ids), e)
+
+
+# ---------------------------------------------------------------------------
+# Delta job
+# ---------------------------------------------------------------------------
+
+async def _acquire_lease(db) -> bool:
+    """Só uma réplica roda o ciclo por vez (compare-and-set no doc de estado)."""
+    now = _now()
+    await db[STATE_COLLECTION].update_one({"_id": _STATE_ID}, {"$setOnInsert": {"ready": False}}, upsert=True)
+    doc = await db[STATE_COLLECTION].find_one_and_update(
+        {"_id": _STATE_ID, "$or": [
+            {"lease_until": None}, {"lease_until": {"$lte": now}}, {"lease_owner": _WORKER_ID},
+        ]},
+        {"$set": {"lease_owner": _WORKER_ID, "lease_until": now + timedelta(seconds=LEASE_SECONDS)}},
+    )
+    return doc is not None
+
+
+async def _changed_class_ids(db, watermark: str) -> set:
+    changed: set = set()
+    query = {"$or": [{"updated_at": {"$gt": watermark}}, {"created_at": {"$gt": watermark}}]}
+    for source in SOURCE_COLLECTIONS:
+        changed.update(await db[source].distinct("class_id", query))
+    return changed
+
+
+async def _all_class_ids(db) -> set:
+    ids: set = set()
+    for source in SOURCE_COLLECTIONS:
+        ids.update(await db[source].distinct("class_id"))
+    return ids
+
+
+async def run_rollup_cycle(db, *, full: Optional[bool] = None) -> dict:
+    """Um ciclo do delta job. `full=None` decide sozinho (sem backfill ou
+    reconciliação vencida → completo). Devolve um resumo para logs/observability."""
+    started = _now()
+    if not await _acquire_lease(db):
+        return {"skipped": "lease"}
+    state = await db[STATE_COLLECTION].find_one({"_id": _STATE_ID}) or {}
+    last_full = state.get("last_full_at")
+    if last_full is not None and last_full.tzinfo is None:
+        last_full = last_full.replace(tzinfo=timezone.utc)
+    if full is None:
+        full = (not state.get("ready") or not state.get("watermark") or last_full is None
+                or started - last_full >= timedelta(hours=FULL_RECONCILE_HOURS))
+
+    dirty = await db[DIRTY_COLLECTION].find({}, {"_id": 0, "class_id": 1}).to_list(None)
+    if full:
+        class_ids = await _all_class_ids(db)
+    else:
+        class_ids = await _changed_class_ids(db, state["watermark"])
+    class_ids.update(d["class_id"] for d in dirty)
+
+    sem = asyncio.Semaphore(CONCURRENCY)
+    failed: list = []
+
+    async def _one(cid):
+        async with sem:
+            try:
+                await rebuild_class(db, cid)
+            except Exception as e:
+                failed.append(cid)
+                logger.warning("[analytics_rollups] turma %s falhou: %s", cid, e)
+
+    await asyncio.gather(*(_one(cid) for cid in class_ids))
+
+    if full:
+        # Turmas que sumiram das origens (ex.: ano apagado) deixam de existir nos rollups.
+        keep = list(class_ids)
+        for name in ROLLUP_COLLECTIONS:
+            await db[name].delete_many({"class_id": {"$nin": keep}})
+    done = [cid for cid in class_ids if cid not in failed]
+    if done:
+        await db[DIRTY_COLLECTION].delete_many({"class_id": {"$in": done}, "marked_at": {"$lte": started}})
+
+    summary = {
+        "mode": "full" if full else "delta",
+        "classes": len(class_ids),
+        "failed": len(failed),
+        "duration_ms": round((_now() - started).total_seconds() * 1000, 1),
+    }
+    update: dict = {"lease_until": None, "last_run": summary}
+    if not failed:
+        watermark = (started - timedelta(seconds=WATERMARK_SKEW_SECONDS)).isoformat()
+        update.update({"ready": True, "as_of": started, "watermark": watermark})
+        if full:
+            update["last_full_at"] = started
+    await db[STATE_COLLECTION].update_one({"_id": _STATE_ID}, {"$set": update})
+    return summary
+
+
+async def run_rollup_loop(db, stop_event: Optional[asyncio.Event] = None) -> None:
+    """Task de background: delta a cada INTERVAL_SECONDS ou logo após `mark_dirty`."""
+    stop_event = stop_event or asyncio.Event()
+    wake = _wake_event()
+    try:
+        await ensure_indexes(db)
+    except Exception as e:
+        logger.warning("[analytics_rollups] ensure_indexes falhou: %s", e)
+    while not stop_event.is_set():
+        try:
+            summary = await run_rollup_cycle(db)
+            if summary.get("classes") or summary.get("failed"):
+                logger.info("[analytics_rollups] %s", summary)
+        except Exception as e:
+            logger.error("[analytics_rollups] ciclo falhou: %s", e)
+        wake.clear()
+        stop_wait = asyncio.ensure_future(stop_event.wait())
+        wake_wait = asyncio.ensure_future(wake.wait())
+        try:
+            await asyncio.wait({stop_wait, wake_wait}, timeout=INTERVAL_SECONDS,
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stop_wait.cancel()
+            wake_wait.cancel()
+        if wake.is_set() and not stop_event.is_set():
+            await asyncio.sleep(DEBOUNCE_SECONDS)
+
+
+# ---------------------------------------------------------------------------
+# Leitura (routers/analytics)
+# ---------------------------------------------------------------------------
+
+async def rollup_status(db) -> dict:
+    """`{'usable', 'as_of', 'lag_seconds'}` — se os endpoints podem ler dos rollups."""
+    if not ROLLUPS_ENABLED:
+        return {"usable": False, "as_of": None, "lag_seconds": None}
+    try:
+        state = await db[STATE_COLLECTION].find_one({"_id": _STATE_ID}, {"ready": 1, "as_of": 1})
+    except Exception:
+        state = None
+    as_of = (state or {}).get("as_of")
+    if as_of is not None and as_of.tzinfo is None:
+        as_of = as_of.replace(tzinfo=timezone.utc)
+    lag = (_now() - as_of).total_seconds() if as_of else None
+    usable = bool(state and state.get("ready") and lag is not None and lag <= MAX_LAG_SECONDS)
+    return {"usable": usable, "as_of": as_of, "lag_seconds": lag}
+
+
+def data_freshness(status: Optional[dict], use_rollup: bool) -> dict:
+    """Indicador de frescor devolvido aos clientes (`source` = rollup | live)."""
+    if not use_rollup or not status:
+        return {"source": "live", "as_of": _now().isoformat(), "lag_seconds": 0}
+    return {
+        "source": "rollup",
+        "as_of": status["as_of"].isoformat() if status.get("as_of") else None,
+        "lag_seconds": round(status["lag_seconds"], 1) if status.get("lag_seconds") is not None else None,
+    }
+
+
+def freshness_headers(freshness: dict) -> dict:
+    return {
+        "X-Analytics-Source": freshness["source"],
+        "X-Analytics-As-Of": freshness.get("as_of") or "",
+    }
@@ -0,0 +1,189 @@
+"""Blob store endereçado por conteúdo para `document_files` (Out/2026).
+
+Antes o PDF ia inteiro em `document_files.data_base64`: +33% de espaço, o
+blob todo em memória a cada download e teto de 16 MB do BSON (diário por
+período / livro de promoção já encostavam). Agora `document_files` guarda só
+metadados + `storage` e os bytes ficam num backend plugável:
+
+  DOCUMENT_BLOB_BACKEND=gridfs      (default) bucket GridFS `document_blobs`
+  DOCUMENT_BLOB_BACKEND=filesystem  diretório DOCUMENT_BLOB_DIR (volume compartilhado)
+  DOCUMENT_BLOB_BACKEND=inline      legado — base64 no próprio documento
+
+A chave do blob é o sha256 que já calculávamos: renders idênticos (mesmo
+boletim gerado 2x) apontam para o MESMO blob. Leitura é por faixa
+(`read_range`) em pedaços de BLOB_CHUNK_SIZE — é o que permite streaming e
+HTTP Range no download.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import tempfile
+from typing import AsyncIterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_BLOB_BACKEND = os.environ.get("DOCUMENT_BLOB_BACKEND", "gridfs").strip().lower()
+DOCUMENT_BLOB_DIR = os.environ.get(
+    "DOCUMENT_BLOB_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "uploads", "document_blobs"),
+)
+GRIDFS_BUCKET = "document_blobs"
+BLOB_CHUNK_SIZE = 256 * 1024
+
+
+class BlobNotFound(Exception):
+    pass
+
+
+class GridFSBlobStore:
+    """Blobs no GridFS; `filename` = sha256 (1 arquivo por conteúdo).
+
+    O índice (filename, uploadDate) é criado pelo próprio driver no 1º upload.
+    """
+
+    name = "gridfs"
+
+    def __init__(self, db, bucket_name: str = GRIDFS_BUCKET):
+        from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+        self._db = db
+        self._bucket_name = bucket_name
+        self._bucket = AsyncIOMotorGridFSBucket(db, bucket_name=bucket_name)
+
+    async def _find(self, sha256: str) -> Optional[dict]:
+        return await self._db[f"{self._bucket_name}.files"].find_one(
+            {"filename": sha256}, {"_id": 1, "length": 1}, sort=[("uploadDate", 1)],
+        )
+
+    async def exists(self, sha256: str) -> bool:
+        return await self._find(sha256) is not None
+
+    async def put(self, sha256: str, data: bytes, *, content_type: str) -> bool:
+        """Grava se ainda não existir. Retorna True se gravou, False se deduplicou."""
+        if await self.exists(sha256):
+            return False
+        await self._bucket.upload_from_stream(
+            sha256, data, chunk_size_bytes=BLOB_CHUNK_SIZE,
+            metadata={"content_type": content_type, "size_bytes": len(data)},
+        )
+        return True
+
+    async def read_range(self, sha256: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Bytes [start, end] (inclusivo), em pedaços. `end=None` → até o fim."""
+        found = await self._find(sha256)
+        if not found:
+            raise BlobNotFound(sha256)
+        stream = await self._bucket.open_download_stream(found["_id"])
+        last = found["length"] - 1 if end is None else min(end, found["length"] - 1)
+        stream.seek(start)
+        remaining = last - start + 1
+        while remaining > 0:
+            chunk = await stream.read(min(BLOB_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    async def delete(self, sha256: str) -> bool:
+        found = await self._find(sha256)
+        if not found:
+            return False
+        await self._bucket.delete(found["_id"])
+        return True
+
+
+class FileSystemBlobStore:
+    """Blobs em disco: <root>/<sha[:2]>/<sha[2:4]>/<sha>. Escrita atômica (tmp + rename)."""
+
+    name = "filesystem"
+
+    def __init__(self, root: str = DOCUMENT_BLOB_DIR):
+        self._root = root
+
+    def _path(self, sha256: str) -> str:
+        if len(sha256) < 8 or not all(c in "0123456789abcdef" for c in sha256):
+            raise ValueError(f"sha256 inválido: {sha256!r}")
+        return os.path.join(self._root, sha256[:2], sha256[2:4], sha256)
+
+    async def exists(self, sha256: str) -> bool:
+        return os.path.exists(self._path(sha256))
+
+    def _write(self, path: str, data: bytes) -> bool:
+        if os.path.exists(path):
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        return True
+
+    async def put(self, sha256: str, data: bytes, *, content_type: str) -> bool:
+        return await asyncio.to_thread(self._write, self._path(sha256), data)
+
+    @staticmethod
+    def _read(path: str, offset: int, size: int) -> bytes:
+        with open(path, "rb") as fh:
+            fh.seek(offset)
+            return fh.read(size)
+
+    async def read_range(self, sha256: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        path = self._path(sha256)
+        try:
+            length = os.path.getsize(path)
+        except OSError:
+            raise BlobNotFound(sha256)
+        last = length - 1 if end is None else min(end, length - 1)
+        pos = start
+        while pos <= last:
+            chunk = await asyncio.to_thread(self._read, path, pos, min(BLOB_CHUNK_SIZE, last - pos + 1))
+            if not chunk:
+                break
+            pos += len(chunk)
+            yield chunk
+
+    async def delete(self, sha256: str) -> bool:
+        try:
+            await asyncio.to_thread(os.unlink, self._path(sha256))
+        except FileNotFoundError:
+            return False
+        return True
+
+
+_stores: dict = {}
+
+
+def get_blob_store(db, backend: Optional[str] = None, namespace: Optional[str] = None):
+    """Store do backend pedido (default: DOCUMENT_BLOB_BACKEND). None = inline.
+
+    `namespace` separa blobs de outro dono (bucket GridFS / diretório irmão de
+    DOCUMENT_BLOB_DIR) — ex.: resultados de `pdf_jobs`, que são apagados ao
+    expirar e não podem compartilhar blob com `document_files`.
+    """
+    backend = (backend or DOCUMENT_BLOB_BACKEND).lower()
+    if backend == "inline":
+        return None
+    key = (backend, id(db), namespace)
+    store = _stores.get(key)
+    if store is None:
+        if backend == "gridfs":
+            store = GridFSBlobStore(db, namespace or GRIDFS_BUCKET)
+        elif backend == "filesystem":
+            if namespace:
+                store = FileSystemBlobStore(os.path.join(os.path.dirname(DOCUMENT_BLOB_DIR), namespace))
+            else:
+                store = FileSystemBlobStore()
+        else:
+            raise ValueError(f"DOCUMENT_BLOB_BACKEND desconhecido: {backend}")
+        _stores[key] = store
+    return store
@@ -33,6 +33,7 @@ from reportlab.lib.units import cm
 from reportlab.pdfgen import canvas
 
 from services.document_files import store_pdf
+from services.render_pool import run_render
 from utils.client_time import current_time_context
 
 logger = logging.getLogger(__name__)
@@ -123,6 +124,14 @@ def _stamp_qr_overlay(pdf_bytes: bytes, qr_url: str, *, doc_id: str) -> bytes:
     return out.getvalue()
 
 
+def _render_boletim_bytes(**kwargs) -> bytes:
+    """Roda no render pool: gerador oficial → bytes (BytesIO não atravessa o pool)."""
+    from pdf.boletim import generate_boletim_pdf
+    buf = generate_boletim_pdf(**kwargs)
+    buf.seek(0)
+    return buf.read()
+
+
 async def _build_bulletin_pdf(db, *, student_id: str, academic_year: int) -> tuple[bytes, dict]:
     """Gera o PDF do boletim com as MESMAS regras do endpoint síncrono.
 
@@ -193,9 +202,9 @@ async def _build_bulletin_pdf(db, *, student_id: str, academic_year: int) -> tup
                 prev["absences"] = (prev.get("absences") or 0) + absences
                 attendance_data[cid] = prev
 
-    # PDF (reusa gerador oficial existente)
-    from pdf.boletim import generate_boletim_pdf
-    buf = generate_boletim_pdf(
+    # PDF (reusa gerador oficial existente, fora do event loop)
+    pdf_bytes = await run_render(
+        _render_boletim_bytes,
         student=student,
         school=school,
         enrollment=enrollment,
@@ -207,8 +216,6 @@ async def _build_bulletin_pdf(db, *, student_id: str, academic_year: int) -> tup
         calendario_letivo=calendario_letivo,
         attendance_data=attendance_data,
     )
-    buf.seek(0)
-    pdf_bytes = buf.read()
 
     summary = {
         "student_id": student_id,
@@ -261,7 +268,7 @@ async def render_bulletin_handler(job: dict, *, db, public_base_url: str) -> dic
     await db.bulletin_verifications.insert_one(verification_doc)
 
     # 3) Overlay com QR
-    final_pdf = _stamp_qr_overlay(pdf_bytes, verify_url, doc_id=verification_id)
+    final_pdf = await run_render(_stamp_qr_overlay, pdf_bytes, verify_url, doc_id=verification_id)
 
     # 4) Hash do PDF final
     pdf_hash = hashlib.sha256(final_pdf).hexdigest()
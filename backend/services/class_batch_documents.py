@@ -0,0 +1,114 @@
+"""
+Documentos em lote por turma (boletim, ficha individual, certificado).
+
+[Out/2026] `GET /documents/batch/{class_id}/{document_type}` fazia um
+`db.grades.find` por aluno, varria TODA a frequência da turma para cada aluno
+(O(alunos × sessões × registros)) e chamava os geradores ReportLab no event
+loop — um lote de 35 fichas congelava a API inteira daquele worker.
+
+Este módulo concentra a parte pura do lote (sem `db`):
+  - `group_grades_by_student`: notas de TODOS os alunos vindas de um único `$in`;
+  - `index_absences_by_student`: UMA passada na frequência da turma;
+  - `build_attendance_data`: mesmo payload `attendance_data` do endpoint individual;
+  - `render_batch_page` / `merge_pdf_pages`: rodam no `services.render_pool`
+    (funções module-level, argumentos picklable).
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from io import BytesIO
+from typing import Iterable
+
+
+def group_grades_by_student(grades: Iterable[dict]) -> dict[str, list[dict]]:
+    """Agrupa o resultado do `$in` por student_id (ordem natural preservada)."""
+    by_student: dict[str, list[dict]] = defaultdict(list)
+    for g in grades:
+        sid = g.get("student_id")
+        if sid:
+            by_student[sid].append(g)
+    return by_student
+
+
+def index_absences_by_student(attendance_records: Iterable[dict]) -> dict[str, dict]:
+    """Conta faltas ('F') por aluno numa única passada pela frequência da turma.
+
+    Mesma regra do endpoint individual: chamada diária do período regular soma
+    em `faltas_regular`; as demais (por componente) em `faltas_por_componente`.
+    Retorna {student_id: {"faltas_regular": int, "faltas_por_componente": {course_id: int}}}.
+    """
+    index: dict[str, dict] = {}
+    for att_record in attendance_records:
+        period = att_record.get("period", "regular")
+        course_id = att_record.get("course_id")
+        is_daily_regular = att_record.get("attendance_type", "daily") == "daily" and period == "regular"
+        if not is_daily_regular and not course_id:
+            continue
+        for sr in att_record.get("records", []):
+            if sr.get("status") != "F":
+                continue
+            sid = sr.get("student_id")
+            if not sid:
+                continue
+            entry = index.get(sid)
+            if entry is None:
+                entry = index[sid] = {"faltas_regular": 0, "faltas_por_componente": {}}
+            if is_daily_regular:
+                entry["faltas_regular"] += 1
+            else:
+                por_comp = entry["faltas_por_componente"]
+                por_comp[course_id] = por_comp.get(course_id, 0) + 1
+    return index
+
+
+def build_attendance_data(absences: dict | None, courses: list[dict], *, is_escola_integral: bool) -> dict:
+    """Monta o `attendance_data` esperado por boletim/ficha a partir do índice."""
+    absences = absences or {}
+    faltas_por_componente = dict(absences.get("faltas_por_componente") or {})
+    attendance_data: dict = {
+        "_meta": {
+            "faltas_regular": absences.get("faltas_regular", 0),
+            "faltas_por_componente": faltas_por_componente,
+            "is_escola_integral": is_escola_integral,
+        }
+    }
+    for course in courses:
+        c_id = course.get("id")
+        atendimento = course.get("atendimento_programa")
+        if atendimento == "atendimento_integral":
+            faltas = faltas_por_componente.get(c_id, 0)
+        else:
+            faltas = 0
+        attendance_data[c_id] = {"absences": faltas, "atendimento_programa": atendimento}
+    return attendance_data
+
+
+def render_batch_page(document_type: str, kwargs: dict) -> bytes:
+    """Roda no render pool: gera o PDF de UM aluno e devolve bytes."""
+    from pdf_generator import (
+        generate_boletim_pdf,
+        generate_certificado_pdf,
+        generate_ficha_individual_pdf,
+    )
+
+    generators = {
+        "boletim": generate_boletim_pdf,
+        "ficha_individual": generate_ficha_individual_pdf,
+        "certificado": generate_certificado_pdf,
+    }
+    buf = generators[document_type](**kwargs)
+    buf.seek(0)
+    return buf.read()
+
+
+def merge_pdf_pages(pages: list[bytes]) -> bytes:
+    """Roda no render pool: concatena os PDFs individuais na ordem recebida."""
+    from PyPDF2 import PdfMerger
+
+    merger = PdfMerger()
+    for page in pages:
+        merger.append(BytesIO(page))
+    out = BytesIO()
+    merger.write(out)
+    merger.close()
+    return out.getvalue()
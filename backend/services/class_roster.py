@@ -0,0 +1,217 @@
+"""Roster da turma memoizado — Out/2026.
+
+`GET /attendance/by-class/{class_id}/{date}`, `GET /grades/by-class/{class_id}/{course_id}`
+e o roster da frequência DVD (`services.attendance_assignment_roster`) montavam
+a mesma lista do zero a cada troca de data/componente: matrículas ativas,
+matrículas inativas (transferido/desistente/remanejado/progredido/
+reclassificado — "cancelled" fica de fora de propósito), alunos com vínculo
+direto (`students.class_id`), dados dos alunos, `student_history` dos inativos
+e alunos em dependência — 6 a 8 queries por carga do diário.
+
+Aqui essas leituras viram um `ClassRoster` (o resultado CRU das queries) numa
+região de cache por (banco, turma). Tudo que depende do pedido — ano letivo
+para o nº de matrícula, componente/tenant das dependências — é derivado em
+memória pelos métodos, com as mesmas regras que cada endpoint aplicava.
+
+Invalidação (tags da região `class:roster`, propagadas às outras réplicas pelo
+barramento de utils/cache):
+  - `class:<id>` — escritas de matrícula/dependência/transferência da turma;
+  - `student:<id>` — qualquer aluno do roster (nome, status, turma atual);
+  - reparos em lote (manutenção, dedup, migração de datas) limpam a região
+    inteira (`clear_class_rosters`);
+  - TTL (CLASS_ROSTER_CACHE_SECONDS) cobre só escritas fora dos routers
+    (scripts).
+
+O snapshot é compartilhado entre requisições: quem consome NÃO deve mutar os
+dicts (copie antes, como o diário de notas já faz com `grade`).
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.cache import get_region
+
+CLASS_ROSTER_CACHE_SECONDS = float(os.environ.get("CLASS_ROSTER_CACHE_SECONDS", "120"))
+
+INACTIVE_ENROLLMENT_STATUSES = ["transferred", "dropout", "relocated", "progressed", "reclassified"]
+
+ACTION_TYPE_LABELS = {
+    'transferencia_saida': 'Transferido',
+    'remanejamento': 'Remanejado',
+    'progressao': 'Progredido',
+    'reclassificacao': 'Reclassificado',
+    'desistencia': 'Desistente',
+    'cancelamento': 'Cancelado',
+}
+
+_region = get_region("class:roster", max_entries=1000, default_ttl=CLASS_ROSTER_CACHE_SECONDS)
+
+
+def class_tag(class_id: str) -> str:
+    return f"class:{class_id}"
+
+
+def student_tag(student_id: str) -> str:
+    return f"student:{student_id}"
+
+
+@dataclass
+class ClassRoster:
+    class_id: str
+    active_enrollments: List[dict] = field(default_factory=list)
+    inactive_enrollments: List[dict] = field(default_factory=list)
+    direct_students: List[dict] = field(default_factory=list)
+    students: List[dict] = field(default_factory=list)          # ordem alfabética (collation pt)
+    history: List[dict] = field(default_factory=list)           # ação mais recente primeiro
+    dependencies: List[dict] = field(default_factory=list)      # ativas, todos os componentes
+    dependency_students: Dict[str, dict] = field(default_factory=dict)
+
+    @property
+    def active_ids(self) -> set:
+        return {e.get('student_id') for e in self.active_enrollments}
+
+    @property
+    def inactive_ids(self) -> set:
+        active = self.active_ids
+        return {e.get('student_id') for e in self.inactive_enrollments} - active
+
+    def enrollment_numbers(self, academic_year) -> Dict[str, Any]:
+        """Nº de matrícula: ativa > inativa > cadastro; no mesmo nível, a do ano pedido."""
+        numbers: Dict[str, Any] = {}
+        active = self.active_ids
+        for e in self.active_enrollments:
+            sid = e.get('student_id')
+            if sid not in numbers or e.get('academic_year') == academic_year:
+                numbers[sid] = e.get('enrollment_number')
+        for e in self.inactive_enrollments:
+            sid = e.get('student_id')
+            if sid not in active and (sid not in numbers or e.get('academic_year') == academic_year):
+                numbers[sid] = e.get('enrollment_number')
+        for s in self.direct_students:
+            sid = s.get('id')
+            if sid not in numbers:
+                numbers[sid] = s.get('enrollment_number')
+        return numbers
+
+    def enrollment_dates(self, include_inactive: bool = False) -> Dict[str, Any]:
+        """Data de matrícula (da ativa; com `include_inactive`, cai para a inativa)."""
+        dates: Dict[str, Any] = {}
+        for e in self.active_enrollments:
+            if e.get('enrollment_date'):
+                dates[e.get('student_id')] = e.get('enrollment_date')
+        if include_inactive:
+            for e in self.inactive_enrollments:
+                sid = e.get('student_id')
+                if e.get('enrollment_date') and sid not in dates:
+                    dates[sid] = e.get('enrollment_date')
+        return dates
+
+    def enrollment_series(self) -> Dict[str, Any]:
+        return {e.get('student_id'): e.get('student_series')
+                for e in self.active_enrollments if e.get('student_series')}
+
+    def action_info(self) -> Dict[str, dict]:
+        """Ação mais recente (rótulo + data) de cada aluno inativo."""
+        info: Dict[str, dict] = {}
+        for h in self.history:
+            sid = h.get('student_id')
+            if sid not in info:
+                info[sid] = {
+                    "action_label": ACTION_TYPE_LABELS.get(h.get('action_type'), ''),
+                    "action_date": h.get('action_date', ''),
+                }
+        return info
+
+    def dependencies_for(self, course_id: str, tenant_id: Optional[str] = None) -> List[Tuple[dict, dict]]:
+        """(dependência, aluno) ativos no componente, fora do roster regular."""
+        deps = [d for d in self.dependencies
+                if d.get('course_id') == course_id and (not tenant_id or d.get('mantenedora_id') == tenant_id)]
+        regular = {s['id'] for s in self.students}
+        dep_by_sid = {d.get('student_id'): d for d in deps}
+        pairs = []
+        for d in deps:
+            sid = d.get('student_id')
+            if not sid or sid in regular:
+                continue
+            student = self.dependency_students.get(sid)
+            if student:
+                pairs.append((dep_by_sid[sid], student))
+        return pairs
+
+    def tags(self) -> List[str]:
+        sids = {s['id'] for s in self.students} | set(self.dependency_students)
+        return [class_tag(self.class_id)] + [student_tag(sid) for sid in sids if sid]
+
+
+async def load_class_roster(db, class_id: str) -> ClassRoster:
+    """As leituras do roster, sem cache."""
+    roster = ClassRoster(class_id=class_id)
+    roster.active_enrollments = await db.enrollments.find(
+        {"class_id": class_id, "status": "active"},
+        {"_id": 0, "student_id": 1, "enrollment_number": 1, "academic_year": 1,
+         "student_series": 1, "enrollment_date": 1}
+    ).to_list(1000)
+    roster.inactive_enrollments = await db.enrollments.find(
+        {"class_id": class_id, "status": {"$in": INACTIVE_ENROLLMENT_STATUSES}},
+        {"_id": 0, "student_id": 1, "enrollment_number": 1, "academic_year": 1,
+         "status": 1, "enrollment_date": 1}
+    ).to_list(1000)
+    roster.direct_students = await db.students.find(
+        {"class_id": class_id, "status": {"$in": ["active", "Ativo"]}},
+        {"_id": 0, "id": 1, "enrollment_number": 1}
+    ).to_list(1000)
+
+    inactive_ids = roster.inactive_ids
+    all_ids = list(roster.active_ids | inactive_ids | {s.get('id') for s in roster.direct_students})
+    if all_ids:
+        roster.students = await db.students.find(
+            {"id": {"$in": all_ids}},
+            {"_id": 0, "id": 1, "full_name": 1, "enrollment_number": 1, "status": 1,
+             "class_id": 1, "student_series": 1}
+        ).sort("full_name", 1).collation({"locale": "pt", "strength": 1}).to_list(1000)
+    if inactive_ids:
+        roster.history = await db.student_history.find(
+            {
+                "student_id": {"$in": list(inactive_ids)},
+                "class_id": class_id,
+                "action_type": {"$in": list(ACTION_TYPE_LABELS)},
+            },
+            {"_id": 0, "student_id": 1, "action_type": 1, "action_date": 1}
+        ).sort("action_date", -1).to_list(1000)
+
+    roster.dependencies = await db.student_dependencies.find(
+        {"class_id": class_id, "status": "active"}, {"_id": 0}
+    ).to_list(2000)
+    regular = {s['id'] for s in roster.students}
+    dep_ids = list({d['student_id'] for d in roster.dependencies
+                    if d.get('student_id') and d['student_id'] not in regular})
+    if dep_ids:
+        dep_students = await db.students.find(
+            {"id": {"$in": dep_ids}},
+            {"_id": 0, "id": 1, "full_name": 1, "enrollment_number": 1, "status": 1, "dependency_mode": 1}
+        ).to_list(2000)
+        roster.dependency_students = {s['id']: s for s in dep_students}
+    return roster
+
+
+async def get_class_roster(db, class_id: str) -> ClassRoster:
+    """Roster da turma (cache por banco+turma; single-flight no miss)."""
+    key = (getattr(db, "name", ""), class_id)
+    return await _region.get_or_load(
+        key, lambda: load_class_roster(db, class_id), tags=ClassRoster.tags,
+    )
+
+
+def invalidate_class_rosters(class_ids: Iterable[Optional[str]] = (),
+                             student_ids: Iterable[Optional[str]] = ()) -> None:
+    """Derruba os rosters das turmas e os que contêm os alunos (todas as réplicas)."""
+    tags = [class_tag(c) for c in class_ids if c] + [student_tag(s) for s in student_ids if s]
+    if tags:
+        _region.invalidate_tags(*tags)
+
+
+def clear_class_rosters() -> None:
+    """Derruba todos os rosters (reparos em lote; todas as réplicas)."""
+    _region.clear()
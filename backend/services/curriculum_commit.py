@@ -0,0 +1,369 @@
+"""Commit em LOTE do importador curricular (BNCC / DCM) — Out/2026.
+
+O commit antigo andava item a item com `find_one` + `insert_one` em
+`curriculum_components`, `bncc_skills`, `curriculum_adaptations` e
+`curriculum_skills` (4–8 round-trips por habilidade). Um documento BNCC com
+milhares de habilidades levava minutos e, se caísse no meio, deixava o batch
+meio importado. Aqui:
+
+  1. `build_commit_plan`: UMA query `$in` por coleção para o que já existe e
+     todos os documentos novos montados em memória (mesmas regras/ids do
+     commit antigo — ids determinísticos, então repetir o commit não duplica);
+  2. `write_commit_plan`: `bulk_write` por coleção em blocos de
+     CURRICULUM_COMMIT_CHUNK_SIZE, status dos itens do batch num único update;
+  3. opcionalmente tudo dentro de uma transação (exige replica set);
+  4. progresso por bloco via callback (o router grava em `commit_progress`).
+
+Trava do commit: o batch fica 'committing' com `commit_progress.updated_at`
+renovado a cada bloco. Se o processo morre no meio (crash, restart, task
+cancelada antes do rollback), a trava sem progresso há
+CURRICULUM_COMMIT_STALE_SECONDS é assumida pelo próximo commit — repetir é
+seguro (ids determinísticos).
+"""
+from __future__ import annotations
+
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+
+from services.curriculum_extractor import COMPONENT_MAP
+from services.curriculum_v2_migration import (
+    BNCC_CODE_RE, AREA_BY_COMPONENT, hash_id as _hash_id,
+    etapa_bncc_from_codigo as _etapa_bncc_from_codigo,
+    escopo_from_fonte as _escopo_from_fonte,
+)
+
+CURRICULUM_COMMIT_CHUNK_SIZE = int(os.environ.get("CURRICULUM_COMMIT_CHUNK_SIZE", "1000"))
+CURRICULUM_COMMIT_TRANSACTION = os.environ.get("CURRICULUM_COMMIT_TRANSACTION", "false").lower() in ("1", "true", "yes")
+
+CURRICULUM_COMMIT_STALE_SECONDS = int(os.environ.get("CURRICULUM_COMMIT_STALE_SECONDS", "600"))
+
+ProgressCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+_DUPLICATE_KEY = 11000
+
+# Ordem de gravação: referências (componente, BNCC) antes de quem aponta para elas.
+_WRITE_ORDER = (
+    ("curriculum_components", "components"),
+    ("bncc_skills", "bncc"),
+    ("curriculum_adaptations", "adaptations"),
+    ("curriculum_skills", "legacy"),
+)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def commit_lock_stale(batch: dict, now: Optional[datetime] = None) -> bool:
+    """'committing' sem progresso há CURRICULUM_COMMIT_STALE_SECONDS (dono morreu)."""
+    if batch.get("status") != "committing":
+        return False
+    raw = (batch.get("commit_progress") or {}).get("updated_at")
+    if not raw:
+        return True
+    try:
+        updated = datetime.fromisoformat(raw)
+    except (TypeError, ValueError):
+        return True
+    if updated.tzinfo is None:
+        updated = updated.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return (now - updated).total_seconds() > CURRICULUM_COMMIT_STALE_SECONDS
+
+
+async def acquire_commit_lock(db, batch: dict) -> Optional[Tuple[str, str]]:
+    """Passa o batch para 'committing' (condicional ao estado lido: duplo clique /
+    duas abas → só um vence). Trava vencida é assumida. Retorna (lease, status a
+    restaurar se o commit falhar), ou None se não obteve a trava. Progresso,
+    rollback e status final filtram pelo `commit_lease`: um dono antigo que
+    ainda esteja vivo não pisa no novo."""
+    if batch["status"] == "committing":
+        if not commit_lock_stale(batch):
+            return None
+        prev_status = batch.get("commit_prev_status") or "pending_review"
+        query = {"id": batch["id"], "status": "committing",
+                 "commit_progress.updated_at": (batch.get("commit_progress") or {}).get("updated_at")}
+    else:
+        prev_status = batch["status"]
+        query = {"id": batch["id"], "status": prev_status}
+    lease = uuid.uuid4().hex
+    res = await db.curriculum_import_batches.update_one(query, {"$set": {
+        "status": "committing",
+        "commit_lease": lease,
+        "commit_prev_status": prev_status,
+        "commit_started_at": _now(),
+        "commit_progress": {"done": 0, "total": None, "updated_at": _now()},
+    }})
+    return (lease, prev_status) if res.modified_count else None
+
+
+COMMIT_LOCK_FIELDS = {"commit_progress": "", "commit_lease": "", "commit_prev_status": "", "commit_started_at": ""}
+
+
+async def release_commit_lock(db, batch_id: str, lease: str, prev_status: str, error: str) -> None:
+    """Desfaz a trava depois de uma falha (inclusive cancelamento)."""
+    await db.curriculum_import_batches.update_one(
+        {"id": batch_id, "commit_lease": lease},
+        {"$set": {"status": prev_status, "commit_error": error[:500]}, "$unset": COMMIT_LOCK_FIELDS},
+    )
+
+
+@dataclass
+class CommitPlan:
+    components: List[dict] = field(default_factory=list)
+    bncc: List[dict] = field(default_factory=list)
+    adaptations: List[dict] = field(default_factory=list)
+    legacy: List[dict] = field(default_factory=list)
+    imported: List[int] = field(default_factory=list)     # idx → status 'imported'
+    duplicates: List[int] = field(default_factory=list)   # idx → status 'duplicate'
+    counts: Dict[str, int] = field(default_factory=lambda: {
+        "skills_inserted": 0, "skills_skipped_duplicate": 0, "components_created": 0,
+        "bncc_inserted": 0, "bncc_existed": 0,
+        "adaptations_inserted": 0, "adaptations_existed": 0,
+    })
+
+    def total_docs(self) -> int:
+        return len(self.components) + len(self.bncc) + len(self.adaptations) + len(self.legacy)
+
+
+def _item_keys(item: dict, batch_fonte: str):
+    comp_codigo = (item.get('componente_codigo') or 'XX').upper()
+    etapa = item.get('etapa') or 'anos_iniciais'
+    fonte = item.get('fonte') or batch_fonte
+    return comp_codigo, etapa, fonte
+
+
+def _component_doc(item: dict, comp_codigo: str, etapa: str, fonte: str,
+                   mantenedora_id: Optional[str], batch_id: str, now: str) -> dict:
+    nome = item.get('componente_nome') or COMPONENT_MAP.get(comp_codigo, (comp_codigo, etapa))[0]
+    escopo = _escopo_from_fonte(fonte)
+    return {
+        "id": f"comp_{comp_codigo.lower()}_{etapa}_{fonte.lower()}",
+        "codigo": comp_codigo,
+        "nome": nome,
+        "eixo_estruturante": None,
+        "etapa": etapa,
+        "fonte": fonte,
+        "escopo": escopo,
+        "area_conhecimento": AREA_BY_COMPONENT.get(comp_codigo),
+        "mantenedora_id": mantenedora_id if escopo == 'MUNICIPAL' else None,
+        "descricao": f"Importado via batch {batch_id}.",
+        "ordem": 50,
+        "ativo": True,
+        "created_at": now,
+        "updated_at": None,
+    }
+
+
+def _bncc_doc(item: dict, codigo: str, comp_codigo: str, now: str) -> dict:
+    m = BNCC_CODE_RE.match(codigo)
+    comp_from_code = m.group(3) if m else comp_codigo
+    return {
+        "id": _hash_id("bncc", codigo),
+        "codigo_bncc": codigo,
+        "descricao_bncc": item['descricao'],
+        "eixo": None,
+        "etapa": _etapa_bncc_from_codigo(codigo, item.get('ano')),
+        "ano": item.get('ano'),
+        "ano_range": None,
+        "area_conhecimento": AREA_BY_COMPONENT.get(comp_from_code),
+        "componente_codigo": comp_from_code,
+        "ativo": True,
+        "created_at": now,
+        "updated_at": None,
+    }
+
+
+def _adaptation_key(doc: dict) -> tuple:
+    return (doc.get("mantenedora_id"), doc.get("component_id"), doc.get("bncc_skill_id"),
+            doc.get("codigo_local"), doc.get("ano") or 0, doc.get("bimestre"))
+
+
+async def build_commit_plan(db, batch: dict, approved: List[dict],
+                            mantenedora_id: Optional[str]) -> CommitPlan:
+    """Resolve o que já existe (1 query por coleção) e monta os documentos novos."""
+    batch_id = batch['id']
+    batch_fonte = batch.get('fonte', 'DCM_FA')
+    now = _now()
+    plan = CommitPlan()
+    counts = plan.counts
+
+    # --- 1. Componentes (codigo, etapa, fonte) ---
+    comp_keys = {_item_keys(i, batch_fonte) for i in approved}
+    comp_ids: Dict[tuple, str] = {}
+    async for c in db.curriculum_components.find(
+        {"codigo": {"$in": sorted({k[0] for k in comp_keys})},
+         "etapa": {"$in": sorted({k[1] for k in comp_keys})},
+         "fonte": {"$in": sorted({k[2] for k in comp_keys})}},
+        {"_id": 0, "id": 1, "codigo": 1, "etapa": 1, "fonte": 1},
+    ):
+        comp_ids.setdefault((c.get("codigo"), c.get("etapa"), c.get("fonte")), c["id"])
+
+    # --- 2. BNCC canônicas por código ---
+    bncc_codes = sorted({i['codigo'] for i in approved if BNCC_CODE_RE.match(i['codigo'])})
+    bncc_ids: Dict[str, str] = {}
+    if bncc_codes:
+        async for b in db.bncc_skills.find({"codigo_bncc": {"$in": bncc_codes}},
+                                           {"_id": 0, "id": 1, "codigo_bncc": 1}):
+            bncc_ids.setdefault(b["codigo_bncc"], b["id"])
+
+    # --- 3. Legado (curriculum_skills) por código ---
+    legacy_codes = set()
+    codes = sorted({i['codigo'] for i in approved})
+    async for s in db.curriculum_skills.find({"codigo": {"$in": codes}}, {"_id": 0, "codigo": 1}):
+        legacy_codes.add(s["codigo"])
+
+    # Resolve componente/BNCC de cada item (cria os que faltam, em memória)
+    resolved = []
+    for item in approved:
+        comp_codigo, etapa, fonte = key = _item_keys(item, batch_fonte)
+        if key not in comp_ids:
+            doc = _component_doc(item, comp_codigo, etapa, fonte, mantenedora_id, batch_id, now)
+            plan.components.append(doc)
+            counts["components_created"] += 1
+            comp_ids[key] = doc["id"]
+        codigo = item['codigo']
+        is_bncc_code = bool(BNCC_CODE_RE.match(codigo))
+        bncc_id = None
+        if is_bncc_code:
+            if codigo in bncc_ids:
+                counts["bncc_existed"] += 1
+            else:
+                doc = _bncc_doc(item, codigo, comp_codigo, now)
+                plan.bncc.append(doc)
+                counts["bncc_inserted"] += 1
+            bncc_id = bncc_ids.setdefault(codigo, _hash_id("bncc", codigo))
+        resolved.append((item, comp_codigo, fonte, comp_ids[key], is_bncc_code, bncc_id))
+
+    # --- 4. Adaptações já existentes (tupla única) ---
+    existing_adapt = set()
+    component_ids = sorted({r[3] for r in resolved})
+    local_codes = sorted({r[0]['codigo'] for r in resolved if not r[4]})
+    scope = [c for c in ({"bncc_skill_id": {"$in": sorted(set(bncc_ids.values()))}} if bncc_ids else None,
+                         {"codigo_local": {"$in": local_codes}} if local_codes else None) if c]
+    async for a in db.curriculum_adaptations.find(
+        {"mantenedora_id": mantenedora_id, "component_id": {"$in": component_ids}, "$or": scope},
+        {"_id": 0, "mantenedora_id": 1, "component_id": 1, "bncc_skill_id": 1,
+         "codigo_local": 1, "ano": 1, "bimestre": 1},
+    ):
+        existing_adapt.add(_adaptation_key(a))
+
+    for item, comp_codigo, fonte, component_id, is_bncc_code, bncc_id in resolved:
+        codigo = item['codigo']
+        adapt_doc = {
+            "id": _hash_id("adapt", codigo, mantenedora_id or "_",
+                           item.get('ano') or 0, item.get('bimestre') or 0),
+            "mantenedora_id": mantenedora_id,
+            "component_id": component_id,
+            "bncc_skill_id": bncc_id,
+            "codigo_local": None if is_bncc_code else codigo,
+            "descricao_local": None if is_bncc_code else item['descricao'],
+            "eixo_local": None,
+            "objeto_conhecimento": None,
+            "ano": item.get('ano') or 0,
+            "bimestre": item.get('bimestre'),
+            "ordem_sequencia": 0,
+            "fonte": fonte if fonte in ('DCM_FA', 'MUNICIPAL', 'BNCC_COMPUTACAO') else 'MUNICIPAL',
+            "ativo": True,
+            "created_at": now,
+            "updated_at": None,
+        }
+        akey = _adaptation_key(adapt_doc)
+        if akey in existing_adapt:
+            counts["adaptations_existed"] += 1
+            plan.duplicates.append(item['idx'])
+            continue
+        existing_adapt.add(akey)
+        plan.adaptations.append(adapt_doc)
+        counts["adaptations_inserted"] += 1
+
+        if codigo in legacy_codes:
+            counts["skills_skipped_duplicate"] += 1
+        else:
+            legacy_codes.add(codigo)
+            plan.legacy.append({
+                "id": f"skill_imp_{batch_id[:8]}_{item['idx']}",
+                "codigo": codigo,
+                "descricao": item['descricao'],
+                "componente_id": component_id,
+                "componente_codigo": comp_codigo,
+                "ano": item.get('ano'),
+                "bimestre": item.get('bimestre'),
+                "objeto_conhecimento": None,
+                "unidade_tematica": None,
+                "fonte": fonte,
+                "metodos_recomendados": [],
+                "ativo": True,
+                "created_at": now,
+                "updated_at": None,
+            })
+            counts["skills_inserted"] += 1
+        plan.imported.append(item['idx'])
+    return plan
+
+
+async def _insert_chunk(collection, docs: List[dict], session) -> int:
+    """insert em bulk (não ordenado); devolve quantos já existiam (chave duplicada)."""
+    try:
+        await collection.bulk_write([InsertOne(d) for d in docs], ordered=False, session=session)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(err.get("code") != _DUPLICATE_KEY for err in errors):
+            raise
+        return len(errors)
+    return 0
+
+
+async def write_commit_plan(db, batch_id: str, plan: CommitPlan, *, session=None,
+                            progress_cb: Optional[ProgressCallback] = None,
+                            chunk_size: int = CURRICULUM_COMMIT_CHUNK_SIZE) -> None:
+    """Grava o plano (bulk por coleção, em blocos) e o status dos itens do batch."""
+    total = plan.total_docs()
+    done = 0
+    for collection, attr in _WRITE_ORDER:
+        docs = getattr(plan, attr)
+        for start in range(0, len(docs), chunk_size):
+            chunk = docs[start:start + chunk_size]
+            dupes = await _insert_chunk(db[collection], chunk, session)
+            if dupes and attr == "bncc":
+                plan.counts["bncc_inserted"] -= dupes
+                plan.counts["bncc_existed"] += dupes
+            elif dupes and attr == "adaptations":
+                plan.counts["adaptations_inserted"] -= dupes
+                plan.counts["adaptations_existed"] += dupes
+            elif dupes and attr == "legacy":
+                plan.counts["skills_inserted"] -= dupes
+                plan.counts["skills_skipped_duplicate"] += dupes
+            elif dupes:
+                plan.counts["components_created"] -= dupes
+            done += len(chunk)
+            if progress_cb:
+                await progress_cb({"phase": collection, "done": done, "total": total})
+
+    if plan.imported or plan.duplicates:
+        await db.curriculum_import_batches.update_one(
+            {"id": batch_id},
+            {"$set": {"items.$[imp].status": "imported", "items.$[dup].status": "duplicate"}},
+            array_filters=[{"imp.idx": {"$in": plan.imported}}, {"dup.idx": {"$in": plan.duplicates}}],
+            session=session,
+        )
+
+
+async def commit_items(db, batch: dict, approved: List[dict], mantenedora_id: Optional[str], *,
+                       transactional: bool = CURRICULUM_COMMIT_TRANSACTION,
+                       progress_cb: Optional[ProgressCallback] = None) -> CommitPlan:
+    """Planeja e grava o commit. `transactional=True` grava tudo ou nada (replica set)."""
+    plan = await build_commit_plan(db, batch, approved, mantenedora_id)
+    if not transactional:
+        await write_commit_plan(db, batch['id'], plan, progress_cb=progress_cb)
+        return plan
+    async with await db.client.start_session() as session:
+        async with session.start_transaction():
+            await write_commit_plan(db, batch['id'], plan, session=session, progress_cb=progress_cb)
+    return plan
@@ -0,0 +1,189 @@
+"""Extração de PDF curricular FORA do event loop — Out/2026.
+
+O upload chamava `extract_skills_from_pdf` (pdfplumber + regex, CPU-bound)
+direto no handler: um BNCC de centenas de páginas travava a API inteira
+durante o parse. Aqui:
+
+  1. cache por sha256 do PDF (+ componentes, fonte e EXTRACTOR_VERSION) em
+     `curriculum_extraction_cache` — reenviar o mesmo documento é instantâneo;
+  2. sem cache, o batch nasce com status 'extracting' e a extração roda como
+     job em background: o PDF é dividido em faixas de
+     CURRICULUM_EXTRACT_PAGES_PER_TASK páginas, cada faixa vai para o
+     `services.render_pool` (processos, em paralelo);
+  3. conforme as faixas terminam, os itens estruturados (provisórios) entram no
+     batch (`$push`) junto com `extract_progress` — a UI já mostra o que saiu;
+  4. no fim, Fases B–D (`finalize_extraction`) sobre a junção das faixas, os
+     itens definitivos substituem os provisórios e o batch vai para
+     'pending_review' (ou 'extract_failed').
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from models import CurriculumImportItem
+from services.curriculum_extractor import (
+    EXTRACTOR_VERSION, count_pdf_pages, extract_page_range, finalize_extraction,
+)
+from services.render_pool import run_render
+
+logger = logging.getLogger(__name__)
+
+CACHE_COLLECTION = 'curriculum_extraction_cache'
+CURRICULUM_EXTRACT_PAGES_PER_TASK = int(os.environ.get("CURRICULUM_EXTRACT_PAGES_PER_TASK", "8"))
+CURRICULUM_EXTRACT_CACHE_TTL_DAYS = int(os.environ.get("CURRICULUM_EXTRACT_CACHE_TTL_DAYS", "30"))
+
+PagesCallback = Callable[[List[dict], int, int], Awaitable[None]]
+
+_running: set = set()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def cache_key(content: bytes, only_list: Optional[List[str]], fonte: str) -> str:
+    sha = hashlib.sha256(content).hexdigest()
+    only = ','.join(sorted(only_list)) if only_list else '*'
+    return f"{sha}:{only}:{fonte}:v{EXTRACTOR_VERSION}"
+
+
+async def get_cached_items(db, key: str) -> Optional[List[dict]]:
+    doc = await db[CACHE_COLLECTION].find_one({"key": key}, {"_id": 0, "items": 1})
+    return doc['items'] if doc else None
+
+
+async def _store_cache(db, key: str, items: List[dict], pages: int) -> None:
+    expires = datetime.now(timezone.utc) + timedelta(days=CURRICULUM_EXTRACT_CACHE_TTL_DAYS)
+    await db[CACHE_COLLECTION].update_one(
+        {"key": key},
+        {"$set": {"key": key, "items": items, "pages": pages, "created_at": _now(), "expires_at": expires}},
+        upsert=True,
+    )
+
+
+def page_ranges(total_pages: int, per_task: Optional[int] = None) -> List[Tuple[int, int]]:
+    per_task = max(1, per_task or CURRICULUM_EXTRACT_PAGES_PER_TASK)
+    return [(first, min(first + per_task - 1, total_pages))
+            for first in range(1, total_pages + 1, per_task)]
+
+
+async def extract_pdf_parallel(pdf_path: str, only_list: Optional[List[str]], fonte: str,
+                               on_pages: Optional[PagesCallback] = None) -> Tuple[List[dict], int]:
+    """Extração completa por faixas no pool de processos → (itens, nº de páginas)."""
+    total = await run_render(count_pdf_pages, pdf_path)
+    structured: List[dict] = []
+    text_by_page: Dict[int, str] = {}
+    done = 0
+    ranges = page_ranges(total)
+    pending = [asyncio.ensure_future(run_render(extract_page_range, pdf_path, a, b, only_list, fonte))
+               for a, b in ranges]
+    try:
+        for fut in asyncio.as_completed(pending):
+            part, texts = await fut
+            structured.extend(part)
+            text_by_page.update(texts)
+            done += len(texts)
+            if on_pages:
+                await on_pages(part, done, total)
+    except BaseException:
+        for f in pending:
+            f.cancel()
+        raise
+    items = await run_render(finalize_extraction, structured, text_by_page, only_list, fonte)
+    return items, total
+
+
+async def build_batch_items(db, items_raw: List[dict], fonte: str, start_idx: int = 0) -> List[CurriculumImportItem]:
+    """Itens do batch; códigos já presentes em `curriculum_skills` → 'duplicate'."""
+    codigos = [i['codigo'] for i in items_raw]
+    existing = set()
+    if codigos:
+        cursor = db.curriculum_skills.find(
+            {"codigo": {"$in": codigos}}, {"_id": 0, "codigo": 1}
+        )
+        async for doc in cursor:
+            existing.add(doc['codigo'])
+
+    return [
+        CurriculumImportItem(
+            idx=start_idx + n,
+            codigo=raw['codigo'],
+            descricao=raw['descricao'],
+            ano=raw.get('ano'),
+            ano_range=raw.get('ano_range'),
+            bimestre=raw.get('bimestre'),
+            componente_codigo=raw.get('componente_codigo'),
+            componente_nome=raw.get('componente_nome'),
+            etapa=raw.get('etapa'),
+            page=raw.get('page'),
+            fonte=raw.get('fonte', fonte),
+            status='duplicate' if raw['codigo'] in existing else 'pending',
+        )
+        for n, raw in enumerate(items_raw)
+    ]
+
+
+async def run_extraction_job(db, batch_id: str, pdf_path: str, key: str,
+                             only_list: Optional[List[str]], fonte: str) -> None:
+    """Extrai o PDF, alimentando o batch faixa a faixa. Sempre remove `pdf_path`."""
+    coll = db.curriculum_import_batches
+    streamed: set = set()
+
+    async def _on_pages(part: List[dict], done: int, total: int) -> None:
+        fresh = []
+        for raw in part:
+            if raw['codigo'] not in streamed:
+                streamed.add(raw['codigo'])
+                fresh.append(raw)
+        items = await build_batch_items(db, fresh, fonte, start_idx=len(streamed) - len(fresh))
+        await coll.update_one({"id": batch_id}, {
+            "$push": {"items": {"$each": [i.model_dump() for i in items]}},
+            "$set": {"total_items": len(streamed),
+                     "extract_progress": {"pages_done": done, "pages_total": total, "updated_at": _now()}},
+        })
+
+    try:
+        items_raw, pages = await extract_pdf_parallel(pdf_path, only_list, fonte, on_pages=_on_pages)
+        await _store_cache(db, key, items_raw, pages)
+        items = await build_batch_items(db, items_raw, fonte)
+        await coll.update_one({"id": batch_id, "status": "extracting"}, {"$set": {
+            "items": [i.model_dump() for i in items],
+            "total_items": len(items),
+            "status": "pending_review",
+            "extract_progress": {"pages_done": pages, "pages_total": pages, "updated_at": _now()},
+        }})
+    except Exception as e:  # noqa: BLE001
+        logger.error(f"[curriculum_extraction] batch {batch_id} falhou: {e}")
+        await coll.update_one({"id": batch_id, "status": "extracting"}, {"$set": {
+            "status": "extract_failed", "extract_error": f"Falha ao extrair PDF: {e}"[:500],
+        }})
+    finally:
+        try:
+            os.unlink(pdf_path)
+        except OSError:
+            pass
+
+
+def start_extraction_job(db, batch_id: str, pdf_path: str, key: str,
+                         only_list: Optional[List[str]], fonte: str) -> asyncio.Task:
+    task = asyncio.create_task(run_extraction_job(db, batch_id, pdf_path, key, only_list, fonte))
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+    return task
+
+
+def summarize_items(items: List[CurriculumImportItem]) -> Dict[str, Any]:
+    """Totais devolvidos pelo upload."""
+    return {
+        "total_items": len(items),
+        "duplicates": sum(1 for i in items if i.status == 'duplicate'),
+        "by_componente": {
+            c: sum(1 for i in items if i.componente_codigo == c)
+            for c in {i.componente_codigo for i in items if i.componente_codigo}
+        },
+    }
@@ -15,12 +15,20 @@ Pipeline:
       descrição curta demais, marcadores estranhos).
 
 Resultado: cobertura completa + qualidade alta nos HIGH + revisão obrigatória nos LOW.
+
+[Out/2026] A Fase A também roda por faixa de páginas (`extract_page_range`) e
+as Fases B–D sobre a junção das faixas (`finalize_extraction`) — é assim que
+`services/curriculum_extraction` paraleliza o PDF no pool de processos.
 """
 from __future__ import annotations
 
 import re
 from typing import List, Optional, Set, Tuple
 
+# Versão do pipeline — entra na chave do cache de extração por sha256
+# (services/curriculum_extraction); incremente ao mudar as regras abaixo.
+EXTRACTOR_VERSION = 3
+
 BNCC_CODE_RE = re.compile(r'\b(E[FIM])(\d{2})([A-Z]{2})(\d{2}[A-Z]?)\b')
 
 COMPONENT_MAP = {
@@ -203,17 +211,21 @@ def _merge_multiline_cells(table: list, hab_col: int) -> list:
 def _extract_via_tables(
     pdf_path: str, only: Optional[Set[str]], fonte: str,
     text_by_page: Optional[dict] = None,
+    first_page: int = 1, last_page: Optional[int] = None,
 ) -> List[dict]:
     """Fase A — extração estruturada (confidence='high').
 
     Se `text_by_page` dict for fornecido (mutável), também coleta o texto puro
     de cada página em uma única passada — evita reabrir o PDF nas Fases B/C.
+    `first_page`/`last_page` (1-based, inclusivos) restringem a uma faixa.
     """
     import pdfplumber
 
     candidates: List[dict] = []
     with pdfplumber.open(pdf_path) as pdf:
-        for page_num, page in enumerate(pdf.pages, start=1):
+        last = len(pdf.pages) if last_page is None else min(last_page, len(pdf.pages))
+        for page_num in range(first_page, last + 1):
+            page = pdf.pages[page_num - 1]
             if text_by_page is not None:
                 try:
                     text_by_page[page_num] = page.extract_text() or ''
@@ -353,16 +365,42 @@ def _all_codes_from_text(text_by_page: dict, only: Optional[Set[str]]) -> Set[st
     return codes
 
 
-def extract_skills_from_pdf(
+def count_pdf_pages(pdf_path: str) -> int:
+    import pdfplumber
+
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def extract_page_range(
     pdf_path: str,
+    first_page: int,
+    last_page: int,
     only_components: Optional[List[str]] = None,
     fonte: str = 'DCM_FA',
-) -> List[dict]:
-    """Entrada principal — pipeline híbrido."""
-    only = set(only_components) if only_components else None
+) -> Tuple[List[dict], dict]:
+    """Fase A de uma faixa de páginas → (itens estruturados, {página: texto}).
 
+    Module-level e só com argumentos picklable: roda no `services.render_pool`.
+    """
+    only = set(only_components) if only_components else None
     text_by_page: dict = {}
-    structured = _extract_via_tables(pdf_path, only, fonte, text_by_page=text_by_page)
+    structured = _extract_via_tables(
+        pdf_path, only, fonte, text_by_page=text_by_page,
+        first_page=first_page, last_page=last_page,
+    )
+    return structured, text_by_page
+
+
+def finalize_extraction(
+    structured: List[dict],
+    text_by_page: dict,
+    only_components: Optional[List[str]] = None,
+    fonte: str = 'DCM_FA',
+) -> List[dict]:
+    """Fases B–D sobre o resultado (de uma ou mais faixas) da Fase A."""
+    only = set(only_components) if only_components else None
+    structured = sorted(structured, key=lambda s: s.get('page') or 0)  # estável: ordem do PDF
     captured = {s['codigo'] for s in structured}
     all_codes = _all_codes_from_text(text_by_page, only)
     missing = all_codes - captured
@@ -392,3 +430,14 @@ def extract_skills_from_pdf(
         x.get('codigo'),
     ))
     return items
+
+
+def extract_skills_from_pdf(
+    pdf_path: str,
+    only_components: Optional[List[str]] = None,
+    fonte: str = 'DCM_FA',
+) -> List[dict]:
+    """Entrada principal — pipeline híbrido (síncrono, PDF inteiro)."""
+    structured, text_by_page = extract_page_range(
+        pdf_path, 1, count_pdf_pages(pdf_path), only_components, fonte)
+    return finalize_extraction(structured, text_by_page, only_components, fonte)
@@ -34,6 +34,7 @@ from reportlab.platypus import (
 from reportlab.lib.enums import TA_LEFT, TA_CENTER
 
 from services.document_files import store_pdf
+from services.render_pool import run_render
 from services.diary_snapshot_service import append_render, TEMPLATE_VERSION, RENDER_ENGINE_VERSION
 
 logger = logging.getLogger(__name__)
@@ -429,7 +430,7 @@ async def render_diary_handler(job: dict, *, db, public_base_url: str = "") -> d
         raise ValueError(f"SNAPSHOT_NOT_RENDERABLE: status={snap.get('status')}")
 
     # Renderiza PDF a partir do payload congelado (NUNCA banco vivo).
-    pdf_bytes = _build_pdf_from_snapshot(snap)
+    pdf_bytes = await run_render(_build_pdf_from_snapshot, snap)
     pdf_hash = hashlib.sha256(pdf_bytes).hexdigest()
 
     klass_name = (((snap.get("payload") or {}).get("class") or {}).get("name") or "turma").replace(" ", "_")
@@ -1,8 +1,11 @@
 """Helpers para armazenar/recuperar PDFs gerados via render_jobs.
 
-Estratégia simples: collection `document_files` com `data_base64` (escala bem
-para boletins individuais de até ~50 KB cada). Se um dia precisar lidar com
-arquivos maiores (>1 MB), trocar por GridFS sem mudar contrato externo.
+Collection `document_files` = metadados (id, filename, tenant, sha256...).
+[Out/2026] Os bytes saíram do documento: ficam no blob store endereçado por
+sha256 (services/blob_store.py — GridFS ou filesystem), com deduplicação de
+renders idênticos e leitura por faixa. Documentos antigos com `data_base64`
+continuam legíveis; `scripts/migrate_document_files_to_blobs.py` os move.
+O contrato externo (`file_id`) não mudou.
 """
 from __future__ import annotations
 
@@ -10,7 +13,33 @@ import base64
 import hashlib
 import uuid
 from datetime import datetime, timezone
-from typing import Optional
+from typing import AsyncIterator, Optional
+
+from services.blob_store import DOCUMENT_BLOB_BACKEND, BlobNotFound, get_blob_store
+
+
+async def _put_bytes(db, data: bytes, sha: str, mime_type: str) -> dict:
+    """Grava os bytes no backend configurado; devolve os campos de storage do doc."""
+    store = get_blob_store(db)
+    if store is None:
+        return {"data_base64": base64.b64encode(data).decode("ascii")}
+    await store.put(sha, data, content_type=mime_type)
+    return {"storage": {"backend": store.name, "key": sha}}
+
+
+async def _iter_bytes(db, doc: dict, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+    storage = doc.get("storage")
+    if storage:
+        store = get_blob_store(db, storage.get("backend"))
+        async for chunk in store.read_range(storage["key"], start, end):
+            yield chunk
+        return
+    raw = base64.b64decode(doc["data_base64"])  # legado (pré-Out/2026)
+    yield raw[start:None if end is None else end + 1]
+
+
+async def _read_bytes(db, doc: dict) -> bytes:
+    return b"".join([chunk async for chunk in _iter_bytes(db, doc)])
 
 
 async def store_pdf(
@@ -33,7 +62,7 @@ async def store_pdf(
         "mime_type": "application/pdf",
         "size_bytes": len(pdf_bytes),
         "sha256": sha,
-        "data_base64": base64.b64encode(pdf_bytes).decode("ascii"),
+        **await _put_bytes(db, pdf_bytes, sha, "application/pdf"),
         "mantenedora_id": mantenedora_id,
         "school_id": school_id,
         "student_id": student_id,
@@ -53,7 +82,10 @@ async def fetch_pdf(db, file_id: str) -> Optional[dict]:
     doc = await db.document_files.find_one({"id": file_id}, {"_id": 0})
     if not doc:
         return None
-    pdf = base64.b64decode(doc["data_base64"])
+    try:
+        pdf = await _read_bytes(db, doc)
+    except BlobNotFound:
+        return None
     return {
         "pdf_bytes": pdf,
         "filename": doc.get("filename") or "documento.pdf",
@@ -64,6 +96,58 @@ async def fetch_pdf(db, file_id: str) -> Optional[dict]:
     }
 
 
+async def open_pdf(db, file_id: str) -> Optional[dict]:
+    """Metadados + leitor por faixa, SEM carregar o arquivo (downloads em streaming).
+
+    Retorna {filename, sha256, mime_type, size_bytes, created_at, iter_range}
+    onde `iter_range(start=0, end=None)` é um async iterator de bytes.
+    """
+    doc = await db.document_files.find_one({"id": file_id}, {"_id": 0})
+    if not doc:
+        return None
+    storage = doc.get("storage")
+    if storage and not await get_blob_store(db, storage.get("backend")).exists(storage["key"]):
+        return None  # metadado órfão: responde 404 antes de começar o stream
+    size = doc.get("size_bytes")
+    if size is None:  # legado sem tamanho gravado
+        size = len(await _read_bytes(db, doc))
+
+    def iter_range(start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        return _iter_bytes(db, doc, start, end)
+
+    return {
+        "filename": doc.get("filename") or "documento.pdf",
+        "sha256": doc.get("sha256"),
+        "mime_type": doc.get("mime_type") or "application/pdf",
+        "size_bytes": size,
+        "created_at": doc.get("created_at"),
+        "iter_range": iter_range,
+    }
+
+
+async def migrate_inline_document(db, doc: dict, backend: str = DOCUMENT_BLOB_BACKEND) -> bool:
+    """Move `data_base64` de um documento legado para o blob store.
+
+    Confere o sha256 antes de trocar o documento; o $unset é condicionado ao
+    documento ainda estar inline (idempotente, seguro para re-execução).
+    """
+    store = get_blob_store(db, backend)
+    if store is None or doc.get("storage") or not doc.get("data_base64"):
+        return False
+    data = base64.b64decode(doc["data_base64"])
+    sha = hashlib.sha256(data).hexdigest()
+    if doc.get("sha256") and doc["sha256"] != sha:
+        raise ValueError(f"sha256 divergente em document_files {doc.get('id')}")
+    await store.put(sha, data, content_type=doc.get("mime_type") or "application/octet-stream")
+    res = await db.document_files.update_one(
+        {"id": doc["id"], "storage": {"$exists": False}},
+        {"$set": {"storage": {"backend": store.name, "key": sha}, "sha256": sha,
+                  "size_bytes": len(data)},
+         "$unset": {"data_base64": ""}},
+    )
+    return res.modified_count == 1
+
+
 # ============================================================================
 # Signature images (Fase 5c — Mai/2026)
 # ============================================================================
@@ -135,7 +219,7 @@ async def store_signature_image(
         "sha256": sha,
         "width": width,
         "height": height,
-        "data_base64": base64.b64encode(png_bytes).decode("ascii"),
+        **await _put_bytes(db, png_bytes, sha, mime),
         "owner_user_id": user_id,
         "mantenedora_id": mantenedora_id,
         "school_id": None,
@@ -159,8 +243,12 @@ async def fetch_signature_image(db, file_id: str) -> Optional[dict]:
     )
     if not doc:
         return None
+    try:
+        data = await _read_bytes(db, doc)
+    except BlobNotFound:
+        return None
     return {
-        "bytes": base64.b64decode(doc["data_base64"]),
+        "bytes": data,
         "mime_type": doc.get("mime_type") or "image/png",
         "width": doc.get("width"),
         "height": doc.get("height"),
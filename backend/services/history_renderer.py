@@ -19,6 +19,7 @@ from datetime import datetime, timezone
 from services.bulletin_renderer import _stamp_qr_overlay  # reusa overlay QR
 from services.document_files import store_pdf
 from services.history_consolidator import build_consolidated_history
+from services.render_pool import run_render
 from utils.client_time import current_time_context
 
 logger = logging.getLogger(__name__)
@@ -42,6 +43,14 @@ def _verify_url(base: str, token: str) -> str:
     return f"{(base or '').rstrip('/')}/verify/historico/{token}"
 
 
+def _render_historico_bytes(**kwargs) -> bytes:
+    """Roda no render pool: gerador oficial → bytes."""
+    from pdf.historico_escolar import generate_historico_escolar_pdf
+    buf = generate_historico_escolar_pdf(**kwargs)
+    buf.seek(0)
+    return buf.read()
+
+
 async def render_history_handler(job: dict, *, db, public_base_url: str) -> dict:
     student_id = _parse_source_id(job.get("source_snapshot_id") or "")
 
@@ -97,14 +106,14 @@ async def render_history_handler(job: dict, *, db, public_base_url: str) -> dict
     await db.history_verifications.insert_one(summary)
 
     # PDF base
-    from pdf.historico_escolar import generate_historico_escolar_pdf
     try:
         from routers.documents import resolve_anexa_name
         await resolve_anexa_name(db, school)
     except Exception:  # noqa: BLE001
         pass
 
-    buf = generate_historico_escolar_pdf(
+    pdf_bytes = await run_render(
+        _render_historico_bytes,
         student=student,
         school=school,
         mantenedora=mantenedora,
@@ -112,11 +121,9 @@ async def render_history_handler(job: dict, *, db, public_base_url: str) -> dict
         verification_code=verification_id[:8].upper(),
         valid_until=None,
     )
-    buf.seek(0)
-    pdf_bytes = buf.read()
 
     # Overlay QR
-    final_pdf = _stamp_qr_overlay(pdf_bytes, url, doc_id=verification_id)
+    final_pdf = await run_render(_stamp_qr_overlay, pdf_bytes, url, doc_id=verification_id)
     pdf_hash = hashlib.sha256(final_pdf).hexdigest()
 
     safe = (student.get("full_name") or "aluno").replace(" ", "_")
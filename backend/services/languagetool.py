@@ -0,0 +1,297 @@
+"""Proxy do LanguageTool com pool, cache por parágrafo e orçamento — Out/2026.
+
+`POST /api/spellcheck` abria um `httpx.AsyncClient` (handshake TLS) por
+chamada e repassava o texto INTEIRO a cada clique — no diário o professor
+revisa o mesmo texto várias vezes mudando uma linha. Agora:
+
+  - um `httpx.AsyncClient` de longa duração por event loop (keep-alive),
+    fechado no shutdown (`close_client`);
+  - o texto é quebrado em parágrafos (linhas); cada parágrafo tem o resultado
+    cacheado pelo sha256 de (idioma, regras desabilitadas, texto) na região
+    `spellcheck` de utils/cache — editar uma linha só reenvia aquela linha;
+  - os parágrafos que faltam vão numa ÚNICA chamada (juntados por "\\n") e as
+    marcações voltam para cada parágrafo pelo offset;
+  - parágrafos idênticos já em verificação (outra aba, outro professor, duplo
+    clique) aguardam a mesma chamada em vez de repetir;
+  - orçamento de chamadas ao LanguageTool: global (a API pública limita por
+    IP, ou seja, o servidor inteiro) e por mantenedora, em tokens/minuto. Só
+    cache miss consome orçamento.
+
+Instância própria: `LANGUAGETOOL_URL=http://languagetool:8010/v2/check`. Sem
+`api.languagetool.org` na URL o proxy a trata como local (sem limite global
+por padrão, orçamento por mantenedora maior).
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from utils.cache import get_region
+from utils.metrics import count_event
+
+logger = logging.getLogger(__name__)
+
+LANGUAGETOOL_URL = os.environ.get("LANGUAGETOOL_URL", "https://api.languagetool.org/v2/check")
+LANGUAGETOOL_LOCAL = os.environ.get(
+    "LANGUAGETOOL_LOCAL", "false" if "api.languagetool.org" in LANGUAGETOOL_URL else "true",
+).lower() in ("1", "true", "yes")
+LANGUAGETOOL_TIMEOUT = float(os.environ.get("LANGUAGETOOL_TIMEOUT", "15"))
+LANGUAGETOOL_MAX_CONNECTIONS = int(os.environ.get("LANGUAGETOOL_MAX_CONNECTIONS", "10"))
+# 0 = sem limite. A API pública aceita 20 req/min por IP.
+LANGUAGETOOL_REQUESTS_PER_MINUTE = int(os.environ.get(
+    "LANGUAGETOOL_REQUESTS_PER_MINUTE", "0" if LANGUAGETOOL_LOCAL else "20"))
+SPELLCHECK_TENANT_REQUESTS_PER_MINUTE = int(os.environ.get(
+    "SPELLCHECK_TENANT_REQUESTS_PER_MINUTE", "120" if LANGUAGETOOL_LOCAL else "10"))
+SPELLCHECK_CACHE_SECONDS = float(os.environ.get("SPELLCHECK_CACHE_SECONDS", "86400"))
+
+# Regras pedantes que geram ruído em textos escolares.
+DISABLED_RULES = "WHITESPACE_RULE,UPPERCASE_SENTENCE_START"
+USER_AGENT = "SIGESC-Spellchecker/1.0"
+
+_region = get_region("spellcheck", max_entries=20_000, default_ttl=SPELLCHECK_CACHE_SECONDS)
+
+
+class LanguageToolError(Exception):
+    """Falha/resposta inválida do LanguageTool."""
+
+
+class LanguageToolTimeout(LanguageToolError):
+    pass
+
+
+class LanguageToolRateLimited(LanguageToolError):
+    """Orçamento esgotado (nosso) ou 429 do próprio LanguageTool."""
+
+
+# ============================================================
+# Cliente HTTP (um por event loop)
+# ============================================================
+_client: Optional[Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    loop = asyncio.get_running_loop()
+    if _client and _client[0] is loop and not _client[1].is_closed:
+        return _client[1]
+    client = httpx.AsyncClient(
+        timeout=LANGUAGETOOL_TIMEOUT,
+        headers={"User-Agent": USER_AGENT},
+        limits=httpx.Limits(max_connections=LANGUAGETOOL_MAX_CONNECTIONS,
+                            max_keepalive_connections=LANGUAGETOOL_MAX_CONNECTIONS),
+    )
+    _client = (loop, client)
+    return client
+
+
+async def close_client() -> None:
+    """Fecha o cliente do loop corrente (shutdown do servidor)."""
+    global _client
+    if _client and _client[0] is asyncio.get_running_loop() and not _client[1].is_closed:
+        await _client[1].aclose()
+    _client = None
+
+
+# ============================================================
+# Orçamento (token bucket por chave)
+# ============================================================
+class RateBudget:
+    def __init__(self, per_minute: int, clock=time.monotonic):
+        self.per_minute = per_minute
+        self._clock = clock
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def try_acquire(self, key: str) -> bool:
+        if self.per_minute <= 0:
+            return True
+        now = self._clock()
+        tokens, last = self._buckets.get(key, (float(self.per_minute), now))
+        tokens = min(float(self.per_minute), tokens + (now - last) * self.per_minute / 60.0)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            return False
+        self._buckets[key] = (tokens - 1, now)
+        return True
+
+    def refund(self, key: str) -> None:
+        if self.per_minute > 0 and key in self._buckets:
+            tokens, last = self._buckets[key]
+            self._buckets[key] = (min(float(self.per_minute), tokens + 1), last)
+
+
+global_budget = RateBudget(LANGUAGETOOL_REQUESTS_PER_MINUTE)
+tenant_budget = RateBudget(SPELLCHECK_TENANT_REQUESTS_PER_MINUTE)
+
+
+# ============================================================
+# Parágrafos
+# ============================================================
+def utf16_len(s: str) -> int:
+    """Tamanho em unidades UTF-16 — a unidade dos offsets do LanguageTool e do JS."""
+    return len(s.encode("utf-16-le")) // 2
+
+
+def split_paragraphs(text: str) -> List[Tuple[int, str]]:
+    """[(offset UTF-16, parágrafo)] — uma entrada por linha não vazia."""
+    out, pos = [], 0
+    for line in text.split("\n"):
+        if line.strip():
+            out.append((pos, line))
+        pos += utf16_len(line) + 1
+    return out
+
+
+def paragraph_key(lang: str, paragraph: str) -> str:
+    return hashlib.sha256(f"{lang}|{DISABLED_RULES}|{paragraph}".encode("utf-8")).hexdigest()
+
+
+def _normalize(m: dict) -> dict:
+    rule = m.get("rule") or {}
+    return {
+        "message": m.get("message", ""),
+        "short_message": m.get("shortMessage", ""),
+        "offset": m.get("offset", 0),
+        "length": m.get("length", 0),
+        "replacements": [r.get("value", "") for r in m.get("replacements", [])][:8],
+        "rule_id": rule.get("id", ""),
+        "category": (rule.get("category") or {}).get("name", ""),
+        "issue_type": (rule.get("issueType") or "other"),
+        "context": (m.get("context") or {}).get("text", ""),
+    }
+
+
+async def _call_languagetool(text: str, lang: str) -> List[dict]:
+    try:
+        resp = await _get_client().post(
+            LANGUAGETOOL_URL,
+            data={"text": text, "language": lang, "disabledRules": DISABLED_RULES},
+        )
+    except httpx.TimeoutException:
+        raise LanguageToolTimeout("timeout")
+    except Exception as e:
+        logger.error(f"Falha ao chamar LanguageTool: {e}")
+        raise LanguageToolError(str(e))
+    if resp.status_code == 429:
+        raise LanguageToolRateLimited("429 do LanguageTool")
+    if resp.status_code >= 400:
+        logger.error(f"LanguageTool {resp.status_code}: {resp.text[:200]}")
+        raise LanguageToolError(f"HTTP {resp.status_code}")
+    return [_normalize(m) for m in resp.json().get("matches", [])]
+
+
+CONTEXT_SIZE = 40  # unidades UTF-16 de cada lado, como o `contextSize` padrão do LanguageTool
+
+
+def _paragraph_context(paragraph: str, size: int, offset: int, length: int) -> str:
+    """Trecho em volta do erro recortado do PRÓPRIO parágrafo.
+
+    O `context` do LanguageTool vem do texto enviado — com vários parágrafos
+    juntos ele mostraria os vizinhos, e o resultado é cacheado por parágrafo
+    para qualquer mantenedora.
+    """
+    start, end = max(0, offset - CONTEXT_SIZE), min(size, offset + length + CONTEXT_SIZE)
+    raw = paragraph.encode("utf-16-le")[2 * start:2 * end].decode("utf-16-le", errors="ignore")
+    return ("..." if start > 0 else "") + raw + ("..." if end < size else "")
+
+
+async def _fetch_paragraphs(paragraphs: List[str], lang: str) -> List[List[dict]]:
+    """Uma chamada para N parágrafos; marcações com offset relativo ao parágrafo.
+
+    Offsets e tamanhos em unidades UTF-16 (emoji conta 2), como o LanguageTool
+    devolve e o frontend fatia.
+    """
+    starts, sizes, pos = [], [], 0
+    for p in paragraphs:
+        starts.append(pos)
+        sizes.append(utf16_len(p))
+        pos += sizes[-1] + 1
+    results: List[List[dict]] = [[] for _ in paragraphs]
+    for m in await _call_languagetool("\n".join(paragraphs), lang):
+        # parágrafo que contém o início da marcação (busca linear: poucos parágrafos)
+        idx = max(i for i, s in enumerate(starts) if s <= m["offset"])
+        rel = m["offset"] - starts[idx]
+        if rel + m["length"] > sizes[idx]:
+            continue  # atravessa a quebra de linha: não pertence a um parágrafo só
+        results[idx].append({
+            **m, "offset": rel,
+            "context": _paragraph_context(paragraphs[idx], sizes[idx], rel, m["length"]),
+        })
+    return results
+
+
+_inflight: Dict[str, asyncio.Future] = {}
+stats = {"paragraphs": 0, "cache_hits": 0, "coalesced": 0, "upstream_calls": 0, "budget_rejections": 0}
+
+
+async def check_text(text: str, lang: str, tenant_id: Optional[str] = None) -> List[dict]:
+    """Marcações do texto inteiro (offsets absolutos), reaproveitando o cache."""
+    paragraphs = split_paragraphs(text)
+    keys = [paragraph_key(lang, p) for _, p in paragraphs]
+    found: Dict[str, List[dict]] = {}
+    waiting: Dict[str, asyncio.Future] = {}
+    missing: Dict[str, str] = {}
+    for key, (_, p) in zip(keys, paragraphs):
+        if key in found or key in waiting or key in missing:
+            continue
+        cached = _region.get(key)
+        if cached is not None:
+            found[key] = cached
+        elif key in _inflight:
+            waiting[key] = _inflight[key]
+        else:
+            missing[key] = p
+    stats["paragraphs"] += len(paragraphs)
+    stats["cache_hits"] += len(found)
+    stats["coalesced"] += len(waiting)
+    count_event("spellcheck", "paragraph_cache_hit", len(found))
+
+    if missing:
+        tenant_key = tenant_id or "none"
+        if not tenant_budget.try_acquire(tenant_key):
+            stats["budget_rejections"] += 1
+            raise LanguageToolRateLimited(f"orçamento da mantenedora {tenant_key}")
+        if not global_budget.try_acquire("global"):
+            tenant_budget.refund(tenant_key)
+            stats["budget_rejections"] += 1
+            raise LanguageToolRateLimited("orçamento global")
+        loop = asyncio.get_running_loop()
+        futures = {key: loop.create_future() for key in missing}
+        _inflight.update(futures)
+        stats["upstream_calls"] += 1
+        count_event("spellcheck", "upstream_call")
+        try:
+            fetched = await _fetch_paragraphs(list(missing.values()), lang)
+        except BaseException as exc:
+            for fut in futures.values():
+                if isinstance(exc, asyncio.CancelledError):
+                    fut.cancel()
+                else:
+                    fut.set_exception(exc)
+                    fut.exception()  # marca como recuperada se ninguém aguardava
+            raise
+        finally:
+            for key in futures:
+                _inflight.pop(key, None)
+        for key, matches in zip(missing, fetched):
+            _region.set(key, matches)
+            futures[key].set_result(matches)
+            found[key] = matches
+
+    for key, fut in waiting.items():
+        try:
+            found[key] = await asyncio.shield(fut)
+        except asyncio.CancelledError:
+            if not fut.cancelled():
+                raise  # quem foi cancelado foi esta chamada
+            return await check_text(text, lang, tenant_id)  # o líder foi cancelado
+
+    out: List[dict] = []
+    for key, (offset, _) in zip(keys, paragraphs):
+        out.extend({**m, "offset": m["offset"] + offset} for m in found[key])
+    return out
@@ -0,0 +1,97 @@
+"""
+Render Pool — tira a renderização CPU-bound (ReportLab/PyPDF2) do event loop.
+
+[Out/2026] Os handlers do render worker montam os dados com Motor (async) e
+entregam a parte pesada — `generate_*_pdf`, overlay de QR — para um
+`ProcessPoolExecutor`. Assim N jobs renderizam em paralelo de verdade (sem GIL)
+e a API continua respondendo enquanto um Livro/Diário grande é gerado.
+
+Regras para funções enviadas ao pool:
+  - precisam ser module-level (picklable por referência);
+  - argumentos/retorno picklable (dicts, bytes) — nada de `db`, sockets, locks;
+  - o contexto temporal (`utils.client_time`) é reaplicado no processo filho,
+    então `local_now()` dentro do gerador enxerga o mesmo fuso do job.
+
+Configuração (env):
+  RENDER_PROCESS_POOL_SIZE   nº de processos (default min(4, cpus)); 0 = usa
+                             `asyncio.to_thread` (dev/testes, sem processos extras)
+
+Processos são criados com `spawn` (fork de um processo com threads do Motor
+não é seguro). Se o pool quebrar (filho morto por OOM), é recriado na próxima
+chamada e a chamada atual cai para thread.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from utils.client_time import current_time_context, use_time_context
+
+logger = logging.getLogger(__name__)
+
+
+def _default_pool_size() -> int:
+    raw = os.environ.get("RENDER_PROCESS_POOL_SIZE")
+    if raw is not None and raw.strip() != "":
+        try:
+            return max(0, int(raw))
+        except ValueError:
+            logger.warning("[render_pool] RENDER_PROCESS_POOL_SIZE inválido: %r", raw)
+    return min(4, os.cpu_count() or 1)
+
+
+RENDER_PROCESS_POOL_SIZE = _default_pool_size()
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if RENDER_PROCESS_POOL_SIZE <= 0:
+        return None
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=RENDER_PROCESS_POOL_SIZE,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        logger.info("[render_pool] pool criado (processos=%s)", RENDER_PROCESS_POOL_SIZE)
+    return _pool
+
+
+def _invoke(fn: Callable, time_ctx: dict, args: tuple, kwargs: dict) -> Any:
+    """Executa `fn` (no processo filho ou thread) sob o contexto temporal do job."""
+    with use_time_context(
+        timezone_name=time_ctx.get("timezone"),
+        utc_offset_minutes=time_ctx.get("utc_offset_minutes"),
+        source=time_ctx.get("timezone_source") or "render_pool",
+    ):
+        return fn(*args, **kwargs)
+
+
+async def run_render(fn: Callable, *args, **kwargs) -> Any:
+    """Executa `fn(*args, **kwargs)` fora do event loop e aguarda o resultado."""
+    global _pool
+    call = functools.partial(_invoke, fn, current_time_context(), args, kwargs)
+    pool = _get_pool()
+    if pool is None:
+        return await asyncio.to_thread(call)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, call)
+    except BrokenProcessPool:
+        logger.error("[render_pool] pool quebrado; recriando e executando em thread")
+        _pool = None
+        return await asyncio.to_thread(call)
+
+
+def shutdown_render_pool(wait: bool = False) -> None:
+    """Encerra o pool (chamado no shutdown do app)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=wait, cancel_futures=True)
+        _pool = None
@@ -1,30 +1,65 @@
 """
-Render Worker — single-process, in-asyncio, mínimo viável.
+Render Worker — pool in-process de slots concorrentes, com lease/heartbeat.
 
-[Fev/2026] Passo 4. Owner explicitou: "worker simples já resolve;
-overengineering proibido nesta fase".
+[Fev/2026] Passo 4: single-loop mínimo viável.
+[Out/2026] Fechamento de bimestre enfileirava boletins/históricos/diários por
+dezenas de minutos atrás de um único renderer. Agora:
 
-Loop:
-  while True:
-    1. busca 1 job pending OU failed-com-retry-elegível (next_retry_at <= now)
-    2. marca processing (compare-and-set por idempotency_key)
-    3. invoca handler registrado para document_type
-    4. sucesso → completed; exception → retry (se sobra) ou failed permanente
-    5. sleep POLL_INTERVAL_SECONDS
+  - N slots concorrentes por processo (`RENDER_WORKER_CONCURRENCY`);
+  - vários processos/réplicas competem pelo MESMO compare-and-set de
+    `_claim_next_job` — quem ganha grava `worker_id` + `lease_expires_at`;
+  - enquanto o handler roda, um heartbeat renova o lease;
+  - lease vencido (processo morreu no meio do job) é devolvido para `pending`
+    por `_reclaim_stale_leases`, contando como tentativa (mesma política de
+    retry do contrato — após MAX_RETRIES vira `failed`);
+  - teto de concorrência por document_type (`RENDER_WORKER_TYPE_LIMITS`),
+    aplicado por processo: tipos saturados ficam fora do filtro de claim;
+  - a parte CPU-bound dos handlers roda em `services.render_pool`.
 
-Sem fila externa. Sem worker pool. Sem broker.
+Loop de cada slot:
+  1. busca 1 job pending (ou retry elegível) de tipo não saturado
+  2. marca processing + lease (compare-and-set atômico)
+  3. invoca handler registrado para document_type
+  4. sucesso → completed; exception → retry (se sobra) ou failed permanente
+     (gravações finais exigem `worker_id` do dono — lease perdido = descartado)
+  5. fila vazia → dorme até ser acordado (`render_wake_signal`) ou até o
+     próximo poll adaptativo
+
+Wake-up (Out/2026): todo enqueue passa por `utils.render_jobs.insert_render_job`,
+que acorda os slots na hora. Em replica set, um change stream sobre
+`document_render_jobs` acorda também os workers das OUTRAS réplicas. O poll
+vira rede de segurança (retries agendados, enqueue em réplica sem change
+stream): começa em POLL_INTERVAL_SECONDS e dobra enquanto ocioso até
+IDLE_POLL_MAX_SECONDS.
+
+Configuração (env):
+  RENDER_WORKER_CONCURRENCY   slots por processo (default 2)
+  RENDER_WORKER_TYPE_LIMITS   teto por tipo, ex.: "diary_period=1,bulletin=4"
+  RENDER_JOB_LEASE_SECONDS    duração do lease (default 120)
+  RENDER_WORKER_IDLE_POLL_MAX_SECONDS  teto do poll ocioso (default 60)
+  RENDER_WORKER_CHANGE_STREAM "auto" (default) tenta change stream e cai
+                              para poll se não houver replica set; "off" desliga
+
+Sem broker externo: a coleção `document_render_jobs` continua sendo a fila.
 """
 from __future__ import annotations
 
 import asyncio
 import logging
-from datetime import datetime, timezone
+import os
+import socket
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
 
 from utils.client_time import use_time_context
+from utils.observability import record_render_job
 from utils.render_jobs import (
     MAX_RETRIES,
     compute_next_retry_at,
     get_render_handler,
+    notify_render_worker,
+    render_wake_signal,
 )
 
 logger = logging.getLogger(__name__)
@@ -32,34 +67,150 @@ logger = logging.getLogger(__name__)
 POLL_INTERVAL_SECONDS = 5
 
 
+def _env_int(name: str, default: int, *, minimum: int = 0) -> int:
+    raw = os.environ.get(name)
+    if raw is None or raw.strip() == "":
+        return default
+    try:
+        return max(minimum, int(raw))
+    except ValueError:
+        logger.warning("[render_worker] %s inválido: %r (usando %s)", name, raw, default)
+        return default
+
+
+def parse_type_limits(raw: str | None) -> dict[str, int]:
+    """Converte "bulletin=4,diary_period=1" em {"bulletin": 4, "diary_period": 1}."""
+    limits: dict[str, int] = {}
+    for part in (raw or "").split(","):
+        name, sep, value = part.partition("=")
+        name = name.strip()
+        if not sep or not name:
+            continue
+        try:
+            limits[name] = max(1, int(value))
+        except ValueError:
+            logger.warning("[render_worker] limite inválido ignorado: %r", part)
+    return limits
+
+
+WORKER_CONCURRENCY = _env_int("RENDER_WORKER_CONCURRENCY", 2, minimum=1)
+LEASE_SECONDS = _env_int("RENDER_JOB_LEASE_SECONDS", 120, minimum=15)
+HEARTBEAT_SECONDS = max(5, LEASE_SECONDS // 4)
+DOCUMENT_TYPE_CONCURRENCY = parse_type_limits(os.environ.get("RENDER_WORKER_TYPE_LIMITS"))
+IDLE_POLL_MAX_SECONDS = _env_int("RENDER_WORKER_IDLE_POLL_MAX_SECONDS", 60, minimum=POLL_INTERVAL_SECONDS)
+CHANGE_STREAM_MODE = (os.environ.get("RENDER_WORKER_CHANGE_STREAM") or "auto").strip().lower()
+
+# Identidade deste processo na fila (slots recebem sufixo ":s<n>").
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
 def _now_iso() -> str:
     return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
-async def _claim_next_job(db) -> dict | None:
+def _lease_deadline() -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=LEASE_SECONDS)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _parse_iso(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def _elapsed_ms(since_iso: str | None, until_iso: str | None = None) -> int | None:
+    t0 = _parse_iso(since_iso)
+    if t0 is None:
+        return None
+    t1 = _parse_iso(until_iso) or datetime.now(timezone.utc)
+    return int((t1 - t0).total_seconds() * 1000)
+
+
+# ===========================================================================
+# Estado in-process (métricas + saturação por tipo)
+# ===========================================================================
+class _WorkerState:
+    def __init__(self) -> None:
+        self.claim_lock = asyncio.Lock()
+        self.active_by_type: Counter = Counter()
+        self.totals: Counter = Counter()
+        self.slots = 0
+        self.started_at: str | None = None
+        self.change_stream = "disabled"
+
+    def saturated_types(self) -> list[str]:
+        return [
+            t for t, limit in DOCUMENT_TYPE_CONCURRENCY.items()
+            if self.active_by_type.get(t, 0) >= limit
+        ]
+
+    def snapshot(self) -> dict:
+        return {
+            "worker_id": WORKER_ID,
+            "mode": "instance-local",
+            "started_at": self.started_at,
+            "slots": self.slots,
+            "lease_seconds": LEASE_SECONDS,
+            "change_stream": self.change_stream,
+            "wake_notifications": render_wake_signal.notifications,
+            "type_limits": dict(DOCUMENT_TYPE_CONCURRENCY),
+            "active_by_type": {t: n for t, n in self.active_by_type.items() if n},
+            "active_total": sum(self.active_by_type.values()),
+            "totals": dict(self.totals),
+        }
+
+
+_state = _WorkerState()
+
+
+def worker_state_snapshot() -> dict:
+    """Estado do pool DESTE processo (para `/render-jobs/metrics`)."""
+    return _state.snapshot()
+
+
+# ===========================================================================
+# Mongo: claim / lease / transições
+# ===========================================================================
+async def _claim_next_job(
+    db,
+    *,
+    worker_id: str = WORKER_ID,
+    exclude_types: list[str] | None = None,
+) -> dict | None:
     """Atomicamente reivindica o próximo job processável.
 
-    Critério: status pending E (next_retry_at == null OR next_retry_at <= now).
-    Marca como processing. Retorna o job ou None.
+    Critério: status pending E (next_retry_at == null OR next_retry_at <= now)
+    E document_type fora de `exclude_types`. Marca como processing com lease
+    em nome de `worker_id`. Retorna o job ou None.
     """
     now = _now_iso()
+    flt: dict = {
+        "status": "pending",
+        "$or": [
+            {"next_retry_at": None},
+            {"next_retry_at": {"$lte": now}},
+        ],
+    }
+    if exclude_types:
+        flt["document_type"] = {"$nin": list(exclude_types)}
     job = await db.document_render_jobs.find_one_and_update(
-        {
-            "status": "pending",
-            "$or": [
-                {"next_retry_at": None},
-                {"next_retry_at": {"$lte": now}},
-            ],
-        },
+        flt,
         {
             "$set": {
                 "status": "processing",
                 "started_at": now,
+                "worker_id": worker_id,
+                "lease_expires_at": _lease_deadline(),
+                "heartbeat_at": now,
             },
             "$push": {
                 "audit_trail": {
                     "action": "processing",
                     "at": now,
+                    "worker_id": worker_id,
                 },
             },
         },
@@ -70,18 +221,19 @@ async def _claim_next_job(db) -> dict | None:
     return job
 
 
-async def _mark_completed(db, *, job_id: str, result: dict, started_at: str | None) -> None:
-    duration_ms = None
-    if started_at:
-        try:
-            t0 = datetime.fromisoformat(started_at.replace("Z", "+00:00"))
-            duration_ms = int((datetime.now(timezone.utc) - t0).total_seconds() * 1000)
-        except (ValueError, TypeError):
-            duration_ms = None
+def _owned_by(job_id: str, worker_id: str) -> dict:
+    """Filtro CAS: só o dono do lease grava a transição final."""
+    return {"id": job_id, "status": "processing", "worker_id": worker_id}
 
+
+async def _mark_completed(
+    db, *, job_id: str, result: dict, started_at: str | None, worker_id: str = WORKER_ID,
+    queue_wait_ms: int | None = None,
+) -> bool:
+    duration_ms = _elapsed_ms(started_at)
     now = _now_iso()
-    await db.document_render_jobs.update_one(
-        {"id": job_id},
+    res = await db.document_render_jobs.update_one(
+        _owned_by(job_id, worker_id),
         {
             "$set": {
                 "status": "completed",
@@ -91,6 +243,9 @@ async def _mark_completed(db, *, job_id: str, result: dict, started_at: str | No
                 "generated_file_size_bytes": result.get("generated_file_size_bytes"),
                 "pdf_hash_sha256": result.get("pdf_hash_sha256"),
                 "error_message": None,
+                "lease_expires_at": None,
+                "duration_ms": duration_ms,
+                "queue_wait_ms": queue_wait_ms,
             },
             "$push": {
                 "audit_trail": {
@@ -98,23 +253,29 @@ async def _mark_completed(db, *, job_id: str, result: dict, started_at: str | No
                     "at": now,
                     "duration_ms": duration_ms,
                     "file_id": result.get("generated_file_id"),
+                    "worker_id": worker_id,
                 },
             },
         },
     )
+    return res.matched_count > 0
 
 
 async def _mark_failed_or_retry(
-    db, *, job_id: str, retry_count: int, error_message: str
-) -> None:
-    """Decide entre retry agendado ou falha permanente."""
+    db, *, job_id: str, retry_count: int, error_message: str, worker_id: str = WORKER_ID,
+) -> str | None:
+    """Decide entre retry agendado ou falha permanente.
+
+    Retorna o outcome gravado ("retry_scheduled" | "failed_permanent") ou
+    None se o lease já não pertencia a este worker.
+    """
     now = _now_iso()
     new_retry_count = retry_count + 1
 
     if new_retry_count >= MAX_RETRIES:
         # Falha permanente.
-        await db.document_render_jobs.update_one(
-            {"id": job_id},
+        res = await db.document_render_jobs.update_one(
+            _owned_by(job_id, worker_id),
             {
                 "$set": {
                     "status": "failed",
@@ -122,28 +283,32 @@ async def _mark_failed_or_retry(
                     "next_retry_at": None,
                     "failed_at": now,
                     "error_message": error_message[:1024],
+                    "lease_expires_at": None,
                 },
                 "$push": {
                     "audit_trail": {
                         "action": "failed_permanent",
                         "at": now,
                         "error": error_message[:512],
+                        "worker_id": worker_id,
                     },
                 },
             },
         )
-        return
+        return "failed_permanent" if res.matched_count else None
 
     # Retry agendado.
     next_retry = compute_next_retry_at(new_retry_count)
-    await db.document_render_jobs.update_one(
-        {"id": job_id},
+    res = await db.document_render_jobs.update_one(
+        _owned_by(job_id, worker_id),
         {
             "$set": {
                 "status": "pending",
                 "retry_count": new_retry_count,
                 "next_retry_at": next_retry,
                 "error_message": error_message[:1024],
+                "worker_id": None,
+                "lease_expires_at": None,
             },
             "$push": {
                 "audit_trail": {
@@ -152,45 +317,140 @@ async def _mark_failed_or_retry(
                     "retry_count": new_retry_count,
                     "next_retry_at": next_retry,
                     "error": error_message[:512],
+                    "worker_id": worker_id,
                 },
             },
         },
     )
+    return "retry_scheduled" if res.matched_count else None
+
+
+async def _reclaim_stale_leases(db) -> int:
+    """Devolve à fila jobs `processing` cujo lease venceu (worker morto).
+
+    Conta como tentativa: quem já está na última vira `failed` permanente
+    (evita loop infinito com um documento que derruba o processo).
+    """
+    now = _now_iso()
+    stale = {"status": "processing", "lease_expires_at": {"$lte": now}}
+    error = "LEASE_EXPIRED: worker não concluiu dentro do lease"
+
+    exhausted = await db.document_render_jobs.update_many(
+        {**stale, "retry_count": {"$gte": MAX_RETRIES - 1}},
+        {
+            "$set": {
+                "status": "failed",
+                "next_retry_at": None,
+                "failed_at": now,
+                "error_message": error,
+                "lease_expires_at": None,
+            },
+            "$inc": {"retry_count": 1},
+            "$push": {"audit_trail": {"action": "lease_expired_failed", "at": now}},
+        },
+    )
+    requeued = await db.document_render_jobs.update_many(
+        stale,
+        {
+            "$set": {
+                "status": "pending",
+                "next_retry_at": None,
+                "error_message": error,
+                "worker_id": None,
+                "lease_expires_at": None,
+            },
+            "$inc": {"retry_count": 1},
+            "$push": {"audit_trail": {"action": "lease_expired_requeued", "at": now}},
+        },
+    )
+    total = exhausted.modified_count + requeued.modified_count
+    if total:
+        _state.totals["reclaimed"] += total
+        logger.warning(
+            "[render_worker] leases vencidos: %s requeued, %s failed",
+            requeued.modified_count, exhausted.modified_count,
+        )
+    return total
+
+
+async def _heartbeat_loop(db, *, job_id: str, worker_id: str) -> None:
+    """Renova o lease enquanto o handler roda (cancelado ao terminar)."""
+    while True:
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        try:
+            res = await db.document_render_jobs.update_one(
+                _owned_by(job_id, worker_id),
+                {"$set": {"lease_expires_at": _lease_deadline(), "heartbeat_at": _now_iso()}},
+            )
+        except Exception as e:  # noqa: BLE001 — heartbeat perdido não derruba o job
+            logger.warning("[render_worker] heartbeat falhou job=%s: %s", job_id, e)
+            continue
+        if not res.matched_count:
+            logger.warning("[render_worker] lease perdido job=%s worker=%s", job_id, worker_id)
+            return
 
 
-async def process_one_job(db) -> bool:
+# ===========================================================================
+# Execução
+# ===========================================================================
+async def process_one_job(db, *, worker_id: str = WORKER_ID) -> bool:
     """Processa UM job. Retorna True se algo foi feito; False se fila vazia."""
-    job = await _claim_next_job(db)
-    if not job:
-        return False
+    async with _state.claim_lock:
+        job = await _claim_next_job(
+            db, worker_id=worker_id, exclude_types=_state.saturated_types()
+        )
+        if not job:
+            return False
+        document_type = job["document_type"]
+        _state.active_by_type[document_type] += 1
+    _state.totals["claimed"] += 1
 
+    try:
+        await _run_claimed_job(db, job, worker_id=worker_id)
+    finally:
+        _state.active_by_type[document_type] -= 1
+    return True
+
+
+async def _run_claimed_job(db, job: dict, *, worker_id: str) -> None:
     job_id = job["id"]
     document_type = job["document_type"]
+    tenant_id = job.get("mantenedora_id")
+    queue_wait_ms = _elapsed_ms(job.get("requested_at"), job.get("started_at"))
     handler = get_render_handler(document_type)
 
     if handler is None:
         # Sem handler: erro NÃO recuperável → failed permanente sem retry.
         now = _now_iso()
         await db.document_render_jobs.update_one(
-            {"id": job_id},
+            _owned_by(job_id, worker_id),
             {
                 "$set": {
                     "status": "failed",
                     "next_retry_at": None,
                     "failed_at": now,
                     "error_message": f"NO_HANDLER_REGISTERED for document_type={document_type}",
+                    "lease_expires_at": None,
                 },
                 "$push": {
                     "audit_trail": {
                         "action": "failed_no_handler",
                         "at": now,
+                        "worker_id": worker_id,
                     },
                 },
             },
         )
         logger.error("[render_worker] no handler for document_type=%s job=%s", document_type, job_id)
-        return True
+        _state.totals["failed_no_handler"] += 1
+        record_render_job(
+            duration_ms=0, document_type=document_type, outcome="failed_no_handler",
+            tenant_id=tenant_id, queue_wait_ms=queue_wait_ms, worker_id=worker_id,
+        )
+        return
 
+    heartbeat = asyncio.create_task(_heartbeat_loop(db, job_id=job_id, worker_id=worker_id))
+    t0 = asyncio.get_running_loop().time()
     try:
         time_ctx = job.get("time_context") or {}
         with use_time_context(
@@ -201,42 +461,148 @@ async def process_one_job(db) -> bool:
             result = await handler(job) or {}
         if not isinstance(result, dict):
             result = {}
-        await _mark_completed(db, job_id=job_id, result=result, started_at=job.get("started_at"))
-        logger.info("[render_worker] job %s completed (type=%s)", job_id, document_type)
+        owned = await _mark_completed(
+            db, job_id=job_id, result=result, started_at=job.get("started_at"),
+            worker_id=worker_id, queue_wait_ms=queue_wait_ms,
+        )
+        outcome = "completed" if owned else "lease_lost"
+        logger.info("[render_worker] job %s %s (type=%s worker=%s)", job_id, outcome, document_type, worker_id)
     except Exception as e:  # noqa: BLE001 — handler pode lançar qualquer coisa
         logger.exception("[render_worker] job %s failed: %s", job_id, e)
-        await _mark_failed_or_retry(
+        outcome = await _mark_failed_or_retry(
             db,
             job_id=job_id,
             retry_count=job.get("retry_count", 0),
             error_message=str(e) or e.__class__.__name__,
-        )
+            worker_id=worker_id,
+        ) or "lease_lost"
+    finally:
+        heartbeat.cancel()
 
-    return True
+    _state.totals[outcome] += 1
+    record_render_job(
+        duration_ms=(asyncio.get_running_loop().time() - t0) * 1000,
+        document_type=document_type, outcome=outcome, tenant_id=tenant_id,
+        queue_wait_ms=queue_wait_ms, worker_id=worker_id,
+    )
 
 
-async def run_worker_loop(db, *, stop_event: asyncio.Event | None = None) -> None:
-    """Loop principal — chamado uma vez no startup como background task.
+async def _wait_or_stop(stop_event: asyncio.Event | None, seconds: float) -> None:
+    try:
+        if stop_event is not None:
+            await asyncio.wait_for(stop_event.wait(), timeout=seconds)
+        else:
+            await asyncio.sleep(seconds)
+    except asyncio.TimeoutError:
+        pass
 
-    `stop_event` permite shutdown limpo (set durante app shutdown).
-    """
-    logger.info("[render_worker] started, poll=%ss", POLL_INTERVAL_SECONDS)
-    while True:
-        if stop_event is not None and stop_event.is_set():
-            logger.info("[render_worker] stop_event set, exiting")
-            break
+
+async def _wait_for_work(stop_event: asyncio.Event | None, seconds: float) -> bool:
+    """Dorme até wake-up, stop ou timeout. Retorna True se foi acordado por wake-up."""
+    waiters = [asyncio.ensure_future(render_wake_signal.wait())]
+    if stop_event is not None:
+        waiters.append(asyncio.ensure_future(stop_event.wait()))
+    try:
+        await asyncio.wait(waiters, timeout=seconds, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for w in waiters:
+            w.cancel()
+    return render_wake_signal.is_set()
+
+
+async def _slot_loop(db, *, slot_id: str, stop_event: asyncio.Event | None) -> None:
+    idle_wait = POLL_INTERVAL_SECONDS
+    while not (stop_event is not None and stop_event.is_set()):
+        # Limpa ANTES do claim: notify entre o claim vazio e o wait não se perde.
+        render_wake_signal.clear()
         try:
-            did_work = await process_one_job(db)
+            did_work = await process_one_job(db, worker_id=slot_id)
         except Exception as e:  # noqa: BLE001 — defesa para não derrubar o loop
-            logger.exception("[render_worker] loop iteration crashed: %s", e)
+            logger.exception("[render_worker] slot %s iteration crashed: %s", slot_id, e)
             did_work = False
 
-        # Se trabalhamos, tenta de novo imediatamente; senão, dorme.
-        if not did_work:
-            try:
-                if stop_event is not None:
-                    await asyncio.wait_for(stop_event.wait(), timeout=POLL_INTERVAL_SECONDS)
-                else:
-                    await asyncio.sleep(POLL_INTERVAL_SECONDS)
-            except asyncio.TimeoutError:
-                pass
+        # Se trabalhamos, tenta de novo imediatamente; senão, dorme (backoff ocioso).
+        if did_work:
+            idle_wait = POLL_INTERVAL_SECONDS
+            continue
+        woken = await _wait_for_work(stop_event, idle_wait)
+        idle_wait = POLL_INTERVAL_SECONDS if woken else min(idle_wait * 2, IDLE_POLL_MAX_SECONDS)
+
+
+async def _change_stream_loop(db, *, stop_event: asyncio.Event | None) -> None:
+    """Acorda os slots quando QUALQUER réplica enfileira/reagenda um job.
+
+    Só funciona em replica set; em standalone o Mongo responde erro e o
+    worker segue com wake-up in-process + poll adaptativo.
+    """
+    from pymongo.errors import OperationFailure, PyMongoError
+
+    pipeline = [{"$match": {"$or": [
+        {"operationType": "insert"},
+        {"operationType": "update", "updateDescription.updatedFields.status": "pending"},
+    ]}}]
+    while not (stop_event is not None and stop_event.is_set()):
+        try:
+            async with db.document_render_jobs.watch(pipeline) as stream:
+                _state.change_stream = "active"
+                logger.info("[render_worker] change stream ativo em document_render_jobs")
+                async for _change in stream:
+                    notify_render_worker()
+        except OperationFailure as e:
+            # 40573 = "$changeStream is only supported on replica sets"
+            if e.code == 40573 or "replica set" in str(e).lower():
+                _state.change_stream = "unsupported"
+                logger.info("[render_worker] change stream indisponível (sem replica set); usando poll adaptativo")
+                return
+            _state.change_stream = "error"
+            logger.warning("[render_worker] change stream falhou: %s", e)
+        except PyMongoError as e:
+            _state.change_stream = "error"
+            logger.warning("[render_worker] change stream interrompido: %s", e)
+        await _wait_or_stop(stop_event, IDLE_POLL_MAX_SECONDS)
+
+
+async def _reaper_loop(db, *, stop_event: asyncio.Event | None) -> None:
+    while not (stop_event is not None and stop_event.is_set()):
+        try:
+            await _reclaim_stale_leases(db)
+        except Exception as e:  # noqa: BLE001
+            logger.exception("[render_worker] reclaim de leases falhou: %s", e)
+        await _wait_or_stop(stop_event, max(POLL_INTERVAL_SECONDS, LEASE_SECONDS // 2))
+
+
+async def run_worker_loop(
+    db,
+    *,
+    stop_event: asyncio.Event | None = None,
+    concurrency: int | None = None,
+) -> None:
+    """Loop principal — chamado uma vez no startup como background task.
+
+    Sobe `concurrency` slots (default `RENDER_WORKER_CONCURRENCY`) + o reaper
+    de leases vencidos. `stop_event` permite shutdown limpo (set durante app
+    shutdown): slots terminam o job corrente e saem.
+    """
+    slots = concurrency or WORKER_CONCURRENCY
+    _state.slots = slots
+    _state.started_at = _now_iso()
+    logger.info(
+        "[render_worker] started worker=%s slots=%s poll=%ss lease=%ss limits=%s",
+        WORKER_ID, slots, POLL_INTERVAL_SECONDS, LEASE_SECONDS, DOCUMENT_TYPE_CONCURRENCY,
+    )
+    tasks = [
+        asyncio.create_task(_slot_loop(db, slot_id=f"{WORKER_ID}:s{i}", stop_event=stop_event))
+        for i in range(slots)
+    ]
+    tasks.append(asyncio.create_task(_reaper_loop(db, stop_event=stop_event)))
+    change_stream_task = None
+    if CHANGE_STREAM_MODE not in {"off", "0", "false", "no"}:
+        change_stream_task = asyncio.create_task(_change_stream_loop(db, stop_event=stop_event))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for t in tasks:
+            t.cancel()
+        if change_stream_task is not None:
+            change_stream_task.cancel()
+        logger.info("[render_worker] stop_event set, exiting")
@@ -0,0 +1,515 @@
+"""SIE — cálculo em LOTE (rede / escola / turma).
+
+[Out/2026] O lote antigo chamava `compute_for_student` + `_persist` aluno a
+aluno: 3–4 queries de leitura e 6+ `update_one` por aluno, tudo dentro da
+request. Numa rede de 20 mil alunos isso levava dezenas de minutos. Aqui:
+
+  1. alunos em blocos de CHUNK_SIZE, ordenados por turma (blocos ≈ turmas);
+  2. leitura em BULK por bloco: 1 query de notas, 1 de matrículas ativas e
+     1 de frequência (turmas do bloco) — mesmas regras de `load_signals`;
+  3. scores acadêmico/frequência/geral VETORIZADOS (NumPy) por mantenedora,
+     com resultado idêntico aos motores puros (mesmas fórmulas, mesmos
+     arredondamentos — ver tests/test_sie_batch.py);
+  4. gravação via `bulk_write` (1 chamada por coleção por bloco);
+  5. opcionalmente como job em background com progresso em `sie_batch_jobs`.
+
+Diagnóstico e alertas continuam nos motores puros (`build_diagnostic`,
+`build_alerts`) — são regras, não aritmética.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from pymongo import UpdateMany, UpdateOne
+
+from services.academic_risk_engine import summarize_grades
+from services.alert_engine import build_alerts
+from services.diagnostic_engine import build_diagnostic
+from services.sie_service import _PRESENT_SET, get_or_create_config
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+JOBS_COLLECTION = 'sie_batch_jobs'
+_STUDENT_PROJECTION = {'_id': 0, 'id': 1, 'full_name': 1, 'school_id': 1, 'class_id': 1, 'mantenedora_id': 1}
+
+ProgressCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Referência forte às tasks em andamento (o loop só guarda referência fraca).
+_running: set = set()
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _round_all(values: np.ndarray, ndigits: int) -> List[float]:
+    """`round()` do Python elemento a elemento — mantém paridade exata com os
+    motores escalares (np.round arredonda diferente em casos de borda)."""
+    return [round(v, ndigits) for v in values.tolist()]
+
+
+# ---------------------------------------------------------------------------
+# Scores vetorizados (uma config por chamada)
+# ---------------------------------------------------------------------------
+
+def score_academic_batch(summaries: List[Dict[str, Any]], config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Versão vetorizada de `compute_academic_risk` sobre `summarize_grades` de N alunos."""
+    passing = float(config.get('passing_grade', 6.0))
+    aw = config.get('academic_weights', {}) or {}
+    w_notas = float(aw.get('notas', 50))
+    w_rec = float(aw.get('recuperacao', 20))
+    w_rep = float(aw.get('reprovacao', 20))
+    w_trend = float(aw.get('tendencia', 10))
+    caps = config.get('caps', {}) or {}
+    rec_max = float(caps.get('recovery_max', 3)) or 1
+    fail_max = float(caps.get('failed_max', 2)) or 1
+    trend_drop_max = float(caps.get('trend_drop_max', 3)) or 1
+
+    avg = np.array([np.nan if s['average_grade'] is None else s['average_grade'] for s in summaries], dtype=float)
+    rec = np.array([s['recovery_subjects'] for s in summaries], dtype=float)
+    fail = np.array([s['failed_subjects'] for s in summaries], dtype=float)
+    delta = np.array([s['avg_delta'] for s in summaries], dtype=float)
+    has = ~np.isnan(avg)
+
+    if passing > 0:
+        notas_frac = np.where(has, np.clip((passing - np.nan_to_num(avg)) / passing, 0.0, 1.0), 0.0)
+    else:
+        notas_frac = np.zeros(len(summaries))
+    rec_frac = np.clip(rec / rec_max, 0.0, 1.0)
+    rep_frac = np.clip(fail / fail_max, 0.0, 1.0)
+    trend_frac = np.clip(-delta / trend_drop_max, 0.0, 1.0)
+
+    c_notas = np.array(_round_all(w_notas * notas_frac, 2))
+    c_rec = np.array(_round_all(w_rec * rec_frac, 2))
+    c_rep = np.array(_round_all(w_rep * rep_frac, 2))
+    c_trend = np.array(_round_all(w_trend * trend_frac, 2))
+    scores = _round_all(np.clip(c_notas + c_rec + c_rep + c_trend, 0, 100), 1)
+    trend = np.where(delta <= -0.5, 'falling', np.where(delta >= 0.5, 'improving', 'stable')).tolist()
+    deltas_r = _round_all(delta, 2)
+
+    out = []
+    for i, s in enumerate(summaries):
+        out.append({
+            'score': scores[i],
+            'average_grade': s['average_grade'],
+            'recovery_subjects': s['recovery_subjects'],
+            'failed_subjects': s['failed_subjects'],
+            'critical_components': s['critical_components'],
+            'trend_status': trend[i],
+            'trend_delta': deltas_r[i],
+            'has_grade_data': bool(has[i]),
+            'breakdown': [
+                {'factor': 'notas', 'weight': w_notas, 'contribution': float(c_notas[i]), 'raw_value': s['average_grade']},
+                {'factor': 'recuperacao', 'weight': w_rec, 'contribution': float(c_rec[i]), 'raw_value': s['recovery_subjects']},
+                {'factor': 'reprovacao', 'weight': w_rep, 'contribution': float(c_rep[i]), 'raw_value': s['failed_subjects']},
+                {'factor': 'tendencia', 'weight': w_trend, 'contribution': float(c_trend[i]), 'raw_value': deltas_r[i]},
+            ],
+        })
+    return out
+
+
+def score_attendance_batch(summaries: List[Dict[str, Any]], config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Versão vetorizada de `compute_attendance_risk`."""
+    min_pct = float(config.get('attendance_min_pct', 75))
+    aw = config.get('attendance_weights', {}) or {}
+    w_annual = float(aw.get('presenca_anual', 70))
+    w_recent = float(aw.get('faltas_recentes', 30))
+    caps = config.get('caps', {}) or {}
+    recent_abs_max = float(caps.get('recent_absence_max', 0.5)) or 0.5
+
+    total = np.array([int(s.get('total', 0) or 0) for s in summaries], dtype=float)
+    present = np.array([int(s.get('present', 0) or 0) for s in summaries], dtype=float)
+    r_total = np.array([int(s.get('recent_total', 0) or 0) for s in summaries], dtype=float)
+    r_present = np.array([int(s.get('recent_present', 0) or 0) for s in summaries], dtype=float)
+    has = total > 0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct_raw = np.where(has, 100.0 * present / total, 0.0)
+        pct = np.array(_round_all(pct_raw, 1))
+        if min_pct > 0:
+            annual_frac = np.where(has, np.clip((min_pct - pct) / min_pct, 0.0, 1.0), 0.0)
+        else:
+            annual_frac = np.zeros(len(summaries))
+        rate = np.where(r_total > 0, (r_total - r_present) / r_total, 0.0)
+    recent_frac = np.clip(rate / recent_abs_max, 0.0, 1.0)
+
+    c_annual = np.array(_round_all(w_annual * annual_frac, 2))
+    c_recent = np.array(_round_all(w_recent * recent_frac, 2))
+    scores = _round_all(np.clip(c_annual + c_recent, 0, 100), 1)
+    rate_pct = _round_all(rate * 100, 1)
+    pct_list = pct.tolist()
+
+    out = []
+    for i in range(len(summaries)):
+        ap = pct_list[i] if has[i] else None
+        out.append({
+            'score': scores[i],
+            'attendance_pct': ap,
+            'recent_absence_rate': rate_pct[i],
+            'has_attendance_data': bool(has[i]),
+            'breakdown': [
+                {'factor': 'presenca_anual', 'weight': w_annual, 'contribution': float(c_annual[i]), 'raw_value': ap},
+                {'factor': 'faltas_recentes', 'weight': w_recent, 'contribution': float(c_recent[i]), 'raw_value': rate_pct[i]},
+            ],
+        })
+    return out
+
+
+def score_overall_batch(academic_scores: List[float], attendance_scores: List[float],
+                        config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Versão vetorizada de `compute_overall_risk` (+ `classify_risk`)."""
+    ow = config.get('overall_weights', {}) or {}
+    w_ac = float(ow.get('academic', 55))
+    w_at = float(ow.get('attendance', 45))
+    total_w = (w_ac + w_at) or 1.0
+    bands = config.get('risk_bands', {}) or {}
+    low_max = float(bands.get('low_max', 24))
+    mod_max = float(bands.get('moderate_max', 49))
+    high_max = float(bands.get('high_max', 74))
+
+    ac = np.array(academic_scores, dtype=float)
+    at = np.array(attendance_scores, dtype=float)
+    overall = _round_all(np.clip((w_ac * ac + w_at * at) / total_w, 0, 100), 1)
+    ov = np.array(overall)
+    levels = np.select([ov <= low_max, ov <= mod_max, ov <= high_max],
+                       ['low', 'moderate', 'high'], default='critical').tolist()
+    c_ac = _round_all((w_ac / total_w) * ac, 1)
+    c_at = _round_all((w_at / total_w) * at, 1)
+    weight_ac = round(w_ac / total_w * 100, 1)
+    weight_at = round(w_at / total_w * 100, 1)
+
+    return [{
+        'overall_risk': overall[i],
+        'risk_level': levels[i],
+        'factors': [
+            {'factor': 'academic', 'weight': weight_ac, 'contribution': c_ac[i], 'raw_value': academic_scores[i]},
+            {'factor': 'attendance', 'weight': weight_at, 'contribution': c_at[i], 'raw_value': attendance_scores[i]},
+        ],
+    } for i in range(len(overall))]
+
+
+def compute_results(students: List[Dict[str, Any]], grades_by_student: Dict[str, List[Dict[str, Any]]],
+                    attendance_by_student: Dict[str, Dict[str, int]], config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Pacote {academic, attendance, overall, diagnostic, alerts} de N alunos com a MESMA config."""
+    if not students:
+        return []
+    passing = float(config.get('passing_grade', 6.0))
+    empty = {'total': 0, 'present': 0, 'recent_total': 0, 'recent_present': 0}
+    academic = score_academic_batch(
+        [summarize_grades(grades_by_student.get(s['id'], []), passing) for s in students], config)
+    attendance = score_attendance_batch(
+        [attendance_by_student.get(s['id'], empty) for s in students], config)
+    overall = score_overall_batch([a['score'] for a in academic], [a['score'] for a in attendance], config)
+    results = []
+    for student, ac, at, ov in zip(students, academic, attendance, overall):
+        results.append({
+            'academic': ac,
+            'attendance': at,
+            'overall': ov,
+            'diagnostic': build_diagnostic(student, ac, at, ov, config),
+            'alerts': build_alerts(student, ac, at, ov, config),
+        })
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Leitura em bulk (mesmas regras de sie_service.load_signals)
+# ---------------------------------------------------------------------------
+
+async def load_batch_signals(
+    db, students: List[Dict[str, Any]], year: int, recent_cutoffs: Dict[str, str],
+) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Dict[str, int]]]:
+    """Notas e sumário de frequência de um BLOCO de alunos em 3–4 queries.
+
+    `recent_cutoffs`: student_id → data ISO de início da janela recente
+    (depende da config da mantenedora do aluno).
+    """
+    sids = [s['id'] for s in students]
+
+    grades_by_student: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    async for g in db.grades.find({'student_id': {'$in': sids}, 'academic_year': year}, {'_id': 0}):
+        grades_by_student[g['student_id']].append(g)
+
+    class_ids_of: Dict[str, set] = {s['id']: ({s['class_id']} if s.get('class_id') else set()) for s in students}
+    async for e in db.enrollments.find(
+        {'student_id': {'$in': sids}, 'status': 'active'}, {'_id': 0, 'student_id': 1, 'class_id': 1}
+    ):
+        if e.get('class_id'):
+            class_ids_of[e['student_id']].add(e['class_id'])
+
+    attendance_by_student: Dict[str, Dict[str, int]] = {
+        sid: {'total': 0, 'present': 0, 'recent_total': 0, 'recent_present': 0} for sid in sids
+    }
+
+    def _count(doc: Dict[str, Any], accept) -> None:
+        date_s = str(doc.get('date') or '')[:10]
+        for rec in (doc.get('records') or []):
+            sid = rec.get('student_id')
+            if not accept(sid):
+                continue
+            summary = attendance_by_student[sid]
+            is_present = (rec.get('status') or '').strip().lower() in _PRESENT_SET
+            is_recent = bool(date_s) and date_s >= recent_cutoffs[sid]
+            summary['total'] += 1
+            if is_present:
+                summary['present'] += 1
+            if is_recent:
+                summary['recent_total'] += 1
+                if is_present:
+                    summary['recent_present'] += 1
+
+    with_class = {sid for sid, cids in class_ids_of.items() if cids}
+    all_class_ids = sorted({cid for cids in class_ids_of.values() for cid in cids})
+    if all_class_ids:
+        async for a in db.attendance.find(
+            {'academic_year': year, 'class_id': {'$in': all_class_ids}},
+            {'_id': 0, 'class_id': 1, 'date': 1, 'records': 1},
+        ):
+            cid = a.get('class_id')
+            _count(a, lambda sid, cid=cid: sid in with_class and cid in class_ids_of[sid])
+
+    # Sem turma conhecida: qualquer frequência do ano em que o aluno aparece.
+    without_class = [sid for sid in sids if sid not in with_class]
+    if without_class:
+        orphan = set(without_class)
+        async for a in db.attendance.find(
+            {'academic_year': year, 'records.student_id': {'$in': without_class}},
+            {'_id': 0, 'date': 1, 'records': 1},
+        ):
+            _count(a, lambda sid: sid in orphan)
+
+    return grades_by_student, attendance_by_student
+
+
+# ---------------------------------------------------------------------------
+# Persistência em bulk
+# ---------------------------------------------------------------------------
+
+def build_persist_ops(student: Dict[str, Any], result: Dict[str, Any], year: int,
+                      tenant_id: Optional[str], now: str, snap_date: str) -> Dict[str, list]:
+    """Operações de gravação de UM aluno, por coleção (risk, diagnóstico,
+    snapshot diário, alertas + resolução dos que não dispararam)."""
+    sid = student['id']
+    school_id = student.get('school_id')
+    class_id = student.get('class_id')
+    ac = result['academic']
+    at = result['attendance']
+    ov = result['overall']
+    base = {
+        'mantenedora_id': tenant_id,
+        'student_id': sid,
+        'school_id': school_id,
+        'class_id': class_id,
+        'academic_year': year,
+    }
+
+    risk_doc = {
+        **base,
+        'overall_risk': ov['overall_risk'],
+        'risk_level': ov['risk_level'],
+        'academic_risk': ac['score'],
+        'attendance_risk': at['score'],
+        'trend_status': ac['trend_status'],
+        'factors': ov['factors'],
+        'academic_breakdown': ac['breakdown'],
+        'attendance_breakdown': at['breakdown'],
+        'recovery_subjects': ac['recovery_subjects'],
+        'failed_subjects': ac['failed_subjects'],
+        'critical_components': ac['critical_components'],
+        'average_grade': ac['average_grade'],
+        'attendance_pct': at['attendance_pct'],
+        'updated_at': now,
+    }
+    ops: Dict[str, list] = {
+        'student_risk_scores': [UpdateOne(
+            {'student_id': sid, 'academic_year': year},
+            {'$set': risk_doc, '$setOnInsert': {'id': str(uuid.uuid4()), 'computed_at': now}},
+            upsert=True,
+        )],
+        'student_diagnostics': [UpdateOne(
+            {'student_id': sid, 'academic_year': year},
+            {'$set': {**base, **result['diagnostic'], 'updated_at': now},
+             '$setOnInsert': {'id': str(uuid.uuid4()), 'computed_at': now}},
+            upsert=True,
+        )],
+        'student_snapshots': [UpdateOne(
+            {'student_id': sid, 'academic_year': year, 'snapshot_date': snap_date},
+            {'$set': {
+                **base,
+                'snapshot_date': snap_date,
+                'academic_risk': ac['score'],
+                'attendance_risk': at['score'],
+                'overall_risk': ov['overall_risk'],
+                'risk_level': ov['risk_level'],
+                'trend': ac['trend_status'],
+                'updated_at': now,
+            }, '$setOnInsert': {'id': str(uuid.uuid4()), 'created_at': now}},
+            upsert=True,
+        )],
+        'student_alerts': [],
+    }
+
+    current_types = []
+    for al in result['alerts']:
+        current_types.append(al['alert_type'])
+        ops['student_alerts'].append(UpdateOne(
+            {'student_id': sid, 'academic_year': year, 'alert_type': al['alert_type']},
+            {'$set': {
+                **base,
+                'alert_type': al['alert_type'],
+                'severity': al['severity'],
+                'message': al['message'],
+                'resolved_at': None,
+                'updated_at': now,
+            }, '$setOnInsert': {'id': str(uuid.uuid4()), 'created_at': now}},
+            upsert=True,
+        ))
+    # Resolve alertas que não dispararam neste cálculo (tipos disjuntos dos
+    # upserts acima — a ordem das operações no bulk é irrelevante).
+    ops['student_alerts'].append(UpdateMany(
+        {'student_id': sid, 'academic_year': year,
+         'alert_type': {'$nin': current_types}, 'resolved_at': None},
+        {'$set': {'resolved_at': now, 'updated_at': now}},
+    ))
+    return ops
+
+
+async def persist_results(db, items: List[Tuple[Dict[str, Any], Dict[str, Any], Optional[str]]], year: int) -> None:
+    """Grava (aluno, resultado, tenant_id) com um `bulk_write` por coleção."""
+    if not items:
+        return
+    now = _now_iso()
+    snap_date = datetime.now(timezone.utc).date().isoformat()
+    by_coll: Dict[str, list] = defaultdict(list)
+    for student, result, tenant_id in items:
+        for coll, ops in build_persist_ops(student, result, year, tenant_id, now, snap_date).items():
+            by_coll[coll].extend(ops)
+    for coll, ops in by_coll.items():
+        if ops:
+            await db[coll].bulk_write(ops, ordered=False)
+
+
+# ---------------------------------------------------------------------------
+# Orquestração
+# ---------------------------------------------------------------------------
+
+def _empty_stats() -> Dict[str, Any]:
+    return {'processed': 0, 'total': 0,
+            'by_level': {'low': 0, 'moderate': 0, 'high': 0, 'critical': 0},
+            'alerts_open': 0}
+
+
+async def run_batch(db, query: Dict[str, Any], year: int,
+                    progress_cb: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """Computa e persiste o SIE de todos os alunos de `query` (filtro de `students`)."""
+    students = await db.students.find(query, _STUDENT_PROJECTION).to_list(None)
+    # Blocos alinhados por mantenedora/turma → menos turmas distintas por query de frequência.
+    students.sort(key=lambda s: (s.get('mantenedora_id') or '', s.get('school_id') or '', s.get('class_id') or ''))
+
+    stats = _empty_stats()
+    stats['total'] = len(students)
+    if progress_cb:
+        await progress_cb(stats)
+
+    cfg_cache: Dict[str, Dict[str, Any]] = {}
+    for start in range(0, len(students), CHUNK_SIZE):
+        chunk = students[start:start + CHUNK_SIZE]
+
+        by_tenant: Dict[Optional[str], List[Dict[str, Any]]] = defaultdict(list)
+        for s in chunk:
+            by_tenant[s.get('mantenedora_id')].append(s)
+        cutoffs: Dict[str, str] = {}
+        for tenant_id, group in by_tenant.items():
+            key = tenant_id or '__none__'
+            if key not in cfg_cache:
+                cfg_cache[key] = await get_or_create_config(db, tenant_id)
+            days = int(cfg_cache[key].get('recent_window_days', 30))
+            cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).date().isoformat()
+            for s in group:
+                cutoffs[s['id']] = cutoff
+
+        grades_by_student, attendance_by_student = await load_batch_signals(db, chunk, year, cutoffs)
+
+        items = []
+        for tenant_id, group in by_tenant.items():
+            cfg = cfg_cache[tenant_id or '__none__']
+            for student, result in zip(group, compute_results(group, grades_by_student, attendance_by_student, cfg)):
+                items.append((student, result, tenant_id))
+                stats['by_level'][result['overall']['risk_level']] += 1
+                stats['alerts_open'] += len(result['alerts'])
+        await persist_results(db, items, year)
+
+        stats['processed'] += len(chunk)
+        if progress_cb:
+            await progress_cb(stats)
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Job em background (progresso persistido — qualquer réplica responde o polling)
+# ---------------------------------------------------------------------------
+
+async def create_job(db, *, year: int, filters: Dict[str, Any], user: Dict[str, Any],
+                     tenant_id: Optional[str]) -> Dict[str, Any]:
+    job = {
+        'id': str(uuid.uuid4()),
+        'status': 'queued',
+        'academic_year': year,
+        'filters': filters,
+        'mantenedora_id': tenant_id,
+        'requested_by': user.get('id'),
+        **_empty_stats(),
+        'progress': 0,
+        'error': None,
+        'created_at': _now_iso(),
+        'started_at': None,
+        'finished_at': None,
+    }
+    await db[JOBS_COLLECTION].insert_one(dict(job))
+    return job
+
+
+async def run_job(db, job_id: str, query: Dict[str, Any], year: int,
+                  on_done: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None) -> None:
+    coll = db[JOBS_COLLECTION]
+
+    async def _progress(stats: Dict[str, Any]) -> None:
+        pct = round(100 * stats['processed'] / stats['total']) if stats['total'] else 100
+        await coll.update_one({'id': job_id}, {'$set': {**stats, 'progress': pct}})
+
+    await coll.update_one({'id': job_id}, {'$set': {'status': 'running', 'started_at': _now_iso()}})
+    try:
+        stats = await run_batch(db, query, year, progress_cb=_progress)
+    except Exception as e:  # noqa: BLE001
+        logger.error(f"[sie_batch] job {job_id} falhou: {e}")
+        await coll.update_one({'id': job_id}, {'$set': {
+            'status': 'error', 'error': str(e) or 'Erro interno', 'finished_at': _now_iso(),
+        }})
+        return
+    await coll.update_one({'id': job_id}, {'$set': {
+        **stats, 'status': 'done', 'progress': 100, 'finished_at': _now_iso(),
+    }})
+    if on_done:
+        try:
+            await on_done(stats)
+        except Exception as e:  # noqa: BLE001
+            logger.warning(f"[sie_batch] pós-job {job_id}: {e}")
+
+
+def start_job(db, job_id: str, query: Dict[str, Any], year: int,
+              on_done: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None) -> asyncio.Task:
+    task = asyncio.create_task(run_job(db, job_id, query, year, on_done=on_done))
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+    return task
+
+
+async def get_job(db, job_id: str) -> Optional[Dict[str, Any]]:
+    return await db[JOBS_COLLECTION].find_one({'id': job_id}, {'_id': 0})
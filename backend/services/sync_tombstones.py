@@ -0,0 +1,96 @@
+"""Tombstones de exclusão para o sync offline (Out/2026).
+
+O pull incremental só enxergava o que ainda existe (`updated_at >= lastSync`):
+um registro apagado no servidor ficava para sempre no cache do dispositivo.
+Cada exclusão de grades/attendance/students passa a deixar um tombstone
+(`sync_tombstones`) com o id removido; o pull devolve os ids apagados desde o
+último sync e o cliente os descarta.
+
+Tombstones expiram após SYNC_TOMBSTONE_RETENTION_DAYS (índice TTL em
+`expires_at`). Um cliente cujo último sync é mais antigo que isso não tem como
+saber o que foi apagado → o pull sinaliza `resetRequired` (resync completo).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.environ.get("SYNC_TOMBSTONE_RETENTION_DAYS", "90"))
+SYNC_TOMBSTONE_MAX_PER_PULL = int(os.environ.get("SYNC_TOMBSTONE_MAX_PER_PULL", "5000"))
+
+TOMBSTONE_COLLECTIONS = ("grades", "attendance", "students")
+
+
+def _tombstone(collection: str, doc: dict, user: Optional[dict], now: datetime) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "collection": collection,
+        "record_id": doc["id"],
+        "mantenedora_id": doc.get("mantenedora_id"),
+        "class_id": doc.get("class_id"),
+        "deleted_at": now.isoformat(),
+        "deleted_by": (user or {}).get("id"),
+        "expires_at": now + timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS),
+    }
+
+
+async def record_tombstones(db, collection: str, docs: Iterable[dict], user: Optional[dict] = None) -> int:
+    """Registra a exclusão dos `docs` (precisam de `id`; `mantenedora_id` e
+    `class_id` são copiados para o filtro do pull). Best-effort: uma falha aqui
+    não desfaz a exclusão já feita — o pior caso é o cliente manter um registro
+    apagado até o próximo resync."""
+    if collection not in TOMBSTONE_COLLECTIONS:
+        return 0
+    now = datetime.now(timezone.utc)
+    rows = [_tombstone(collection, d, user, now) for d in docs if d and d.get("id")]
+    if not rows:
+        return 0
+    try:
+        await db.sync_tombstones.insert_many(rows, ordered=False)
+    except Exception as e:
+        logger.warning(f"[Sync] Falha ao registrar {len(rows)} tombstone(s) de {collection}: {e}")
+        return 0
+    return len(rows)
+
+
+def tombstones_expired(since: Optional[str], now: Optional[datetime] = None) -> bool:
+    """True se `since` é anterior à retenção — tombstones daquele período já sumiram."""
+    if not since:
+        return False
+    try:
+        ts = datetime.fromisoformat(since.replace("Z", "+00:00"))
+    except ValueError:
+        return False
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return ts < now - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS)
+
+
+async def fetch_deleted_ids(db, collection: str, since: str, tenant_query: dict,
+                            limit: int = SYNC_TOMBSTONE_MAX_PER_PULL,
+                            class_id: Optional[str] = None) -> Tuple[List[str], bool]:
+    """Ids de `collection` apagados desde `since` (ISO), no escopo `tenant_query`
+    (e da turma `class_id`, no pull por turma — senão as exclusões da rede
+    inteira contariam para o limite de cada dispositivo).
+
+    Retorna (ids, truncado). Truncado = mais de `limit` exclusões no período:
+    o chamador deve pedir resync completo em vez de mandar uma lista parcial.
+    """
+    q = dict(tenant_query)
+    q["collection"] = collection
+    if class_id:
+        q["class_id"] = class_id
+    q["deleted_at"] = {"$gte": since}
+    ids: List[str] = []
+    cursor = db.sync_tombstones.find(q, {"_id": 0, "record_id": 1}).sort("deleted_at", 1).limit(limit + 1)
+    async for t in cursor:
+        ids.append(t["record_id"])
+    if len(ids) > limit:
+        return [], True
+    return list(dict.fromkeys(ids)), False
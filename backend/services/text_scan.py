@@ -0,0 +1,284 @@
+"""Busca de melhorias de texto em background — Out/2026.
+
+`POST /admin/text-improvement/scan` fazia tudo no handler: para cada campo
+candidato, um `find_one` na fila (`_already_pending`) e a detecção de
+formatação/ortografia (pyspellchecker + Levenshtein em Python puro) direto no
+event loop. Um scan da rede inteira travava a API por minutos. Aqui:
+
+  1. o scan é um documento em `text_improvement_scans` (alvos, contadores,
+     progresso e CURSOR `{collection, after_id}`) e roda como job em
+     background;
+  2. os documentos são lidos em blocos de TEXT_SCAN_CHUNK_SIZE, ordenados por
+     `_id`; as chaves já pendentes do bloco vêm numa query só (`$in`) para um
+     set em memória;
+  3. a detecção roda no `services.render_pool` (processos), com o bloco
+     dividido entre os workers; cada processo memoiza a decisão ortográfica
+     por palavra (`_spelling_decision`) ao longo do scan;
+  4. cada bloco grava a fila (`bulk_write`) e depois o cursor — um scan que
+     caiu retoma de onde parou (`resume_scan`), e o que já tinha entrado na
+     fila conta como duplicado, não reentra.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pymongo import InsertOne
+
+from scripts.text_improvement import (
+    QUEUE_COLLECTION,
+    _build_queue_item,
+    detect_format_issues,
+    detect_spelling_issues,
+    should_skip_format,
+    should_skip_spelling,
+)
+from services.render_pool import RENDER_PROCESS_POOL_SIZE, run_render
+
+logger = logging.getLogger(__name__)
+
+SCANS_COLLECTION = 'text_improvement_scans'
+TEXT_SCAN_CHUNK_SIZE = int(os.environ.get("TEXT_SCAN_CHUNK_SIZE", "200"))
+TEXT_SCAN_STALE_SECONDS = int(os.environ.get("TEXT_SCAN_STALE_SECONDS", "300"))
+
+META_FIELDS = {
+    "_id": 1, "id": 1, "mantenedora_id": 1, "full_name": 1, "nome": 1,
+    "name": 1, "class_id": 1, "course_id": 1, "recorded_by": 1,
+    "created_by_user_id": 1, "created_by": 1,
+}
+
+_running: set = set()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def owner_filter_for(owner_id: Optional[str]) -> dict:
+    """Professor: só os próprios registros; admin (None): tudo."""
+    if not owner_id:
+        return {}
+    return {"$or": [
+        {"recorded_by": owner_id},
+        {"created_by_user_id": owner_id},
+        {"created_by": owner_id},
+    ]}
+
+
+# ============================================================
+# Detecção (roda no processo filho)
+# ============================================================
+def analyze_texts(entries: List[Tuple[int, str, str]]) -> List[Dict[str, Any]]:
+    """[(idx, campo, texto)] → achados [{idx, field, tipo, new, rules, ...}].
+
+    Mesmas fases e regras do scan original: formatação, depois ortografia.
+    """
+    findings: List[Dict[str, Any]] = []
+    for idx, field, text in entries:
+        if not should_skip_format(text):
+            new_v, rules = detect_format_issues(text)
+            if rules:
+                findings.append({"idx": idx, "field": field, "tipo": "formatacao",
+                                 "new": new_v, "rules": rules})
+        if not should_skip_spelling(text):
+            new_sp, corrections = detect_spelling_issues(text)
+            if corrections:
+                findings.append({"idx": idx, "field": field, "tipo": "ortografia",
+                                 "new": new_sp, "corrections": corrections})
+    return findings
+
+
+async def _analyze_parallel(entries: List[Tuple[int, str, str]]) -> List[Dict[str, Any]]:
+    if not entries:
+        return []
+    parts = max(1, min(RENDER_PROCESS_POOL_SIZE, len(entries)))
+    size = -(-len(entries) // parts)
+    results = await asyncio.gather(*(
+        run_render(analyze_texts, entries[i:i + size]) for i in range(0, len(entries), size)
+    ))
+    return [f for part in results for f in part]
+
+
+async def _pending_keys(db, col_name: str, source_ids: List[str]) -> Set[Tuple[str, str, str]]:
+    """(source_id, campo, tipo) já pendentes na fila para os documentos do bloco."""
+    keys: Set[Tuple[str, str, str]] = set()
+    async for item in db[QUEUE_COLLECTION].find(
+        {"source_collection": col_name, "source_id": {"$in": source_ids}, "status": "pending"},
+        {"_id": 0, "source_id": 1, "source_field": 1, "tipo": 1},
+    ):
+        keys.add((item.get("source_id"), item.get("source_field"), item.get("tipo")))
+    return keys
+
+
+def _queue_item(col_name: str, doc: dict, field: str, finding: dict) -> dict:
+    original = doc[field]
+    if finding["tipo"] == "formatacao":
+        return _build_queue_item(col_name, doc, field, original, finding["new"], finding["rules"],
+                                 tipo="formatacao")
+    corrections = finding["corrections"]
+    avg_conf = sum(c["confidence"] for c in corrections) / len(corrections)
+    rules_list = [f"sp_{c['original']}_{c['sugestao']}" for c in corrections]
+    return _build_queue_item(col_name, doc, field, original, finding["new"], rules_list,
+                             tipo="ortografia", confidence=round(avg_conf, 2),
+                             spelling_corrections=corrections)
+
+
+# ============================================================
+# Job
+# ============================================================
+async def create_scan(db, targets: Dict[str, List[str]], *, created_by: Optional[str],
+                      owner_id: Optional[str]) -> dict:
+    """Registra o scan (status 'running', cursor no início) e estima o total."""
+    owner_filter = owner_filter_for(owner_id)
+    total = 0
+    for col_name in targets:
+        total += await db[col_name].count_documents(owner_filter)
+    scan = {
+        "id": str(uuid.uuid4()),
+        "status": "running",
+        "scope": "self" if owner_id else "all",
+        "owner_id": owner_id,
+        "created_by": created_by,
+        "targets": targets,
+        "cursor": {"collection": next(iter(targets), None), "after_id": None},
+        "counters": {"scanned": 0, "candidates": 0, "enqueued": 0, "duplicates": 0},
+        "progress": {"total": total, "percent": 0},
+        "error": None,
+        "created_at": _now(),
+        "updated_at": _now(),
+        "finished_at": None,
+    }
+    await db[SCANS_COLLECTION].insert_one(dict(scan))
+    return scan
+
+
+async def _scan_chunk(db, col_name: str, fields: List[str], docs: List[dict],
+                      counters: Dict[str, int]) -> None:
+    entries = [
+        (idx, f, doc[f])
+        for idx, doc in enumerate(docs)
+        for f in fields
+        if isinstance(doc.get(f), str) and doc[f].strip()
+    ]
+    findings = await _analyze_parallel(entries)
+    pending = await _pending_keys(db, col_name, [str(d.get("id") or d.get("_id")) for d in docs])
+    ops: List[InsertOne] = []
+    for finding in findings:
+        doc = docs[finding["idx"]]
+        key = (str(doc.get("id") or doc.get("_id")), finding["field"], finding["tipo"])
+        counters["candidates"] += 1
+        if key in pending:
+            counters["duplicates"] += 1
+            continue
+        pending.add(key)
+        ops.append(InsertOne(_queue_item(col_name, doc, finding["field"], finding)))
+        counters["enqueued"] += 1
+    counters["scanned"] += len(docs)
+    if ops:
+        await db[QUEUE_COLLECTION].bulk_write(ops, ordered=False)
+
+
+async def run_scan_job(db, scan_id: str) -> Optional[dict]:
+    """Processa o scan a partir do cursor gravado. Devolve o documento final."""
+    coll = db[SCANS_COLLECTION]
+    scan = await coll.find_one({"id": scan_id}, {"_id": 0})
+    if not scan:
+        return None
+    targets: Dict[str, List[str]] = scan["targets"]
+    owner_filter = owner_filter_for(scan.get("owner_id"))
+    counters = dict(scan["counters"])
+    total = (scan.get("progress") or {}).get("total") or 0
+    cursor = dict(scan["cursor"])
+    names = list(targets)
+    try:
+        start = names.index(cursor["collection"]) if cursor.get("collection") in names else len(names)
+        for col_name in names[start:]:
+            fields = targets[col_name]
+            after_id = cursor["after_id"] if cursor.get("collection") == col_name else None
+            projection = {**META_FIELDS, **{f: 1 for f in fields}}
+            while True:
+                flt = dict(owner_filter)
+                if after_id is not None:
+                    flt["_id"] = {"$gt": after_id}
+                docs = await (db[col_name].find(flt, projection).sort("_id", 1)
+                              .limit(TEXT_SCAN_CHUNK_SIZE).to_list(TEXT_SCAN_CHUNK_SIZE))
+                if not docs:
+                    break
+                await _scan_chunk(db, col_name, fields, docs, counters)
+                after_id = docs[-1]["_id"]
+                # Cursor só depois da fila: retomar nunca pula um bloco.
+                await coll.update_one({"id": scan_id}, {"$set": {
+                    "cursor": {"collection": col_name, "after_id": after_id},
+                    "counters": counters,
+                    "progress": {"total": total,
+                                 "percent": min(99, int(counters["scanned"] * 100 / total)) if total else 0},
+                    "updated_at": _now(),
+                }})
+                if len(docs) < TEXT_SCAN_CHUNK_SIZE:
+                    break
+        final = {"status": "done", "counters": counters, "cursor": {"collection": None, "after_id": None},
+                 "progress": {"total": total, "percent": 100}, "updated_at": _now(), "finished_at": _now()}
+    except Exception as e:  # noqa: BLE001
+        logger.error(f"[text_scan] scan {scan_id} falhou: {e}")
+        final = {"status": "failed", "error": f"Falha na análise: {e}"[:500], "updated_at": _now()}
+    await coll.update_one({"id": scan_id}, {"$set": final})
+    return {**scan, **final}
+
+
+def start_scan_job(db, scan_id: str) -> asyncio.Task:
+    task = asyncio.create_task(run_scan_job(db, scan_id))
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+    return task
+
+
+def is_resumable(scan: dict) -> bool:
+    """Falhou, ou está 'running' sem avançar há TEXT_SCAN_STALE_SECONDS (réplica caiu)."""
+    if scan.get("status") == "failed":
+        return True
+    if scan.get("status") != "running":
+        return False
+    updated = scan.get("updated_at")
+    if isinstance(updated, datetime) and updated.tzinfo is None:
+        updated = updated.replace(tzinfo=timezone.utc)
+    return updated is None or _now() - updated > timedelta(seconds=TEXT_SCAN_STALE_SECONDS)
+
+
+async def resume_scan(db, scan: dict) -> bool:
+    """Reabre o scan (condicional ao `updated_at` lido: só um chamador retoma)."""
+    res = await db[SCANS_COLLECTION].update_one(
+        {"id": scan["id"], "status": scan["status"], "updated_at": scan.get("updated_at")},
+        {"$set": {"status": "running", "error": None, "updated_at": _now()}},
+    )
+    if not res.modified_count:
+        return False
+    start_scan_job(db, scan["id"])
+    return True
+
+
+def public_scan(scan: dict) -> dict:
+    """Formato devolvido pela API (mesmas chaves do scan síncrono + progresso).
+
+    `stale`: 'running' parado há TEXT_SCAN_STALE_SECONDS — o frontend para de
+    esperar e pede `/resume` (relógio do servidor, não o do navegador).
+    """
+    counters = scan.get("counters") or {}
+    return {
+        "scan_id": scan["id"],
+        "status": scan["status"],
+        "stale": scan.get("status") == "running" and is_resumable(scan),
+        "scope": scan.get("scope"),
+        "enqueued": counters.get("enqueued", 0),
+        "duplicates": counters.get("duplicates", 0),
+        "candidates": counters.get("candidates", 0),
+        "scanned": counters.get("scanned", 0),
+        "progress": scan.get("progress"),
+        "cursor": {"collection": (scan.get("cursor") or {}).get("collection")},
+        "error": scan.get("error"),
+        "created_at": scan.get("created_at"),
+        "finished_at": scan.get("finished_at"),
+    }
@@ -362,4 +362,47 @@ async def create_all_indexes(db):
         [("flag", 1), ("tenant", 1), ("environment", 1)], unique=True, background=True, name="uq_mig_flag"
     )
 
+    # SIE (Out/2026) — chaves dos upserts em bulk do lote (services/sie_batch.py)
+    await db.student_risk_scores.create_index(
+        [("student_id", 1), ("academic_year", 1)], background=True, name="ix_sie_risk_student")
+    await db.student_risk_scores.create_index(
+        [("academic_year", 1), ("overall_risk", -1)], background=True, name="ix_sie_risk_rank")
+    await db.student_diagnostics.create_index(
+        [("student_id", 1), ("academic_year", 1)], background=True, name="ix_sie_diag_student")
+    await db.student_snapshots.create_index(
+        [("student_id", 1), ("academic_year", 1), ("snapshot_date", 1)],
+        background=True, name="ix_sie_snapshot")
+    await db.student_alerts.create_index(
+        [("student_id", 1), ("academic_year", 1), ("alert_type", 1)], background=True, name="ix_sie_alert")
+    await db.sie_batch_jobs.create_index("id", unique=True, background=True)
+
+    # Sync offline por cursor (Out/2026) — keyset (updated_at, id) do pull
+    # (routers/sync.py) e tombstones de exclusão com TTL.
+    for coll in ("grades", "attendance", "students", "classes", "courses", "schools"):
+        await db[coll].create_index(
+            [("mantenedora_id", 1), ("updated_at", 1), ("id", 1)], background=True, name="ix_sync_keyset")
+    for coll in ("grades", "attendance"):
+        await db[coll].create_index(
+            [("mantenedora_id", 1), ("class_id", 1), ("updated_at", 1), ("id", 1)],
+            background=True, name="ix_sync_keyset_class")
+    await db.sync_tombstones.create_index(
+        [("mantenedora_id", 1), ("collection", 1), ("deleted_at", 1)], background=True, name="ix_sync_tombstones")
+    await db.sync_tombstones.create_index(
+        [("mantenedora_id", 1), ("collection", 1), ("class_id", 1), ("deleted_at", 1)],
+        background=True, name="ix_sync_tombstones_class")
+    await db.sync_tombstones.create_index(
+        "expires_at", expireAfterSeconds=0, background=True, name="ttl_sync_tombstones")
+
+    # Cache da extração de PDF curricular por sha256 (services/curriculum_extraction.py)
+    await db.curriculum_extraction_cache.create_index("key", unique=True, background=True)
+    await db.curriculum_extraction_cache.create_index(
+        "expires_at", expireAfterSeconds=0, background=True, name="ttl_curriculum_extraction_cache")
+
+    # Busca de melhorias de texto em background (services/text_scan.py): scans
+    # por id + chave pendente da fila consultada em lote por bloco.
+    await db.text_improvement_scans.create_index("id", unique=True, background=True)
+    await db.text_improvement_queue.create_index(
+        [("source_collection", 1), ("source_id", 1), ("status", 1)], background=True,
+        name="ix_text_improvement_pending_source")
+
     logger.info("Índices MongoDB criados/verificados com sucesso")
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""
+Tests da lens em lote (utils/academic_event_lens.resolve_students_ownership —
+Out/2026) e da validação de dependências pré-carregada.
+
+Sem MongoDB: coleções fake que contam as queries.
+"""
+import asyncio
+import os
+import random
+import sys
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils import academic_event_lens as lens  # noqa: E402
+from utils.dependency_validator import check_dependency_link, fetch_dependencies  # noqa: E402
+
+
+def _match(doc, query):
+    for key, cond in query.items():
+        if key == '$or':
+            if not any(_match(doc, q) for q in cond):
+                return False
+        elif isinstance(cond, dict) and '$in' in cond:
+            if doc.get(key) not in cond['$in']:
+                return False
+        elif doc.get(key) != cond:
+            return False
+    return True
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, n):
+        return [dict(d) for d in (self.docs if n is None else self.docs[:n])]
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.queries = 0
+
+    def find(self, query, projection=None):
+        self.queries += 1
+        return _Cursor([d for d in self.docs if _match(d, query)])
+
+    async def find_one(self, query, projection=None):
+        self.queries += 1
+        return next((dict(d) for d in self.docs if _match(d, query)), None)
+
+
+class FakeDB:
+    def __init__(self, events=(), dependencies=()):
+        self.academic_events = FakeCollection(events)
+        self.mantenedoras = FakeCollection([{'id': 'm1', 'timezone': 'America/Manaus'}])
+        self.student_dependencies = FakeCollection(dependencies)
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def _random_events(rng, students):
+    events = []
+    for n in range(60):
+        origin = rng.random() < 0.5
+        events.append({
+            'id': f'e{n}',
+            'student_id': rng.choice(students),
+            'event_type': rng.choice(lens.ACADEMIC_EVENT_PRECEDENCE),
+            'approval_status': rng.choice(['approved', 'approved', 'pending']),
+            'superseded_by_event_id': None,
+            'origin_class_id': 'c1' if origin else 'c9',
+            'destination_class_id': 'c9' if origin else 'c1',
+            'effective_date': f'2026-0{rng.randint(3, 9)}-1{rng.randint(0, 9)}',
+            'created_at': f'2026-01-0{rng.randint(1, 9)}T10:00:00',
+            'origin_teacher_id': 't-o', 'destination_teacher_id': 't-d',
+        })
+    return events
+
+
+def test_lote_igual_a_versao_unitaria_com_uma_query():
+    rng = random.Random(7)
+    students = [f's{i}' for i in range(40)]
+    db = FakeDB(_random_events(rng, students))
+
+    async def scenario():
+        single = {
+            sid: await lens.resolve_student_ownership(
+                db, student_id=sid, class_id='c1', target_date='2026-06-15', mantenedora_id='m1')
+            for sid in students
+        }
+        db.academic_events.queries = db.mantenedoras.queries = 0
+        bulk = await lens.resolve_students_ownership(
+            db, student_ids=students, class_id='c1', target_date='2026-06-15', mantenedora_id='m1')
+        return single, bulk
+
+    single, bulk = _run(scenario())
+    assert bulk == single
+    assert any(not d['editable'] for d in bulk.values())
+    assert db.academic_events.queries == 1
+    assert db.mantenedoras.queries == 0  # timezone já em cache para o tenant
+
+
+def test_dependencias_do_lote_em_uma_query():
+    dep = {'id': 'd1', 'status': 'active', 'student_id': 's1', 'class_id': 'c1',
+           'course_id': 'k1', 'mantenedora_id': 'm1'}
+    db = FakeDB(dependencies=[dep])
+    deps = _run(fetch_dependencies(db, ['d1', None, 'd1', 'nope']))
+
+    assert db.student_dependencies.queries == 1 and set(deps) == {'d1'}
+    kwargs = dict(dependency_id='d1', student_id='s1', class_id='c1', course_id='k1', tenant_id='m1')
+    assert check_dependency_link(deps.get('d1'), **kwargs) == dep
+    with pytest.raises(HTTPException) as exc:
+        check_dependency_link(deps.get('nope'), **dict(kwargs, dependency_id='nope'))
+    assert exc.value.detail['code'] == 'DEPENDENCY_COHERENCE_NOT_FOUND'
+    with pytest.raises(HTTPException) as exc:
+        check_dependency_link(deps.get('d1'), **dict(kwargs, student_id='s2'))
+    assert exc.value.detail['code'] == 'DEPENDENCY_COHERENCE_STUDENT_MISMATCH'
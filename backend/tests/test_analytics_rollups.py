@@ -0,0 +1,83 @@
+"""
+Tests dos rollups do Dashboard Analítico (services/analytics_rollups.py — Out/2026).
+
+Os builders são puros (docs de uma turma → linhas de contadores) e precisam
+reproduzir as mesmas regras das pipelines ao vivo de routers/analytics.py.
+"""
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services.analytics_rollups import (  # noqa: E402
+    build_attendance_rows,
+    build_enrollment_rows,
+    build_grade_rows,
+    data_freshness,
+)
+
+
+def test_frequencia_divide_combos_e_ignora_dependencia():
+    docs = [
+        {"date": "2026-03-02", "academic_year": "2026", "created_at": "2026-03-02T12:00:00+00:00",
+         "records": [
+             {"student_id": "s1", "status": "P|F"},
+             {"student_id": "s2", "status": "j"},
+             {"student_id": "s3", "status": "P", "dependency_id": "dep-1"},
+             {"student_id": "s4", "status": ""},
+         ]},
+        {"date": "2026-03-02", "academic_year": 2026, "created_at": "2026-03-10T12:00:00+00:00",
+         "records": [{"student_id": "s1", "status": "P"}]},
+        {"date": "2026-04-01", "academic_year": 2026, "dependency_id": "dep-9",
+         "records": [{"student_id": "s1", "status": "F"}]},
+    ]
+    daily, per_student = build_attendance_rows("c1", docs)
+    by_date = {(r["date"], r["regular"]): r for r in daily}
+
+    march = by_date[("2026-03-02", True)]
+    assert march["academic_year"] == 2026 and march["month"] == "03"
+    assert (march["total"], march["present"], march["absent"], march["justified"]) == (4, 2, 1, 1)
+    # 2º doc lançado 8 dias depois da aula: fora do SLA de 3 dias.
+    assert (march["docs"], march["docs_on_time"]) == (2, 1)
+
+    dep = by_date[("2026-04-01", False)]
+    assert dep["absent"] == 1
+
+    s1 = {r["regular"]: r for r in per_student if r["student_id"] == "s1"}
+    assert (s1[True]["total"], s1[True]["present"]) == (3, 2)
+    assert s1[False]["absent"] == 1
+    assert not [r for r in per_student if r["student_id"] in ("s3", "s4")]
+
+
+def test_notas_somam_regulares_e_bimestres():
+    docs = [
+        {"student_id": "s1", "academic_year": 2026, "final_average": 7.0, "b1": 6.0, "b2": None},
+        {"student_id": "s1", "academic_year": 2026, "final_average": 4.0, "b1": 4.0},
+        {"student_id": "s1", "academic_year": 2026, "final_average": 2.0, "dependency_id": "d"},
+        {"student_id": "s2", "academic_year": 2026, "final_average": None, "b1": 8.0},
+    ]
+    rows = {r["student_id"]: r for r in build_grade_rows("c1", docs)}
+    s1 = rows["s1"]
+    assert (s1["reg_n"], s1["reg_sum"], s1["reg_min"]) == (2, 11.0, 4.0)
+    assert (s1["fa_n"], s1["fa_sum"]) == (3, 13.0)
+    assert (s1["b1_n"], s1["b1_sum"], s1["b2_n"]) == (2, 10.0, 0)
+    assert rows["s2"]["reg_n"] == 0 and rows["s2"]["reg_min"] is None
+    assert rows["s2"]["b1_sum"] == 8.0
+
+
+def test_matriculas_por_status():
+    docs = [
+        {"school_id": "e1", "mantenedora_id": "m", "academic_year": "2026", "status": "active"},
+        {"school_id": "e1", "mantenedora_id": "m", "academic_year": 2026, "status": "active"},
+        {"school_id": "e1", "mantenedora_id": "m", "academic_year": 2026, "status": None},
+    ]
+    rows = {r["status"]: r["count"] for r in build_enrollment_rows("c1", docs)}
+    assert rows == {"active": 2, None: 1}
+
+
+def test_indicador_de_frescor():
+    as_of = datetime.now(timezone.utc) - timedelta(seconds=42)
+    fresh = data_freshness({"usable": True, "as_of": as_of, "lag_seconds": 42.04}, True)
+    assert fresh == {"source": "rollup", "as_of": as_of.isoformat(), "lag_seconds": 42.0}
+    assert data_freshness(None, False)["source"] == "live"
@@ -0,0 +1,85 @@
+"""
+Tests do buffer de auditoria (audit_service.AuditWriter — Out/2026).
+
+Sem MongoDB: coleção fake que registra as chamadas de insert_many e pode
+falhar sob demanda.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from audit_service import AuditWriter  # noqa: E402
+
+
+class FakeCollection:
+    def __init__(self, fail_times=0):
+        self.docs = []
+        self.calls = 0
+        self.fail_times = fail_times
+
+    async def insert_many(self, docs, ordered=True):
+        self.calls += 1
+        if self.fail_times:
+            self.fail_times -= 1
+            raise ConnectionError("mongo fora")
+        self.docs.extend(docs)
+
+    async def insert_one(self, doc):
+        self.docs.append(doc)
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_agrupa_em_lotes_e_drena_no_stop():
+    async def scenario():
+        coll = FakeCollection()
+        writer = AuditWriter(lambda: coll, batch_size=50, flush_interval=60)
+        writer.start()
+        for i in range(120):
+            await writer.enqueue({'n': i})
+        await writer.stop()
+        return coll, writer.stats()
+
+    coll, stats = _run(scenario())
+    assert [d['n'] for d in coll.docs] == list(range(120))
+    assert coll.calls <= 4
+    assert stats['flushed'] == 120 and stats['dropped'] == 0 and stats['queue_depth'] == 0
+
+
+def test_backpressure_grava_inline_sem_perder():
+    async def scenario():
+        coll = FakeCollection()
+        writer = AuditWriter(lambda: coll, max_size=2, batch_size=100,
+                             flush_interval=60, enqueue_timeout=0.01)
+        writer.start()
+        await writer._lock.acquire()  # simula flush lento em andamento
+        for i in range(5):
+            await writer.enqueue({'n': i})
+        writer._lock.release()
+        await writer.stop()
+        return coll, writer.stats()
+
+    coll, stats = _run(scenario())
+    assert sorted(d['n'] for d in coll.docs) == list(range(5))
+    assert stats['inline_fallback'] == 3 and stats['backpressure_waits'] == 3
+
+
+def test_retenta_e_conta_descartes():
+    async def scenario():
+        ok = FakeCollection(fail_times=1)
+        bad = FakeCollection(fail_times=99)
+        w_ok = AuditWriter(lambda: ok, retries=2, flush_interval=60)
+        w_bad = AuditWriter(lambda: bad, retries=1, flush_interval=60)
+        for w in (w_ok, w_bad):
+            w.start()
+            await w.enqueue({'n': 1})
+            await w.stop()
+        return ok, w_ok.stats(), w_bad.stats()
+
+    ok, s_ok, s_bad = _run(scenario())
+    assert len(ok.docs) == 1 and s_ok['retries'] == 1 and s_ok['dropped'] == 0
+    assert s_bad['dropped'] == 1 and s_bad['flushed'] == 0
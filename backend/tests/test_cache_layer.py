@@ -0,0 +1,189 @@
+"""
+Tests da camada única de cache (utils/cache.py — Out/2026).
+
+LRU limitada, tags, single-flight por chave, fachadas legadas e aplicação de
+eventos do barramento de invalidação. Tudo em memória (sem Mongo).
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import utils.cache as cache_mod
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.cache import (  # noqa: E402
+    CacheRegion,
+    MemoryCacheBackend,
+    TTLCache,
+    apply_invalidation_event,
+    get_region,
+    run_invalidation_listener,
+    tenant_invalidation_tags,
+    tenant_tag,
+)
+
+
+def test_lru_respeita_limite_e_descarta_menos_usado():
+    be = MemoryCacheBackend(max_entries=2)
+    be.set("a", 1, ttl=60)
+    be.set("b", 2, ttl=60)
+    assert be.get("a") == 1  # "a" vira o mais recente
+    be.set("c", 3, ttl=60)
+    assert len(be) == 2
+    assert "b" not in be._data
+    assert be.evictions == 1
+
+
+def test_eviction_prefere_expirados():
+    now = [100.0]
+    be = MemoryCacheBackend(max_entries=2, clock=lambda: now[0])
+    be.set("velho", 1, ttl=1)
+    be.set("novo", 2, ttl=60)
+    now[0] = 105.0
+    be.set("outro", 3, ttl=60)
+    assert set(be._data) == {"novo", "outro"}
+
+
+def test_invalidate_tags_remove_so_o_tenant():
+    region = CacheRegion("t:tags")
+    region.set("k1", "x", tags=(tenant_tag("T1"),))
+    region.set("k2", "y", tags=(tenant_tag("T2"),))
+    region.set("k3", "z", tags=(tenant_tag(None),))
+    removed = region.invalidate_tags(*tenant_invalidation_tags("T1"))
+    assert removed == 2
+    assert region.get("k1") is None
+    assert region.get("k3") is None
+    assert region.get("k2") == "y"
+
+
+@pytest.mark.asyncio
+async def test_single_flight_mesma_chave():
+    region = CacheRegion("t:sf")
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"v": 1}
+
+    results = await asyncio.gather(*[region.get_or_load("k", loader) for _ in range(10)])
+    assert calls == 1
+    assert all(r == {"v": 1} for r in results)
+    snap = region.snapshot()
+    assert snap["loads"] == 1
+    assert snap["coalesced"] == 9
+
+
+@pytest.mark.asyncio
+async def test_chaves_diferentes_nao_se_bloqueiam():
+    region = CacheRegion("t:par")
+    gate = asyncio.Event()
+
+    async def slow():
+        await gate.wait()
+        return "lento"
+
+    slow_task = asyncio.create_task(region.get_or_load("lento", slow))
+    await asyncio.sleep(0)
+    fast = await asyncio.wait_for(region.get_or_load("rapido", lambda: "ok"), timeout=1)
+    assert fast == "ok"
+    gate.set()
+    assert await slow_task == "lento"
+
+
+@pytest.mark.asyncio
+async def test_erro_no_loader_propaga_e_nao_cacheia():
+    region = CacheRegion("t:err")
+
+    async def boom():
+        raise RuntimeError("falhou")
+
+    with pytest.raises(RuntimeError):
+        await region.get_or_load("k", boom)
+    assert await region.get_or_load("k", lambda: 42) == 42
+    assert region.snapshot()["load_errors"] == 1
+
+
+def test_ttlcache_fachada_invalidacao_por_tag():
+    c = TTLCache()
+    c.set("t_escolas", {"tenant": "A"}, ["a"], 60, tags=(tenant_tag("A"),))
+    c.set("t_escolas", {"tenant": "B"}, ["b"], 60, tags=(tenant_tag("B"),))
+    c.invalidate("t_escolas", tags=tenant_invalidation_tags("A"))
+    assert c.get("t_escolas", {"tenant": "A"}) is None
+    assert c.get("t_escolas", {"tenant": "B"}) == ["b"]
+    c.invalidate("t_escolas")
+    assert c.get("t_escolas", {"tenant": "B"}) is None
+
+
+def test_evento_do_barramento_aplica_no_l1():
+    region = get_region("t:bus")
+    region.set("k1", 1, tags=("school:S1",))
+    region.set("k2", 2, tags=("school:S2",))
+    apply_invalidation_event({"region": "t:bus", "tags": ["school:S1"]})
+    assert region.get("k1") is None
+    assert region.get("k2") == 2
+    apply_invalidation_event({"region": "t:bus"})
+    assert region.get("k2") is None
+
+
+class _BusCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction=1):
+        self.docs = sorted(self.docs, key=lambda d: d[field], reverse=direction < 0)
+        return self
+
+    def __aiter__(self):
+        self._it = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return dict(next(self._it))
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeBus:
+    """`cache_invalidations` como o Motor devolve: `at` sem timezone."""
+
+    def __init__(self, events):
+        self.events = events
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        since = query["at"]["$gte"].replace(tzinfo=None)
+        return _BusCursor([e for e in self.events
+                           if e["at"] >= since and e["origin"] != query["origin"]["$ne"]])
+
+
+@pytest.mark.asyncio
+async def test_listener_aplica_eventos_com_at_naive_e_avanca_janela(monkeypatch):
+    region = get_region("t:listener")
+    for n in range(3):
+        region.set(f"k{n}", n, tags=(f"school:S{n}",))
+    base = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=1)
+    bus = FakeBus([
+        {"id": f"e{n}", "origin": "outra", "region": "t:listener",
+         "tags": [f"school:S{n}"], "at": base + timedelta(seconds=n)}
+        for n in range(3)
+    ])
+    monkeypatch.setattr(cache_mod, "_bus_collection", bus)
+    monkeypatch.setattr(cache_mod, "CACHE_BUS_POLL_SECONDS", 0.01)
+    stop = asyncio.Event()
+    task = asyncio.create_task(run_invalidation_listener(stop))
+    while len(bus.queries) < 2:
+        await asyncio.sleep(0.01)
+    stop.set()
+    await task
+
+    assert [region.get(f"k{n}") for n in range(3)] == [None, None, None]  # todos no 1º poll
+    overlap = timedelta(seconds=5)
+    assert bus.queries[1]["at"]["$gte"] == (base + timedelta(seconds=2)).replace(tzinfo=timezone.utc) - overlap
@@ -0,0 +1,85 @@
+"""
+Testes — lote de documentos por turma (services/class_batch_documents.py).
+
+Garante que o índice de faltas numa única passada produz o MESMO
+`attendance_data` que o cálculo antigo por aluno (varredura completa).
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services.class_batch_documents import (  # noqa: E402
+    build_attendance_data,
+    group_grades_by_student,
+    index_absences_by_student,
+)
+
+ATTENDANCE = [
+    {"attendance_type": "daily", "period": "regular", "course_id": None,
+     "records": [{"student_id": "A", "status": "F"}, {"student_id": "B", "status": "P"}]},
+    {"attendance_type": "daily", "period": "regular",
+     "records": [{"student_id": "A", "status": "F"}, {"student_id": "B", "status": "F"}]},
+    {"attendance_type": "by_component", "period": "regular", "course_id": "C_INT",
+     "records": [{"student_id": "A", "status": "F"}, {"student_id": "B", "status": "F"}]},
+    {"attendance_type": "daily", "period": "integral", "course_id": "C_INT",
+     "records": [{"student_id": "B", "status": "F"}]},
+    {"attendance_type": "by_component", "period": "regular", "course_id": None,
+     "records": [{"student_id": "A", "status": "F"}]},
+]
+COURSES = [
+    {"id": "C_INT", "atendimento_programa": "atendimento_integral"},
+    {"id": "C_REG", "atendimento_programa": None},
+]
+
+
+def _legacy_attendance_data(student_id, records, courses, integral):
+    """Cópia do cálculo por aluno que existia em routers/documents.get_batch_documents."""
+    faltas_regular = 0
+    faltas_por_componente = {}
+    for att_record in records:
+        period = att_record.get('period', 'regular')
+        course_id = att_record.get('course_id')
+        attendance_type = att_record.get('attendance_type', 'daily')
+        for sr in att_record.get('records', []):
+            if sr.get('student_id') == student_id and sr.get('status') == 'F':
+                if attendance_type == 'daily' and period == 'regular':
+                    faltas_regular += 1
+                elif course_id:
+                    faltas_por_componente[course_id] = faltas_por_componente.get(course_id, 0) + 1
+    data = {'_meta': {'faltas_regular': faltas_regular,
+                      'faltas_por_componente': faltas_por_componente,
+                      'is_escola_integral': integral}}
+    for course in courses:
+        c_id = course.get('id')
+        atendimento = course.get('atendimento_programa')
+        faltas = faltas_por_componente.get(c_id, 0) if atendimento == 'atendimento_integral' else 0
+        data[c_id] = {'absences': faltas, 'atendimento_programa': atendimento}
+    return data
+
+
+def test_absence_index_matches_per_student_scan():
+    index = index_absences_by_student(ATTENDANCE)
+    for sid in ("A", "B", "SEM_FALTAS"):
+        expected = _legacy_attendance_data(sid, ATTENDANCE, COURSES, True)
+        got = build_attendance_data(index.get(sid), COURSES, is_escola_integral=True)
+        assert got == expected, sid
+
+
+def test_absence_index_counts():
+    index = index_absences_by_student(ATTENDANCE)
+    assert index["A"] == {"faltas_regular": 2, "faltas_por_componente": {"C_INT": 1}}
+    assert index["B"] == {"faltas_regular": 1, "faltas_por_componente": {"C_INT": 2}}
+
+
+def test_group_grades_by_student_preserves_order():
+    grades = [
+        {"student_id": "A", "course_id": "1"},
+        {"student_id": "B", "course_id": "1"},
+        {"student_id": "A", "course_id": "2"},
+        {"course_id": "orphan"},
+    ]
+    grouped = group_grades_by_student(grades)
+    assert [g["course_id"] for g in grouped["A"]] == ["1", "2"]
+    assert len(grouped["B"]) == 1
+    assert "orphan" not in str(dict(grouped).keys())
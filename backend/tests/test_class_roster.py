@@ -0,0 +1,137 @@
+"""
+Tests do roster de turma memoizado (services/class_roster — Out/2026).
+
+Sem MongoDB: coleções fake que contam as leituras. A segunda carga do diário
+da mesma turma não pode ir ao banco; escrita de matrícula/aluno (tags
+`class:<id>` / `student:<id>`) derruba o snapshot.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services import class_roster  # noqa: E402
+from services.class_roster import get_class_roster, invalidate_class_rosters  # noqa: E402
+
+
+def _match(doc, query):
+    for key, cond in query.items():
+        if isinstance(cond, dict) and '$in' in cond:
+            if doc.get(key) not in cond['$in']:
+                return False
+        elif doc.get(key) != cond:
+            return False
+    return True
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction=1):
+        self.docs = sorted(self.docs, key=lambda d: d.get(field) or '', reverse=direction < 0)
+        return self
+
+    def collation(self, _):
+        return self
+
+    async def to_list(self, length):
+        return [dict(d) for d in self.docs[:length]]
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = [dict(d) for d in docs]
+        self.finds = 0
+
+    def find(self, query, projection=None):
+        self.finds += 1
+        return _Cursor([d for d in self.docs if _match(d, query)])
+
+
+class FakeDB(dict):
+    name = 'roster_test'
+
+    def __getattr__(self, name):
+        return self.setdefault(name, FakeCollection())
+
+    @property
+    def total_finds(self):
+        return sum(c.finds for c in self.values())
+
+
+def _db():
+    db = FakeDB()
+    db['enrollments'] = FakeCollection([
+        {'student_id': 's1', 'class_id': 'c1', 'status': 'active', 'academic_year': 2026,
+         'enrollment_number': 'E1-26', 'enrollment_date': '2026-02-01', 'student_series': '3º Ano'},
+        {'student_id': 's1', 'class_id': 'c1', 'status': 'active', 'academic_year': 2025,
+         'enrollment_number': 'E1-25'},
+        {'student_id': 's2', 'class_id': 'c1', 'status': 'transferred', 'academic_year': 2026,
+         'enrollment_number': 'E2', 'enrollment_date': '2026-02-03'},
+    ])
+    db['students'] = FakeCollection([
+        {'id': 's1', 'full_name': 'Bruna', 'class_id': 'c1', 'status': 'active'},
+        {'id': 's2', 'full_name': 'Ana', 'class_id': 'c9', 'status': 'transferred'},
+        {'id': 's3', 'full_name': 'Caio', 'class_id': 'c7', 'status': 'active', 'enrollment_number': 'E3'},
+    ])
+    db['student_history'] = FakeCollection([
+        {'student_id': 's2', 'class_id': 'c1', 'action_type': 'transferencia_saida', 'action_date': '2026-05-10'},
+    ])
+    db['student_dependencies'] = FakeCollection([
+        {'student_id': 's3', 'class_id': 'c1', 'course_id': 'mat', 'mantenedora_id': 'm1', 'status': 'active'},
+        {'student_id': 's1', 'class_id': 'c1', 'course_id': 'mat', 'mantenedora_id': 'm1', 'status': 'active'},
+        {'student_id': 's3', 'class_id': 'c1', 'course_id': 'port', 'mantenedora_id': 'm1', 'status': 'active'},
+    ])
+    return db
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_segunda_carga_nao_consulta_e_deriva_como_os_endpoints():
+    class_roster._region.clear(propagate=False)
+    db = _db()
+    roster = _run(get_class_roster(db, 'c1'))
+    loads = db.total_finds
+    again = _run(get_class_roster(db, 'c1'))
+
+    assert again is roster and db.total_finds == loads
+    assert [s['full_name'] for s in roster.students] == ['Ana', 'Bruna']
+    assert roster.enrollment_numbers(2026) == {'s1': 'E1-26', 's2': 'E2'}
+    assert roster.enrollment_numbers(2025)['s1'] == 'E1-25'
+    assert roster.enrollment_dates() == {'s1': '2026-02-01'}
+    assert roster.enrollment_dates(include_inactive=True)['s2'] == '2026-02-03'
+    assert roster.enrollment_series() == {'s1': '3º Ano'}
+    assert roster.action_info()['s2'] == {'action_label': 'Transferido', 'action_date': '2026-05-10'}
+    # s1 já está no roster regular; s3 só entra pela dependência do componente/tenant
+    assert [(d['course_id'], s['id']) for d, s in roster.dependencies_for('mat', 'm1')] == [('mat', 's3')]
+    assert roster.dependencies_for('mat', 'outra') == []
+
+
+def test_invalidacao_por_turma_e_por_aluno_recarrega():
+    class_roster._region.clear(propagate=False)
+    db = _db()
+    first = _run(get_class_roster(db, 'c1'))
+
+    db['students'].docs[0]['full_name'] = 'Bruna Souza'
+    invalidate_class_rosters(student_ids=['s1'])
+    second = _run(get_class_roster(db, 'c1'))
+    assert second is not first
+    assert [s['full_name'] for s in second.students] == ['Ana', 'Bruna Souza']
+
+    invalidate_class_rosters(student_ids=['s3'])        # aluno em dependência também pertence ao roster
+    third = _run(get_class_roster(db, 'c1'))
+    assert third is not second
+
+    invalidate_class_rosters(class_ids=['c2'], student_ids=['fora'])
+    assert _run(get_class_roster(db, 'c1')) is third
+
+    db['enrollments'].docs.append({'student_id': 's3', 'class_id': 'c1', 'status': 'active',
+                                   'academic_year': 2026, 'enrollment_number': 'E3-26'})
+    invalidate_class_rosters(class_ids=['c1'])
+    fourth = _run(get_class_roster(db, 'c1'))
+    assert [s['id'] for s in fourth.students] == ['s2', 's1', 's3']
+    assert fourth.dependencies_for('mat', 'm1') == []
@@ -0,0 +1,192 @@
+"""
+Tests do fan-out WebSocket (utils/connection_manager + utils/ws_pubsub — Out/2026).
+
+Sem rede: sockets fake (um deles trava no envio) e um backbone em memória
+compartilhado entre dois managers, simulando duas réplicas.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils import connection_manager as cm  # noqa: E402
+from utils.connection_manager import ConnectionManager, topics_for_user  # noqa: E402
+
+
+class FakeSocket:
+    def __init__(self, stall=False):
+        self.stall = stall
+        self.sent = []
+        self.closed = None
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        if self.stall:
+            await asyncio.sleep(3600)
+        self.sent.append(message)
+
+    async def close(self, code=1000):
+        self.closed = code
+
+
+class SharedBus:
+    """Backbone em memória: entrega a todos os managers exceto a origem."""
+
+    name = 'memory'
+
+    def __init__(self):
+        self.handlers = {}
+
+    async def publish(self, envelope):
+        for origin, handler in list(self.handlers.items()):
+            if origin != envelope['origin']:
+                await handler(envelope)
+
+    def attach(self, manager, origin):
+        manager._backbone = self
+        self.handlers[origin] = manager._on_remote
+        return origin
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_socket_lento_nao_trava_e_e_desconectado(monkeypatch):
+    monkeypatch.setattr(cm, 'WS_SEND_QUEUE_SIZE', 3)
+    monkeypatch.setattr(cm, 'WS_SEND_TIMEOUT_SECONDS', 0.05)
+
+    async def scenario():
+        manager = ConnectionManager()
+        fast, slow = FakeSocket(), FakeSocket(stall=True)
+        await manager.connect(fast, 'u1')
+        await manager.connect(slow, 'u2')
+        for n in range(5):
+            await manager.broadcast({'n': n})
+            await asyncio.sleep(0.01)  # o socket rápido drena; o lento acumula
+        await asyncio.sleep(0.1)
+        connected = list(manager.active_connections)
+        await manager.stop()
+        return manager, fast, slow, connected
+
+    manager, fast, slow, connected = _run(scenario())
+    assert fast.sent == [{'n': n} for n in range(5)]
+    assert slow.closed == 1013 and connected == ['u1']
+    assert manager.stats['evicted'] == 1
+
+
+def test_topicos_e_entrega_entre_replicas():
+    async def scenario():
+        a, b = ConnectionManager(), ConnectionManager()
+        bus = SharedBus()
+        bus.attach(a, 'replica-a')
+        bus.attach(b, 'replica-b')
+        a_sock, b_sock, other = FakeSocket(), FakeSocket(), FakeSocket()
+        payload = {'sub': 'u1', 'role': 'diretor', 'mantenedora_id': 'm1', 'school_ids': ['s1']}
+        await a.connect(a_sock, 'u1', topics=topics_for_user(payload))
+        await b.connect(b_sock, 'u2', topics=topics_for_user({'sub': 'u2', 'school_ids': ['s1']}))
+        await b.connect(other, 'u3', topics=topics_for_user({'sub': 'u3', 'school_ids': ['s9']}))
+        assert b.subscribe(other, ['school:s1', 'school:s9']) == {'school:s9'}  # só o permitido
+
+        import utils.ws_pubsub as ws
+        orig = ws.make_envelope
+
+        def envelope(origin):
+            return lambda *args, **kw: {**orig(*args, **kw), 'origin': origin}
+
+        ws.make_envelope = envelope('replica-b')
+        try:
+            await b.send_message('u1', {'type': 'dm'})             # u1 está na réplica A
+            await b.publish('school:s1', {'type': 'aviso'})
+            await b.broadcast({'type': 'geral'}, exclude_user_id='u3')
+        finally:
+            ws.make_envelope = orig
+        await asyncio.sleep(0.01)
+        await a.stop()
+        await b.stop()
+        return a_sock, b_sock, other
+
+    a_sock, b_sock, other = _run(scenario())
+    assert [m['type'] for m in a_sock.sent] == ['dm', 'aviso', 'geral']
+    assert [m['type'] for m in b_sock.sent] == ['aviso', 'geral']
+    assert other.sent == []
+
+
+class FakeCapped:
+    """Capped collection em memória: ordem natural = ordem de inserção."""
+
+    def __init__(self, docs=()):
+        self.docs, self.evicted, self.kill = list(docs), 0, False
+
+    def insert(self, _id, env_id, origin='replica-b'):
+        self.docs.append({'_id': _id, 'id': env_id, 'origin': origin, 'topic': 't', 'message': {}})
+
+    async def find_one(self, query, projection=None, sort=None):
+        if sort:
+            return dict(self.docs[-1]) if self.docs else None
+        return next((dict(d) for d in self.docs if d['id'] == query['id']), None)
+
+    def find(self, query, cursor_type=None):
+        assert query == {}  # nada de filtro por _id
+        self.kill = False
+        return _TailCursor(self)
+
+
+class _TailCursor:
+    def __init__(self, coll):
+        self.coll, self.pos = coll, coll.evicted
+
+    @property
+    def alive(self):
+        return not self.coll.kill
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        idx = self.pos - self.coll.evicted
+        if self.alive and 0 <= idx < len(self.coll.docs):
+            self.pos += 1
+            return dict(self.coll.docs[idx])
+        await asyncio.sleep(0.005)  # awaitData sem novidades
+        raise StopAsyncIteration
+
+
+def test_backbone_mongo_segue_ordem_natural_e_retoma_pelo_ultimo_lido(monkeypatch):
+    import utils.ws_pubsub as ws
+    monkeypatch.setattr(ws, 'WS_PUBSUB_RETRY_SECONDS', 0.01)
+    coll = FakeCapped()
+    coll.insert(900, 'old1')
+    coll.insert(950, 'old2')
+    bus = ws.MongoCappedPubSub({'ws_pubsub': coll})
+    got = []
+
+    async def handler(envelope):
+        got.append(envelope['id'])
+
+    async def settle():
+        await asyncio.sleep(0.05)
+
+    async def scenario():
+        stop = asyncio.Event()
+        task = asyncio.create_task(bus.run(handler, stop))
+        await settle()
+        coll.insert(100, 'e1')                        # ObjectId menor, inserido depois (outra réplica)
+        coll.insert(101, 'e2', origin=ws.INSTANCE_ID)
+        await settle()
+        coll.kill = True                              # failover: cursor morre e é reaberto
+        await settle()
+        coll.insert(50, 'e3')
+        await settle()
+        coll.evicted, coll.docs, coll.kill = coll.evicted + len(coll.docs), [], True   # rollover
+        coll.insert(10, 'e4')
+        coll.insert(20, 'e5')
+        await settle()
+        stop.set()
+        await task
+
+    _run(scenario())
+    assert got == ['e1', 'e3', 'e4', 'e5']
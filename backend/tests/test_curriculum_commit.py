@@ -0,0 +1,185 @@
+"""
+Tests do commit em lote do importador curricular (services/curriculum_commit — Out/2026).
+
+Sem MongoDB: coleções fake que contam as queries e os bulk_write.
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services import curriculum_commit as cc  # noqa: E402
+
+
+def _match(doc, query):
+    for key, cond in query.items():
+        if key == '$or':
+            if not any(_match(doc, q) for q in cond):
+                return False
+        elif isinstance(cond, dict) and '$in' in cond:
+            if doc.get(key) not in cond['$in']:
+                return False
+        elif doc.get(key) != cond:
+            return False
+    return True
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        self._it = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return dict(next(self._it))
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.finds = self.bulk_writes = 0
+        self.updates = []
+
+    def find(self, query, projection=None):
+        self.finds += 1
+        return _Cursor([d for d in self.docs if _match(d, query)])
+
+    async def bulk_write(self, ops, ordered=True, session=None):
+        self.bulk_writes += 1
+        errors = []
+        for n, op in enumerate(ops):
+            doc = op._doc
+            if any(d['id'] == doc['id'] for d in self.docs):
+                errors.append({'index': n, 'code': 11000})
+            else:
+                self.docs.append(doc)
+        if errors:
+            raise BulkWriteError({'writeErrors': errors})
+
+    async def update_one(self, query, update, array_filters=None, session=None):
+        self.updates.append((update, array_filters))
+
+
+class FakeDB(dict):
+    def __getitem__(self, name):
+        return self.setdefault(name, FakeCollection())
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+def _item(idx, codigo, comp='LP', ano=1):
+    return {'idx': idx, 'codigo': codigo, 'descricao': f'd{idx}', 'componente_codigo': comp,
+            'ano': ano, 'bimestre': 1, 'etapa': 'anos_iniciais', 'status': 'approved'}
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_plano_com_uma_query_por_colecao_e_duplicados():
+    db = FakeDB()
+    db['bncc_skills'].docs.append({'id': 'pre', 'codigo_bncc': 'EF01LP05'})
+    db['curriculum_skills'].docs.append({'id': 'x', 'codigo': 'EF01LP02'})
+    db['curriculum_adaptations'].docs.append({
+        'id': 'a', 'mantenedora_id': 'm1', 'component_id': 'comp_lp_anos_iniciais_dcm_fa',
+        'bncc_skill_id': None, 'codigo_local': 'FA.LP.09', 'ano': 1, 'bimestre': 1})
+    approved = [_item(0, 'EF01LP01'), _item(1, 'EF01LP02'), _item(2, 'EF01LP01'),
+                _item(3, 'EF01LP05'), _item(4, 'FA.LP.09'), _item(5, 'EF02MA01', comp='MA', ano=2)]
+
+    plan = _run(cc.build_commit_plan(db, {'id': 'batch-1', 'fonte': 'DCM_FA'}, approved, 'm1'))
+
+    assert all(db[c].finds == 1 for c in ('curriculum_components', 'bncc_skills',
+                                          'curriculum_skills', 'curriculum_adaptations'))
+    assert plan.counts == {
+        'skills_inserted': 3, 'skills_skipped_duplicate': 1, 'components_created': 2,
+        'bncc_inserted': 3, 'bncc_existed': 2, 'adaptations_inserted': 4, 'adaptations_existed': 2,
+    }
+    assert plan.imported == [0, 1, 3, 5] and plan.duplicates == [2, 4]
+    assert [d['bncc_skill_id'] for d in plan.adaptations][2] == 'pre'
+
+
+def test_gravacao_em_blocos_com_progresso_e_chave_duplicada():
+    db = FakeDB()
+    approved = [_item(i, f'EF01LP{i:02d}') for i in range(7)]
+    plan = _run(cc.build_commit_plan(db, {'id': 'batch-1', 'fonte': 'DCM_FA'}, approved, 'm1'))
+    db['curriculum_skills'].docs.append({'id': 'skill_imp_batch-1_3', 'codigo': 'corrida'})
+    progress = []
+
+    async def on_progress(p):
+        progress.append(p['done'])
+
+    _run(cc.write_commit_plan(db, 'batch-1', plan, progress_cb=on_progress, chunk_size=3))
+
+    assert db['bncc_skills'].bulk_writes == 3 and len(db['bncc_skills'].docs) == 7
+    assert progress == [1, 4, 7, 8, 11, 14, 15, 18, 21, 22] and plan.total_docs() == 22
+    assert plan.counts['skills_inserted'] == 6 and plan.counts['skills_skipped_duplicate'] == 1
+    update, filters = db['curriculum_import_batches'].updates[0]
+    assert filters[0] == {'imp.idx': {'$in': list(range(7))}}
+
+    db['curriculum_adaptations'].bulk_write = _boom
+    with pytest.raises(RuntimeError):
+        _run(cc.write_commit_plan(db, 'batch-1', plan))
+
+
+async def _boom(*a, **k):
+    raise RuntimeError('falha de rede')
+
+
+class _Res:
+    def __init__(self, n):
+        self.modified_count = n
+
+
+class FakeBatches:
+    """Só o necessário para a trava: filtro por igualdade (com chave pontuada) + $set/$unset."""
+
+    def __init__(self, doc):
+        self.doc = doc
+
+    def _get(self, key):
+        value = self.doc
+        for part in key.split('.'):
+            value = (value or {}).get(part)
+        return value
+
+    async def update_one(self, query, update):
+        if any(self._get(k) != v for k, v in query.items()):
+            return _Res(0)
+        self.doc.update(update.get('$set', {}))
+        for k in update.get('$unset', {}):
+            self.doc.pop(k, None)
+        return _Res(1)
+
+
+def test_trava_do_commit_com_lease_assume_trava_vencida_e_libera_em_cancelamento():
+    from datetime import datetime, timedelta, timezone
+    batches = FakeBatches({'id': 'b1', 'status': 'pending_review'})
+    db = FakeDB(curriculum_import_batches=batches)
+
+    async def scenario():
+        first = await cc.acquire_commit_lock(db, dict(batches.doc))
+        assert await cc.acquire_commit_lock(db, dict(batches.doc)) is None      # dono vivo: 409
+        # dono morreu (crash/restart): sem progresso há mais que o limite
+        old = (datetime.now(timezone.utc) - timedelta(seconds=cc.CURRICULUM_COMMIT_STALE_SECONDS + 5)).isoformat()
+        batches.doc['commit_progress']['updated_at'] = old
+        assert cc.commit_lock_stale(batches.doc)
+        second = await cc.acquire_commit_lock(db, dict(batches.doc))
+        await cc.release_commit_lock(db, 'b1', first[0], first[1], 'atrasado')  # dono antigo não pisa
+        assert batches.doc['status'] == 'committing'
+        await cc.release_commit_lock(db, 'b1', second[0], second[1], 'CancelledError')
+        return first, second
+
+    first, second = _run(scenario())
+    assert first[1] == second[1] == 'pending_review' and first[0] != second[0]
+    assert batches.doc['status'] == 'pending_review' and batches.doc['commit_error'] == 'CancelledError'
+    assert 'commit_lease' not in batches.doc and 'commit_progress' not in batches.doc
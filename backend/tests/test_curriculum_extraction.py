@@ -0,0 +1,67 @@
+"""
+Tests da extração de PDF curricular por faixas de página (services/curriculum_extraction — Out/2026).
+
+Sem MongoDB: só o pipeline de extração. O PDF é gerado com ReportLab; as
+faixas rodam em thread (RENDER_PROCESS_POOL_SIZE=0).
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services import curriculum_extraction as cx  # noqa: E402
+from services import render_pool  # noqa: E402
+from services.curriculum_extractor import extract_skills_from_pdf  # noqa: E402
+
+
+def _make_pdf(path, pages=7):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Table, TableStyle
+
+    style = getSampleStyleSheet()['Normal']
+    elements = []
+    for p in range(pages):
+        ano = p % 5 + 1
+        rows = [['EIXO', 'COMPONENTE', 'ANO', 'BIMESTRE'],
+                ['Leitura', 'Língua Portuguesa', f'{ano}º ano', f'{p % 4 + 1}º'],
+                ['OBJETOS', 'HABILIDADES', 'PROPOSTAS', '']]
+        rows += [['obj', f'(EF0{ano}LP{p * 2 + r:02d}) Ler e compreender textos da página {p} linha {r}', 'x', '']
+                 for r in range(2)]
+        table = Table(rows)
+        table.setStyle(TableStyle([('GRID', (0, 0), (-1, -1), 0.5, colors.black)]))
+        elements += [table, Paragraph(f'EF0{ano}MA{p:02d} Resolver problemas com números naturais.', style),
+                     PageBreak()]
+    SimpleDocTemplate(str(path), pagesize=A4).build(elements)
+
+
+def test_faixas_de_paginas():
+    assert cx.page_ranges(7, 3) == [(1, 3), (4, 6), (7, 7)]
+    assert cx.page_ranges(2, 8) == [(1, 2)]
+    assert cx.page_ranges(0, 3) == []
+    a = cx.cache_key(b'%PDF', ['MA', 'LP'], 'DCM_FA')
+    assert a == cx.cache_key(b'%PDF', ['LP', 'MA'], 'DCM_FA') != cx.cache_key(b'%PDF', None, 'DCM_FA')
+
+
+def test_extracao_paralela_igual_a_sequencial(tmp_path, monkeypatch):
+    pytest.importorskip('pdfplumber')
+    pytest.importorskip('reportlab')
+    pdf = tmp_path / 'dcm.pdf'
+    _make_pdf(pdf)
+    monkeypatch.setattr(render_pool, 'RENDER_PROCESS_POOL_SIZE', 0)
+    monkeypatch.setattr(cx, 'CURRICULUM_EXTRACT_PAGES_PER_TASK', 3)
+    progress = []
+
+    async def on_pages(part, done, total):
+        progress.append((done, total))
+
+    items, pages = asyncio.new_event_loop().run_until_complete(
+        cx.extract_pdf_parallel(str(pdf), None, 'DCM_FA', on_pages=on_pages))
+
+    assert pages == 7 and len(progress) == 3 and progress[-1] == (7, 7)
+    assert items == extract_skills_from_pdf(str(pdf))
+    assert {i['confidence'] for i in items} == {'high', 'low'} and len(items) == 21
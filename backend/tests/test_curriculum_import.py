@@ -65,7 +65,7 @@ def test_full_pipeline(token, pdf_bytes):
     # 1. Upload (LP only)
     files = {"file": ("dcm_fa.pdf", pdf_bytes, "application/pdf")}
     r = httpx.post(
-        f"{BACKEND}/api/curriculum/import/upload?only=LP&fonte=DCM_FA",
+        f"{BACKEND}/api/curriculum/import/upload?only=LP&fonte=DCM_FA&wait=true",
         headers=_h(token), files=files, timeout=60,
     )
     assert r.status_code == 201, r.text
@@ -119,7 +119,7 @@ def test_full_pipeline(token, pdf_bytes):
     # 7. Re-upload deveria marcar os 3 já importados como duplicate
     files2 = {"file": ("dcm_fa.pdf", pdf_bytes, "application/pdf")}
     r = httpx.post(
-        f"{BACKEND}/api/curriculum/import/upload?only=LP&fonte=DCM_FA",
+        f"{BACKEND}/api/curriculum/import/upload?only=LP&fonte=DCM_FA&wait=true",
         headers=_h(token), files=files2, timeout=60,
     )
     assert r.status_code == 201, r.text
@@ -142,7 +142,7 @@ def test_commit_without_approved_returns_400(token, pdf_bytes):
     _cleanup(token)
     files = {"file": ("dcm_fa.pdf", pdf_bytes, "application/pdf")}
     r = httpx.post(
-        f"{BACKEND}/api/curriculum/import/upload?only=LP",
+        f"{BACKEND}/api/curriculum/import/upload?only=LP&wait=true",
         headers=_h(token), files=files, timeout=60,
     )
     assert r.status_code == 201, r.text
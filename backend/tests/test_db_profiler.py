@@ -0,0 +1,76 @@
+"""
+Tests do profiler de queries por requisição (utils/db_profiler — Out/2026).
+
+Sem MongoDB: o handler dispara no listener os mesmos eventos que o Motor
+dispararia (started → succeeded).
+"""
+import itertools
+import logging
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from utils import db_profiler  # noqa: E402
+from utils.db_profiler import DbProfilerMiddleware, profiler_command_listener, query_shape  # noqa: E402
+
+_ids = itertools.count()
+
+
+def _command(name, command, ms=2):
+    rid = next(_ids)
+    profiler_command_listener.started(SimpleNamespace(
+        command_name=name, command=command, connection_id=('h', 1), request_id=rid))
+    profiler_command_listener.succeeded(SimpleNamespace(
+        command_name=name, connection_id=('h', 1), request_id=rid, duration_micros=ms * 1000))
+
+
+def test_formato_da_query_ignora_valores():
+    a = query_shape('find', {'find': 'students', 'filter': {'id': 'a1', 'status': {'$in': ['x', 'y']}}})
+    b = query_shape('find', {'find': 'students', 'filter': {'status': {'$in': ['z']}, 'id': 'b2'}})
+    assert a == b == 'students.find {id:?,status:{$in:[?]}}'
+    assert query_shape('update', {'update': 'attendance', 'updates': [{'q': {'id': 1}, 'u': {}}]}) \
+        == 'attendance.update {id:?}'
+    assert query_shape('aggregate', {'aggregate': 'grades', 'pipeline': [{'$match': {'class_id': 'c'}}]}) \
+        == 'grades.aggregate {class_id:?}'
+    assert query_shape('ping', {'ping': 1}) is None
+
+
+def test_n_mais_um_detectado_e_ranking_por_tempo_de_banco(monkeypatch, caplog):
+    monkeypatch.setattr(db_profiler, 'DB_PROFILER_ENABLED', True)
+    monkeypatch.setattr(db_profiler, 'DB_PROFILER_REPEAT_THRESHOLD', 5)
+    db_profiler.reset_for_tests()
+    app = FastAPI()
+
+    @app.get('/api/classes/{class_id}/pdf')
+    async def pdf(class_id: str):
+        _command('find', {'find': 'enrollments', 'filter': {'class_id': class_id}})
+        for n in range(8):  # um find_one por aluno
+            _command('find', {'find': 'students', 'filter': {'id': f's{n}'}, 'limit': 1})
+        _command('getMore', {'getMore': 1, 'collection': 'enrollments'})
+        return {}
+
+    @app.get('/api/schools')
+    async def schools():
+        _command('find', {'find': 'schools', 'filter': {}}, ms=1)
+        return []
+
+    app.add_middleware(DbProfilerMiddleware)
+    client = TestClient(app)
+    with caplog.at_level(logging.WARNING, logger='utils.db_profiler'):
+        client.get('/api/classes/c1/pdf')
+        client.get('/api/schools')
+
+    report = db_profiler.top_endpoints()
+    top, other = report['endpoints']
+    assert top['endpoint'] == 'GET /api/classes/{class_id}/pdf'
+    assert top['queries_total'] == 9 and top['db_ms_total'] == 20  # getMore soma só tempo
+    assert top['by_collection'] == {'students': 8, 'enrollments': 1}
+    assert top['n_plus_one_requests'] == 1
+    assert top['repeated_shapes'] == [{'shape': 'students.find {id:?}', 'count': 8}]
+    assert other['endpoint'] == 'GET /api/schools' and other['flagged_requests'] == 0
+    assert len(caplog.records) == 1 and 'n+1' in caplog.records[0].getMessage()
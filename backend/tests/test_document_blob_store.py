@@ -0,0 +1,117 @@
+"""
+Tests do blob store de `document_files` (services/blob_store.py — Out/2026)
+e do parsing de HTTP Range (utils/http_range.py).
+
+Sem MongoDB: backend filesystem num tmp_path + coleção fake de metadados.
+"""
+import asyncio
+import base64
+import hashlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services import blob_store, document_files  # noqa: E402
+from utils.http_range import RangeNotSatisfiable, parse_range  # noqa: E402
+
+
+class FakeFiles:
+    def __init__(self):
+        self.docs = {}
+
+    async def insert_one(self, doc):
+        self.docs[doc['id']] = dict(doc)
+
+    async def find_one(self, query, projection=None):
+        doc = self.docs.get(query['id'])
+        if doc and all(doc.get(k) == v for k, v in query.items() if k != 'id'):
+            return dict(doc)
+        return None
+
+    async def update_one(self, query, update):
+        doc = self.docs[query['id']]
+
+        class _Res:
+            modified_count = 0
+        if 'storage' in doc:
+            return _Res()
+        doc.update(update['$set'])
+        for key in update['$unset']:
+            doc.pop(key, None)
+        _Res.modified_count = 1
+        return _Res()
+
+
+class FakeDB:
+    def __init__(self):
+        self.document_files = FakeFiles()
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+@pytest.fixture
+def fs_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_store, 'DOCUMENT_BLOB_BACKEND', 'filesystem')
+    monkeypatch.setattr(blob_store, 'BLOB_CHUNK_SIZE', 7)
+    monkeypatch.setattr(blob_store, '_stores', {})
+    monkeypatch.setattr(blob_store.FileSystemBlobStore.__init__, '__defaults__', (str(tmp_path),))
+    return tmp_path
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range('bytes=0-9', 100) == (0, 9)
+    assert parse_range('bytes=90-', 100) == (90, 99)
+    assert parse_range('bytes=-10', 100) == (90, 99)
+    assert parse_range('bytes=50-500', 100) == (50, 99)
+    assert parse_range('bytes=0-1,5-6', 100) is None  # multi-faixa → inteiro
+    assert parse_range('items=0-1', 100) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range('bytes=100-', 100)
+
+
+def test_pdf_deduplicado_e_lido_por_faixa(fs_backend):
+    pdf = b'%PDF-1.4 ' + bytes(range(256)) * 4
+
+    async def scenario():
+        db = FakeDB()
+        a = await document_files.store_pdf(db, pdf_bytes=pdf, filename='a.pdf', document_type='bulletin')
+        b = await document_files.store_pdf(db, pdf_bytes=pdf, filename='b.pdf', document_type='bulletin')
+        full = await document_files.fetch_pdf(db, b['file_id'])
+        opened = await document_files.open_pdf(db, a['file_id'])
+        part = b''.join([c async for c in opened['iter_range'](10, 29)])
+        return db, a, b, full, opened, part
+
+    db, a, b, full, opened, part = _run(scenario())
+    assert a['file_id'] != b['file_id']
+    assert 'data_base64' not in db.document_files.docs[a['file_id']]
+    blobs = [f for _, _, files in os.walk(fs_backend) for f in files]
+    assert blobs == [hashlib.sha256(pdf).hexdigest()]
+    assert full['pdf_bytes'] == pdf and full['filename'] == 'b.pdf'
+    assert opened['size_bytes'] == len(pdf) and part == pdf[10:30]
+
+
+def test_migra_documento_legado(fs_backend):
+    data = b'%PDF legado'
+    legacy = {'id': 'f1', 'filename': 'x.pdf', 'mime_type': 'application/pdf',
+              'sha256': hashlib.sha256(data).hexdigest(), 'size_bytes': len(data),
+              'data_base64': base64.b64encode(data).decode('ascii')}
+
+    async def scenario():
+        db = FakeDB()
+        await db.document_files.insert_one(legacy)
+        before = await document_files.fetch_pdf(db, 'f1')
+        moved = await document_files.migrate_inline_document(db, dict(legacy), 'filesystem')
+        again = await document_files.migrate_inline_document(db, await db.document_files.find_one({'id': 'f1'}), 'filesystem')
+        after = await document_files.fetch_pdf(db, 'f1')
+        return db, before, moved, again, after
+
+    db, before, moved, again, after = _run(scenario())
+    assert before['pdf_bytes'] == data == after['pdf_bytes']
+    assert (moved, again) == (True, False)
+    assert db.document_files.docs['f1']['storage'] == {'backend': 'filesystem', 'key': legacy['sha256']}
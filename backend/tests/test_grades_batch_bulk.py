@@ -0,0 +1,141 @@
+"""
+Tests do lançamento de notas em lote (POST /grades/batch — Out/2026).
+
+Sem MongoDB: coleção fake que conta as leituras e os bulk_write. O lote deve
+fazer UMA leitura de notas e UMA escrita, com a mesma média/status do
+recálculo por nota (`compute_final_average`).
+"""
+import os
+import sys
+
+import pytest
+from pymongo import InsertOne, UpdateOne
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from auth_middleware import AuthMiddleware  # noqa: E402
+from routers import grades as grades_router  # noqa: E402
+from routers.grades import compute_final_average  # noqa: E402
+
+
+def _match(doc, query):
+    for key, cond in query.items():
+        if isinstance(cond, dict) and '$in' in cond:
+            if doc.get(key) not in cond['$in']:
+                return False
+        elif doc.get(key) != cond:
+            return False
+    return True
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        self._it = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return dict(next(self._it))
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = [dict(d) for d in docs]
+        self.finds = self.find_ones = 0
+        self.bulk_ops = []
+
+    def find(self, query, projection=None):
+        self.finds += 1
+        return _Cursor([d for d in self.docs if _match(d, query)])
+
+    async def find_one(self, query, projection=None):
+        self.find_ones += 1
+        return next((dict(d) for d in self.docs if _match(d, query)), None)
+
+    async def bulk_write(self, ops, ordered=True):
+        self.bulk_ops.append(ops)
+        for op in ops:
+            if isinstance(op, InsertOne):
+                self.docs.append(dict(op._doc))
+            else:
+                assert isinstance(op, UpdateOne)
+                for d in self.docs:
+                    if _match(d, op._filter):
+                        d.update(op._doc['$set'])
+
+
+class FakeDB(dict):
+    def __getattr__(self, name):
+        return self.setdefault(name, FakeCollection())
+
+
+class FakeAudit:
+    def __init__(self):
+        self.calls = []
+
+    async def log(self, **kw):
+        self.calls.append(kw)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    user = {'id': 'u1', 'role': 'professor', 'mantenedora_id': 'm1'}
+
+    async def _current_user(request):
+        return user
+
+    monkeypatch.setattr(AuthMiddleware, 'require_roles', staticmethod(lambda roles: _current_user))
+    base = {'class_id': 'c1', 'course_id': 'mat', 'academic_year': 2026}
+    db = FakeDB(grades=FakeCollection([
+        {'id': 'g1', 'student_id': 's1', **base, 'b1': 5.0, 'b2': 5.0, 'rec_s1': None,
+         'final_average': 5.0, 'status': 'cursando'},
+        {'id': 'g2', 'student_id': 's2', **base, 'b1': 6.0, 'migrated_from_class_id': 'old'},
+        {'id': 'gx', 'student_id': 's1', **base, 'class_id': 'c9'},  # fora do lote
+    ]))
+    audit = FakeAudit()
+    app = FastAPI()
+    app.include_router(grades_router.setup_grades_router(db, audit), prefix='/api')
+    return TestClient(app), db, audit, base
+
+
+def test_lote_le_e_grava_uma_vez_com_mesma_media(client):
+    http, db, audit, base = client
+    payload = [
+        {'student_id': 's1', **base, 'rec_s1': 7.0},
+        {'student_id': 's2', **base, 'b1': 9.0},          # bimestre migrado (congelado)
+        {'student_id': 's3', **base, 'b1': 8.0},          # nova nota
+        {'student_id': 's3', **base, 'b2': 6.0},          # mesma linha de novo: vê a anterior
+    ]
+    r = http.post('/api/grades/batch', json=payload)
+    assert r.status_code == 200, r.text
+    body = r.json()
+
+    grades = db.grades
+    assert grades.finds == 1 and grades.find_ones == 0 and len(grades.bulk_ops) == 1
+    assert [type(op).__name__ for op in grades.bulk_ops[0]] == ['UpdateOne', 'InsertOne', 'UpdateOne']
+    assert body['updated'] == 3
+    assert body['skipped'] == [{'student_id': 's2', 'grade_id': 'g2', 'reason': 'migrated_grade_locked'}]
+
+    g1 = next(d for d in grades.docs if d['id'] == 'g1')
+    assert (g1['final_average'], g1['status']) == compute_final_average(g1) == (7.0, 'cursando')
+    s3 = [d for d in grades.docs if d['student_id'] == 's3']
+    assert len(s3) == 1 and '_id' not in body['grades'][1]
+    assert (s3[0]['b1'], s3[0]['b2'], s3[0]['final_average'], s3[0]['mantenedora_id']) == (8.0, 6.0, 7.0, 'm1')
+    assert body['grades'][-1]['final_average'] == 7.0
+    assert len(audit.calls) == 1
+
+
+def test_media_e_status_iguais_a_regra_anterior():
+    assert compute_final_average({}) == (None, 'cursando')
+    assert compute_final_average({'b1': 4, 'b2': 4, 'b3': 4, 'b4': 4}) == (4.0, 'recuperacao')
+    assert compute_final_average({'b1': 4, 'b2': 4, 'b3': 4, 'b4': 4, 'recovery': 7}) == (5.5, 'aprovado')
+    assert compute_final_average({'b1': 3, 'b2': 5, 'b3': 6, 'b4': 6, 'rec_s1': 8}) == (7.0, 'aprovado')
+    assert compute_final_average({'b1': 2, 'b2': 2, 'b3': 3, 'b4': 3, 'recovery': 4}) == (3.25, 'reprovado')
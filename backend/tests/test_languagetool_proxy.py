@@ -0,0 +1,116 @@
+"""
+Tests do proxy do LanguageTool (services/languagetool — Out/2026).
+
+Sem rede: `httpx.MockTransport` no lugar do LanguageTool, que marca toda
+ocorrência de "otimo" (offsets em UTF-16, como o real) e conta as chamadas.
+Editar uma linha só reenvia a linha editada; textos idênticos em voo viram
+uma chamada; o orçamento por mantenedora só é consumido por cache miss.
+"""
+import asyncio
+import os
+import sys
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services import languagetool  # noqa: E402
+from services.languagetool import LanguageToolRateLimited, RateBudget, check_text  # noqa: E402
+
+
+def _u16(s):
+    return len(s.encode('utf-16-le')) // 2
+
+
+class FakeLanguageTool:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.texts = []
+
+    async def __call__(self, request):
+        text = parse_qs(request.content.decode())['text'][0]
+        self.texts.append(text)
+        await asyncio.sleep(self.delay)
+        matches, start = [], text.find('otimo')
+        while start >= 0:
+            matches.append({
+                'message': 'Possível erro de ortografia.', 'offset': _u16(text[:start]), 'length': 5,
+                'replacements': [{'value': 'ótimo'}], 'context': {'text': text},
+                'rule': {'id': 'HUNSPELL_RULE', 'issueType': 'misspelling',
+                         'category': {'name': 'Ortografia'}},
+            })
+            start = text.find('otimo', start + 1)
+        return httpx.Response(200, json={'matches': matches})
+
+
+@pytest.fixture
+def lt(monkeypatch):
+    fake = FakeLanguageTool()
+    languagetool._region.clear(propagate=False)
+    monkeypatch.setattr(languagetool, 'global_budget', RateBudget(0))
+    monkeypatch.setattr(languagetool, 'tenant_budget', RateBudget(0))
+    monkeypatch.setattr(languagetool, '_get_client',
+                        lambda: httpx.AsyncClient(transport=httpx.MockTransport(fake)))
+    return fake
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_cache_por_paragrafo_reenvia_so_a_linha_editada(lt):
+    text = 'Foi um otimo dia.\n\nA turma leu bem.\nTudo otimo.'
+    first = _run(check_text(text, 'pt-BR', 'm1'))
+    assert [text[m['offset']:m['offset'] + m['length']] for m in first] == ['otimo', 'otimo']
+    assert first[0]['replacements'] == ['ótimo'] and first[0]['issue_type'] == 'misspelling'
+    assert lt.texts == ['Foi um otimo dia.\nA turma leu bem.\nTudo otimo.']   # uma chamada só
+
+    edited = 'Foi um otimo dia.\n\nA turma leu muito bem, otimo.\nTudo otimo.'
+    second = _run(check_text(edited, 'pt-BR', 'm1'))
+    assert lt.texts[1:] == ['A turma leu muito bem, otimo.']
+    assert [m['offset'] for m in second] == [edited.find('otimo'), edited.find('otimo', 10),
+                                             edited.rfind('otimo')]
+    assert _run(check_text(edited, 'pt-BR', 'm1')) == second and len(lt.texts) == 2
+
+
+def test_coalescencia_e_orcamento_por_mantenedora(lt, monkeypatch):
+    lt.delay = 0.05
+    monkeypatch.setattr(languagetool, 'tenant_budget', RateBudget(1, clock=lambda: 0.0))
+
+    async def scenario():
+        same = await asyncio.gather(
+            check_text('Um otimo texto.', 'pt-BR', 'm1'),
+            check_text('Um otimo texto.', 'pt-BR', 'm2'),
+        )
+        cached = await check_text('Um otimo texto.', 'pt-BR', 'm1')    # hit: não gasta orçamento
+        with pytest.raises(LanguageToolRateLimited):
+            await check_text('Outro texto.', 'pt-BR', 'm1')
+        other_tenant = await check_text('Outro texto.', 'pt-BR', 'm3')
+        return same, cached, other_tenant
+
+    same, cached, other_tenant = _run(scenario())
+    assert same[0] == same[1] == cached and len(same[0]) == 1
+    assert other_tenant == []
+    assert lt.texts == ['Um otimo texto.', 'Outro texto.']
+
+
+def test_offsets_em_utf16_com_emoji(lt):
+    text = '😀\nFoi otimo 👍 e otimo.\n\n🎉🎉 Tudo otimo.'
+    first = _run(check_text(text, 'pt-BR', 'm1'))
+    expected = [_u16(text[:i]) for i in range(len(text)) if text.startswith('otimo', i)]
+    assert [m['offset'] for m in first] == expected          # nada descartado, nada deslocado
+    assert len(lt.texts) == 1
+    # servido do cache por parágrafo, com os mesmos offsets absolutos
+    assert _run(check_text(text, 'pt-BR', 'm1')) == first and len(lt.texts) == 1
+
+
+def test_contexto_nao_vaza_paragrafos_vizinhos(lt):
+    _run(check_text('Laudo médico sigiloso do aluno.\nFrase otimo aqui.', 'pt-BR', 'm1'))
+    other = _run(check_text('Frase otimo aqui.', 'pt-BR', 'm2'))        # cache hit de outra mantenedora
+    assert len(lt.texts) == 1
+    assert [m['context'] for m in other] == ['Frase otimo aqui.']
+    long_line = 'x' * 60 + ' otimo ' + 'y' * 60
+    (m,) = _run(check_text(long_line, 'pt-BR', 'm1'))
+    assert m['context'] == '...' + long_line[21:106] + '...' and 'otimo' in m['context']
@@ -0,0 +1,66 @@
+"""
+Tests do registro de métricas / exportação Prometheus (utils/metrics — Out/2026).
+
+Sem MongoDB: o listener de comandos recebe eventos fake de dentro do handler.
+"""
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from mig.core.monitoring import MigMonitoring  # noqa: E402
+from utils.metrics import MetricsMiddleware, MetricsRegistry, REGISTRY, mongo_command_listener  # noqa: E402
+from utils.observability import MetricChannel  # noqa: E402
+
+
+def test_texto_prometheus_e_silos_alimentando_o_registro():
+    reg = MetricsRegistry(namespace='t')
+    h = reg.histogram('lat_seconds', 'Latência.', ('route',), buckets=(0.1, 1))
+    for v in (0.05, 0.5, 3):
+        h.observe(v, route='/a')
+    reg.counter('hits_total', 'Hits "x".', ('k',)).inc(2, k='a\nb')
+    text = reg.render()
+    assert '# TYPE t_lat_seconds histogram' in text
+    assert 't_lat_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 't_lat_seconds_bucket{route="/a",le="1"} 2' in text
+    assert 't_lat_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 't_lat_seconds_count{route="/a"} 3' in text
+    assert 't_hits_total{k="a\\nb"} 2' in text and '# HELP t_hits_total Hits \\"x\\".' in text
+
+    channel = REGISTRY.histogram('channel_latency_seconds', '', ('channel',))
+    events = REGISTRY.counter('events_total', '', ('family', 'event'))
+    before = channel.count(channel='t_canal'), events.value(family='mig', event='worker.success')
+    MetricChannel('t_canal').record(duration_ms=12, tenant_id='m1', labels={'class_id': 'c1'})
+    MigMonitoring().incr('worker.success', 3)
+    assert channel.count(channel='t_canal') == before[0] + 1
+    assert events.value(family='mig', event='worker.success') == before[1] + 3
+
+
+def test_middleware_por_template_de_rota_com_tempo_de_mongo():
+    reg = MetricsRegistry(namespace='t')
+    app = FastAPI()
+
+    @app.get('/api/students/{student_id}')
+    async def get_student(student_id: str):
+        for ms in (20, 30):  # o que o Motor dispararia em duas queries
+            mongo_command_listener.succeeded(SimpleNamespace(command_name='find', duration_micros=ms * 1000))
+        return {'id': student_id}
+
+    app.add_middleware(MetricsMiddleware, registry=reg)
+    client = TestClient(app)
+    assert client.get('/api/students/a1').status_code == 200
+    assert client.get('/api/students/b2').status_code == 200
+    assert client.get('/nao/existe').status_code == 404
+
+    text = reg.render()
+    assert 't_http_requests_total{method="GET",route="/api/students/{student_id}",status="200"} 2' in text
+    assert 't_http_requests_total{method="GET",route="<unmatched>",status="404"} 1' in text
+    assert 'a1' not in text and 'b2' not in text
+    mongo = reg.histogram('http_request_mongo_seconds', '', ('method', 'route'))
+    series = mongo._series[('GET', '/api/students/{student_id}')]
+    assert abs(series[-1] - 0.1) < 1e-9  # 2 requisições × 50ms
+    assert 't_http_requests_in_progress 0' in text
@@ -5,7 +5,7 @@ E4 (paridade): CmdeService reproduz exatamente as respostas dos endpoints atuais
 Unitários: mapper/validators e mapeamento de erros do BaseGovClient para exceções tipadas.
 """
 import sys, os, asyncio
-from unittest.mock import patch, MagicMock
+from unittest.mock import MagicMock
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -54,34 +54,24 @@ def _fake_client_returning(status_code, text="erro", json_data=None):
     resp.status_code = status_code
     resp.text = text
     resp.json = MagicMock(return_value=(json_data if json_data is not None else {"ok": True}))
+    client = MagicMock()
 
-    class _Ctx:
-        def __init__(self_, *a, **k):
-            pass
-        async def __aenter__(self_):
-            m = MagicMock()
-            async def _req(*a, **k):
-                return resp
-            m.request = _req
-            return m
-        async def __aexit__(self_, *a):
-            return False
-    return _Ctx
+    async def _req(*a, **k):
+        return resp
+    client.request = _req
+    return client
 
 
 async def _run_client_error_cases():
-    import mig.core.http_client as hc
     for code, exc in [(401, MigAuthError), (403, MigForbiddenError)]:
-        with patch.object(hc.httpx, "AsyncClient", _fake_client_returning(code)):
-            c = BaseGovClient("http://x", provider="cmde")
-            try:
-                await c.get("/y"); assert False, "deveria levantar"
-            except exc:
-                pass
+        c = BaseGovClient("http://x", provider="cmde", client=_fake_client_returning(code))
+        try:
+            await c.get("/y"); assert False, "deveria levantar"
+        except exc:
+            pass
     # 200 retorna json
-    with patch.object(hc.httpx, "AsyncClient", _fake_client_returning(200, json_data={"a": 1})):
-        c = BaseGovClient("http://x", provider="cmde")
-        assert await c.get("/y") == {"a": 1}
+    c = BaseGovClient("http://x", provider="cmde", client=_fake_client_returning(200, json_data={"a": 1}))
+    assert await c.get("/y") == {"a": 1}
     print("OK unit: BaseGovClient status mapping")
 
 
@@ -290,29 +280,22 @@ async def _run_sprint011():
     print("OK sprint011: carga multi-tenant, retry, erro definitivo, sem duplicação")
 
     # --- Retry integrado ao BaseGovClient (503,503,200 → ok em 3 tentativas) ---
-    import mig.core.http_client as hc
     from mig.core.retry import RetryPolicy as _RP
     rcalls = {"n": 0}
-    def _retry_ctx(*a, **k):
-        class _C:
-            def __init__(s, *aa, **kk): pass
-            async def __aenter__(s):
-                m = MagicMock()
-                async def _req(*aa, **kk):
-                    rcalls["n"] += 1
-                    r = MagicMock()
-                    if rcalls["n"] >= 3:
-                        r.status_code = 200; r.json = MagicMock(return_value={"ok": 1}); r.text = ""
-                    else:
-                        r.status_code = 503; r.text = "down"
-                    return r
-                m.request = _req; return m
-            async def __aexit__(s, *aa): return False
-        return _C()
-    with patch.object(hc.httpx, "AsyncClient", _retry_ctx):
-        c = BaseGovClient("http://x", provider="cmde", retry_policy=_RP(max_attempts=3, base_delay_seconds=0.01))
-        out = await c.get("/y")
-        assert out == {"ok": 1} and c.last_attempts == 3, (out, c.last_attempts)
+    m = MagicMock()
+    async def _req(*aa, **kk):
+        rcalls["n"] += 1
+        r = MagicMock()
+        if rcalls["n"] >= 3:
+            r.status_code = 200; r.json = MagicMock(return_value={"ok": 1}); r.text = ""
+        else:
+            r.status_code = 503; r.text = "down"
+        return r
+    m.request = _req
+    c = BaseGovClient("http://x", provider="cmde", client=m,
+                      retry_policy=_RP(max_attempts=3, base_delay_seconds=0.01))
+    out = await c.get("/y")
+    assert out == {"ok": 1} and c.last_attempts == 3, (out, c.last_attempts)
     print("OK sprint011: retry integrado no BaseGovClient (503,503,200)")
 
     # --- Métricas preparadas para CMDE futuro ---
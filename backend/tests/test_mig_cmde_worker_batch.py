@@ -0,0 +1,141 @@
+"""
+Tests do envio em lote do FrequencyWorker e do pool HTTP do BaseGovClient (Out/2026).
+
+Sem MongoDB: fila em memória com o contrato usado pelo worker; provider = Simulador CMDE.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mig.cmde.frequency_simulator import (  # noqa: E402
+    CmdeFrequencySimulator, SimulatorConfig, SCENARIO_REJECT, SCENARIO_ERROR_503)
+from mig.cmde.queue import FAILED, PENDING, PROCESSING, RESERVED, RETRYING, SUCCESS  # noqa: E402
+from mig.cmde.worker import FrequencyWorker  # noqa: E402
+from mig.core import http_client as hc  # noqa: E402
+from mig.core.retry import NO_RETRY  # noqa: E402
+
+
+class FakeQueue:
+    def __init__(self, items):
+        self.items = {i['id']: i for i in items}
+        self.inflight = self.max_inflight = 0
+
+    async def requeue_expired(self):
+        return 0
+
+    async def reserve_batch(self, tenant, limit, lease_seconds=60):
+        free = [i for i in self.items.values() if i['tenant'] == tenant and i['status'] == PENDING]
+        if not free:
+            return []
+        group = (free[0]['school_inep'], free[0]['competencia'])
+        batch = [i for i in free if (i['school_inep'], i['competencia']) == group][:limit]
+        for i in batch:
+            i['status'] = RESERVED
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        await asyncio.sleep(0)  # cede o loop: outros lotes entram em voo
+        return [dict(i) for i in batch]
+
+    async def start_processing_many(self, ids):
+        for i in ids:
+            self.items[i]['status'] = PROCESSING
+        return len(ids)
+
+    async def succeed(self, item_id):
+        self.items[item_id]['status'] = SUCCESS
+        self._done()
+
+    async def fail(self, item_id, error=None, recoverable=True):
+        self.items[item_id]['status'] = RETRYING if recoverable else FAILED
+        self._done()
+        return self.items[item_id]['status']
+
+    def _done(self):
+        if not any(i['status'] == PROCESSING for i in self.items.values()):
+            self.inflight = 0
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = []
+
+    async def insert_one(self, doc):
+        self.docs.append(doc)
+
+    async def update_one(self, query, update):
+        self.docs.append(update['$set'])
+
+    def aggregate(self, pipeline):
+        return self
+
+    async def to_list(self, n):
+        return []
+
+
+class FakeDB(dict):
+    def __getitem__(self, name):
+        return self.setdefault(name, FakeCollection())
+
+
+class CountingSimulator(CmdeFrequencySimulator):
+    def __init__(self, *a, **k):
+        super().__init__(*a, **k)
+        self.payloads = []
+
+    async def enviar_frequencia(self, payload):
+        self.payloads.append(payload)
+        return await super().enviar_frequencia(payload)
+
+
+def _item(i, school='1517'):
+    return {'id': f'q{i}', 'tenant': 'T', 'batch_id': 'lote-1', 'correlation_id': 'CMDE-LOTE',
+            'student_id': f's{i}', 'school_inep': school, 'competencia': '2026-09',
+            'status': PENDING, 'attempts': 0,
+            'payload_snapshot': {'student_id': f's{i}', 'school_inep': school, 'competencia': '2026-09'}}
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_run_envia_lotes_por_escola_e_concilia_cada_item():
+    queue = FakeQueue([_item(i, school='A' if i < 12 else 'B') for i in range(17)])
+    sim = CountingSimulator(SimulatorConfig(scenario=SCENARIO_REJECT, reject_refs={'s3', 's7', 's10', 's13'}))
+    db = FakeDB()
+    worker = FrequencyWorker(db, port=sim, queue=queue, retry_policy=NO_RETRY,
+                             batch_size=5, max_inflight_batches=2)
+
+    summary = _run(worker.run('T'))
+
+    assert sorted(len(p.items) for p in sim.payloads) == [2, 5, 5, 5]
+    assert all(len({i.school_inep for i in p.items}) == 1 for p in sim.payloads)
+    assert queue.max_inflight == 2
+    assert summary == {'processed': 17, 'success': 13, 'failed': 4, 'retrying': 0, 'dead_letter': 0}
+    assert {k for k, i in queue.items.items() if i['status'] == FAILED} == {'q3', 'q7', 'q10', 'q13'}
+    receipts = db['mig_cmde_send_receipts'].docs
+    assert len(receipts) == 17 and len({r['mec_protocol'] for r in receipts}) == 1
+
+
+def test_erro_de_transporte_devolve_o_lote_inteiro_para_retry():
+    queue = FakeQueue([_item(i) for i in range(4)])
+    sim = CountingSimulator(SimulatorConfig(scenario=SCENARIO_ERROR_503))
+    worker = FrequencyWorker(FakeDB(), port=sim, queue=queue, retry_policy=NO_RETRY, batch_size=10)
+
+    states = _run(worker.process_batch('T'))
+
+    assert states == [RETRYING] * 4 and len(sim.payloads) == 1
+
+
+def test_clients_do_mesmo_provedor_compartilham_conexoes():
+    async def scenario():
+        a = hc.BaseGovClient('https://cmde.example/api', provider='cmde')
+        b = hc.BaseGovClient('https://cmde.example/api/', provider='cmde')
+        shared = a._http()
+        assert b._http() is shared and not shared.is_closed
+        await hc.close_pooled_clients()
+        assert shared.is_closed and a._http() is not shared
+        await hc.close_pooled_clients()
+
+    _run(scenario())
@@ -0,0 +1,180 @@
+"""
+Tests do registro durável de jobs de PDF (pdf_jobs.py — Out/2026).
+
+Sem MongoDB: coleção fake compartilhada por dois stores (duas réplicas) e
+blob store filesystem num tmp_path. O PDF pronto vai para o blob, não para o
+documento do job; a fila é limitada; job sem heartbeat vira erro.
+"""
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pdf_jobs  # noqa: E402
+from pdf_jobs import PdfJobExecutor, PdfJobQueueFull, PdfJobStore  # noqa: E402
+from services import blob_store  # noqa: E402
+
+
+def _get(doc, key):
+    for part in key.split('.'):
+        doc = (doc or {}).get(part) if isinstance(doc, dict) else None
+    return doc
+
+
+def _match(doc, query):
+    for key, cond in query.items():
+        value = _get(doc, key)
+        if isinstance(cond, dict) and '$in' in cond:
+            if value not in cond['$in']:
+                return False
+        elif isinstance(cond, dict) and '$lt' in cond:
+            if value is None or not value < cond['$lt']:
+                return False
+        elif value != cond:
+            return False
+    return True
+
+
+class _Res:
+    def __init__(self, n):
+        self.modified_count = self.deleted_count = n
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return [dict(d) for d in self.docs[:length]]
+
+
+class FakeJobs:
+    def __init__(self):
+        self.docs = []
+
+    async def create_index(self, *args, **kwargs):
+        pass
+
+    async def insert_one(self, doc):
+        self.docs.append(dict(doc))
+
+    async def find_one(self, query, projection=None):
+        return next((dict(d) for d in self.docs if _match(d, query)), None)
+
+    def find(self, query, projection=None):
+        return _Cursor([d for d in self.docs if _match(d, query)])
+
+    async def update_one(self, query, update):
+        for d in self.docs:
+            if _match(d, query):
+                d.update(update['$set'])
+                return _Res(1)
+        return _Res(0)
+
+    async def update_many(self, query, update):
+        hits = [d for d in self.docs if _match(d, query)]
+        for d in hits:
+            d.update(update['$set'])
+        return _Res(len(hits))
+
+    async def delete_one(self, query):
+        for d in self.docs:
+            if _match(d, query):
+                self.docs.remove(d)
+                return _Res(1)
+        return _Res(0)
+
+
+class FakeDB(dict):
+    def __getitem__(self, name):
+        return self.setdefault(name, FakeJobs())
+
+
+@pytest.fixture
+def fs_results(tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_store, 'DOCUMENT_BLOB_BACKEND', 'filesystem')
+    monkeypatch.setattr(blob_store, 'DOCUMENT_BLOB_DIR', str(tmp_path / 'document_blobs'))
+    monkeypatch.setattr(blob_store, '_stores', {})
+    return tmp_path / 'pdf_job_results'
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_fila_limitada_resultado_no_blob_e_visivel_em_outra_replica(fs_results, monkeypatch):
+    db = FakeDB()
+    release = asyncio.Event
+
+    async def scenario():
+        gate = release()
+
+        async def runner(progress_cb):
+            progress_cb(40, 'Montando páginas...')
+            await gate.wait()
+            return b'%PDF-livro', 'livro.pdf'
+
+        executor = PdfJobExecutor(PdfJobStore(db), concurrency=1, queue_size=1)
+        first = await executor.enqueue('promotion', runner, params={'class_id': 'c1'}, created_by='u1')
+        await asyncio.sleep(0.01)              # 1º job em execução, fila vazia
+        second = await executor.enqueue('promotion', runner)
+        with pytest.raises(PdfJobQueueFull):
+            await executor.enqueue('promotion', runner)
+
+        other_replica = PdfJobStore(db)
+        running = await other_replica.get(first.id)
+        gate.set()
+        await asyncio.sleep(0.05)
+        done = await other_replica.get(first.id)
+        body = b''.join([chunk async for chunk in await other_replica.open_result(done)])
+        await executor.stop(timeout=1)
+        return executor, running, done, body, second
+
+    executor, running, done, body, second = _run(scenario())
+    assert (running.status, running.progress, running.message) == ('running', 40, 'Montando páginas...')
+    assert done.status == 'done' and done.filename == 'livro.pdf' and body == b'%PDF-livro'
+    assert done.params == {'class_id': 'c1'} and done.created_by == 'u1'
+    assert done.result['backend'] == 'filesystem' and done.result['size_bytes'] == len(body)
+    assert all('result_bytes' not in d and 'pdf_bytes' not in d for d in db['pdf_jobs'].docs)
+    assert executor.stats['rejected'] == 1 and executor.stats['done'] == 2
+
+    # expirado: some da consulta e o purge remove documento + blob
+    blob_files = [p for p in fs_results.rglob('*') if p.is_file()]
+    assert len(blob_files) == 1
+    for d in db['pdf_jobs'].docs:
+        d['expires_at'] = time.time() - 1
+    store = PdfJobStore(db)
+    assert _run(store.get(second.id)) is None
+    assert _run(store.purge_expired()) == 2
+    assert db['pdf_jobs'].docs == [] and not blob_files[0].exists()
+
+
+def test_erro_do_gerador_e_job_sem_heartbeat(fs_results, monkeypatch):
+    db = FakeDB()
+
+    class Http404(Exception):
+        detail = 'Turma não encontrada'
+
+    async def failing(progress_cb):
+        raise Http404()
+
+    async def scenario():
+        executor = PdfJobExecutor(PdfJobStore(db), concurrency=1, queue_size=2)
+        job = await executor.enqueue('promotion', failing)
+        await asyncio.sleep(0.02)
+        failed = await executor.store.get(job.id)
+
+        orphan = await executor.store.create('promotion')   # réplica que caiu antes de rodar
+        monkeypatch.setattr(pdf_jobs, 'PDF_JOB_STALE_SECONDS', 0.01)
+        await asyncio.sleep(0.03)
+        stale = await executor.store.get(orphan.id)
+        await executor.stop(timeout=1)
+        return failed, stale
+
+    failed, stale = _run(scenario())
+    assert (failed.status, failed.error, failed.message) == ('error', 'Turma não encontrada', 'Erro')
+    assert stale.status == 'error' and 'interrompida' in stale.error and stale.done_at
@@ -283,3 +283,120 @@ async def test_worker_picks_oldest_first(db):
     j2_doc = await db.document_render_jobs.find_one({"id": j2})
     assert j1_doc["status"] == "completed"
     assert j2_doc["status"] == "pending"
+
+
+# ===========================================================================
+# Pool de workers (Out/2026) — lease, reclaim, limites por tipo
+# ===========================================================================
+def test_parse_type_limits():
+    from services.render_worker import parse_type_limits
+    assert parse_type_limits("bulletin=4, diary_period=1") == {"bulletin": 4, "diary_period": 1}
+    assert parse_type_limits("") == {}
+    assert parse_type_limits("bulletin=x,history") == {}
+    assert parse_type_limits("history=0") == {"history": 1}
+
+
+@pytest.mark.asyncio
+async def test_worker_claim_sets_lease(db):
+    from services.render_worker import _claim_next_job
+
+    job_id = await _seed_pending_job(db)
+    job = await _claim_next_job(db, worker_id="w-test:s0")
+    assert job["id"] == job_id
+    assert job["worker_id"] == "w-test:s0"
+    assert job["lease_expires_at"] > _now_iso()
+    assert job["audit_trail"][-1]["worker_id"] == "w-test:s0"
+
+    # Já reivindicado: outro slot não pega o mesmo job.
+    assert await _claim_next_job(db, worker_id="w-test:s1") is None
+
+
+@pytest.mark.asyncio
+async def test_worker_reclaims_stale_lease(db):
+    from services.render_worker import _reclaim_stale_leases
+
+    job_id = await _seed_pending_job(db)
+    past = (datetime.now(timezone.utc) - timedelta(seconds=30)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    await db.document_render_jobs.update_one(
+        {"id": job_id},
+        {"$set": {"status": "processing", "worker_id": "dead:s0", "lease_expires_at": past}},
+    )
+    assert await _reclaim_stale_leases(db) >= 1
+    job = await db.document_render_jobs.find_one({"id": job_id}, {"_id": 0})
+    assert job["status"] == "pending"
+    assert job["retry_count"] == 1
+    assert job["worker_id"] is None
+    assert job["audit_trail"][-1]["action"] == "lease_expired_requeued"
+
+
+@pytest.mark.asyncio
+async def test_worker_stale_lease_on_last_attempt_fails(db):
+    from services.render_worker import _reclaim_stale_leases
+
+    job_id = await _seed_pending_job(db, retry_count=MAX_RETRIES - 1)
+    past = (datetime.now(timezone.utc) - timedelta(seconds=30)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    await db.document_render_jobs.update_one(
+        {"id": job_id},
+        {"$set": {"status": "processing", "worker_id": "dead:s0", "lease_expires_at": past}},
+    )
+    await _reclaim_stale_leases(db)
+    job = await db.document_render_jobs.find_one({"id": job_id}, {"_id": 0})
+    assert job["status"] == "failed"
+    assert job["retry_count"] == MAX_RETRIES
+    assert "LEASE_EXPIRED" in job["error_message"]
+
+
+@pytest.mark.asyncio
+async def test_worker_lost_lease_does_not_overwrite(db):
+    """Job reclamado por outro worker: a conclusão do dono antigo é descartada."""
+    async def steals_lease(job: dict) -> dict:
+        await db.document_render_jobs.update_one(
+            {"id": job["id"]}, {"$set": {"worker_id": "other:s0"}}
+        )
+        return {"generated_file_id": "stale"}
+    register_render_handler(DOC_TYPE, steals_lease)
+
+    job_id = await _seed_pending_job(db)
+    assert await process_one_job(db) is True
+    job = await db.document_render_jobs.find_one({"id": job_id}, {"_id": 0})
+    assert job["status"] == "processing"
+    assert job["generated_file_id"] is None
+
+
+@pytest.mark.asyncio
+async def test_worker_respects_type_limit(db, monkeypatch):
+    from services import render_worker
+
+    monkeypatch.setitem(render_worker.DOCUMENT_TYPE_CONCURRENCY, DOC_TYPE, 1)
+    monkeypatch.setitem(render_worker._state.active_by_type, DOC_TYPE, 1)
+
+    async def ok(_):
+        return {}
+    register_render_handler(DOC_TYPE, ok)
+
+    await _seed_pending_job(db)
+    # Tipo saturado neste processo: nada é reivindicado.
+    assert await process_one_job(db) is False
+
+    render_worker._state.active_by_type[DOC_TYPE] = 0
+    assert await process_one_job(db) is True
+
+
+# ===========================================================================
+# Wake-up (Out/2026) — enqueue acorda o worker sem esperar o poll
+# ===========================================================================
+@pytest.mark.asyncio
+async def test_insert_render_job_wakes_idle_slot(db):
+    from services.render_worker import _wait_for_work
+    from utils.render_jobs import insert_render_job, render_wake_signal
+
+    render_wake_signal.clear()
+    waiter = asyncio.create_task(_wait_for_work(None, 30))
+    await asyncio.sleep(0)
+    await insert_render_job(db, {
+        "id": "rj_wake_1", "idempotency_key": "rj_wake_key_1", "document_type": DOC_TYPE,
+        "source_snapshot_id": SNAPSHOT_ID, "status": "pending", "next_retry_at": None,
+        "requested_at": _now_iso(), "audit_trail": [],
+    })
+    assert await asyncio.wait_for(waiter, timeout=2) is True
+    render_wake_signal.clear()
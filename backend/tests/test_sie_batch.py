@@ -0,0 +1,86 @@
+"""Paridade do lote vetorizado do SIE (services/sie_batch.py — Out/2026).
+
+O lote precisa produzir EXATAMENTE o mesmo pacote que os motores escalares
+(`compute_for_student`) — mesmos scores, faixas, breakdowns e alertas.
+Rodar: cd /app/backend && python3 -m pytest tests/test_sie_batch.py -q
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import UpdateMany, UpdateOne  # noqa: E402
+
+from services.sie_service import merge_defaults  # noqa: E402
+from services.academic_risk_engine import compute_academic_risk  # noqa: E402
+from services.attendance_risk_engine import compute_attendance_risk  # noqa: E402
+from services.overall_risk_engine import compute_overall_risk  # noqa: E402
+from services.diagnostic_engine import build_diagnostic  # noqa: E402
+from services.alert_engine import build_alerts  # noqa: E402
+from services.sie_batch import build_persist_ops, compute_results  # noqa: E402
+
+CFG = merge_defaults(None)
+
+
+def _random_grades(rng):
+    grades = []
+    for _ in range(rng.randint(0, 6)):
+        g = {'status': rng.choice(['aprovado', 'reprovado', 'recuperacao', '', None])}
+        for b in ('b1', 'b2', 'b3', 'b4'):
+            if rng.random() < 0.8:
+                g[b] = round(rng.uniform(0, 10), 1)
+        if rng.random() < 0.5:
+            g['final_average'] = round(rng.uniform(0, 10), 2)
+        if rng.random() < 0.1:
+            g['recovery'] = 5.0
+        grades.append(g)
+    return grades
+
+
+def _random_attendance(rng):
+    total = rng.randint(0, 200)
+    present = rng.randint(0, total)
+    recent_total = rng.randint(0, min(total, 20))
+    return {'total': total, 'present': present, 'recent_total': recent_total,
+            'recent_present': rng.randint(0, recent_total)}
+
+
+def _scalar(student, grades, summary, cfg):
+    ac = compute_academic_risk(grades, cfg)
+    at = compute_attendance_risk(summary, cfg)
+    ov = compute_overall_risk(ac['score'], at['score'], cfg)
+    return {'academic': ac, 'attendance': at, 'overall': ov,
+            'diagnostic': build_diagnostic(student, ac, at, ov, cfg),
+            'alerts': build_alerts(student, ac, at, ov, cfg)}
+
+
+def test_lote_identico_aos_motores():
+    rng = random.Random(2026)
+    cfg_alt = merge_defaults({'passing_grade': 7.0, 'attendance_min_pct': 80,
+                              'overall_weights': {'academic': 60, 'attendance': 40}})
+    for cfg in (CFG, cfg_alt):
+        students = [{'id': f's{i}'} for i in range(300)]
+        grades = {s['id']: _random_grades(rng) for s in students}
+        attendance = {s['id']: _random_attendance(rng) for s in students}
+        batch = compute_results(students, grades, attendance, cfg)
+        for s, got in zip(students, batch):
+            assert got == _scalar(s, grades[s['id']], attendance[s['id']], cfg)
+
+
+def test_aluno_sem_dados_nao_penalizado():
+    [r] = compute_results([{'id': 'x'}], {}, {}, CFG)
+    assert r['academic']['score'] == 0.0 and r['attendance']['score'] == 0.0
+    assert r['overall']['risk_level'] == 'low'
+    assert r['attendance']['attendance_pct'] is None
+
+
+def test_ops_de_persistencia():
+    student = {'id': 's1', 'school_id': 'e1', 'class_id': 'c1'}
+    [result] = compute_results([student], {'s1': [{'final_average': 2.0, 'status': 'reprovado'}]}, {}, CFG)
+    ops = build_persist_ops(student, result, 2026, 'm1', '2026-10-17T00:00:00+00:00', '2026-10-17')
+    for coll in ('student_risk_scores', 'student_diagnostics', 'student_snapshots'):
+        assert len(ops[coll]) == 1 and isinstance(ops[coll][0], UpdateOne)
+    alerts = ops['student_alerts']
+    assert len(alerts) == len(result['alerts']) + 1
+    assert isinstance(alerts[-1], UpdateMany)
@@ -0,0 +1,121 @@
+"""
+Tests do índice de busca de alunos em memória (utils/student_search_index — Out/2026).
+
+Sem MongoDB: coleção fake só com o que o build da partição usa.
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils import student_search_index as ssi  # noqa: E402
+from utils.student_search_index import (  # noqa: E402
+    RANK_CONTAINS, RANK_PREFIX, RANK_WORD_PREFIX, TenantNameIndex)
+
+STUDENTS = [
+    {'id': 's1', 'full_name': 'Ana Clara Souza', 'cpf': '123.456.789-01', 'class_id': 'c1', 'status': 'active'},
+    {'id': 's2', 'full_name': 'Mariana Souza', 'cpf': '98765432100', 'class_id': 'c2', 'status': 'active'},
+    {'id': 's3', 'full_name': 'Luana Ribeiro', 'cpf': '', 'class_id': 'c1', 'status': 'transferred'},
+    {'id': 's4', 'full_name': 'Ânderson Lima', 'cpf': '12399988877', 'class_id': 'c1', 'status': 'active'},
+]
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    ssi._reset_for_tests()
+    yield
+    ssi._reset_for_tests()
+
+
+def test_ranking_por_qualidade_filtros_e_cpf():
+    index = TenantNameIndex(STUDENTS)
+
+    assert index.search('an', limit=10) == [(RANK_PREFIX, 's1'), (RANK_PREFIX, 's4')]
+    assert index.search('ana', limit=10) == [(RANK_PREFIX, 's1')]  # "luana"/"mariana" só com q >= 4
+    assert index.search('souza', limit=10) == [(RANK_WORD_PREFIX, 's1'), (RANK_WORD_PREFIX, 's2')]
+    assert index.search('iana', limit=10) == [(RANK_CONTAINS, 's2')]
+    assert index.search('an', limit=1) == [(RANK_PREFIX, 's1')]
+    assert index.search('an', limit=10, filters={'class_id': 'c1', 'status': None}) == \
+        [(RANK_PREFIX, 's1'), (RANK_PREFIX, 's4')]
+    assert index.search('lu', limit=10, filters={'status': 'active'}) == []
+    assert index.search('123', limit=10) == [(RANK_PREFIX, 's1'), (RANK_PREFIX, 's4')]
+    assert index.search('123.456', limit=10) == [(RANK_PREFIX, 's1')]
+
+
+def test_atualizacao_incremental():
+    index = TenantNameIndex(STUDENTS)
+    index.upsert({'id': 's2', 'full_name': 'Beatriz Souza'})  # troca de nome, demais campos mantidos
+    index.remove('s1')
+    index.upsert({'id': 's5', 'full_name': 'Ana Beatriz', 'class_id': 'c9'})
+
+    assert index.search('mari', limit=10) == []
+    assert index.search('beat', limit=10) == [(RANK_PREFIX, 's2'), (RANK_WORD_PREFIX, 's5')]
+    assert index.docs['s2']['cpf'] == '98765432100'
+    assert index.search('an', limit=10) == [(RANK_PREFIX, 's5'), (RANK_PREFIX, 's4')]
+    assert index.search('123.456', limit=10) == []
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, n):
+        return [dict(d) for d in self.docs]
+
+
+class FakeStudents:
+    def __init__(self, docs):
+        self.docs = docs
+        self.finds = 0
+
+    async def count_documents(self, query):
+        return len([d for d in self.docs if d.get('mantenedora_id') == query['mantenedora_id']])
+
+    def find(self, query, projection=None):
+        self.finds += 1
+        return _Cursor([d for d in self.docs if d.get('mantenedora_id') == query['mantenedora_id']])
+
+
+class FakeDB:
+    name = 'sigesc'
+
+    def __init__(self, docs):
+        self.students = FakeStudents(docs)
+
+
+def test_particao_por_tenant_construida_uma_vez(monkeypatch):
+    db = FakeDB([dict(s, mantenedora_id='m1') for s in STUDENTS] + [{'id': 'x', 'full_name': 'Ana X', 'mantenedora_id': 'm2'}])
+
+    async def scenario():
+        first = await ssi.get_tenant_index(db, 'm1')
+        again = await ssi.get_tenant_index(db, 'm1')
+        ssi.note_student_saved(db, {'id': 's9', 'full_name': 'Anita Alves', 'mantenedora_id': 'm1'})
+        monkeypatch.setattr(ssi, 'STUDENT_SEARCH_INDEX_MAX_DOCS', 0)
+        too_big = await ssi.get_tenant_index(db, 'm2')
+        return first, again, too_big, await ssi.get_tenant_index(db, None)
+
+    first, again, too_big, no_tenant = asyncio.new_event_loop().run_until_complete(scenario())
+    assert first is again and db.students.finds == 1
+    assert [sid for _, sid in first.search('an', limit=10)] == ['s1', 's4', 's9']
+    assert too_big is None and no_tenant is None
+
+
+def test_particao_antiga_serve_enquanto_a_nova_e_construida():
+    db = FakeDB([dict(s, mantenedora_id='m1') for s in STUDENTS])
+
+    async def scenario():
+        old = await ssi.get_tenant_index(db, 'm1')
+        ssi._region.clear(propagate=False)                    # TTL/invalidação do tenant
+        served = await ssi.get_tenant_index(db, 'm1')          # não espera o rebuild
+        while not ssi._building:                               # leitura feita, build na thread
+            await asyncio.sleep(0)
+        ssi.note_student_saved(db, {'id': 's9', 'full_name': 'Anita Alves', 'mantenedora_id': 'm1'})
+        await asyncio.gather(*ssi._refreshing)
+        return old, served, await ssi.get_tenant_index(db, 'm1')
+
+    old, served, new = asyncio.new_event_loop().run_until_complete(scenario())
+    assert served is old and new is not old and db.students.finds == 2
+    assert [sid for _, sid in new.search('an', limit=10)] == ['s1', 's4', 's9']   # escrita do meio do build
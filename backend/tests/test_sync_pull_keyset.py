@@ -0,0 +1,191 @@
+"""
+Tests do pull offline por cursor (routers/sync — Out/2026): keyset em
+(updated_at, id), cursor opaco e snapshot NDJSON da turma.
+
+Sem MongoDB: coleção fake com o subconjunto de operadores que o pull usa.
+"""
+import asyncio
+import gzip
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import routers.sync as sync  # noqa: E402
+from services import sync_tombstones  # noqa: E402
+
+USER = {'id': 'u1', 'role': 'secretario', 'mantenedora_id': 'm1', 'school_ids': []}
+
+
+def _match(doc, query):
+    for key, cond in query.items():
+        if key == '$and':
+            if not all(_match(doc, q) for q in cond):
+                return False
+        elif key == '$or':
+            if not any(_match(doc, q) for q in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = doc.get(key)
+            for op, arg in cond.items():
+                ok = {
+                    '$gt': lambda: value is not None and value > arg,
+                    '$gte': lambda: value is not None and value >= arg,
+                    '$ne': lambda: value != arg,
+                    '$in': lambda: value in arg,
+                }[op]()
+                if not ok:
+                    return False
+        elif doc.get(key) != cond:
+            return False
+    return True
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, spec):
+        # null/ausente antes de strings, como no Mongo
+        self.docs = sorted(self.docs, key=lambda d: tuple((d.get(f) is not None, d.get(f) or '') for f, _ in spec))
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, n):
+        return [dict(d) for d in self.docs[:n]]
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+
+    def find(self, query, projection=None):
+        return _Cursor([d for d in self.docs if _match(d, query)])
+
+    async def count_documents(self, query):
+        raise AssertionError('modo cursor não conta documentos')
+
+
+class FakeDB(dict):
+    def __getattr__(self, name):
+        return self[name]
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def _grades():
+    docs = [{'id': f'g{i:03d}', 'mantenedora_id': 'm1', 'class_id': 'c1', 'b1': i} for i in range(25)]
+    for d in docs[::3]:
+        d['updated_at'] = '2026-10-0%d' % (d['b1'] % 3 + 1)
+    docs.append({'id': 'x', 'mantenedora_id': 'm2', 'class_id': 'c1'})
+    return docs
+
+
+def test_keyset_percorre_tudo_sem_repetir_e_entrega_editado_de_novo():
+    grades = FakeCollection(_grades())
+    db = FakeDB(grades=grades)
+
+    async def scenario():
+        seen, after = [], None
+        while True:
+            rows, after, more = await sync.fetch_collection_page_keyset(db, USER, 'grades', 'c1', None, None, after, 7)
+            seen.extend(r['id'] for r in rows)
+            if len(seen) == 7:
+                grades.docs[1]['updated_at'] = '2026-10-09'  # editado no meio da paginação
+            if not more:
+                return seen
+
+    seen = _run(scenario())
+    assert sorted(set(seen)) == [f'g{i:03d}' for i in range(25)]  # tenant m2 fora
+    assert seen.count('g001') == 2 and seen[-1] == 'g001'
+    assert len(seen) == 26
+
+
+def test_cursor_opaco_valida_colecao_e_vira_token_de_mudancas():
+    state = sync.resume_sync_state(None, 'grades', 'c1', '2026', None, 'T0')
+    token = sync.encode_sync_token(dict(state, k=['2026-10-01', 'g003']))
+    resumed = sync.resume_sync_state(token, 'grades', 'c1', '2026', None, 'T1')
+    assert resumed == {'c': 'grades', 'f': ['c1', '2026'], 's': None, 't': 'T0',
+                       'k': ['2026-10-01', 'g003'], 'p': None}
+
+    done = sync.encode_sync_token(dict(resumed, s=resumed['t'], k=None))
+    nxt = sync.resume_sync_state(done, 'grades', 'c1', '2026', None, 'T2')
+    assert (nxt['s'], nxt['t'], nxt['k']) == ('T0', 'T2', None)
+
+    with pytest.raises(ValueError):
+        sync.resume_sync_state(token, 'students', 'c1', '2026', None, 'T1')
+    with pytest.raises(ValueError):
+        sync.resume_sync_state('não-é-cursor', 'grades', 'c1', '2026', None, 'T1')
+
+
+def test_snapshot_ndjson_gzip_da_turma(monkeypatch):
+    db = FakeDB(grades=FakeCollection(_grades()), attendance=FakeCollection())
+    pages = []
+
+    async def adapter_fetch(db, user, collection, class_id, academic_year, last_sync, page=1, page_size=100, request=None):
+        pages.append(page)
+        return [{'id': f'a{page}'}], 2  # adaptador DVD: pagina por offset
+
+    monkeypatch.setattr(sync, 'fetch_collection_data_paginated', adapter_fetch)
+    monkeypatch.setattr(sync, 'SNAPSHOT_BATCH_SIZE', 1)
+    monkeypatch.setattr(sync, '_pull_interceptors', [lambda user, collection, class_id: collection == 'attendance'])
+
+    async def scenario():
+        stream = sync.stream_class_snapshot(db, USER, None, 'c1', None, ['grades', 'attendance'],
+                                            'T0', sync._encode_ndjson)
+        return b''.join([c async for c in sync._gzip_stream(stream)])
+
+    lines = [json.loads(line) for line in gzip.decompress(_run(scenario())).decode().splitlines()]
+    assert lines[0]['type'] == 'header' and lines[-1]['type'] == 'end'
+    assert len([r for r in lines if r['type'] == 'record']) == 27
+    assert lines[-1]['counts'] == {'grades': 25, 'attendance': 2}
+    assert pages == [1, 2]
+    assert sync.decode_sync_token(lines[-1]['cursors']['grades'])['s'] == 'T0'
+
+
+class _TombstoneCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction=1):
+        self.docs = sorted(self.docs, key=lambda d: d[field])
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def __aiter__(self):
+        self._it = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return dict(next(self._it))
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def test_tombstones_do_pull_por_turma_nao_contam_a_rede_inteira(monkeypatch):
+    rows = [{'collection': 'grades', 'record_id': f'g{n}', 'mantenedora_id': 'm1',
+             'class_id': 'c1' if n < 2 else 'c2', 'deleted_at': f'2026-10-0{n + 1}T00:00:00'}
+            for n in range(5)]
+    tombstones = FakeCollection(rows)
+    tombstones.find = lambda q, projection=None: _TombstoneCursor([d for d in rows if _match(d, q)])
+    db = FakeDB(sync_tombstones=tombstones)
+    monkeypatch.setattr(sync, 'fetch_deleted_ids',
+                        lambda *a, **kw: sync_tombstones.fetch_deleted_ids(*a, **{**kw, 'limit': 2}))
+
+    ids, reset = _run(sync._pull_tombstones(db, USER, None, 'grades', {'s': '2026-09-01'}, 'c1'))
+    assert (ids, reset) == (['g0', 'g1'], False)
+    state = {'s': '2026-09-01'}
+    assert _run(sync._pull_tombstones(db, USER, None, 'grades', state)) == ([], True)   # rede: 5 > limite
+    assert state['s'] is None
@@ -0,0 +1,169 @@
+"""
+Tests do push offline em lote (routers/sync.process_sync_batch — Out/2026).
+
+Sem MongoDB: coleções fake que registram as queries/bulk_writes; a frequência
+canônica é substituída por um stub (o motor tem seus próprios testes).
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pymongo import DeleteOne, InsertOne, UpdateOne  # noqa: E402
+
+import routers.sync as sync  # noqa: E402
+from routers.sync import SyncOperation, SyncPushResult, process_sync_batch  # noqa: E402
+
+USER = {'id': 'u1', 'role': 'professor', 'mantenedora_id': 'm1', 'school_ids': []}
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self._it = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.finds = []
+        self.bulk = []
+
+    def find(self, query, projection=None):
+        self.finds.append(query)
+        ids = set(query['id']['$in'])
+        mid = query.get('mantenedora_id')
+        return _Cursor([d for d in self.docs if d['id'] in ids and (mid is None or d.get('mantenedora_id') == mid)])
+
+    async def bulk_write(self, requests, ordered=True):
+        self.bulk.append((requests, ordered))
+
+
+class FakeTombstones:
+    def __init__(self):
+        self.rows = []
+
+    async def insert_many(self, rows, ordered=True):
+        self.rows.extend(rows)
+
+
+class FakeDB(dict):
+    def __getattr__(self, name):
+        return self[name]
+
+
+def _op(collection, operation, record_id, data=None):
+    return SyncOperation(collection=collection, operation=operation, recordId=record_id,
+                         data=data, timestamp='2026-10-01T10:00:00Z')
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_grades_em_um_bulk_write_com_resultados_na_ordem():
+    grades = FakeCollection([{'id': 'g1', 'mantenedora_id': 'm1'}, {'id': 'g9', 'mantenedora_id': 'm2'}])
+    db = FakeDB(grades=grades, students=FakeCollection(), classes=FakeCollection(),
+                sync_tombstones=FakeTombstones())
+    ops = [
+        _op('grades', 'create', 'temp_a', {'student_id': 's1', 'b1': 5, 'mantenedora_id': 'm2'}),
+        _op('grades', 'update', 'g1', {'b1': 7}),
+        _op('grades', 'update', 'g9', {'b1': 7}),       # outro tenant
+        _op('grades', 'delete', 'g1'),
+        _op('foo', 'create', 'x'),
+    ]
+    results = _run(process_sync_batch(db, USER, ops))
+
+    assert [r.recordId for r in results] == ['temp_a', 'g1', 'g9', 'g1', 'x']
+    assert [r.success for r in results] == [True, True, False, True, False]
+    assert results[2].error == 'Registro não encontrado no servidor'
+    assert len(grades.finds) == 1 and len(grades.bulk) == 1
+    requests, ordered = grades.bulk[0]
+    assert [type(r) for r in requests] == [InsertOne, UpdateOne, DeleteOne]
+    assert ordered is True  # g1 aparece 2x → ordem importa
+    assert requests[0]._doc['mantenedora_id'] == 'm1'  # tenant nunca vem do cliente
+    assert requests[0]._doc['id'] == results[0].serverId
+    assert [(t['collection'], t['record_id'], t['mantenedora_id']) for t in db.sync_tombstones.rows] == \
+        [('grades', 'g1', 'm1')]
+
+
+def test_frequencia_repetida_converge_para_a_ultima(monkeypatch):
+    applied = []
+
+    async def fake_canonical(db, user, request, record_id, data):
+        applied.append(record_id)
+        return SyncPushResult(recordId=record_id, success=True, serverId=f"srv-{data['date']}")
+
+    monkeypatch.setattr(sync, '_sync_attendance_canonical', fake_canonical)
+    rec = [{'student_id': 's1', 'status': 'P'}]
+    ops = [
+        _op('attendance', 'update', 'a1', {'class_id': 'c1', 'date': '2026-10-01', 'records': rec}),
+        _op('attendance', 'update', 'a2', {'class_id': 'c1', 'date': '2026-10-02', 'records': rec}),
+        _op('attendance', 'update', 'a3', {'class_id': 'c1', 'date': '2026-10-01', 'records': rec}),
+    ]
+    results = _run(process_sync_batch(FakeDB(), USER, ops))
+
+    assert sorted(applied) == ['a2', 'a3']
+    assert [r.recordId for r in results] == ['a1', 'a2', 'a3']
+    assert results[0].success and results[0].serverId == results[2].serverId == 'srv-2026-10-01'
+
+
+
+def test_frequencia_mesma_turma_e_data_em_serie_e_falha_nao_contamina(monkeypatch):
+    applied, active = [], set()
+
+    async def fake_canonical(db, user, request, record_id, data):
+        key = (data['class_id'], data['date'])
+        assert key not in active                     # nunca duas escritas no mesmo doc ao mesmo tempo
+        active.add(key)
+        await asyncio.sleep(0.01)
+        active.discard(key)
+        applied.append(record_id)
+        if record_id == 'a3':
+            return SyncPushResult(recordId=record_id, success=False, error='ACADEMIC_EVENT_LOCK')
+        return SyncPushResult(recordId=record_id, success=True, serverId=f'srv-{record_id}')
+
+    monkeypatch.setattr(sync, '_sync_attendance_canonical', fake_canonical)
+    rec = [{'student_id': 's1', 'status': 'P'}]
+    day = {'class_id': 'c1', 'date': '2026-10-01', 'records': rec}
+    ops = [
+        _op('attendance', 'update', 'a1', {**day, 'course_id': 'mat'}),
+        _op('attendance', 'update', 'a2', {**day, 'course_id': '', 'period': 'regular'}),  # cai no doc de a1
+        _op('attendance', 'update', 'a3', {**day, 'course_id': 'mat', 'aula_numero': None}),
+    ]
+    results = _run(process_sync_batch(FakeDB(), USER, ops))
+
+    assert applied == ['a2', 'a3', 'a1']             # a1 superada por a3, que falhou → a1 aplicada
+    assert results[0].success and results[0].serverId == 'srv-a1'
+    assert results[1].success and not results[2].success
+
+def test_operacoes_interceptadas_por_adaptador_seguem_pelo_wrapper(monkeypatch):
+    seen = []
+
+    async def wrapper(db, user, op, request=None):
+        seen.append(op.recordId)
+        return SyncPushResult(recordId=op.recordId, success=False, error='409: DVD_ASSIGNMENT_REQUIRED')
+
+    students = FakeCollection([{'id': 's1', 'mantenedora_id': 'm1'}])
+    db = FakeDB(grades=FakeCollection(), students=students, classes=FakeCollection())
+    ops = [_op('grades', 'update', 'g1', {'b1': 7}), _op('students', 'update', 's1', {'nome': 'x'})]
+
+    monkeypatch.setattr(sync, 'process_sync_operation', wrapper)
+    monkeypatch.setattr(sync, '_push_interceptors', [])
+    _run(process_sync_batch(db, USER, ops))
+    assert seen == ['g1', 's1']  # wrapper sem predicado → tudo 1 a 1 (fail-closed)
+
+    seen.clear()
+    sync.register_push_interceptor(lambda user, op: op.collection == 'grades' and user['role'] == 'professor')
+    results = _run(process_sync_batch(db, USER, ops))
+    assert seen == ['g1'] and len(students.bulk) == 1
+    assert [r.success for r in results] == [False, True]
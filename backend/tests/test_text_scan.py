@@ -0,0 +1,191 @@
+"""
+Tests da busca de melhorias de texto em background (services/text_scan — Out/2026).
+
+Sem MongoDB: coleções fake que contam as consultas à fila. O scan anda em
+blocos pelo `_id`, consulta a fila UMA vez por bloco (nada de `find_one` por
+candidato) e, se cair no meio, retoma do cursor sem reenfileirar.
+"""
+import asyncio
+import copy
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services import text_scan  # noqa: E402
+from services.text_scan import (  # noqa: E402
+    create_scan, is_resumable, public_scan, resume_scan, run_scan_job,
+)
+
+
+def _match(doc, query):
+    for key, cond in query.items():
+        if key == '$or':
+            if not any(_match(doc, q) for q in cond):
+                return False
+        elif isinstance(cond, dict) and '$in' in cond:
+            if doc.get(key) not in cond['$in']:
+                return False
+        elif isinstance(cond, dict) and '$gt' in cond:
+            if doc.get(key) is None or not doc[key] > cond['$gt']:
+                return False
+        elif doc.get(key) != cond:
+            return False
+    return True
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction=1):
+        self.docs = sorted(self.docs, key=lambda d: d[field], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length):
+        return [dict(d) for d in self.docs[:length]]
+
+    def __aiter__(self):
+        self._it = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return dict(next(self._it))
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _Res:
+    modified_count = 1
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = [dict(d) for d in docs]
+        self.finds = self.find_ones = 0
+        self.fail_bulk_at = None
+        self.bulk_calls = 0
+
+    def find(self, query, projection=None):
+        self.finds += 1
+        return _Cursor([d for d in self.docs if _match(d, query)])
+
+    async def find_one(self, query, projection=None):
+        self.find_ones += 1
+        return next((dict(d) for d in self.docs if _match(d, query)), None)
+
+    async def count_documents(self, query):
+        return sum(1 for d in self.docs if _match(d, query))
+
+    async def insert_one(self, doc):
+        self.docs.append(dict(doc))
+
+    async def update_one(self, query, update):
+        for d in self.docs:
+            if _match(d, query):
+                d.update(copy.deepcopy(update['$set']))   # o Mongo serializa na hora
+                return _Res()
+        res = _Res()
+        res.modified_count = 0
+        return res
+
+    async def bulk_write(self, ops, ordered=True):
+        self.bulk_calls += 1
+        if self.bulk_calls == self.fail_bulk_at:
+            raise RuntimeError('primary stepped down')
+        self.docs.extend(dict(op._doc) for op in ops)
+
+
+class FakeDB(dict):
+    def __getitem__(self, name):
+        return self.setdefault(name, FakeCollection())
+
+
+TEXTS = [
+    'O aluno apresentou  boa evolução na leitura.',          # formatação
+    'O aluno apresentou dificudade na leitura e escrita.',   # ortografia
+    'Participa das atividades com interesse.',               # nada
+    'Demonstra dificudade  em matemática.',                  # as duas
+    'Leitura fluente.',                                      # nada
+]
+
+
+def _db():
+    db = FakeDB()
+    db['students'].docs = [
+        {'_id': n, 'id': f's{n}', 'observations': text, 'mantenedora_id': 'm1'}
+        for n, text in enumerate(TEXTS)
+    ]
+    # sugestão de formatação de s0 já está pendente na fila
+    db['text_improvement_queue'].docs = [{
+        'source_collection': 'students', 'source_id': 's0', 'source_field': 'observations',
+        'tipo': 'formatacao', 'status': 'pending',
+    }]
+    return db
+
+
+@pytest.fixture(autouse=True)
+def _inline_pool(monkeypatch):
+    monkeypatch.setattr(text_scan, 'RENDER_PROCESS_POOL_SIZE', 2)
+    monkeypatch.setattr(text_scan, 'TEXT_SCAN_CHUNK_SIZE', 2)
+
+    async def run_inline(fn, *args):
+        return fn(*args)
+    monkeypatch.setattr(text_scan, 'run_render', run_inline)
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_scan_em_blocos_com_fila_pre_carregada():
+    db = _db()
+    queue = db['text_improvement_queue']
+
+    async def scenario():
+        scan = await create_scan(db, {'students': ['observations']}, created_by='admin', owner_id=None)
+        return await run_scan_job(db, scan['id'])
+
+    final = _run(scenario())
+    assert final['status'] == 'done' and final['progress'] == {'total': 5, 'percent': 100}
+    assert final['counters'] == {'scanned': 5, 'candidates': 4, 'enqueued': 3, 'duplicates': 1}
+    assert queue.find_ones == 0 and queue.finds == 3          # uma consulta por bloco (2+2+1)
+    new = [(d['source_id'], d['tipo']) for d in queue.docs if 'id' in d]
+    assert sorted(new) == [('s1', 'ortografia'), ('s3', 'formatacao'), ('s3', 'ortografia')]
+    s1 = next(d for d in queue.docs if d.get('source_id') == 's1' and 'id' in d)
+    assert s1['sugestao'] == 'O aluno apresentou dificuldade na leitura e escrita.'
+    assert s1['applied_rules'] == ['sp_dificudade_dificuldade'] and s1['confidence'] == 0.9
+
+
+def test_scan_que_falhou_retoma_do_cursor_sem_reenfileirar():
+    db = _db()
+    queue = db['text_improvement_queue']
+    queue.fail_bulk_at = 2                                     # cai no 2º bloco (s2, s3)
+
+    async def scenario():
+        scan = await create_scan(db, {'students': ['observations']}, created_by='admin', owner_id=None)
+        failed = await run_scan_job(db, scan['id'])
+        stored = await db['text_improvement_scans'].find_one({'id': scan['id']})
+        assert is_resumable(stored)
+        assert await resume_scan(db, stored)
+        assert not await resume_scan(db, stored)               # só um chamador retoma
+        await asyncio.gather(*text_scan._running)
+        return failed, await db['text_improvement_scans'].find_one({'id': scan['id']})
+
+    failed, done = _run(scenario())
+    assert failed['status'] == 'failed' and 'primary stepped down' in failed['error']
+    assert done['status'] == 'done' and done['counters']['enqueued'] == 3
+    new = [(d['source_id'], d['tipo']) for d in queue.docs if 'id' in d]
+    assert len(new) == len(set(new)) == 3
+    assert not public_scan(done)['stale'] and not public_scan(failed)['stale']
+    stuck = {**done, 'status': 'running',                         # réplica caiu no meio
+             'updated_at': datetime.now(timezone.utc) - timedelta(hours=1)}
+    assert public_scan(stuck)['stale']
@@ -0,0 +1,126 @@
+"""
+Tests do cache de revogação de tokens (auth_utils.TokenBlacklistService — Out/2026)
+e da memoização do usuário por request (AuthMiddleware.get_current_user).
+
+Sem MongoDB: coleção fake com find().sort() assíncrono e contadores de chamadas.
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('JWT_SECRET_KEY', 'test')
+
+from starlette.requests import Request  # noqa: E402
+
+import auth_middleware  # noqa: E402
+from auth_middleware import AuthMiddleware  # noqa: E402
+from auth_utils import TokenBlacklistService, create_access_token  # noqa: E402
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, key, direction):
+        self._docs = sorted(self._docs, key=lambda d: d.get(key), reverse=direction < 0)
+        return self
+
+    def __aiter__(self):
+        self._it = iter(self._docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeBlacklist:
+    def __init__(self):
+        self.docs = []
+        self.finds = 0
+        self.find_ones = 0
+
+    async def insert_one(self, doc):
+        self.docs.append(dict(doc))
+
+    def find(self, query, projection=None):
+        self.finds += 1
+        since = (query.get('revoked_at') or {}).get('$gte')
+        return _Cursor([d for d in self.docs if since is None or d['revoked_at'] >= since])
+
+    async def find_one(self, query, sort=None):
+        self.find_ones += 1
+        return None
+
+
+def _service():
+    coll = FakeBlacklist()
+    svc = TokenBlacklistService()
+    svc.set_db({'token_blacklist': coll})
+    return svc, coll
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_checks_servidos_da_memoria_com_refresh_incremental():
+    async def scenario():
+        svc, coll = _service()
+        exp = datetime.now(timezone.utc) + timedelta(hours=1)
+        await svc.revoke_token('jti-local', 'u1', exp)
+        assert await svc.is_token_revoked(jti='jti-local') is True
+        # revogação feita por outra réplica: só aparece após o próximo refresh
+        coll.docs.append({'jti': 'jti-remoto', 'user_id': 'u2', 'expires_at': exp,
+                          'revoked_at': datetime.now(timezone.utc)})
+        assert await svc.is_token_revoked(jti='jti-remoto') is False
+        for _ in range(50):
+            await svc.is_token_revoked(jti='jti-livre', user_id='u1', issued_at=1)
+        assert coll.finds == 1 and coll.find_ones == 0
+        await svc.refresh_cache(force=True)
+        assert await svc.is_token_revoked(jti='jti-remoto') is True
+        return svc
+
+    svc = _run(scenario())
+    assert svc.cache_stats['refreshes'] == 2
+
+
+def test_revoke_all_aplica_por_iat():
+    async def scenario():
+        svc, _ = _service()
+        await svc.revoke_all_user_tokens('u1')
+        before = int((datetime.now(timezone.utc) - timedelta(minutes=5)).timestamp())
+        after = int((datetime.now(timezone.utc) + timedelta(seconds=2)).timestamp())
+        return (await svc.is_token_revoked(user_id='u1', issued_at=before),
+                await svc.is_token_revoked(user_id='u1', issued_at=after),
+                await svc.is_token_revoked(user_id='u2', issued_at=before))
+
+    assert _run(scenario()) == (True, False, False)
+
+
+def test_usuario_memoizado_por_request(monkeypatch):
+    calls = []
+
+    async def fake_revoked(**kwargs):
+        calls.append(kwargs)
+        return False
+
+    monkeypatch.setattr(auth_middleware.token_blacklist, 'is_token_revoked', fake_revoked)
+    token = create_access_token({'sub': 'u1', 'role': 'admin', 'school_ids': ['e1']})
+    scope = {'type': 'http', 'headers': [(b'authorization', f'Bearer {token}'.encode())],
+             'query_string': b'', 'method': 'GET', 'path': '/'}
+    request = Request(scope)
+
+    async def scenario():
+        first = await AuthMiddleware.get_current_user(request)
+        first['school_ids'].append('mutado')
+        second = await AuthMiddleware.require_roles(['admin'])(request)
+        return first, second
+
+    first, second = _run(scenario())
+    assert len(calls) == 1
+    assert second['id'] == 'u1' and second['school_ids'] == ['e1']
@@ -9,7 +9,9 @@ Esta é a ÚNICA camada que resolve "quem pode editar o quê e quando" no
 domínio pedagógico. Nenhum router, frontend ou query manual deve manter
 regra temporal paralela.
 
-Tudo passa por `resolve_student_ownership(...)`.
+Tudo passa por `resolve_student_ownership(...)` — ou, para gravações de
+uma turma inteira (frequência, lote de notas), pela versão em lote
+`resolve_students_ownership(...)`, que aplica EXATAMENTE a mesma decisão.
 ========================================================================
 
 API canônica:
@@ -43,12 +45,21 @@ PRECEDÊNCIA (V1, contrato §15):
 from __future__ import annotations
 
 import logging
+import os
 from datetime import date, datetime, timezone
 from typing import Iterable, Optional
 from zoneinfo import ZoneInfo
 
+from utils.cache import get_region
+
 logger = logging.getLogger(__name__)
 
+# [Out/2026] Timezone institucional por mantenedora em cache: antes era 1
+# `mantenedoras.find_one` por aluno em cada gravação de frequência/nota. O
+# campo só muda por migração/seed, então o TTL curto basta.
+LENS_TZ_CACHE_SECONDS = float(os.environ.get("LENS_TZ_CACHE_SECONDS", "300"))
+_tz_cache = get_region("lens:tz", default_ttl=LENS_TZ_CACHE_SECONDS, max_entries=500)
+
 # ===========================================================================
 # Constantes congeladas — não mudar sem bumpar `decision_version`.
 # ===========================================================================
@@ -69,21 +80,30 @@ DEFAULT_INSTITUTIONAL_TZ = "America/Sao_Paulo"
 # ===========================================================================
 # Helpers
 # ===========================================================================
+async def _load_institutional_tz_name(db, mantenedora_id: str) -> str:
+    m = await db.mantenedoras.find_one(
+        {"id": mantenedora_id}, {"_id": 0, "timezone": 1}
+    )
+    if m and m.get("timezone"):
+        try:
+            ZoneInfo(m["timezone"])
+            return m["timezone"]
+        except Exception:
+            logger.warning("[lens] timezone inválido em mantenedora %s, usando default", mantenedora_id)
+    return DEFAULT_INSTITUTIONAL_TZ
+
+
 async def _get_institutional_tz(db, mantenedora_id: Optional[str]) -> ZoneInfo:
-    """Resolve o timezone institucional da mantenedora.
+    """Resolve o timezone institucional da mantenedora (cache por tenant).
 
     Fallback: America/Sao_Paulo (default Brasil).
     """
-    if mantenedora_id:
-        m = await db.mantenedoras.find_one(
-            {"id": mantenedora_id}, {"_id": 0, "timezone": 1}
-        )
-        if m and m.get("timezone"):
-            try:
-                return ZoneInfo(m["timezone"])
-            except Exception:
-                logger.warning("[lens] timezone inválido em mantenedora %s, usando default", mantenedora_id)
-    return ZoneInfo(DEFAULT_INSTITUTIONAL_TZ)
+    if not mantenedora_id:
+        return ZoneInfo(DEFAULT_INSTITUTIONAL_TZ)
+    name = await _tz_cache.get_or_load(
+        (id(db), mantenedora_id), lambda: _load_institutional_tz_name(db, mantenedora_id)
+    )
+    return ZoneInfo(name)
 
 
 def _to_date(value, tz: ZoneInfo) -> date:
@@ -177,8 +197,50 @@ async def resolve_student_ownership(
     }
     events = await db.academic_events.find(flt, {"_id": 0}).to_list(50)
 
-    governing = pick_governing_event(events)
+    return _decide(pick_governing_event(events), class_id, target, tz)
+
+
+async def resolve_students_ownership(
+    db,
+    *,
+    student_ids: Iterable[str],
+    class_id: str,
+    course_id: Optional[str] = None,
+    target_date=None,
+    mantenedora_id: Optional[str] = None,
+) -> dict[str, dict]:
+    """`resolve_student_ownership` para vários alunos da MESMA (turma, data).
+
+    [Out/2026] Uma query `$in` para os eventos de todos os alunos e o
+    timezone resolvido uma vez — salvar a chamada de 40 alunos custava ~80
+    queries. Retorna `{student_id: decisão}`, idêntica à da versão unitária
+    (alunos sem evento recebem a decisão padrão).
+    """
+    sids = list(dict.fromkeys(student_ids))
+    if not sids:
+        return {}
+    tz = await _get_institutional_tz(db, mantenedora_id)
+    target = _to_date(target_date, tz)
+
+    events = await db.academic_events.find({
+        "student_id": {"$in": sids},
+        "approval_status": "approved",
+        "superseded_by_event_id": None,
+        "$or": [{"origin_class_id": class_id}, {"destination_class_id": class_id}],
+    }, {"_id": 0}).to_list(None)
+
+    by_student: dict[str, list[dict]] = {}
+    for ev in events:
+        by_student.setdefault(ev["student_id"], []).append(ev)
+
+    return {
+        sid: _decide(pick_governing_event(by_student.get(sid, ())), class_id, target, tz)
+        for sid in sids
+    }
+
 
+def _decide(governing: Optional[dict], class_id: str, target: date, tz: ZoneInfo) -> dict:
+    """Decisão de ownership a partir do evento governante (regras §4 e §5)."""
     base_decision = {
         "decision_version": DECISION_VERSION,
         "visible": True,                     # contrato §16.1 — sempre visível
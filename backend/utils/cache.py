@@ -1,53 +1,575 @@
 """
 Cache utilitário para o SIGESC.
 Cache in-memory com TTL para endpoints frequentemente acessados.
+
+[Out/2026] Camada única de cache. Antes havia quatro caches ad-hoc (este
+`TTLCache`, `pdf_cache._TTLCache`, o `_stats_cache` do Bolsa Família e o cache
+do autocomplete) — nenhum limitado em tamanho, invalidação por varredura de
+prefixo, um lock global serializando TODOS os misses do pdf_cache e nada
+compartilhado entre réplicas (lista de escolas/turmas velha por até 3 min no
+outro pod depois de um PUT).
+
+Peças:
+  - `MemoryCacheBackend`: LRU limitado por nº de entradas, TTL por chave,
+    índice de tags (tag → chaves) para invalidação sem varredura;
+  - `CacheRegion`: namespace com métricas (hits/misses/loads/coalesced/
+    evictions), `get_or_load` com single-flight POR CHAVE (misses de chaves
+    diferentes não se bloqueiam; misses concorrentes da mesma chave fazem um
+    único fetch) e `invalidate_tags`;
+  - tier compartilhado opcional (`MongoCacheBackend`, coleção `cache_entries`
+    com índice TTL) para valores caros de recomputar;
+  - barramento de invalidação (`cache_invalidations`): cada `invalidate_*`
+    publica um evento e as outras réplicas aplicam no L1 local em ~2s.
+
+Sem `configure_cache(db)` (testes, scripts) tudo roda só em memória — o
+próprio L1 é o "stand-in" do tier compartilhado.
+
+Convenção de tags: `tenant:<mantenedora_id|ALL>`, `school:<id>`.
+
+Configuração (env):
+  CACHE_MAX_ENTRIES_DEFAULT    limite LRU por região (default 2000)
+  CACHE_SHARED_BACKEND         "mongo" liga o tier compartilhado (default off)
+  CACHE_INVALIDATION_BUS       "off" desliga o barramento entre réplicas
+  CACHE_BUS_POLL_SECONDS       intervalo de leitura do barramento (default 2)
 """
 
-import time
+import asyncio
 import hashlib
 import json
-from typing import Any, Optional
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAX_ENTRIES_DEFAULT = int(os.environ.get("CACHE_MAX_ENTRIES_DEFAULT", "2000"))
+CACHE_SHARED_BACKEND = os.environ.get("CACHE_SHARED_BACKEND", "").strip().lower()
+CACHE_INVALIDATION_BUS = os.environ.get("CACHE_INVALIDATION_BUS", "on").strip().lower() != "off"
+CACHE_BUS_POLL_SECONDS = float(os.environ.get("CACHE_BUS_POLL_SECONDS", "2"))
+CACHE_BUS_RETENTION_SECONDS = 600
+
+# Identifica esta réplica nos eventos do barramento (ignora os próprios eventos).
+INSTANCE_ID = uuid.uuid4().hex[:12]
+
+_MISSING = object()
+
+
+def tenant_tag(tenant_id: Optional[str]) -> str:
+    """Tag de uma entrada cacheada no escopo de um tenant (None = visão cross-tenant)."""
+    return f"tenant:{tenant_id or 'ALL'}"
+
+
+def tenant_invalidation_tags(tenant_id: Optional[str]) -> list[str]:
+    """Tags a invalidar quando um dado do tenant muda: o próprio tenant e a visão ALL.
+
+    Sem tenant conhecido devolve [] — `TTLCache.invalidate` então limpa a região inteira.
+    """
+    if not tenant_id:
+        return []
+    return [tenant_tag(tenant_id), tenant_tag(None)]
+
+
+class MemoryCacheBackend:
+    """LRU em memória com TTL por chave e índice de tags.
+
+    `_data` guarda `key -> (expires_at, value)` em ordem de uso (mais recente no fim).
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES_DEFAULT, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max(1, int(max_entries))
+        self._clock = clock
+        self._data: "OrderedDict[Any, tuple[float, Any]]" = OrderedDict()
+        self._tags: dict[str, set] = {}
+        self._key_tags: dict[Any, tuple[str, ...]] = {}
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Any) -> Any:
+        """Retorna o valor ou `_MISSING` (expirado/ausente)."""
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        if self._clock() > entry[0]:
+            self.delete(key)
+            return _MISSING
+        self._data.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Any, value: Any, ttl: float, tags: Iterable[str] = ()) -> None:
+        self._unlink_tags(key)
+        self._data[key] = (self._clock() + ttl, value)
+        self._data.move_to_end(key)
+        tags = tuple(tags)
+        if tags:
+            self._key_tags[key] = tags
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+        while len(self._data) > self.max_entries:
+            self._evict_one()
+
+    def delete(self, key: Any) -> bool:
+        self._unlink_tags(key)
+        return self._data.pop(key, None) is not None
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        removed = 0
+        for tag in tags:
+            for key in list(self._tags.get(tag, ())):
+                removed += int(self.delete(key))
+        return removed
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._tags.clear()
+        self._key_tags.clear()
+
+    def _evict_one(self) -> None:
+        # Expirados primeiro (mais baratos de perder); senão o menos usado.
+        now = self._clock()
+        for key, (expires_at, _) in self._data.items():
+            if expires_at <= now:
+                break
+        else:
+            key = next(iter(self._data))
+        self.delete(key)
+        self.evictions += 1
+
+    def _unlink_tags(self, key: Any) -> None:
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    self._tags.pop(tag, None)
+
+
+class MongoCacheBackend:
+    """Tier compartilhado entre réplicas (coleção `cache_entries`, índice TTL em `expires_at`).
+
+    Valores precisam ser BSON-serializáveis (listas/dicts de documentos já são).
+    """
+
+    def __init__(self, db, collection: str = "cache_entries"):
+        self._coll = db[collection]
+
+    async def ensure_indexes(self) -> None:
+        await self._coll.create_index("expires_at", expireAfterSeconds=0)
+        await self._coll.create_index([("region", 1), ("tags", 1)])
+
+    async def get(self, key: str) -> Any:
+        """Retorna `(value, ttl_restante, tags)` ou `_MISSING`."""
+        now = datetime.now(timezone.utc)
+        doc = await self._coll.find_one(
+            {"_id": key, "expires_at": {"$gt": now}},
+            {"_id": 0, "value": 1, "expires_at": 1, "tags": 1},
+        )
+        if doc is None:
+            return _MISSING
+        expires_at = doc["expires_at"]
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return doc.get("value"), max(1.0, (expires_at - now).total_seconds()), tuple(doc.get("tags") or ())
+
+    async def set(self, region: str, key: str, value: Any, ttl: float, tags: Iterable[str] = ()) -> None:
+        await self._coll.replace_one(
+            {"_id": key},
+            {
+                "_id": key,
+                "region": region,
+                "value": value,
+                "tags": list(tags),
+                "expires_at": datetime.now(timezone.utc) + timedelta(seconds=ttl),
+            },
+            upsert=True,
+        )
+
+    async def delete(self, key: str) -> None:
+        await self._coll.delete_one({"_id": key})
+
+    async def invalidate_tags(self, region: str, tags: Iterable[str]) -> int:
+        res = await self._coll.delete_many({"region": region, "tags": {"$in": list(tags)}})
+        return res.deleted_count
+
+    async def clear(self, region: str) -> int:
+        res = await self._coll.delete_many({"region": region})
+        return res.deleted_count
+
+
+class CacheRegion:
+    """Namespace de cache (ex.: 'api:schools', 'pdf') com L1 LRU, tags e single-flight."""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        max_entries: int = CACHE_MAX_ENTRIES_DEFAULT,
+        default_ttl: float = 300.0,
+        shared: bool = False,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.default_ttl = default_ttl
+        self.shared = shared  # participa do tier compartilhado quando configurado
+        self.local = MemoryCacheBackend(max_entries=max_entries, clock=clock)
+        self._inflight: dict[Any, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.coalesced = 0
+        self.load_errors = 0
+
+    # --- L1 (síncrono) -------------------------------------------------
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        value = self.local.get(key)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = ()) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        tags = tuple(tags)
+        self.local.set(key, value, ttl, tags)
+        if self.shared and _shared_backend is not None:
+            _spawn(_shared_backend.set(self.name, self._shared_key(key), value, ttl, tags))
+
+    def delete(self, key: Any) -> None:
+        self.local.delete(key)
+        if self.shared and _shared_backend is not None:
+            _spawn(_shared_backend.delete(self._shared_key(key)))
+        _publish(self.name, keys=[key])
+
+    def publish_keys(self, *keys: str) -> None:
+        """Derruba `keys` só nas OUTRAS réplicas — para quem já atualizou o próprio L1."""
+        _publish(self.name, keys=list(keys))
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """Remove as entradas com qualquer uma das tags (local + shared + outras réplicas)."""
+        removed = self.local.invalidate_tags(tags)
+        if self.shared and _shared_backend is not None:
+            _spawn(_shared_backend.invalidate_tags(self.name, tags))
+        _publish(self.name, tags=list(tags))
+        return removed
+
+    def clear(self, *, propagate: bool = True) -> None:
+        self.local.clear()
+        if propagate:
+            if self.shared and _shared_backend is not None:
+                _spawn(_shared_backend.clear(self.name))
+            _publish(self.name)
 
+    # --- async (L1 → shared → loader) ----------------------------------
+
+    async def get_or_load(
+        self,
+        key: Any,
+        loader: Callable,
+        *,
+        ttl: Optional[float] = None,
+        tags: Any = (),
+        cache_none: bool = False,
+    ) -> Any:
+        """Retorna o valor cacheado ou executa `loader` UMA vez por chave.
+
+        Chamadas concorrentes para a mesma chave aguardam o mesmo fetch;
+        chaves diferentes nunca esperam umas pelas outras. `loader` pode ser
+        sync ou async. Por padrão `None` não é cacheado (mesma semântica do
+        antigo `pdf_cache.get_or_fetch`). `tags` pode ser uma função do valor
+        carregado (tags que só se conhecem depois do fetch).
+        """
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # quem foi cancelado foi esta chamada
+                # o fetch "líder" foi cancelado: tenta de novo (vira líder)
+                return await self.get_or_load(key, loader, ttl=ttl, tags=tags, cache_none=cache_none)
+
+        self.misses += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            shared = await self._shared_get(key)
+            if shared is _MISSING:
+                self.loads += 1
+                value = loader()
+                if asyncio.iscoroutine(value):
+                    value = await value
+                if value is not None or cache_none:
+                    self.set(key, value, ttl, tags(value) if callable(tags) else tags)
+            else:
+                value, remaining, shared_tags = shared
+                self.local.set(key, value, remaining, shared_tags)
+            fut.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as exc:
+            self.load_errors += 1
+            fut.set_exception(exc)
+            fut.exception()  # marca como recuperada se ninguém mais aguardava
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "region": self.name,
+            "entries": len(self.local),
+            "max_entries": self.local.max_entries,
+            "default_ttl_seconds": self.default_ttl,
+            "shared": bool(self.shared and _shared_backend is not None),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_pct": round(100.0 * self.hits / lookups, 2) if lookups else 0.0,
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+            "load_errors": self.load_errors,
+            "evictions": self.local.evictions,
+            "inflight": len(self._inflight),
+        }
+
+    def reset_stats(self) -> None:
+        self.hits = self.misses = self.loads = self.coalesced = self.load_errors = 0
+        self.local.evictions = 0
+
+    # --- internos ------------------------------------------------------
+
+    def _shared_key(self, key: Any) -> str:
+        return f"{self.name}|{key}"
+
+    async def _shared_get(self, key: Any) -> Any:
+        if not (self.shared and _shared_backend is not None):
+            return _MISSING
+        try:
+            return await _shared_backend.get(self._shared_key(key))
+        except Exception as e:
+            logger.warning("[cache:%s] shared get falhou: %s", self.name, e)
+            return _MISSING
+
+
+# ---------------------------------------------------------------------------
+# Registro de regiões + tier compartilhado + barramento
+# ---------------------------------------------------------------------------
+
+_regions: dict[str, CacheRegion] = {}
+_shared_backend: Optional[MongoCacheBackend] = None
+_bus_collection = None
+_background: set = set()
+
+
+def get_region(name: str, **kwargs) -> CacheRegion:
+    """Retorna (criando na primeira chamada) a região `name`."""
+    region = _regions.get(name)
+    if region is None:
+        region = _regions[name] = CacheRegion(name, **kwargs)
+    return region
+
+
+def invalidate_tags(*tags: str, regions: Optional[Iterable[str]] = None) -> int:
+    """Invalida as tags em várias regiões de uma vez (todas, por padrão)."""
+    names = list(regions) if regions is not None else list(_regions)
+    return sum(_regions[n].invalidate_tags(*tags) for n in names if n in _regions)
+
+
+def cache_stats() -> dict:
+    """Snapshot de todas as regiões (alimenta /admin/observability/cache)."""
+    return {
+        "instance_id": INSTANCE_ID,
+        "shared_backend": "mongo" if _shared_backend is not None else None,
+        "invalidation_bus": _bus_collection is not None,
+        "regions": [r.snapshot() for r in sorted(_regions.values(), key=lambda r: r.name)],
+    }
+
+
+def _spawn(coro) -> None:
+    """Agenda I/O de cache em background (best-effort, nunca quebra a request)."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        coro.close()
+        return
+
+    async def _guarded():
+        try:
+            await coro
+        except Exception as e:
+            logger.warning("[cache] operação em background falhou: %s", e)
+
+    task = loop.create_task(_guarded())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+def _publish(region: str, *, tags: Optional[list] = None, keys: Optional[list] = None) -> None:
+    if _bus_collection is None:
+        return
+    _spawn(_bus_collection.insert_one({
+        "id": uuid.uuid4().hex,
+        "origin": INSTANCE_ID,
+        "region": region,
+        "tags": tags,
+        "keys": [k for k in keys if isinstance(k, str)] if keys else None,
+        "at": datetime.now(timezone.utc),
+    }))
+
+
+def apply_invalidation_event(event: dict) -> None:
+    """Aplica no L1 local um evento publicado por outra réplica (não republica)."""
+    region = _regions.get(event.get("region") or "")
+    if region is None:
+        return
+    if event.get("tags"):
+        region.local.invalidate_tags(event["tags"])
+    elif event.get("keys"):
+        for key in event["keys"]:
+            region.local.delete(key)
+    else:
+        region.local.clear()
+
+
+async def configure_cache(db) -> None:
+    """Liga tier compartilhado/barramento conforme env (chamado no startup)."""
+    global _shared_backend, _bus_collection
+    if CACHE_SHARED_BACKEND == "mongo":
+        backend = MongoCacheBackend(db)
+        await backend.ensure_indexes()
+        _shared_backend = backend
+    if CACHE_INVALIDATION_BUS:
+        coll = db.cache_invalidations
+        await coll.create_index("at", expireAfterSeconds=CACHE_BUS_RETENTION_SECONDS)
+        _bus_collection = coll
+    logger.info(
+        "[cache] configurado (shared=%s, bus=%s, instance=%s)",
+        _shared_backend is not None, _bus_collection is not None, INSTANCE_ID,
+    )
+
+
+async def run_invalidation_listener(stop_event: Optional[asyncio.Event] = None) -> None:
+    """Lê `cache_invalidations` e aplica eventos das outras réplicas no L1 local.
+
+    Janela por `at` com sobreposição (relógios de réplicas diferentes não são
+    perfeitamente sincronizados) + dedupe por `id`.
+    """
+    if _bus_collection is None:
+        return
+    stop_event = stop_event or asyncio.Event()
+    overlap = timedelta(seconds=max(5.0, CACHE_BUS_POLL_SECONDS * 3))
+    since = datetime.now(timezone.utc)
+    seen: dict[str, datetime] = {}
+    while not stop_event.is_set():
+        try:
+            cursor = _bus_collection.find(
+                {"at": {"$gte": since - overlap}, "origin": {"$ne": INSTANCE_ID}},
+                {"_id": 0},
+            ).sort("at", 1)
+            async for event in cursor:
+                eid = event.get("id")
+                if not eid or eid in seen:
+                    continue
+                at = event["at"]
+                if at.tzinfo is None:  # Motor devolve datetime naive (UTC)
+                    at = at.replace(tzinfo=timezone.utc)
+                seen[eid] = at
+                apply_invalidation_event(event)
+                if at > since:
+                    since = at
+            cutoff = since - overlap * 2
+            for eid in [e for e, at in seen.items() if at < cutoff]:
+                seen.pop(eid, None)
+        except Exception as e:
+            logger.warning("[cache] leitura do barramento falhou: %s", e)
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=CACHE_BUS_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+def _reset_for_tests() -> None:
+    global _shared_backend, _bus_collection
+    _shared_backend = None
+    _bus_collection = None
+    for region in _regions.values():
+        region.local.clear()
+        region.reset_stats()
+
+
+# ---------------------------------------------------------------------------
+# Fachada legada (routers de listagem: schools, classes, courses, ctue)
+# ---------------------------------------------------------------------------
 
 class TTLCache:
-    """Cache simples com TTL (Time-To-Live) em segundos."""
-    
-    def __init__(self):
-        self._store = {}
-    
+    """Cache simples com TTL (Time-To-Live) em segundos.
+
+    [Out/2026] Fachada sobre `CacheRegion`: cada prefixo vira a região
+    `api:<prefixo>` (LRU limitada, compartilhada entre réplicas quando o tier
+    Mongo está ligado). `invalidate(prefix)` não varre mais o dict inteiro.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES_DEFAULT):
+        self._max_entries = max_entries
+
     def _make_key(self, prefix: str, params: dict) -> str:
         """Gera chave de cache baseada no prefixo e parâmetros."""
         raw = json.dumps(params, sort_keys=True, default=str)
         return f"{prefix}:{hashlib.sha256(raw.encode()).hexdigest()}"
-    
+
+    def _region(self, prefix: str) -> CacheRegion:
+        return get_region(f"api:{prefix}", max_entries=self._max_entries, shared=True)
+
     def get(self, prefix: str, params: dict) -> Optional[Any]:
         """Busca valor do cache. Retorna None se expirado ou não existe."""
+        return self._region(prefix).get(self._make_key(prefix, params))
+
+    async def aget(self, prefix: str, params: dict) -> Optional[Any]:
+        """Como `get`, mas consulta o tier compartilhado num miss do L1."""
+        region = self._region(prefix)
         key = self._make_key(prefix, params)
-        entry = self._store.get(key)
-        if entry is None:
+        value = region.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        shared = await region._shared_get(key)
+        if shared is _MISSING:
             return None
-        if time.time() > entry['expires']:
-            del self._store[key]
-            return None
-        return entry['value']
-    
-    def set(self, prefix: str, params: dict, value: Any, ttl: int):
-        """Armazena valor no cache com TTL em segundos."""
-        key = self._make_key(prefix, params)
-        self._store[key] = {
-            'value': value,
-            'expires': time.time() + ttl
-        }
-    
-    def invalidate(self, prefix: str):
-        """Invalida todas as entradas com o prefixo dado."""
-        keys_to_delete = [k for k in self._store if k.startswith(f"{prefix}:")]
-        for k in keys_to_delete:
-            del self._store[k]
-    
+        value, remaining, shared_tags = shared
+        region.local.set(key, value, remaining, shared_tags)
+        return value
+
+    def set(self, prefix: str, params: dict, value: Any, ttl: int, tags: Iterable[str] = ()):
+        """Armazena valor no cache com TTL em segundos (e tags opcionais)."""
+        self._region(prefix).set(self._make_key(prefix, params), value, ttl, tags)
+
+    def invalidate(self, prefix: str, tags: Optional[Iterable[str]] = None):
+        """Invalida as entradas do prefixo — todas, ou só as marcadas com `tags`."""
+        region = self._region(prefix)
+        if tags:
+            region.invalidate_tags(*tags)
+        else:
+            region.clear()
+
     def clear(self):
         """Limpa todo o cache."""
-        self._store.clear()
+        for name, region in list(_regions.items()):
+            if name.startswith("api:"):
+                region.clear()
 
 
 # Instância global
@@ -4,54 +4,248 @@ Extraído de server.py durante a refatoração modular.
 """
 
 from fastapi import WebSocket
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional, Set
 from datetime import datetime, timezone, timedelta
+import asyncio
+import os
 import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+WS_SEND_QUEUE_SIZE = int(os.environ.get("WS_SEND_QUEUE_SIZE", "256"))
+WS_SEND_TIMEOUT_SECONDS = float(os.environ.get("WS_SEND_TIMEOUT_SECONDS", "5"))
+
+TOPIC_ALL = "all"
+
+
+def user_topic(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+def topics_for_user(payload: dict) -> Set[str]:
+    """Tópicos a que um usuário pode assinar (derivados do token)."""
+    topics = {TOPIC_ALL}
+    if payload.get("sub"):
+        topics.add(user_topic(payload["sub"]))
+    if payload.get("role"):
+        topics.add(f"role:{payload['role']}")
+    if payload.get("mantenedora_id"):
+        topics.add(f"tenant:{payload['mantenedora_id']}")
+    for school_id in payload.get("school_ids") or []:
+        topics.add(f"school:{school_id}")
+    return topics
+
+
+class _Connection:
+    """Um socket: fila própria de envio + writer dedicado."""
+
+    __slots__ = ("websocket", "user_id", "topics", "allowed", "queue", "writer")
+
+    def __init__(self, websocket: WebSocket, user_id: str, topics: Set[str], allowed: Set[str]):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.topics = topics
+        self.allowed = allowed
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self.writer: Optional[asyncio.Task] = None
+
+
 class ConnectionManager:
-    """Gerenciador de conexões WebSocket para mensagens em tempo real"""
+    """Gerenciador de conexões WebSocket para mensagens em tempo real
+
+    [Out/2026] Fan-out escalável:
+      - cada conexão tem fila de envio (WS_SEND_QUEUE_SIZE) e um writer próprio
+        com timeout (WS_SEND_TIMEOUT_SECONDS): publicar só enfileira, um socket
+        lento não segura os outros;
+      - consumidor lento (fila cheia ou envio estourando o timeout) é
+        desconectado (close 1013) — o cliente reconecta e recarrega o estado;
+      - tópicos: `user:<id>`, `role:<papel>`, `tenant:<mantenedora>`,
+        `school:<id>` e `all`, assinados a partir do token no connect;
+      - `publish` entrega local e repassa ao backbone (utils/ws_pubsub) para as
+        demais réplicas entregarem aos seus sockets.
+    """
 
     def __init__(self):
         self.active_connections: Dict[str, List[WebSocket]] = {}
+        self._conns: Dict[WebSocket, _Connection] = {}
+        self._topics: Dict[str, Set[_Connection]] = {}
+        self._backbone = None
+        self._listener: Optional[asyncio.Task] = None
+        self._stop: Optional[asyncio.Event] = None
+        self.stats = {"published": 0, "delivered": 0, "remote": 0, "evicted": 0}
+
+    # --- ciclo de vida -------------------------------------------------
+
+    async def start(self, db) -> None:
+        """Liga o backbone entre réplicas (chamado no startup)."""
+        from utils.ws_pubsub import create_backbone
 
-    async def connect(self, websocket: WebSocket, user_id: str):
+        self._backbone = await create_backbone(db)
+        self._stop = asyncio.Event()
+        self._listener = asyncio.create_task(self._backbone.run(self._on_remote, self._stop))
+        logger.info(f"[ws] backbone de pub/sub: {self._backbone.name}")
+
+    async def stop(self, timeout: float = 5) -> None:
+        if self._stop is not None:
+            self._stop.set()
+        if self._listener is not None:
+            try:
+                await asyncio.wait_for(self._listener, timeout=timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+            self._listener = None
+        writers = [c.writer for c in self._conns.values() if c.writer is not None]
+        for conn in list(self._conns.values()):
+            self._drop(conn)
+        await asyncio.gather(*writers, *_closing, return_exceptions=True)
+
+    # --- conexões ------------------------------------------------------
+
+    async def connect(self, websocket: WebSocket, user_id: str, topics: Optional[Iterable[str]] = None):
         await websocket.accept()
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
+        allowed = set(topics or ()) | {TOPIC_ALL, user_topic(user_id)}
+        conn = _Connection(websocket, user_id, set(), allowed)
+        conn.writer = asyncio.create_task(self._write_loop(conn))
+        self._conns[websocket] = conn
+        self.active_connections.setdefault(user_id, []).append(websocket)
+        self.subscribe(websocket, allowed)
         logger.info(f"WebSocket conectado: user_id={user_id}")
 
     def disconnect(self, websocket: WebSocket, user_id: str):
-        if user_id in self.active_connections:
-            if websocket in self.active_connections[user_id]:
-                self.active_connections[user_id].remove(websocket)
-            if not self.active_connections[user_id]:
-                del self.active_connections[user_id]
+        conn = self._conns.get(websocket)
+        if conn is not None:
+            self._drop(conn)
         logger.info(f"WebSocket desconectado: user_id={user_id}")
 
+    def subscribe(self, websocket: WebSocket, topics: Iterable[str]) -> Set[str]:
+        """Assina tópicos (só os permitidos ao usuário). Devolve os assinados."""
+        conn = self._conns.get(websocket)
+        if conn is None:
+            return set()
+        accepted = set(topics) & conn.allowed
+        for topic in accepted - conn.topics:
+            self._topics.setdefault(topic, set()).add(conn)
+        conn.topics |= accepted
+        return accepted
+
+    def unsubscribe(self, websocket: WebSocket, topics: Iterable[str]) -> None:
+        conn = self._conns.get(websocket)
+        if conn is None:
+            return
+        for topic in set(topics) & conn.topics:
+            self._unlink(conn, topic)
+
+    # --- envio ---------------------------------------------------------
+
+    async def publish(self, topic: str, message: dict, exclude_user_id: str = None) -> int:
+        """Entrega `message` a todos os assinantes de `topic` (em todas as réplicas).
+
+        Devolve quantos sockets LOCAIS receberam a mensagem na fila.
+        """
+        self.stats["published"] += 1
+        delivered = self._deliver(topic, message, exclude_user_id)
+        if self._backbone is not None:
+            from utils.ws_pubsub import make_envelope
+
+            try:
+                await self._backbone.publish(make_envelope(topic, message, exclude_user_id))
+            except Exception as e:
+                logger.error(f"Erro ao publicar no backbone WebSocket: {e}")
+        return delivered
+
     async def send_message(self, user_id: str, message: dict):
-        if user_id in self.active_connections:
-            disconnected = []
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    logger.error(f"Erro ao enviar mensagem WebSocket: {e}")
-                    disconnected.append(connection)
-            for conn in disconnected:
-                self.active_connections[user_id].remove(conn)
+        await self.publish(user_topic(user_id), message)
 
     async def send_notification(self, user_id: str, notification: dict):
         await self.send_message(user_id, notification)
 
     async def broadcast(self, message: dict, exclude_user_id: str = None):
-        for user_id in list(self.active_connections.keys()):
-            if user_id != exclude_user_id:
-                await self.send_message(user_id, message)
+        await self.publish(TOPIC_ALL, message, exclude_user_id=exclude_user_id)
+
+    # --- internos ------------------------------------------------------
+
+    async def _on_remote(self, envelope: dict) -> None:
+        self.stats["remote"] += 1
+        self._deliver(envelope["topic"], envelope["message"], envelope.get("exclude_user_id"))
+
+    def _deliver(self, topic: str, message: dict, exclude_user_id: Optional[str]) -> int:
+        delivered = 0
+        for conn in list(self._topics.get(topic, ())):
+            if exclude_user_id and conn.user_id == exclude_user_id:
+                continue
+            try:
+                conn.queue.put_nowait(message)
+                delivered += 1
+            except asyncio.QueueFull:
+                self._evict(conn, "fila de envio cheia")
+        self.stats["delivered"] += delivered
+        return delivered
+
+    async def _write_loop(self, conn: _Connection) -> None:
+        # Sai sozinho quando a conexão é removida: o cancel do `_drop` pode ser
+        # engolido pelo `wait_for` se o envio terminar no mesmo passo do loop.
+        while self._conns.get(conn.websocket) is conn:
+            message = await conn.queue.get()
+            try:
+                await asyncio.wait_for(conn.websocket.send_json(message), timeout=WS_SEND_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                self._evict(conn, "envio excedeu o timeout")
+                return
+            except Exception as e:
+                logger.error(f"Erro ao enviar mensagem WebSocket: {e}")
+                self._drop(conn)
+                return
+
+    def _evict(self, conn: _Connection, reason: str) -> None:
+        if conn.websocket not in self._conns:
+            return
+        self.stats["evicted"] += 1
+        logger.warning(f"WebSocket lento desconectado: user_id={conn.user_id} ({reason})")
+        self._drop(conn)
+        task = asyncio.ensure_future(self._close_quietly(conn.websocket))
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
+
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket) -> None:
+        try:
+            await asyncio.wait_for(websocket.close(code=1013), timeout=WS_SEND_TIMEOUT_SECONDS)
+        except Exception:
+            pass
+
+    def _unlink(self, conn: _Connection, topic: str) -> None:
+        subscribers = self._topics.get(topic)
+        if subscribers is not None:
+            subscribers.discard(conn)
+            if not subscribers:
+                del self._topics[topic]
+        conn.topics.discard(topic)
+
+    def _drop(self, conn: _Connection) -> None:
+        if self._conns.pop(conn.websocket, None) is None:
+            return
+        for topic in list(conn.topics):
+            self._unlink(conn, topic)
+        sockets = self.active_connections.get(conn.user_id)
+        if sockets is not None:
+            if conn.websocket in sockets:
+                sockets.remove(conn.websocket)
+            if not sockets:
+                del self.active_connections[conn.user_id]
+        if conn.writer is not None and conn.writer is not _current_task():
+            conn.writer.cancel()
+
+
+_closing: set = set()
+
+
+def _current_task() -> Optional[asyncio.Task]:
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
 
 
 class ActiveSessionsTracker:
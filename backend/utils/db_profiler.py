@@ -0,0 +1,269 @@
+"""
+Profiler de queries MongoDB por requisição (opt-in) — Out/2026.
+
+N+1 (um `find_one` por aluno nas rotas de PDF, um `await` por registro no
+salvamento de frequência) só aparecia depois de reclamação em produção.
+Com `DB_PROFILER_ENABLED=true`, cada requisição HTTP ganha um `RequestProfile`
+(contextvar) que o `ProfilerCommandListener` — registrado no
+`AsyncIOMotorClient`, como o listener de utils/metrics — alimenta com:
+
+  - nº de queries e tempo total de banco;
+  - contagem por coleção;
+  - FORMATO de cada query (`students.find {id:?}`: valores viram `?`) —
+    o mesmo formato repetido >= DB_PROFILER_REPEAT_THRESHOLD vezes numa
+    requisição é suspeita de N+1.
+
+No fim da requisição (`DbProfilerMiddleware`) o perfil é agregado por
+TEMPLATE de rota e, se passar de DB_PROFILER_SLOW_DB_MS /
+DB_PROFILER_MAX_QUERIES ou tiver formato repetido, vira um WARNING com os
+formatos mais repetidos. `top_endpoints()` alimenta
+`GET /api/admin/observability/db-profile`.
+
+Desligado (default), o listener só faz um `contextvar.get()` por comando.
+Instance-local, como os demais snapshots do painel admin.
+"""
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from pymongo import monitoring
+
+from utils.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+DB_PROFILER_ENABLED = os.environ.get("DB_PROFILER_ENABLED", "false").lower() in ("1", "true", "yes")
+DB_PROFILER_SLOW_DB_MS = float(os.environ.get("DB_PROFILER_SLOW_DB_MS", "500"))
+DB_PROFILER_MAX_QUERIES = int(os.environ.get("DB_PROFILER_MAX_QUERIES", "50"))
+DB_PROFILER_REPEAT_THRESHOLD = int(os.environ.get("DB_PROFILER_REPEAT_THRESHOLD", "10"))
+
+_SHAPES_PER_ENDPOINT = 20
+
+# comando → campo com o filtro (ou função que o extrai)
+_FILTER_FIELDS = {
+    "find": lambda c: c.get("filter"),
+    "count": lambda c: c.get("query"),
+    "distinct": lambda c: c.get("query"),
+    "findAndModify": lambda c: c.get("query"),
+    "update": lambda c: (c.get("updates") or [{}])[0].get("q"),
+    "delete": lambda c: (c.get("deletes") or [{}])[0].get("q"),
+    "aggregate": lambda c: next((s["$match"] for s in c.get("pipeline") or [] if "$match" in s), None),
+    "insert": lambda c: None,
+}
+
+
+def _shape(value: Any, depth: int = 0) -> str:
+    if depth > 4:
+        return "…"
+    if isinstance(value, dict):
+        return "{" + ",".join(f"{k}:{_shape(v, depth + 1)}" for k, v in sorted(value.items())) + "}"
+    if isinstance(value, (list, tuple)):
+        if value and isinstance(value[0], dict):
+            return "[" + _shape(value[0], depth + 1) + "]"
+        return "[?]"
+    return "?"
+
+
+def query_shape(command_name: str, command: dict) -> Optional[str]:
+    """`<coleção>.<comando> <filtro sem valores>`; None para comandos que não são query."""
+    extract = _FILTER_FIELDS.get(command_name)
+    if extract is None:
+        return None
+    collection = command.get(command_name)
+    if not isinstance(collection, str):
+        return None
+    try:
+        flt = extract(command)
+    except Exception:
+        flt = None
+    shape = f"{collection}.{command_name}"
+    if flt:
+        shape += " " + _shape(flt)
+    return shape[:300]
+
+
+class RequestProfile:
+    __slots__ = ("queries", "db_ms", "by_collection", "shapes", "_pending", "_lock")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.by_collection: Counter = Counter()
+        self.shapes: Counter = Counter()
+        self._pending: Dict[tuple, str] = {}
+        self._lock = threading.Lock()  # o Motor dispara o listener em threads do executor
+
+    def repeated_shapes(self, threshold: Optional[int] = None) -> List[tuple]:
+        threshold = threshold or DB_PROFILER_REPEAT_THRESHOLD
+        return [(s, n) for s, n in self.shapes.most_common() if n >= threshold]
+
+
+_profile: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar(
+    "sigesc_db_profile", default=None
+)
+
+
+class ProfilerCommandListener(monitoring.CommandListener):
+    def started(self, event) -> None:
+        profile = _profile.get()
+        if profile is None:
+            return
+        shape = query_shape(event.command_name, event.command)
+        if shape is None:
+            return
+        with profile._lock:
+            profile._pending[(event.connection_id, event.request_id)] = shape
+
+    def _finish(self, event) -> None:
+        profile = _profile.get()
+        if profile is None:
+            return
+        with profile._lock:
+            profile.db_ms += event.duration_micros / 1000
+            shape = profile._pending.pop((event.connection_id, event.request_id), None)
+            if shape is None:
+                return  # getMore/killCursors/hello: só o tempo
+            profile.queries += 1
+            profile.shapes[shape] += 1
+            profile.by_collection[shape.split(".", 1)[0]] += 1
+
+    def succeeded(self, event) -> None:
+        self._finish(event)
+
+    def failed(self, event) -> None:
+        self._finish(event)
+
+
+profiler_command_listener = ProfilerCommandListener()
+
+
+# ============================================================================
+# Agregação por endpoint
+# ============================================================================
+
+_endpoints: Dict[str, dict] = {}
+_endpoints_lock = threading.Lock()
+_since = datetime.now(timezone.utc).isoformat()
+
+
+def _new_endpoint() -> dict:
+    return {
+        "requests": 0,
+        "db_ms_total": 0.0,
+        "db_ms_max": 0.0,
+        "queries_total": 0,
+        "queries_max": 0,
+        "flagged_requests": 0,
+        "n_plus_one_requests": 0,
+        "by_collection": Counter(),
+        "repeated_shapes": Counter(),
+    }
+
+
+def record_request(endpoint: str, profile: RequestProfile, elapsed_ms: float) -> Optional[str]:
+    """Agrega o perfil e devolve o motivo do alerta (ou None)."""
+    repeated = profile.repeated_shapes()
+    reasons = []
+    if profile.db_ms >= DB_PROFILER_SLOW_DB_MS:
+        reasons.append(f"db_ms={profile.db_ms:.0f}")
+    if profile.queries >= DB_PROFILER_MAX_QUERIES:
+        reasons.append(f"queries={profile.queries}")
+    if repeated:
+        reasons.append("n+1")
+    with _endpoints_lock:
+        e = _endpoints.setdefault(endpoint, _new_endpoint())
+        e["requests"] += 1
+        e["db_ms_total"] += profile.db_ms
+        e["db_ms_max"] = max(e["db_ms_max"], profile.db_ms)
+        e["queries_total"] += profile.queries
+        e["queries_max"] = max(e["queries_max"], profile.queries)
+        e["by_collection"].update(profile.by_collection)
+        if reasons:
+            e["flagged_requests"] += 1
+        if repeated:
+            e["n_plus_one_requests"] += 1
+            e["repeated_shapes"].update(dict(repeated))
+            if len(e["repeated_shapes"]) > _SHAPES_PER_ENDPOINT:
+                e["repeated_shapes"] = Counter(dict(e["repeated_shapes"].most_common(_SHAPES_PER_ENDPOINT)))
+    if not reasons:
+        return None
+    reason = ", ".join(reasons)
+    logger.warning(
+        f"[db_profiler] {endpoint}: {reason} (total {elapsed_ms:.0f}ms, "
+        f"{profile.queries} queries, {profile.db_ms:.0f}ms de banco) "
+        f"repetidas={repeated[:3]} coleções={dict(profile.by_collection.most_common(5))}"
+    )
+    return reason
+
+
+def top_endpoints(limit: int = 10, order_by: str = "db_ms_total") -> dict:
+    """Endpoints mais caros em tempo de banco (ou `queries_total`, `db_ms_avg`…)."""
+    with _endpoints_lock:
+        rows = []
+        for endpoint, e in _endpoints.items():
+            req = e["requests"] or 1
+            rows.append({
+                "endpoint": endpoint,
+                "requests": e["requests"],
+                "db_ms_total": round(e["db_ms_total"], 1),
+                "db_ms_avg": round(e["db_ms_total"] / req, 2),
+                "db_ms_max": round(e["db_ms_max"], 1),
+                "queries_total": e["queries_total"],
+                "queries_avg": round(e["queries_total"] / req, 2),
+                "queries_max": e["queries_max"],
+                "flagged_requests": e["flagged_requests"],
+                "n_plus_one_requests": e["n_plus_one_requests"],
+                "by_collection": dict(e["by_collection"].most_common(5)),
+                "repeated_shapes": [
+                    {"shape": s, "count": n} for s, n in e["repeated_shapes"].most_common(5)
+                ],
+            })
+    if rows and order_by not in rows[0]:
+        order_by = "db_ms_total"
+    rows.sort(key=lambda r: r[order_by], reverse=True)
+    return {
+        "enabled": DB_PROFILER_ENABLED,
+        "since": _since,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "mode": "instance-local",
+        "thresholds": {
+            "slow_db_ms": DB_PROFILER_SLOW_DB_MS,
+            "max_queries": DB_PROFILER_MAX_QUERIES,
+            "repeat_threshold": DB_PROFILER_REPEAT_THRESHOLD,
+        },
+        "order_by": order_by,
+        "endpoints": rows[:limit],
+    }
+
+
+def reset_for_tests() -> None:
+    with _endpoints_lock:
+        _endpoints.clear()
+
+
+class DbProfilerMiddleware:
+    """ASGI puro: um `RequestProfile` por requisição HTTP (se habilitado)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not DB_PROFILER_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        profile = RequestProfile()
+        token = _profile.set(profile)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _profile.reset(token)
+            endpoint = f"{scope.get('method', 'GET')} {route_template(scope)}"
+            record_request(endpoint, profile, (time.perf_counter() - t0) * 1000)
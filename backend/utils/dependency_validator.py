@@ -27,14 +27,29 @@ Uso:
         course_id=course_id,
         tenant_id=current_user.get("mantenedora_id"),
     )
+
+Gravação de vários registros (frequência da turma, lote de notas) — [Out/2026]:
+    deps = await fetch_dependencies(current_db, [r.dependency_id for r in records])
+    for r in records:
+        if r.dependency_id:
+            check_dependency_link(deps.get(r.dependency_id), dependency_id=r.dependency_id, ...)
 """
 from __future__ import annotations
 
-from typing import Optional
+from typing import Iterable, Optional
 
 from fastapi import HTTPException
 
 
+async def fetch_dependencies(db, dependency_ids: Iterable[Optional[str]]) -> dict[str, dict]:
+    """Dependências referenciadas por um lote, em UMA query `$in` (id → doc)."""
+    ids = sorted({d for d in dependency_ids if d})
+    if not ids:
+        return {}
+    docs = await db.student_dependencies.find({"id": {"$in": ids}}, {"_id": 0}).to_list(None)
+    return {d["id"]: d for d in docs}
+
+
 async def validate_dependency_link(
     *,
     db,
@@ -61,6 +76,32 @@ async def validate_dependency_link(
     dep = await db.student_dependencies.find_one(
         {"id": dependency_id}, {"_id": 0}
     )
+    return check_dependency_link(
+        dep,
+        dependency_id=dependency_id,
+        student_id=student_id,
+        class_id=class_id,
+        course_id=course_id,
+        tenant_id=tenant_id,
+    )
+
+
+def check_dependency_link(
+    dep: Optional[dict],
+    *,
+    dependency_id: str,
+    student_id: str,
+    class_id: str,
+    course_id: Optional[str],
+    tenant_id: Optional[str],
+) -> dict:
+    """Mesmas regras de `validate_dependency_link` sobre um doc já carregado
+    (ex.: por `fetch_dependencies`). `dep=None` = dependência inexistente."""
+    if not dependency_id:
+        raise HTTPException(
+            status_code=422,
+            detail={"code": "DEPENDENCY_COHERENCE_EMPTY", "message": "dependency_id vazio."},
+        )
     if not dep:
         raise HTTPException(
             status_code=422,
@@ -0,0 +1,40 @@
+"""Parsing do header HTTP `Range` (RFC 9110 §14) — Out/2026.
+
+Só a forma de faixa única `bytes=a-b` / `bytes=a-` / `bytes=-n`, que é o que
+navegadores e visualizadores de PDF enviam. Multi-faixa cai no download
+inteiro (200), como o RFC permite.
+"""
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+
+class RangeNotSatisfiable(Exception):
+    """Faixa sintaticamente válida mas fora do arquivo → 416."""
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) inclusivos, ou None para responder o arquivo inteiro."""
+    if not header or not header.strip().lower().startswith("bytes="):
+        return None
+    spec = header.split("=", 1)[1].strip()
+    if "," in spec or "-" not in spec:
+        return None
+    first, last = (p.strip() for p in spec.split("-", 1))
+    try:
+        if first == "":
+            if not last:
+                return None
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable(header)
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    if start < 0 or end < start:
+        return None
+    return start, min(end, size - 1)
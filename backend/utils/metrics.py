@@ -0,0 +1,377 @@
+"""
+Registro unificado de métricas + exportação Prometheus — Out/2026.
+
+Até aqui cada silo tinha o seu formato: `MetricChannel` (observability.py),
+a telemetria do autocomplete (students_search.py) e `MigMonitoring`
+(mig/core/monitoring.py) — todos instance-local, visíveis só pelo
+`/api/admin/observability/*` da réplica que atendeu. Este módulo mantém
+contadores/gauges/histogramas CUMULATIVOS por processo e os expõe em
+`GET /metrics` (text format 0.0.4): o Prometheus raspa cada réplica, e a
+agregação/p95 entre réplicas sai de `histogram_quantile(... sum by (le) ...)`.
+
+Os silos antigos continuam existindo (janela de 15min para o painel admin);
+eles apenas também alimentam este registro.
+
+Também aqui:
+  - `MetricsMiddleware` (ASGI puro): latência, status e tempo de Mongo por
+    rota — o label é o TEMPLATE da rota (`/api/students/{student_id}`),
+    nunca o path cru, para a cardinalidade ficar limitada;
+  - `MongoCommandListener`: listener de comandos do pymongo que soma a
+    duração dos comandos no acumulador da requisição corrente (o Motor copia
+    o contexto para a thread do executor, então o contextvar chega lá).
+
+Sem dependência nova: `prometheus_client` não está nos requirements e o
+formato de texto é simples.
+"""
+from __future__ import annotations
+
+import contextvars
+import logging
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "sigesc")
+
+# Buckets em SEGUNDOS (convenção Prometheus).
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Canais vão do autocomplete (ms) ao render job (minutos): uma escala só,
+# para o label `channel` caber num histograma.
+CHANNEL_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                           1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _fmt_value(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: labels esperados {self.labelnames}, recebidos {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, Sequence[str], Sequence[str], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {_escape(self.help)}", f"# TYPE {self.name} {self.kind}"]
+        for name, lnames, lvalues, value in self.samples():
+            lines.append(f"{name}{_fmt_labels(lnames, lvalues)} {_fmt_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Contador monotônico (o sufixo `_total` faz parte do nome)."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if amount < 0:
+            raise ValueError("Counter só incrementa")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, self.labelnames, key, v) for key, v in sorted(items)]
+
+
+class Gauge(_Metric):
+    """Valor instantâneo; `set_function` lê o valor na hora do scrape."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._fn: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        if self.labelnames:
+            raise ValueError("set_function só para gauge sem labels")
+        self._fn = fn
+
+    def samples(self):
+        if self._fn is not None:
+            try:
+                return [(self.name, (), (), float(self._fn()))]
+            except Exception as e:
+                logger.warning(f"[metrics] gauge {self.name} falhou: {e}")
+                return []
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, self.labelnames, key, v) for key, v in sorted(items)]
+
+
+class Histogram(_Metric):
+    """Histograma cumulativo (`_bucket{le=…}`, `_sum`, `_count`)."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        if "le" in self.labelnames:
+            raise ValueError("'le' é reservado ao histograma")
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[LabelValues, List[float]] = {}  # [count por bucket..., sum]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0]
+            for i, edge in enumerate(self.buckets):
+                if value <= edge:
+                    series[i] += 1
+                    break
+            series[-1] += value
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return int(sum(series[:-1])) if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(k, list(s)) for k, s in self._series.items()]
+        out = []
+        bucket_names = self.labelnames + ("le",)
+        for key, series in sorted(items):
+            cum = 0
+            for edge, n in zip(self.buckets, series[:-1]):
+                cum += n
+                out.append((f"{self.name}_bucket", bucket_names, key + (_fmt_value(edge),), cum))
+            out.append((f"{self.name}_sum", self.labelnames, key, series[-1]))
+            out.append((f"{self.name}_count", self.labelnames, key, cum))
+        return out
+
+
+class MetricsRegistry:
+    """Métricas do processo. `counter/gauge/histogram` são get-or-create."""
+
+    def __init__(self, namespace: str = METRICS_NAMESPACE):
+        self.namespace = namespace
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, labelnames: Sequence[str], **kw) -> _Metric:
+        full = f"{self.namespace}_{name}" if self.namespace else name
+        with self._lock:
+            metric = self._metrics.get(full)
+            if metric is None:
+                metric = self._metrics[full] = cls(full, help, labelnames, **kw)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"métrica {full} já registrada com outro tipo/labels")
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset_for_tests(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ============================================================================
+# Ponte para os silos existentes
+# ============================================================================
+
+def observe_channel(channel: str, duration_ms: float, *, is_error: bool = False,
+                    is_rate_limited: bool = False) -> None:
+    """Chamado por `MetricChannel.record` (e pelo autocomplete)."""
+    REGISTRY.histogram(
+        "channel_latency_seconds", "Latência por canal de observabilidade.",
+        ("channel",), buckets=CHANNEL_LATENCY_BUCKETS,
+    ).observe(duration_ms / 1000, channel=channel)
+    outcome = "rate_limited" if is_rate_limited else "error" if is_error else "ok"
+    REGISTRY.counter(
+        "channel_requests_total", "Eventos por canal de observabilidade e resultado.",
+        ("channel", "outcome"),
+    ).inc(channel=channel, outcome=outcome)
+
+
+def count_event(family: str, event: str, amount: float = 1) -> None:
+    """Contador genérico `<ns>_events_total{family, event}` (MigMonitoring etc.).
+
+    `event` precisa ser de um conjunto FIXO de valores — nada de IDs.
+    """
+    REGISTRY.counter(
+        "events_total", "Contadores de eventos internos por família.", ("family", "event"),
+    ).inc(amount, family=family, event=event)
+
+
+# ============================================================================
+# Tempo de Mongo por requisição
+# ============================================================================
+
+class _MongoTimer:
+    __slots__ = ("seconds", "commands")
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.commands = 0
+
+
+_mongo_timer: contextvars.ContextVar[Optional[_MongoTimer]] = contextvars.ContextVar(
+    "sigesc_mongo_timer", default=None
+)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Soma a duração dos comandos no acumulador da requisição corrente."""
+
+    def _account(self, event) -> None:
+        seconds = event.duration_micros / 1_000_000
+        REGISTRY.histogram(
+            "mongo_command_duration_seconds", "Duração dos comandos MongoDB.", ("command",),
+        ).observe(seconds, command=event.command_name)
+        timer = _mongo_timer.get()
+        if timer is not None:
+            timer.seconds += seconds
+            timer.commands += 1
+
+    def started(self, event) -> None:
+        pass
+
+    def succeeded(self, event) -> None:
+        self._account(event)
+
+    def failed(self, event) -> None:
+        self._account(event)
+
+
+mongo_command_listener = MongoCommandListener()
+
+
+# ============================================================================
+# Middleware HTTP
+# ============================================================================
+
+_UNMATCHED_ROUTE = "<unmatched>"
+
+
+def route_template(scope) -> str:
+    """Template da rota resolvida pelo router (FastAPI grava em scope['route'])."""
+    return getattr(scope.get("route"), "path", None) or _UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """ASGI puro (não bufferiza o corpo): latência, status e Mongo por rota."""
+
+    def __init__(self, app, registry: MetricsRegistry = REGISTRY, skip_paths: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+        self.latency = registry.histogram(
+            "http_request_duration_seconds", "Latência das requisições HTTP por rota.",
+            ("method", "route"),
+        )
+        self.requests = registry.counter(
+            "http_requests_total", "Requisições HTTP por rota e status.",
+            ("method", "route", "status"),
+        )
+        self.mongo = registry.histogram(
+            "http_request_mongo_seconds", "Tempo gasto em comandos MongoDB por requisição.",
+            ("method", "route"),
+        )
+        self.in_progress = registry.gauge("http_requests_in_progress", "Requisições HTTP em andamento.")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        timer = _MongoTimer()
+        token = _mongo_timer.set(timer)
+        self.in_progress.inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            self.in_progress.dec()
+            _mongo_timer.reset(token)
+            template = route_template(scope)
+            method = scope.get("method", "GET")
+            self.latency.observe(elapsed, method=method, route=template)
+            self.mongo.observe(timer.seconds, method=method, route=template)
+            self.requests.inc(method=method, route=template, status=str(status["code"]))
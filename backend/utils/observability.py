@@ -27,6 +27,12 @@ Uso típico:
     snap = diary_metrics.snapshot()
 
 Modo: in-memory, instance-local (replica_aware=False). Roadmap Fase 2 = Redis/Mongo capped.
+
+[Out/2026] `record` também alimenta o registro cumulativo de `utils/metrics`
+(`sigesc_channel_latency_seconds{channel}` / `sigesc_channel_requests_total`),
+exportado em `GET /metrics` — é por lá que se agrega entre réplicas. Labels e
+`bucket_counters` ficam só no snapshot (IDs de turma/curso/tenant estourariam a
+cardinalidade do Prometheus).
 """
 from __future__ import annotations
 
@@ -36,6 +42,8 @@ from collections import Counter
 from datetime import datetime, timezone
 from typing import Optional
 
+from utils.metrics import observe_channel
+
 OBSERVABILITY_WINDOW_MINUTES = 15
 
 
@@ -132,6 +140,7 @@ class MetricChannel:
         if bucket_counters:
             for k, v in bucket_counters.items():
                 b["counters"][k] += v
+        observe_channel(self.name, duration_ms, is_error=is_error, is_rate_limited=is_rate_limited)
 
     # ------------------------------------------------------------------
     def _p_from_hist(self, hist: list[int], pct: float) -> Optional[float]:
@@ -288,3 +297,44 @@ def record_diary_load(
         is_error=is_error,
         is_rate_limited=is_rate_limited,
     )
+
+
+# ============================================================================
+# Canal `render_jobs` (contrato RENDER_JOBS §9)
+# ============================================================================
+render_job_metrics = MetricChannel(
+    "render_jobs",
+    latency_buckets_ms=[250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 120000],
+)
+
+
+def record_render_job(
+    *,
+    duration_ms: float,
+    document_type: str,
+    outcome: str,
+    tenant_id: Optional[str] = None,
+    queue_wait_ms: Optional[float] = None,
+    worker_id: Optional[str] = None,
+) -> None:
+    """Helper canônico para instrumentar a execução de um render job.
+
+    `outcome` ∈ {"completed", "retry_scheduled", "failed_permanent", "failed_no_handler"}.
+    `queue_wait_ms` (requested_at → claim) alimenta o dimensionamento do pool:
+    espera alta com duração baixa = faltam slots; duração alta = falta CPU.
+    """
+    bucket_counters = {f"outcome__{outcome}": 1, f"type__{document_type}": 1}
+    if queue_wait_ms is not None:
+        bucket_counters["queue_wait_ms_sum"] = int(queue_wait_ms)
+        bucket_counters["queue_wait_samples"] = 1
+    render_job_metrics.record(
+        duration_ms=duration_ms,
+        tenant_id=tenant_id,
+        labels={
+            "document_type": document_type,
+            "outcome": outcome,
+            "worker_id": worker_id,
+        },
+        bucket_counters=bucket_counters,
+        is_error=outcome != "completed",
+    )
@@ -10,8 +10,10 @@ ESCOPO MÍNIMO autorizado pelo owner:
 ✅ Retry exponencial básico (3 tentativas: 30s → 2min → 10min)
 ✅ Snapshots imutáveis de template_version e render_engine_version
 
-❌ Worker distribuído / brokers
-❌ Pipeline paralelo
+✅ Pool de workers concorrentes com lease/heartbeat (Out/2026 —
+   ver `services/render_worker.py`)
+
+❌ Brokers externos
 ❌ Prioridade dinâmica
 ❌ Cache multicamada de PDF
 
@@ -23,6 +25,7 @@ histórico, etc.) são registrados via `register_render_handler(document_type, f
 """
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import logging
 from datetime import datetime, timedelta, timezone
@@ -135,6 +138,52 @@ def has_render_handler(document_type: str) -> bool:
     return document_type in _HANDLERS
 
 
+# ===========================================================================
+# Wake-up do worker (in-process, sem broker)
+# ===========================================================================
+class _WakeSignal:
+    """Acorda os slots ociosos do render worker assim que um job entra na fila.
+
+    Sem isso todo job pagava até POLL_INTERVAL_SECONDS de espera ociosa. Os
+    slots limpam o sinal ANTES de tentar o claim e esperam nele quando a fila
+    está vazia — um `notify()` entre os dois passos não se perde.
+    """
+
+    def __init__(self) -> None:
+        self._event = asyncio.Event()
+        self.notifications = 0
+
+    def notify(self) -> None:
+        self.notifications += 1
+        self._event.set()
+
+    def clear(self) -> None:
+        self._event.clear()
+
+    def is_set(self) -> bool:
+        return self._event.is_set()
+
+    async def wait(self) -> None:
+        await self._event.wait()
+
+
+render_wake_signal = _WakeSignal()
+
+
+def notify_render_worker() -> None:
+    """Sinaliza que há job processável (enqueue, retry manual, change stream)."""
+    render_wake_signal.notify()
+
+
+async def insert_render_job(db, job: dict) -> None:
+    """Caminho único de enqueue: persiste o job `pending` e acorda o worker.
+
+    Não muta `job` (Motor injetaria `_id`).
+    """
+    await db.document_render_jobs.insert_one(dict(job))
+    notify_render_worker()
+
+
 # ===========================================================================
 # Mongo: índices + busca
 # ===========================================================================
@@ -145,6 +194,10 @@ async def ensure_indexes(db) -> None:
     await db.document_render_jobs.create_index([("source_snapshot_id", 1), ("document_type", 1)], background=True)
     await db.document_render_jobs.create_index("mantenedora_id", background=True)
     await db.document_render_jobs.create_index([("requested_at", -1)], background=True)
+    # Pool de workers: claim ordenado por requested_at + reaper de leases vencidos.
+    await db.document_render_jobs.create_index([("status", 1), ("requested_at", 1)], background=True)
+    await db.document_render_jobs.create_index([("status", 1), ("lease_expires_at", 1)], background=True)
+    await db.document_render_jobs.create_index([("status", 1), ("completed_at", -1)], background=True)
 
 
 async def find_existing_job(
@@ -0,0 +1,370 @@
+"""
+Índice de busca de alunos em memória (trigramas + prefixos) — Out/2026.
+
+O autocomplete fazia regex ancorada em `nome_busca` e, com poucos resultados,
+um `$regex` SEM âncora (varredura de todo o tenant) a cada tecla. Aqui cada
+tenant vira uma partição em memória:
+
+  - nomes normalizados (`normalize_for_search(full_name)`) e os restos do nome
+    a partir de cada palavra, em listas ORDENADAS (início do nome / de palavra
+    = uma faixa por bisect, já em ordem alfabética);
+  - trigramas do nome → ids (trecho no meio do nome);
+  - prefixos de 3 dígitos do CPF → ids (busca por CPF sem expor o número:
+    a resposta continua com `mask_cpf`).
+
+Ranking por qualidade do casamento: CPF / início do nome (0) < início de uma
+palavra (1) < trecho no meio do nome (2, só com q >= 4 — mesma regra do antigo
+fallback contains). Empate → ordem alfabética. Uma faixa de ranking só é lida
+se as anteriores não preencheram o `limit`; dentro dela, `heapq.nsmallest`.
+
+Coerência:
+  - partições vivem na região de cache `students:search_index` (TTL
+    STUDENT_SEARCH_INDEX_TTL_SECONDS, build single-flight, tag do tenant). O
+    build roda em thread (`asyncio.to_thread`) e, depois do TTL ou de uma
+    invalidação, a partição anterior continua servindo até a nova entrar;
+  - create/update/delete do router de alunos atualizam a partição local
+    incrementalmente e derrubam a mesma partição nas outras réplicas
+    (barramento de invalidação) — lá ela é reconstruída no próximo uso;
+  - escritas fora do router (transferências, scripts) só aparecem após o TTL.
+    Por isso o chamador confirma os ids escolhidos no Mongo com o filtro real.
+
+Tenants acima de STUDENT_SEARCH_INDEX_MAX_DOCS não são indexados (o chamador
+usa a busca por regex).
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import os
+import re
+from bisect import bisect_left, insort
+from typing import Iterable, Optional
+
+from text_utils import normalize_for_search
+from utils.cache import get_region, tenant_tag
+
+logger = logging.getLogger(__name__)
+
+STUDENT_SEARCH_INDEX_TTL_SECONDS = float(os.environ.get("STUDENT_SEARCH_INDEX_TTL_SECONDS", "300"))
+STUDENT_SEARCH_INDEX_MAX_DOCS = int(os.environ.get("STUDENT_SEARCH_INDEX_MAX_DOCS", "60000"))
+
+CONTAINS_MIN_LEN = 4      # trecho no meio do nome só a partir de 4 caracteres
+CPF_MIN_DIGITS = 3
+
+RANK_PREFIX = 0
+RANK_WORD_PREFIX = 1
+RANK_CONTAINS = 2
+
+_FIELDS = ("full_name", "cpf", "school_id", "class_id", "status")
+_FILTER_POSTINGS = ("school_id", "class_id")
+FILTERED_SCAN_MAX = 2000  # filtro com até isto de alunos: ranqueia o conjunto filtrado
+_PROJECTION = {"_id": 0, "id": 1, **{f: 1 for f in _FIELDS}}
+
+_region = get_region(
+    "students:search_index",
+    max_entries=256,
+    default_ttl=STUDENT_SEARCH_INDEX_TTL_SECONDS,
+)
+
+
+def _digits(value: Optional[str]) -> str:
+    return re.sub(r"\D", "", value or "")
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _word_tails(name: str) -> set:
+    """Restos do nome a partir de cada palavra após a primeira ("ana clara souza"
+    → "clara souza", "souza"): `tail.startswith(q)` ⇔ `" " + q in name`."""
+    return {name[i + 1:] for i, c in enumerate(name) if c == " " and name[i + 1:]}
+
+
+def _add(postings: dict, key: str, sid: str) -> None:
+    postings.setdefault(key, set()).add(sid)
+
+
+def _discard(postings: dict, key: str, sid: str) -> None:
+    ids = postings.get(key)
+    if ids is not None:
+        ids.discard(sid)
+        if not ids:
+            del postings[key]
+
+
+def _sorted_remove(entries: list, item: tuple) -> None:
+    i = bisect_left(entries, item)
+    if i < len(entries) and entries[i] == item:
+        del entries[i]
+
+
+def _range_size(entries: list, prefix: str) -> int:
+    return bisect_left(entries, (prefix + "\U0010ffff",)) - bisect_left(entries, (prefix,))
+
+
+def _starting_with(entries: list, prefix: str):
+    """Entradas ordenadas cujo primeiro campo começa com `prefix` (faixa contígua)."""
+    for i in range(bisect_left(entries, (prefix,)), len(entries)):
+        if not entries[i][0].startswith(prefix):
+            return
+        yield entries[i]
+
+
+class TenantNameIndex:
+    """Partição de um tenant: `docs` (id → campos), listas ordenadas e invertidas.
+
+    `_by_name` [(nome, id)] e `_by_word` [(resto a partir de uma palavra, nome,
+    id)] ficam ordenados: início do nome / de palavra é uma faixa por bisect,
+    já em ordem alfabética. Cada faixa de ranking só é lida se as anteriores
+    não preencheram o `limit` — 'ma' em 60k alunos para no 10º "maria…".
+    """
+
+    def __init__(self, docs: Iterable[dict] = ()):
+        self.docs: dict[str, dict] = {}
+        self._names: dict[str, str] = {}
+        self._grams: dict[str, set] = {}
+        self._cpf: dict[str, set] = {}
+        self._by_attr: dict[tuple, set] = {}
+        self._by_name: list = []
+        self._by_word: list = []
+        for doc in docs:
+            self._put(doc, bulk=True)
+        self._by_name.sort()
+        self._by_word.sort()
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def _keys(self, sid: str):
+        name = self._names.get(sid, "")
+        cpf = _digits(self.docs.get(sid, {}).get("cpf"))
+        return name, _trigrams(name), _word_tails(name), (cpf[:CPF_MIN_DIGITS] if len(cpf) >= CPF_MIN_DIGITS else None)
+
+    def remove(self, sid: str) -> None:
+        if sid not in self.docs:
+            return
+        name, grams, tails, cpf3 = self._keys(sid)
+        for g in grams:
+            _discard(self._grams, g, sid)
+        _sorted_remove(self._by_name, (name, sid))
+        for t in tails:
+            _sorted_remove(self._by_word, (t, name, sid))
+        if cpf3:
+            _discard(self._cpf, cpf3, sid)
+        for f in _FILTER_POSTINGS:
+            _discard(self._by_attr, (f, self.docs[sid].get(f)), sid)
+        del self.docs[sid]
+        del self._names[sid]
+
+    def upsert(self, doc: dict) -> None:
+        """Insere/atualiza um aluno. Campos ausentes em `doc` mantêm o valor indexado."""
+        self._put(doc, bulk=False)
+
+    def _put(self, doc: dict, *, bulk: bool) -> None:
+        sid = doc.get("id")
+        if not sid:
+            return
+        merged = {**self.docs.get(sid, {}), **{f: doc[f] for f in _FIELDS if f in doc}}
+        self.remove(sid)
+        self.docs[sid] = merged
+        self._names[sid] = normalize_for_search(merged.get("full_name")) or ""
+        name, grams, tails, cpf3 = self._keys(sid)
+        for g in grams:
+            _add(self._grams, g, sid)
+        # Carga inicial: append + um sort no fim; incremental: insort.
+        put = list.append if bulk else insort
+        put(self._by_name, (name, sid))
+        for t in tails:
+            put(self._by_word, (t, name, sid))
+        if cpf3:
+            _add(self._cpf, cpf3, sid)
+        for f in _FILTER_POSTINGS:
+            if merged.get(f):
+                _add(self._by_attr, (f, merged[f]), sid)
+
+    def _rank(self, q_norm: str, name: str) -> Optional[int]:
+        if name.startswith(q_norm):
+            return RANK_PREFIX
+        if " " + q_norm in name:
+            return RANK_WORD_PREFIX
+        if len(q_norm) >= CONTAINS_MIN_LEN and q_norm in name:
+            return RANK_CONTAINS
+        return None
+
+    def _scan_names(self, limit: int, match) -> list:
+        """Primeiros `limit` (nome, id) em ordem alfabética que satisfazem `match`."""
+        out = []
+        for name, sid in self._by_name:
+            if match(name, sid):
+                out.append((name, sid))
+                if len(out) >= limit:
+                    break
+        return out
+
+    def search(self, q_norm: str, *, limit: int, filters: Optional[dict] = None) -> list:
+        """[(rank, id)] dos melhores `limit` alunos para `q_norm` (já normalizado)."""
+        filters = {k: v for k, v in (filters or {}).items() if v}
+        docs, names = self.docs, self._names
+
+        def ok(sid: str) -> bool:
+            return not filters or all(docs[sid].get(k) == v for k, v in filters.items())
+
+        q_digits = _digits(q_norm)
+        if len(q_digits) >= CPF_MIN_DIGITS and not re.sub(r"[\d.\-\s/]", "", q_norm):
+            best = heapq.nsmallest(limit, (
+                (names[sid], sid) for sid in self._cpf.get(q_digits[:CPF_MIN_DIGITS], ())
+                if _digits(docs[sid].get("cpf")).startswith(q_digits) and ok(sid)
+            ))
+            return [(RANK_PREFIX, sid) for _, sid in best]
+
+        # Filtro por escola/turma: o conjunto filtrado costuma ser menor que
+        # qualquer faixa do nome — ranqueia só ele.
+        pools = [self._by_attr.get((f, filters[f]), set()) for f in _FILTER_POSTINGS if f in filters]
+        if pools and len(min(pools, key=len)) <= FILTERED_SCAN_MAX:
+            scored = ((self._rank(q_norm, names[sid]), names[sid], sid) for sid in min(pools, key=len))
+            best = heapq.nsmallest(limit, (x for x in scored if x[0] is not None and ok(x[2])))
+            return [(rank, sid) for rank, _, sid in best]
+
+        n = max(len(self._by_name), 1)
+        out: list = []
+        for _, sid in _starting_with(self._by_name, q_norm):
+            if ok(sid):
+                out.append((RANK_PREFIX, sid))
+                if len(out) >= limit:
+                    return out
+        seen = {sid for _, sid in out}
+        need = limit - len(out)
+
+        # Início de palavra: a faixa ordenada por "resto do nome" não está em ordem
+        # alfabética de nome. Faixa pequena → nsmallest nela; faixa grande (palavra
+        # comum) → varre os nomes em ordem e para no `need`-ésimo (~need·n/faixa).
+        word_q = " " + q_norm
+        hits = _range_size(self._by_word, q_norm)
+        if hits * hits > need * n:
+            best = self._scan_names(need, lambda name, sid: word_q in name and sid not in seen and ok(sid))
+        else:
+            best = heapq.nsmallest(need, {
+                (name, sid) for _, name, sid in _starting_with(self._by_word, q_norm)
+                if sid not in seen and ok(sid)
+            })
+        out.extend((RANK_WORD_PREFIX, sid) for _, sid in best)
+        if len(out) >= limit or len(q_norm) < CONTAINS_MIN_LEN:
+            return out
+        seen.update(sid for _, sid in best)
+        need = limit - len(out)
+
+        # Trecho: mesma escolha, estimando pela menor lista de trigramas.
+        postings = sorted((self._grams.get(g, set()) for g in _trigrams(q_norm)), key=len)
+        if not postings or not postings[0]:
+            return out
+        if len(postings[0]) * len(postings[0]) > need * n:
+            best = self._scan_names(need, lambda name, sid: q_norm in name and sid not in seen and ok(sid))
+        else:
+            best = heapq.nsmallest(need, (
+                (names[sid], sid) for sid in set.intersection(*postings)
+                if sid not in seen and q_norm in names[sid] and ok(sid)
+            ))
+        out.extend((RANK_CONTAINS, sid) for _, sid in best)
+        return out
+
+
+def _key(db, tenant_id: str) -> str:
+    return f"{getattr(db, 'name', 'db')}|{tenant_id}"
+
+
+# Última partição construída por chave: continua servindo (e recebendo as
+# escritas incrementais) enquanto a próxima é construída após TTL/invalidação.
+_serving: dict[str, TenantNameIndex] = {}
+# Escritas que chegaram durante um build (reaplicadas na partição nova).
+_building: dict[str, list] = {}
+_refreshing: set = set()
+
+
+async def _build_index(db, tenant_id: str, key: str):
+    query = {"mantenedora_id": tenant_id}
+    if await db.students.count_documents(query) > STUDENT_SEARCH_INDEX_MAX_DOCS:
+        _serving.pop(key, None)
+        return False  # grande demais: lembra a decisão até o TTL
+    _building[key] = []
+    try:
+        docs = await db.students.find(query, _PROJECTION).to_list(None)
+        # ~1-2s em tenants grandes: fora do event loop.
+        index = await asyncio.to_thread(TenantNameIndex, docs)
+        for op, doc in _building[key]:
+            _apply(index, op, doc)
+    finally:
+        _building.pop(key, None)
+    _serving[key] = index
+    return index
+
+
+def _load(db, tenant_id: str, key: str):
+    return _region.get_or_load(key, lambda: _build_index(db, tenant_id, key), tags=(tenant_tag(tenant_id),))
+
+
+async def _refresh(db, tenant_id: str, key: str) -> None:
+    try:
+        await _load(db, tenant_id, key)
+    except Exception as e:
+        logger.warning(f"[student_search_index] falha ao reindexar tenant {tenant_id}: {e}")
+
+
+async def get_tenant_index(db, tenant_id: Optional[str]) -> Optional[TenantNameIndex]:
+    """Partição do tenant (construída sob demanda). None = usar a busca no Mongo.
+
+    Expirada/invalidada com uma partição anterior em mãos: devolve a anterior
+    e reconstrói em background (single-flight da região).
+    """
+    if not tenant_id:
+        return None
+    key = _key(db, tenant_id)
+    index = _region.get(key)
+    if index is None and key in _serving:
+        if key not in _building:
+            task = asyncio.create_task(_refresh(db, tenant_id, key))
+            _refreshing.add(task)
+            task.add_done_callback(_refreshing.discard)
+        return _serving[key]
+    if index is None:
+        try:
+            index = await _load(db, tenant_id, key)
+        except Exception as e:
+            logger.warning(f"[student_search_index] falha ao indexar tenant {tenant_id}: {e}")
+            return None
+    return index if isinstance(index, TenantNameIndex) else None
+
+
+def _apply(index: TenantNameIndex, op: str, doc: dict) -> None:
+    if op == "upsert":
+        index.upsert(doc)
+    else:
+        index.remove(doc.get("id"))
+
+
+def _note(db, doc: Optional[dict], op: str) -> None:
+    if not doc or not doc.get("mantenedora_id"):
+        return
+    key = _key(db, doc["mantenedora_id"])
+    index = _serving.get(key)
+    if index is not None:
+        _apply(index, op, doc)
+    if key in _building:
+        _building[key].append((op, doc))
+    _region.publish_keys(key)
+
+
+def note_student_saved(db, doc: Optional[dict]) -> None:
+    """Aplica create/update na partição local carregada e derruba a das outras réplicas."""
+    _note(db, doc, "upsert")
+
+
+def note_student_deleted(db, doc: Optional[dict]) -> None:
+    _note(db, doc, "remove")
+
+
+def _reset_for_tests() -> None:
+    _region.local.clear()
+    _serving.clear()
+    _building.clear()
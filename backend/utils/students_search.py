@@ -31,13 +31,16 @@ from typing import Optional, Any
 
 from fastapi import HTTPException
 
+from utils.cache import get_region, tenant_tag
+from utils.metrics import count_event, observe_channel
+
 logger = logging.getLogger(__name__)
 
 # ============================================================================
 # Constantes
 # ============================================================================
 CACHE_TTL_SECONDS = 5         # TTL curto: autocomplete muda a cada keystroke
-CACHE_MAX_ENTRIES = 1000      # cap simples; LRU-like via timestamp
+CACHE_MAX_ENTRIES = 1000      # cap da região LRU (utils.cache)
 
 RATE_LIMIT_MAX_CALLS = 30
 RATE_LIMIT_WINDOW_SECONDS = 60
@@ -55,15 +58,23 @@ TOP_N_TENANTS = 10
 # ============================================================================
 # Cache server-side (in-memory, TTL deslizante)
 # ============================================================================
-_cache: dict[str, tuple[float, Any]] = {}
-_cache_hits = 0  # contadores globais (também alimentam o bucket atual)
-_cache_misses = 0
-
-
 def _now() -> float:
     return time.monotonic()
 
 
+# [Out/2026] Região da camada única de cache (LRU, tags por tenant). `_cache`
+# continua expondo o armazenamento `key -> (expires_at, value)` da região.
+_cache_region = get_region(
+    "students_autocomplete",
+    max_entries=CACHE_MAX_ENTRIES,
+    default_ttl=CACHE_TTL_SECONDS,
+    clock=_now,
+)
+_cache = _cache_region.local._data
+_cache_hits = 0  # contadores globais (também alimentam o bucket atual)
+_cache_misses = 0
+
+
 def _normalize_filters_hash(filters: Optional[dict]) -> str:
     """Hash estável dos filtros (json.dumps sort_keys=True)."""
     if not filters:
@@ -83,13 +94,8 @@ def cache_get(key: str) -> Optional[Any]:
     renovar mantém entradas obsoletas no quente). Apenas valida expiração.
     """
     global _cache_hits, _cache_misses
-    entry = _cache.get(key)
-    if entry is None:
-        _cache_misses += 1
-        return None
-    expires_at, value = entry
-    if _now() > expires_at:
-        _cache.pop(key, None)
+    value = _cache_region.get(key)
+    if value is None:
         _cache_misses += 1
         return None
     _cache_hits += 1
@@ -97,17 +103,8 @@ def cache_get(key: str) -> Optional[Any]:
 
 
 def cache_set(key: str, value: Any) -> None:
-    if len(_cache) >= CACHE_MAX_ENTRIES:
-        # Evict expirados primeiro
-        now = _now()
-        expired = [k for k, (exp, _) in _cache.items() if exp <= now]
-        for k in expired:
-            _cache.pop(k, None)
-        # Se ainda lotado, descarta o mais antigo (timestamp == expires_at - TTL)
-        if len(_cache) >= CACHE_MAX_ENTRIES:
-            oldest = min(_cache.items(), key=lambda kv: kv[1][0])
-            _cache.pop(oldest[0], None)
-    _cache[key] = (_now() + CACHE_TTL_SECONDS, value)
+    tenant_id = key.split("|", 1)[0]
+    _cache_region.set(key, value, CACHE_TTL_SECONDS, tags=(tenant_tag(None if tenant_id == "none" else tenant_id),))
 
 
 def _cache_memory_estimate_kb() -> float:
@@ -269,6 +266,14 @@ def record_autocomplete_call(
     if tenant_id:
         bucket["tenants"][tenant_id] += 1
 
+    # Registro cumulativo exportado em GET /metrics (utils/metrics).
+    observe_channel("autocomplete", duration_ms)
+    count_event("autocomplete", "cache_hit" if cache_hit else "cache_miss")
+    if used_fallback:
+        count_event("autocomplete", "fallback")
+    if result_count == 0:
+        count_event("autocomplete", "empty")
+
     # Log estruturado periódico (cada 100 chamadas neste bucket)
     if bucket["requests"] % 100 == 0:
         avg = bucket["latency_sum_ms"] / max(bucket["requests"], 1)
@@ -386,7 +391,8 @@ def get_observability_snapshot() -> dict:
 def _reset_all_for_tests() -> None:
     """Limpa estado in-memory. SOMENTE para tests. Não usar em runtime."""
     global _cache_hits, _cache_misses, _rate_limited_total
-    _cache.clear()
+    _cache_region.local.clear()
+    _cache_region.reset_stats()
     _rate_buckets.clear()
     _buckets.clear()
     _cache_hits = 0
@@ -0,0 +1,137 @@
+"""
+Backbone de pub/sub do WebSocket entre réplicas — Out/2026.
+
+Cada réplica só tem os sockets dos usuários conectados NELA. Para uma
+notificação chegar a quem está em outro worker/pod, `ConnectionManager.publish`
+entrega localmente e publica o envelope no backbone; as outras réplicas leem e
+entregam aos seus sockets (a origem ignora o próprio envelope).
+
+Backends (env WS_PUBSUB_BACKEND):
+  local  — stand-in em processo (default; um único worker, dev/testes):
+           publicar não sai da réplica.
+  mongo  — capped collection `ws_pubsub` (WS_PUBSUB_CAPPED_BYTES) lida com
+           cursor tailable/await: entrega em ~ms sem polling e sem crescer
+           (o capped descarta os mais antigos).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+
+from utils.cache import INSTANCE_ID
+
+logger = logging.getLogger(__name__)
+
+WS_PUBSUB_BACKEND = os.environ.get("WS_PUBSUB_BACKEND", "local").lower()
+WS_PUBSUB_COLLECTION = os.environ.get("WS_PUBSUB_COLLECTION", "ws_pubsub")
+WS_PUBSUB_CAPPED_BYTES = int(os.environ.get("WS_PUBSUB_CAPPED_BYTES", str(16 * 1024 * 1024)))
+WS_PUBSUB_RETRY_SECONDS = float(os.environ.get("WS_PUBSUB_RETRY_SECONDS", "1"))
+
+EnvelopeHandler = Callable[[dict], Awaitable[None]]
+
+
+def make_envelope(topic: str, message: dict, exclude_user_id: Optional[str] = None) -> dict:
+    return {
+        "id": uuid.uuid4().hex,
+        "origin": INSTANCE_ID,
+        "topic": topic,
+        "message": message,
+        "exclude_user_id": exclude_user_id,
+        "at": datetime.now(timezone.utc),
+    }
+
+
+class LocalPubSub:
+    """Stand-in em processo: nada a propagar (a entrega local já foi feita)."""
+
+    name = "local"
+
+    async def publish(self, envelope: dict) -> None:
+        return None
+
+    async def run(self, handler: EnvelopeHandler, stop_event: asyncio.Event) -> None:
+        await stop_event.wait()
+
+
+class MongoCappedPubSub:
+    """Capped collection + cursor tailable: barramento entre réplicas."""
+
+    name = "mongo"
+
+    def __init__(self, db, collection: str = WS_PUBSUB_COLLECTION,
+                 size_bytes: int = WS_PUBSUB_CAPPED_BYTES):
+        self.db = db
+        self.collection_name = collection
+        self.size_bytes = size_bytes
+        self.coll = db[collection]
+
+    async def ensure_collection(self) -> None:
+        from pymongo.errors import CollectionInvalid
+
+        try:
+            await self.db.create_collection(self.collection_name, capped=True, size=self.size_bytes)
+        except CollectionInvalid:
+            pass  # já existe
+        await self.coll.create_index("id", name="ix_ws_pubsub_id")  # retomada do cursor
+
+    async def publish(self, envelope: dict) -> None:
+        await self.coll.insert_one(dict(envelope))
+
+    async def run(self, handler: EnvelopeHandler, stop_event: asyncio.Event) -> None:
+        """Lê envelopes novos (de outras réplicas) até `stop_event`.
+
+        Posição = `id` do último envelope lido, na ordem natural (ordem de
+        inserção do capped). Nada de `_id > último`: o ObjectId é gerado no
+        cliente de cada réplica (relógio e parte aleatória próprios), então um
+        envelope inserido depois pode ter `_id` menor e seria pulado.
+        """
+        from pymongo import CursorType
+
+        last = await self.coll.find_one({}, {"_id": 0, "id": 1}, sort=[("$natural", -1)])
+        last_id = last.get("id") if last else None
+        while not stop_event.is_set():
+            try:
+                # Reabre do início e pula até o último lido; se ele já saiu do
+                # capped (rollover), tudo o que restou é mais novo.
+                skipping = last_id is not None and \
+                    await self.coll.find_one({"id": last_id}, {"_id": 1}) is not None
+                cursor = self.coll.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive and not stop_event.is_set():
+                    async for envelope in cursor:
+                        if skipping:
+                            skipping = envelope.get("id") != last_id
+                            continue
+                        last_id = envelope.get("id")
+                        if envelope.get("origin") == INSTANCE_ID:
+                            continue
+                        try:
+                            await handler(envelope)
+                        except Exception as e:
+                            logger.warning(f"[ws_pubsub] entrega falhou: {e}")
+                    if skipping:
+                        # saiu do capped entre a checagem e a leitura
+                        logger.warning("[ws_pubsub] posição perdida no rollover do capped; seguindo do fim")
+                        skipping = False
+                    if stop_event.is_set():
+                        break
+            except Exception as e:
+                logger.warning(f"[ws_pubsub] cursor do barramento falhou: {e}")
+            # cursor morto (coleção vazia, rollover do capped, failover): reabre
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=WS_PUBSUB_RETRY_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def create_backbone(db, backend: str = WS_PUBSUB_BACKEND):
+    if backend == "mongo":
+        bus = MongoCappedPubSub(db)
+        await bus.ensure_collection()
+        return bus
+    if backend != "local":
+        logger.warning(f"[ws_pubsub] WS_PUBSUB_BACKEND desconhecido: {backend!r}; usando local")
+    return LocalPubSub()
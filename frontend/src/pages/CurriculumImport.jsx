@@ -3,7 +3,8 @@
  *
  * Fluxo:
  *   1. Upload do PDF (com escolha de componente: LP/MA/TODOS e fonte: DCM_FA/BNCC/MUNICIPAL).
- *   2. Extração automática no backend (pdfplumber + regex).
+ *   2. Extração automática no backend (pdfplumber + regex), em background:
+ *      o upload devolve o lote em 'extracting' e a tela acompanha até terminar.
  *   3. Tabela revisional: filtros (status, busca), edição inline de código/descrição/ano,
  *      aprovar/rejeitar em massa (seleção múltipla).
  *   4. Botão "Importar aprovados" persiste em `curriculum_skills`.
@@ -80,7 +81,13 @@ export default function CurriculumImport() {
         form,
         { headers: { 'Content-Type': 'multipart/form-data' } }
       );
-      toast.success(`${r.data.total_items} habilidades extraídas (${r.data.duplicates} duplicadas).`);
+      let result = r.data;
+      if (result.status === 'extracting') {
+        // Extração em background: acompanha o batch até sair de 'extracting'
+        toast.info('PDF recebido — extraindo habilidades...');
+        result = await waitExtraction(result.batch_id);
+      }
+      toast.success(`${result.total_items} habilidades extraídas (${result.duplicates} duplicadas).`);
       await fetchBatches();
       await openBatch(r.data.batch_id);
       setSelectedFile(null);
@@ -92,6 +99,22 @@ export default function CurriculumImport() {
     }
   };
 
+  const waitExtraction = async (batchId) => {
+    for (;;) {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+      const { data } = await axios.get(`${API}/api/curriculum/import/batches/${batchId}`);
+      if (data.status === 'extract_failed') {
+        throw { response: { data: { detail: data.extract_error || 'Falha ao extrair PDF.' } } };
+      }
+      if (data.status !== 'extracting') {
+        return {
+          total_items: data.items.length,
+          duplicates: data.items.filter((i) => i.status === 'duplicate').length,
+        };
+      }
+    }
+  };
+
   const openBatch = async (batchId) => {
     setLoading(true);
     try {
@@ -717,7 +717,11 @@ export function Promotion() {
         `${API_URL}/api/documents/jobs/promotion/${selectedClass}?academic_year=${selectedYear}`,
         { method: 'POST', headers: authHeaders }
       );
-      if (!startResp.ok) throw new Error('Falha ao iniciar a geração');
+      if (!startResp.ok) {
+        // 503 = fila de PDFs cheia: o backend explica no `detail`
+        const err = await startResp.json().catch(() => ({}));
+        throw new Error(err.detail || 'Falha ao iniciar a geração');
+      }
       const { job_id } = await startResp.json();
 
       // 2) Polling — o backend reporta progresso REAL (progress/message)
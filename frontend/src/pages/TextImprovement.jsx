@@ -133,7 +133,23 @@ export default function TextImprovement() {
   const handleScan = async () => {
     setScanLoading(true);
     try {
-      const res = await axios.post(`${API}/admin/text-improvement/scan`, {}, { headers: authHeaders() });
+      // A análise roda em background: dispara e acompanha pelo scan_id.
+      let res = await axios.post(`${API}/admin/text-improvement/scan`, {}, { headers: authHeaders() });
+      let resumed = false;
+      while (res.data?.status === 'running') {
+        if (res.data.stale) {
+          // Parou de avançar (servidor reiniciou no meio): retoma uma vez do cursor.
+          if (resumed) throw new Error('A análise parou de avançar. Tente novamente mais tarde.');
+          resumed = true;
+          const scanUrl = `${API}/admin/text-improvement/scan/${res.data.scan_id}`;
+          res = await axios.post(`${scanUrl}/resume`, {}, { headers: authHeaders() })
+            .catch(err => (err.response?.status === 409 ? axios.get(scanUrl, { headers: authHeaders() }) : Promise.reject(err)));
+          continue;
+        }
+        await new Promise(r => setTimeout(r, 1000));
+        res = await axios.get(`${API}/admin/text-improvement/scan/${res.data.scan_id}`, { headers: authHeaders() });
+      }
+      if (res.data?.status === 'failed') throw new Error(res.data.error || 'Falha ao analisar os textos.');
       const { enqueued = 0, candidates = 0 } = res.data || {};
       if (enqueued > 0) {
         toast.success(`${enqueued} sugestão(ões) de escrita encontrada(s) nos seus textos.`);
@@ -145,7 +161,7 @@ export default function TextImprovement() {
       setStatusFilter('pending');
       await fetchData();
     } catch (err) {
-      toast.error(err.response?.data?.detail || 'Falha ao analisar os textos.');
+      toast.error(err.response?.data?.detail || (!err.response && err.message) || 'Falha ao analisar os textos.');
     } finally {
       setScanLoading(false);
     }